@@ -0,0 +1,4 @@
+from .zones import euclidean_distance, assign_zones, zone_names
+from .network_distance import NetworkDistanceField
+
+__all__ = ['euclidean_distance', 'assign_zones', 'zone_names', 'NetworkDistanceField']
@@ -0,0 +1,204 @@
+import hashlib
+import numpy as np
+from pathlib import Path
+from typing import Sequence, Tuple, Union
+
+"""
+Street-network distance to the city center.
+
+Straight-line distance puts buildings on the far side of a river or canal
+in the same zone as their neighbours across the water. In network mode the
+distance of a point is:
+
+    shortest path (along streets) from the center node(s) to the nearest node
+    + straight-line distance from the point to that node
+
+- build a graph from CityStackGen streets (GeoJSON) or a local OSM extract
+- run ONE multi-source Dijkstra from the center node(s)
+- snap all query points to their nearest node in bulk (KD-tree)
+- cache the per-node distances on disk, keyed by network file + center
+
+geopandas / shapely / scipy / osmnx are only imported when the graph is
+actually built, so a cached field costs only the node lookup.
+"""
+
+# projected CRS used throughout the pipeline (Amersfoort / RD New)
+TARGET_CRS = "EPSG:28992"
+
+# coordinates are rounded to this precision (meters) when merging vertices into nodes
+NODE_PRECISION = 0.01
+
+
+class NetworkDistanceField:
+
+    def __init__(self, network_path: Union[str, Path], cache_dir: Union[str, Path] = None):
+        """
+        Args:
+            network_path: CityStackGen streets GeoJSON or a local OSM extract (.osm / .xml)
+            cache_dir: Directory for cached distance fields (defaults to next to the network file)
+        """
+        self.network_path = Path(network_path)
+        if not self.network_path.exists():
+            raise FileNotFoundError(f"Street network not found: {self.network_path}")
+
+        self.cache_dir = Path(cache_dir) if cache_dir else self.network_path.parent / ".distance_cache"
+
+        self._network_hash = None
+        self._graph = None      # (csr adjacency, node_xy), built lazily
+        self._fields = {}       # cache key -> (node_xy, node_distance, kd-tree)
+
+    # distance along the street network for arrays of points
+    def distances(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        center: Union[Tuple[float, float], Sequence[Tuple[float, float]]]
+    ) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        node_xy, node_distance, tree = self._get_field(self._normalize_centers(center))
+
+        # snap every point to its nearest network node in one query
+        snap_distance, node_index = tree.query(np.column_stack([x.ravel(), y.ravel()]))
+
+        # unreachable nodes keep inf -> no zone matches -> 'unknown'
+        return (node_distance[node_index] + snap_distance).reshape(x.shape)
+
+    def _normalize_centers(self, center) -> np.ndarray:
+        centers = np.asarray(center, dtype=float)
+        if centers.ndim == 1:
+            centers = centers.reshape(1, 2)
+        if centers.ndim != 2 or centers.shape[1] != 2:
+            raise ValueError(f"City center must be (x, y) or a list of (x, y), got shape {centers.shape}")
+        return centers
+
+    def _get_field(self, centers: np.ndarray):
+        key = self._cache_key(centers)
+        if key in self._fields:
+            return self._fields[key]
+
+        cache_file = self.cache_dir / f"network_{key}.npz"
+        if cache_file.exists():
+            cached = np.load(cache_file)
+            node_xy = cached['node_xy']
+            node_distance = cached['node_distance']
+        else:
+            node_xy, node_distance = self._compute_field(centers)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            np.savez(cache_file, node_xy=node_xy, node_distance=node_distance, centers=centers)
+
+        from scipy.spatial import cKDTree
+        field = (node_xy, node_distance, cKDTree(node_xy))
+        self._fields[key] = field
+        return field
+
+    def _cache_key(self, centers: np.ndarray) -> str:
+        # network content (not path/mtime) + center coordinates rounded to the node precision
+        if self._network_hash is None:
+            digest = hashlib.sha1()
+            with open(self.network_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            self._network_hash = digest.hexdigest()
+
+        centers_key = np.round(centers / NODE_PRECISION).astype(np.int64).tobytes()
+        return hashlib.sha1(self._network_hash.encode() + centers_key).hexdigest()[:16]
+
+    def _compute_field(self, centers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import dijkstra
+        from scipy.spatial import cKDTree
+
+        if self._graph is None:
+            self._graph = self._build_graph()
+        adjacency, node_xy = self._graph
+        n_nodes = node_xy.shape[0]
+
+        # connect a virtual source node to the node nearest to each center,
+        # so one Dijkstra run covers all centers (multi-source)
+        snap_distance, center_nodes = cKDTree(node_xy).query(centers)
+        source = n_nodes
+        adjacency = adjacency.tocoo()
+        rows = np.concatenate([adjacency.row, np.full(len(center_nodes), source)])
+        cols = np.concatenate([adjacency.col, center_nodes])
+        # zero-length snaps would be dropped as "no edge" by csgraph
+        weights = np.concatenate([adjacency.data, np.maximum(snap_distance, 1e-9)])
+        graph = coo_matrix((weights, (rows, cols)), shape=(n_nodes + 1, n_nodes + 1)).tocsr()
+
+        node_distance = dijkstra(graph, directed=False, indices=source)[:n_nodes]
+        return node_xy, node_distance
+
+    def _build_graph(self):
+        suffix = self.network_path.suffix.lower()
+        if suffix in ('.osm', '.xml'):
+            edges, node_xy = self._edges_from_osm()
+        else:
+            edges, node_xy = self._edges_from_streets()
+        return self._adjacency(edges, node_xy.shape[0]), node_xy
+
+    def _edges_from_streets(self) -> Tuple[np.ndarray, np.ndarray]:
+        # CityStackGen streets: planar LineStrings, noded at every crossing
+        import geopandas as gpd
+        import shapely
+
+        streets = gpd.read_file(self.network_path)
+        if streets.crs is not None and streets.crs.is_geographic:
+            streets = streets.to_crs(TARGET_CRS)
+
+        lines = streets.geometry.values
+        lines = lines[~shapely.is_empty(lines) & shapely.is_valid(lines)]
+        noded = shapely.get_parts(shapely.union_all(lines))
+
+        coords, line_index = shapely.get_coordinates(noded, return_index=True)
+
+        # merge identical vertices into nodes
+        keys = np.round(coords / NODE_PRECISION).astype(np.int64)
+        _, first, node_of_vertex = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        node_of_vertex = node_of_vertex.ravel()
+        node_xy = coords[first]
+
+        # consecutive vertices of the same line form an edge
+        same_line = line_index[:-1] == line_index[1:]
+        u = node_of_vertex[:-1][same_line]
+        v = node_of_vertex[1:][same_line]
+        length = np.hypot(*(coords[1:][same_line] - coords[:-1][same_line]).T)
+
+        return np.column_stack([u, v, length]), node_xy
+
+    def _edges_from_osm(self) -> Tuple[np.ndarray, np.ndarray]:
+        # local OSM extract: keep the osmnx topology (bridges do not connect to roads below)
+        import osmnx as ox
+
+        graph = ox.project_graph(ox.graph_from_xml(self.network_path), to_crs=TARGET_CRS)
+        nodes, edges = ox.graph_to_gdfs(graph)
+
+        # renumber OSM node ids to positions in a sorted node array
+        order = np.argsort(nodes.index.to_numpy())
+        sorted_ids = nodes.index.to_numpy()[order]
+        node_xy = np.column_stack([nodes['x'].to_numpy(), nodes['y'].to_numpy()])[order]
+
+        u = np.searchsorted(sorted_ids, edges.index.get_level_values('u').to_numpy())
+        v = np.searchsorted(sorted_ids, edges.index.get_level_values('v').to_numpy())
+
+        return np.column_stack([u, v, edges['length'].to_numpy(dtype=float)]), node_xy
+
+    def _adjacency(self, edges: np.ndarray, n_nodes: int):
+        from scipy.sparse import coo_matrix
+
+        u = edges[:, 0].astype(np.int64)
+        v = edges[:, 1].astype(np.int64)
+        length = edges[:, 2]
+
+        # drop self-loops, keep the shortest of parallel edges
+        keep = u != v
+        u, v, length = np.minimum(u, v)[keep], np.maximum(u, v)[keep], length[keep]
+        order = np.lexsort((length, v, u))
+        u, v, length = u[order], v[order], length[order]
+        first = np.ones(len(u), dtype=bool)
+        first[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+
+        return coo_matrix(
+            (np.maximum(length[first], 1e-9), (u[first], v[first])),
+            shape=(n_nodes, n_nodes)
+        ).tocsr()
@@ -0,0 +1,46 @@
+import numpy as np
+from typing import List, Tuple
+
+from rules.rule_dataclass import Zone
+
+
+# index used for distances that fall outside every zone
+UNKNOWN_ZONE_INDEX = -1
+
+
+# straight-line distance from coordinates to the city center (works on arrays)
+def euclidean_distance(
+    x: np.ndarray,
+    y: np.ndarray,
+    center: Tuple[float, float]
+) -> np.ndarray:
+    return np.sqrt((np.asarray(x, dtype=float) - center[0])**2 + (np.asarray(y, dtype=float) - center[1])**2)
+
+
+def assign_zones(zones: List[Zone], distances: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of RuleSet.get_zone
+
+    Args:
+        zones: Zone definitions in rule order
+        distances: Array of distances to the city center (any shape)
+
+    Returns:
+        Array of zone indices (same shape as distances), -1 where no zone matches
+    """
+    distances = np.asarray(distances, dtype=float)
+    zone_index = np.full(distances.shape, UNKNOWN_ZONE_INDEX, dtype=np.int64)
+
+    # walk the zones backwards so the first matching zone wins, like get_zone
+    for i in range(len(zones) - 1, -1, -1):
+        zone = zones[i]
+        mask = (distances >= zone.min_distance) & (distances < zone.max_distance)
+        zone_index[mask] = i
+
+    return zone_index
+
+
+def zone_names(zones: List[Zone], zone_index: np.ndarray) -> np.ndarray:
+    # map zone indices back to names, 'unknown' for -1
+    names = np.array([zone.name for zone in zones] + ['unknown'], dtype=object)
+    return names[zone_index]
@@ -0,0 +1,6 @@
+from .store import EnsembleStore, VARIABLES
+
+__all__ = [
+    'EnsembleStore',
+    'VARIABLES'
+]
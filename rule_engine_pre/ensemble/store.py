@@ -0,0 +1,531 @@
+import json
+import numpy as np
+import pandas as pd
+import shapely
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Sequence, Tuple, Union
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from postprocessing.building_processor import HOUSING_TYPES, HOUSEHOLD_TYPES
+
+"""
+Ensemble store: per-building results of many postprocessing runs (seeds)
+over the same buildings, in one directory instead of one classified
+GeoJSON / CSV per run.
+
+Per run only four small codes per building are kept:
+
+    building_type, household_type    int8 category codes (-1 = missing)
+    household_count, resident_count  int8 / int16 counts (narrowest per tile)
+
+laid out as runs x buildings, cut into tiles of CHUNK_RUNS runs x
+CHUNK_BUILDINGS buildings. Every tile is one zlib blob (level 1): run codes
+repeat a lot, so a tile takes ~0.25-0.4 bytes per value. All tiles of a
+run chunk go into one file, runs_<chunk>.bin, with an index of
+(offset, length, itemsize) per tile in runs_<chunk>.idx.npy. Geometry,
+centroids, areas and zones are stored once (buildings.npz, geometry.wkb).
+
+    store/
+        manifest.json          building count, variables + categories, zones, seeds, chunk files
+        buildings.npz          building_id, x, y, area_m2, zone code, WKB offsets
+        geometry.wkb           WKB of all buildings, back to back
+        runs_00000.bin / .idx.npy ...
+
+A query decompresses only the tiles it needs: one building (or a few)
+needs one tile column per run chunk, one run one tile row. Zone
+distributions are one bincount per tile over (run, zone, category).
+
+    store = EnsembleStore.create('outputs/ensemble', buildings, zones=result['zone'])
+    for seed in seeds:
+        store.append(processor_result, seed=seed)
+    store.flush()
+
+    store = EnsembleStore('outputs/ensemble')
+    store.frequency('building_type', buildings=[17, 42])   # share of runs per type
+    store.zone_distribution('household_type')              # mean share per zone
+    store.run(3)                                           # one run as a DataFrame
+"""
+
+# categorical variables: category lists (code = position), count variables: None
+VARIABLES = {
+    'building_type': HOUSING_TYPES,
+    'household_type': HOUSEHOLD_TYPES,
+    'household_count': None,
+    'resident_count': None
+}
+# tile size (runs x buildings): 32 x 8192 int8 values = 256 KB before compression
+CHUNK_RUNS = 32
+CHUNK_BUILDINGS = 8192
+COMPRESSION_LEVEL = 1
+MANIFEST = 'manifest.json'
+# zone code of buildings outside all zones
+UNKNOWN_ZONE = 'unknown'
+
+
+class EnsembleStore:
+
+    def __init__(self, path: str):
+        """
+        Open an existing store (appends continue after the last stored run)
+
+        Args:
+            path: Store directory (see EnsembleStore.create)
+        """
+        self.path = Path(path)
+        manifest_path = self.path / MANIFEST
+        if not manifest_path.exists():
+            raise ValueError(f"No ensemble store at {self.path} (missing {MANIFEST})")
+        self.manifest = json.loads(manifest_path.read_text())
+        self.variables = dict(self.manifest['variables'])
+        self.size = int(self.manifest['buildings'])
+        self.zones = list(self.manifest['zones'])
+        self.chunk_runs = int(self.manifest['chunk_runs'])
+        self.chunk_buildings = int(self.manifest['chunk_buildings'])
+
+        with np.load(self.path / 'buildings.npz') as data:
+            self.buildings = pd.DataFrame({
+                column: data[column] for column in ('building_id', 'x', 'y', 'area_m2')
+            })
+            self.zone_codes = data['zone']
+            self._wkb_offsets = data['wkb_offsets'] if 'wkb_offsets' in data.files else None
+        self.buildings['zone'] = pd.Categorical.from_codes(self.zone_codes, categories=self.zones)
+
+        # runs not yet written: the last chunk, if it is not full, is read back and rewritten on flush
+        self._tile_cache = {}
+        self._pending = {name: [] for name in self.variables}
+        self._pending_seeds = []
+        chunks = self.manifest['chunks']
+        if chunks and len(chunks[-1]['seeds']) < self.chunk_runs:
+            last = chunks[-1]
+            for name in self.variables:
+                self._pending[name] = list(self._read_chunk(len(chunks) - 1, name))
+            self._pending_seeds = list(last['seeds'])
+            chunks.pop()
+            self._tile_cache = {}
+
+    # create an empty store for a fixed set of buildings
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        buildings: pd.DataFrame,
+        zones: Sequence = None,
+        zone_names: Sequence[str] = None,
+        chunk_runs: int = CHUNK_RUNS,
+        chunk_buildings: int = CHUNK_BUILDINGS,
+        overwrite: bool = False
+    ) -> 'EnsembleStore':
+        """
+        Create an empty store for a fixed set of buildings
+
+        Args:
+            path: Store directory
+            buildings: Buildings with 'x', 'y' (and 'building_id', 'area_m2', geometry if present)
+            zones: Zone name per building (default: buildings['zone'] if present, else all unknown)
+            zone_names: Zone order of the zone codes (default: order of first appearance, unknown last)
+            chunk_runs / chunk_buildings: Tile size
+            overwrite: Replace an existing store
+
+        Returns:
+            The opened, empty store
+        """
+        path = Path(path)
+        if (path / MANIFEST).exists():
+            if not overwrite:
+                raise ValueError(f"Ensemble store {path} exists (use overwrite=True to replace it)")
+            for old in path.glob('runs_*'):
+                old.unlink()
+        if chunk_runs < 1 or chunk_buildings < 1:
+            raise ValueError("Chunk sizes must be positive")
+        path.mkdir(parents=True, exist_ok=True)
+        size = len(buildings)
+
+        if zones is None:
+            zones = buildings['zone'].to_numpy() if 'zone' in buildings else np.full(size, UNKNOWN_ZONE, dtype=object)
+        zones = np.asarray(zones, dtype=object)
+        if len(zones) != size:
+            raise ValueError(f"Got {len(zones)} zones for {size} buildings")
+        if zone_names is None:
+            zone_names = [zone for zone in pd.unique(zones) if zone != UNKNOWN_ZONE]
+        zone_names = [str(zone) for zone in zone_names if zone != UNKNOWN_ZONE] + [UNKNOWN_ZONE]
+        zone_codes = pd.Categorical(zones, categories=zone_names).codes
+        zone_codes = np.where(zone_codes < 0, len(zone_names) - 1, zone_codes).astype(np.int8)
+
+        arrays = {
+            'building_id': buildings['building_id'].to_numpy() if 'building_id' in buildings else np.arange(size),
+            'x': buildings['x'].to_numpy(dtype=np.float64),
+            'y': buildings['y'].to_numpy(dtype=np.float64),
+            'area_m2': buildings['area_m2'].to_numpy(dtype=np.float64) if 'area_m2' in buildings else np.full(size, np.nan),
+            'zone': zone_codes
+        }
+        # geometry once: WKB back to back + offsets
+        crs = None
+        if 'geometry' in buildings:
+            wkb = shapely.to_wkb(np.asarray(buildings.geometry))
+            lengths = np.fromiter((len(geometry) for geometry in wkb), dtype=np.int64, count=size)
+            arrays['wkb_offsets'] = np.concatenate([[0], np.cumsum(lengths)])
+            (path / 'geometry.wkb').write_bytes(b''.join(wkb))
+            crs = buildings.crs.to_string() if getattr(buildings, 'crs', None) is not None else None
+        np.savez(path / 'buildings.npz', **arrays)
+
+        manifest = {
+            'buildings': size,
+            'variables': {name: categories for name, categories in VARIABLES.items()},
+            'zones': zone_names,
+            'crs': crs,
+            'chunk_runs': chunk_runs,
+            'chunk_buildings': chunk_buildings,
+            'chunks': []
+        }
+        (path / MANIFEST).write_text(json.dumps(manifest, indent=2))
+        return cls(path)
+
+    @property
+    def seeds(self) -> list:
+        # seed of every run (stored and pending), in run order
+        return [seed for chunk in self.manifest['chunks'] for seed in chunk['seeds']] + self._pending_seeds
+
+    @property
+    def n_runs(self) -> int:
+        return len(self.seeds)
+
+    # add one run (a BuildingProcessor result in the store's building order)
+    def append(self, result: pd.DataFrame, seed: int = None):
+        """
+        Add the results of one run
+
+        Args:
+            result: DataFrame with the VARIABLES columns, one row per building in store order
+            seed: Random seed of the run (stored in the manifest)
+        """
+        if len(result) != self.size:
+            raise ValueError(f"Run has {len(result)} buildings, the store {self.size}")
+        for name, categories in self.variables.items():
+            if name not in result:
+                raise ValueError(f"Run is missing the '{name}' column")
+            self._pending[name].append(self._encode(name, categories, result[name]))
+        self._pending_seeds.append(seed)
+        if len(self._pending_seeds) == self.chunk_runs:
+            self.flush()
+
+    # write the pending runs (a partial last chunk is rewritten by later appends)
+    def flush(self):
+        if not self._pending_seeds:
+            return
+        chunk = len(self.manifest['chunks'])
+        name = f"runs_{chunk:05d}"
+        index = np.zeros((len(self.variables), self._n_building_chunks(), 3), dtype=np.int64)
+        offset = 0
+        with open(self.path / f"{name}.bin", 'wb') as f:
+            for v, variable in enumerate(self.variables):
+                block = np.stack(self._pending[variable])
+                for b, start in enumerate(range(0, self.size, self.chunk_buildings)):
+                    tile = _narrowest(block[:, start:start + self.chunk_buildings])
+                    data = zlib.compress(np.ascontiguousarray(tile).tobytes(), COMPRESSION_LEVEL)
+                    f.write(data)
+                    index[v, b] = (offset, len(data), tile.dtype.itemsize)
+                    offset += len(data)
+        np.save(self.path / f"{name}.idx.npy", index)
+
+        self.manifest['chunks'].append({'file': name, 'seeds': list(self._pending_seeds)})
+        (self.path / MANIFEST).write_text(json.dumps(self.manifest, indent=2))
+        self._tile_cache = {}
+        if len(self._pending_seeds) < self.chunk_runs:
+            # keep the partial chunk pending: the next flush replaces it
+            self.manifest['chunks'].pop()
+        else:
+            self._pending = {variable: [] for variable in self.variables}
+            self._pending_seeds = []
+
+    # raw codes of one variable (runs x buildings), only the tiles that are needed are read
+    def read(
+        self,
+        variable: str,
+        runs: Union[slice, Sequence[int]] = None,
+        buildings: Union[slice, Sequence[int]] = None
+    ) -> np.ndarray:
+        """
+        Codes / counts of one variable
+
+        Args:
+            variable: One of VARIABLES
+            runs: Run positions (slice or indices, None = all)
+            buildings: Building positions (slice or indices, None = all)
+
+        Returns:
+            (runs, buildings) array: category codes (int8, -1 = missing) or counts (int16)
+        """
+        self._check_variable(variable)
+        run_index = np.arange(self.n_runs)[runs if runs is not None else slice(None)]
+        building_index = np.arange(self.size)[buildings if buildings is not None else slice(None)]
+        dtype = np.int8 if self.variables[variable] is not None else np.int16
+        result = np.empty((len(run_index), len(building_index)), dtype=dtype)
+        if result.size == 0:
+            return result
+
+        # group the requested runs by chunk, the buildings by building chunk
+        stored = len(self.manifest['chunks']) * self.chunk_runs
+        run_chunk = np.minimum(run_index // self.chunk_runs, len(self.manifest['chunks']))
+        building_chunk = building_index // self.chunk_buildings
+        for chunk in np.unique(run_chunk):
+            rows = np.flatnonzero(run_chunk == chunk)
+            local_runs = run_index[rows] - chunk * self.chunk_runs
+            for b in np.unique(building_chunk):
+                columns = np.flatnonzero(building_chunk == b)
+                local_buildings = building_index[columns] - b * self.chunk_buildings
+                if chunk * self.chunk_runs >= stored:
+                    tile = self._pending_tile(variable, b)
+                else:
+                    tile = self._tile(chunk, variable, b)
+                result[_block(rows, columns)] = tile[_block(local_runs, local_buildings)]
+        return result
+
+    # one run as a DataFrame (categories decoded), with the stored building columns
+    def run(self, run: int) -> pd.DataFrame:
+        if not -self.n_runs <= run < self.n_runs:
+            raise ValueError(f"Run {run} out of range ({self.n_runs} runs)")
+        run = run % self.n_runs
+        result = self.buildings.copy()
+        for variable, categories in self.variables.items():
+            values = self.read(variable, runs=[run])[0]
+            result[variable] = pd.Categorical.from_codes(values, categories=categories) if categories else values
+        result.attrs['seed'] = self.seeds[run]
+        return result
+
+    def frequency(
+        self,
+        variable: str,
+        buildings: Union[slice, Sequence[int]] = None,
+        runs: Union[slice, Sequence[int]] = None,
+        share: bool = True
+    ) -> pd.DataFrame:
+        """
+        How often every building gets every category across runs
+
+        Args:
+            variable: Categorical variable ('building_type' or 'household_type')
+            buildings: Building positions (None = all)
+            runs: Run positions (None = all)
+            share: Shares of the runs (False: run counts)
+
+        Returns:
+            DataFrame indexed by building_id, one column per category
+        """
+        categories = self._categories(variable)
+        building_index = np.arange(self.size)[buildings if buildings is not None else slice(None)]
+        counts = np.zeros((len(building_index), len(categories)), dtype=np.int64)
+        n_runs = 0
+        for codes in self._iter_run_blocks(variable, runs, building_index):
+            for k in range(len(categories)):
+                counts[:, k] += (codes == k).sum(axis=0)
+            n_runs += len(codes)
+        values = counts / max(n_runs, 1) if share else counts
+        return pd.DataFrame(
+            values, columns=pd.Index(categories, name=variable),
+            index=pd.Index(self.buildings['building_id'].to_numpy()[building_index], name='building_id')
+        )
+
+    def statistics(
+        self,
+        variable: str,
+        buildings: Union[slice, Sequence[int]] = None,
+        runs: Union[slice, Sequence[int]] = None
+    ) -> pd.DataFrame:
+        """
+        Mean, standard deviation, min and max of a count variable per building across runs
+
+        Returns:
+            DataFrame indexed by building_id with 'mean', 'std', 'min', 'max'
+        """
+        if self.variables.get(variable, ()) is not None:
+            raise ValueError(f"'{variable}' is not a count variable, use frequency()")
+        building_index = np.arange(self.size)[buildings if buildings is not None else slice(None)]
+        total = np.zeros(len(building_index))
+        squares = np.zeros(len(building_index))
+        low = np.full(len(building_index), np.iinfo(np.int64).max)
+        high = np.full(len(building_index), np.iinfo(np.int64).min)
+        n_runs = 0
+        for values in self._iter_run_blocks(variable, runs, building_index):
+            values = values.astype(np.int64)
+            total += values.sum(axis=0)
+            squares += (values * values).sum(axis=0)
+            low = np.minimum(low, values.min(axis=0))
+            high = np.maximum(high, values.max(axis=0))
+            n_runs += len(values)
+        if n_runs == 0:
+            raise ValueError("No runs selected")
+        mean = total / n_runs
+        return pd.DataFrame({
+            'mean': mean,
+            'std': np.sqrt(np.maximum(squares / n_runs - mean * mean, 0.0)),
+            'min': low,
+            'max': high
+        }, index=pd.Index(self.buildings['building_id'].to_numpy()[building_index], name='building_id'))
+
+    def zone_distribution(
+        self,
+        variable: str,
+        runs: Union[slice, Sequence[int]] = None,
+        per_run: bool = False
+    ) -> pd.DataFrame:
+        """
+        Distribution of a variable per zone
+
+        Args:
+            variable: One of VARIABLES
+            runs: Run positions (None = all)
+            per_run: One row per (run, zone) instead of the summary over runs
+
+        Returns:
+            Categorical variable: shares of the categories per zone (mean over runs, or per run)
+            Count variable: zone totals, 'mean', 'std', 'min', 'max' over runs (or 'total' per run)
+        """
+        self._check_variable(variable)
+        categories = self.variables[variable]
+        n_zones = len(self.zones)
+        width = len(categories) if categories else 1
+        run_index = np.arange(self.n_runs)[runs if runs is not None else slice(None)]
+        table = np.zeros((len(run_index), n_zones, width), dtype=np.float64)
+
+        # one bincount per block over (run, zone, category); blocks come grouped by run chunk,
+        # their rows go to the positions of those runs in run_index
+        for codes, positions, start, stop in self._iter_run_blocks(variable, run_index, None, with_columns=True):
+            n = len(codes)
+            cell = np.arange(n, dtype=np.int32)[:, None] * n_zones + self.zone_codes[None, start:stop]
+            if categories:
+                valid = codes >= 0
+                keys = (cell * width + codes)[valid]
+                counts = np.bincount(keys, minlength=n * n_zones * width)
+            else:
+                counts = np.bincount(cell.ravel(), weights=codes.ravel().astype(np.float64), minlength=n * n_zones)
+            table[positions] += counts.reshape(n, n_zones, width)
+
+        seeds = np.asarray(self.seeds, dtype=object)[run_index]
+        if categories:
+            totals = table.sum(axis=2, keepdims=True)
+            shares = np.divide(table, totals, out=np.zeros_like(table), where=totals > 0)
+            if per_run:
+                index = pd.MultiIndex.from_product([run_index, self.zones], names=['run', 'zone'])
+                return pd.DataFrame(shares.reshape(-1, width), index=index, columns=pd.Index(categories, name=variable))
+            return pd.DataFrame(shares.mean(axis=0), index=pd.Index(self.zones, name='zone'),
+                                columns=pd.Index(categories, name=variable))
+
+        totals = table[:, :, 0]
+        if per_run:
+            index = pd.MultiIndex.from_product([run_index, self.zones], names=['run', 'zone'])
+            frame = pd.DataFrame({'total': totals.ravel()}, index=index)
+            frame['seed'] = np.repeat(seeds, n_zones)
+            return frame
+        return pd.DataFrame({
+            'mean': totals.mean(axis=0),
+            'std': totals.std(axis=0),
+            'min': totals.min(axis=0),
+            'max': totals.max(axis=0)
+        }, index=pd.Index(self.zones, name='zone'))
+
+    # building footprints (stored once), as a GeoSeries
+    def geometry(self, buildings: Union[slice, Sequence[int]] = None):
+        import geopandas as gpd
+        if self._wkb_offsets is None:
+            raise ValueError("This ensemble store has no geometry")
+        building_index = np.arange(self.size)[buildings if buildings is not None else slice(None)]
+        data = (self.path / 'geometry.wkb').read_bytes()
+        offsets = self._wkb_offsets
+        wkb = np.empty(len(building_index), dtype=object)
+        wkb[:] = [data[offsets[i]:offsets[i + 1]] for i in building_index]
+        return gpd.GeoSeries.from_wkb(wkb, crs=self.manifest['crs'], index=self.buildings['building_id'].to_numpy()[building_index])
+
+    # bytes on disk per file kind
+    def disk_usage(self) -> Dict[str, int]:
+        usage = {'runs': 0, 'buildings': 0}
+        for file in self.path.iterdir():
+            usage['runs' if file.name.startswith('runs_') else 'buildings'] += file.stat().st_size
+        return usage
+
+    def _check_variable(self, variable: str):
+        if variable not in self.variables:
+            raise ValueError(f"Unknown ensemble variable '{variable}', expected one of {list(self.variables)}")
+
+    def _categories(self, variable: str) -> list:
+        self._check_variable(variable)
+        if self.variables[variable] is None:
+            raise ValueError(f"'{variable}' is a count variable, use statistics()")
+        return self.variables[variable]
+
+    def _encode(self, name: str, categories, values) -> np.ndarray:
+        # category names -> int8 codes, counts -> int16 (checked range)
+        if categories is not None:
+            return pd.Categorical(np.asarray(values, dtype=object), categories=categories).codes.astype(np.int8)
+        values = np.asarray(values)
+        if values.size and (values.min() < 0 or values.max() > np.iinfo(np.int16).max):
+            raise ValueError(f"'{name}' values must be in 0..{np.iinfo(np.int16).max}, got {values.min()}..{values.max()}")
+        return values.astype(np.int16)
+
+    def _n_building_chunks(self) -> int:
+        return max(-(-self.size // self.chunk_buildings), 1)
+
+    def _tile(self, chunk: int, variable: str, building_chunk: int) -> np.ndarray:
+        # decompressed tile (runs of the chunk x buildings of the building chunk), last tile kept
+        key = (chunk, variable, building_chunk)
+        if key not in self._tile_cache:
+            name = self.manifest['chunks'][chunk]['file']
+            index = np.load(self.path / f"{name}.idx.npy", mmap_mode='r')
+            offset, length, itemsize = index[list(self.variables).index(variable), building_chunk]
+            with open(self.path / f"{name}.bin", 'rb') as f:
+                f.seek(int(offset))
+                data = zlib.decompress(f.read(int(length)))
+            n_runs = len(self.manifest['chunks'][chunk]['seeds'])
+            dtype = np.int8 if itemsize == 1 else np.int16
+            tile = np.frombuffer(data, dtype=dtype).reshape(n_runs, -1)
+            self._tile_cache = {key: tile}
+        return self._tile_cache[key]
+
+    def _pending_tile(self, variable: str, building_chunk: int) -> np.ndarray:
+        start = building_chunk * self.chunk_buildings
+        return np.stack([run[start:start + self.chunk_buildings] for run in self._pending[variable]])
+
+    def _read_chunk(self, chunk: int, variable: str) -> np.ndarray:
+        # all runs x all buildings of a stored chunk
+        dtype = np.int8 if self.variables[variable] is not None else np.int16
+        tiles = [self._tile(chunk, variable, b).astype(dtype) for b in range(self._n_building_chunks())]
+        return np.concatenate(tiles, axis=1)
+
+    def _iter_run_blocks(self, variable: str, runs, building_index, with_columns: bool = False):
+        # blocks of (runs of one chunk) x (buildings): tile by tile (with the positions of the runs in
+        # the selection), or the selected buildings at once
+        run_index = np.arange(self.n_runs)[runs if runs is not None else slice(None)]
+        run_chunk = run_index // self.chunk_runs
+        for chunk in np.unique(run_chunk):
+            positions = np.flatnonzero(run_chunk == chunk)
+            chunk_runs = run_index[positions]
+            if with_columns:
+                for start in range(0, self.size, self.chunk_buildings):
+                    stop = min(start + self.chunk_buildings, self.size)
+                    yield self.read(variable, runs=chunk_runs, buildings=slice(start, stop)), positions, start, stop
+            else:
+                yield self.read(variable, runs=chunk_runs, buildings=building_index)
+
+
+def _block(rows: np.ndarray, columns: np.ndarray) -> Tuple:
+    # index of the rows x columns block: slices for ascending consecutive positions (a view, no
+    # fancy-indexed copy); permuted or repeated positions stay index arrays
+    index = [
+        slice(int(positions[0]), int(positions[-1]) + 1) if np.all(np.diff(positions) == 1) else positions
+        for positions in (rows, columns)
+    ]
+    if not isinstance(index[0], slice) and not isinstance(index[1], slice):
+        return np.ix_(*index)
+    return tuple(index)
+
+
+def _narrowest(values: np.ndarray) -> np.ndarray:
+    # int8 if every value fits, int16 otherwise
+    if values.size == 0 or (values.min() >= np.iinfo(np.int8).min and values.max() <= np.iinfo(np.int8).max):
+        return values.astype(np.int8)
+    return values.astype(np.int16)
@@ -0,0 +1,17 @@
+from .spatial_weights import SpatialWeights, grid_weights
+from .morans_i import global_morans_i, local_morans_i
+from .metrics import load_cbs_grid, add_shares, cell_errors, error_metrics, zone_grid
+from .evaluator import GridEvaluator
+
+__all__ = [
+    'SpatialWeights',
+    'grid_weights',
+    'global_morans_i',
+    'local_morans_i',
+    'load_cbs_grid',
+    'add_shares',
+    'cell_errors',
+    'error_metrics',
+    'zone_grid',
+    'GridEvaluator'
+]
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Sequence
+
+from .metrics import error_metrics, add_shares
+from .morans_i import global_morans_i
+from .spatial_weights import grid_weights
+
+"""
+Score many generated runs against one reference grid.
+
+Everything that depends only on the grid (the zone raster, the contiguity
+weights and their moments) is built once in the constructor, or loaded
+from the on-disk weights cache; score() then only does array arithmetic
+and sparse matrix-vector products per run.
+"""
+
+
+class GridEvaluator:
+
+    def __init__(
+        self,
+        grid,
+        reference: Dict[str, np.ndarray],
+        zones: np.ndarray = None,
+        contiguity: str = 'queen',
+        cache_dir: str = None
+    ):
+        """
+        Args:
+            grid: GridSpec of the generated and reference rasters
+            reference: Reference rasters (load_cbs_grid), shares are added from the counts
+            zones: Raster of zone names per cell (metrics.zone_grid), optional
+            contiguity: 'queen' or 'rook' weights for Moran's I
+            cache_dir: Directory for cached spatial weights (optional)
+        """
+        self.grid = grid
+        self.reference = add_shares(reference)
+        self.zones = zones
+
+        # Moran's I on the cells with reference data, so generated and CBS use the same weights
+        mask = np.zeros(grid.shape, dtype=bool)
+        for raster in reference.values():
+            mask |= np.isfinite(raster)
+        self.weights = grid_weights(
+            grid.shape, mask=mask, contiguity=contiguity, cache_dir=cache_dir,
+            grid_key=(grid.left, grid.top, grid.cell_size)
+        )
+        self._reference_morans = {}
+
+    def score(
+        self,
+        generated: Dict[str, np.ndarray],
+        variables: Sequence[str] = None,
+        permutations: int = 0,
+        rng: np.random.Generator = None
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Error metrics and Moran's I of one generated run
+
+        Args:
+            generated: Generated rasters on the same grid (grid_aggregation.aggregate_to_grid)
+            variables: Variables to score (default: all shared rasters)
+            permutations: Permutations for Moran's I pseudo p-values (0 = none)
+            rng: Random generator for the permutations
+
+        Returns:
+            {'errors': per variable / zone MAE, RMSE, bias,
+             'morans_i': per variable global Moran's I of the generated and the reference grid}
+        """
+        generated = add_shares(generated)
+        errors = error_metrics(generated, self.reference, variables, zones=self.zones)
+
+        rows = []
+        for name in errors['variable'].unique():
+            observed = global_morans_i(self._fill(generated[name]), self.weights, permutations, rng)
+            if name not in self._reference_morans:
+                self._reference_morans[name] = global_morans_i(self._fill(self.reference[name]), self.weights)
+            reference = self._reference_morans[name]
+            rows.append({
+                'variable': name,
+                'I': observed['I'],
+                'z': observed['z'],
+                'p_sim': observed.get('p_sim', np.nan),
+                'reference_I': reference['I'],
+                'delta_I': observed['I'] - reference['I']
+            })
+        return {'errors': errors, 'morans_i': pd.DataFrame(rows)}
+
+    def _fill(self, raster: np.ndarray) -> np.ndarray:
+        # missing cells inside the mask (suppressed CBS counts, shares without households)
+        # get the masked mean: they add nothing to the cross products
+        values = np.asarray(raster, dtype=np.float64).copy()
+        inside = values[self.weights.mask]
+        missing = ~np.isfinite(inside)
+        if missing.any():
+            inside[missing] = inside[~missing].mean() if (~missing).any() else 0.0
+            values[self.weights.mask] = inside
+        return values
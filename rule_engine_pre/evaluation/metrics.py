@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import RuleSet
+from distance.zones import euclidean_distance, assign_zones, zone_names
+from postprocessing.grid_aggregation import GridSpec
+
+"""
+Cell-level error metrics between generated grids and CBS statistics.
+
+Generated rasters come from postprocessing.grid_aggregation (same GridSpec),
+reference rasters from the CBS 500 m square statistics (kaart van 500 meter
+vierkanten). CBS suppresses small counts with negative codes (e.g. -99997),
+those cells are NaN and left out of every metric.
+"""
+
+# generated raster -> CBS 500 m column
+CBS_COLUMNS = {
+    'resident_count': 'aantal_inwoners',
+    'household_count': 'aantal_part_huishoudingen',
+    'single_person_count': 'aantal_eenpersoonshuishoudens',
+    'single_parent_count': 'aantal_eenouderhuishoudens',
+    'two_parent_count': 'aantal_tweeouderhuishoudens'
+}
+CBS_ID_COLUMN = 'crs28992res500m'
+
+# shares compared between generated and CBS grids: share -> (count, total)
+SHARES = {
+    'single_person_share': ('single_person_count', ('single_person_count', 'single_parent_count', 'two_parent_count')),
+    'single_parent_share': ('single_parent_count', ('single_person_count', 'single_parent_count', 'two_parent_count')),
+    'two_parent_share': ('two_parent_count', ('single_person_count', 'single_parent_count', 'two_parent_count'))
+}
+
+
+def load_cbs_grid(path: str, grid: GridSpec, columns: Dict[str, str] = None) -> Dict[str, np.ndarray]:
+    """
+    Read CBS 500 m statistics into rasters aligned with a GridSpec
+
+    Args:
+        path: CBS vierkantstatistieken file (GeoPackage / CSV) with a crs28992res500m id column
+        grid: Grid of the generated rasters (GridSpec.aligned with 500 m cells)
+        columns: Generated raster name -> CBS column (default CBS_COLUMNS)
+
+    Returns:
+        Dictionary of (rows, cols) float rasters, NaN for missing or suppressed cells
+    """
+    columns = CBS_COLUMNS if columns is None else columns
+    if Path(path).suffix.lower() == '.csv':
+        table = pd.read_csv(path, usecols=[CBS_ID_COLUMN] + list(columns.values()))
+    else:
+        import pyogrio
+        table = pyogrio.read_dataframe(path, columns=[CBS_ID_COLUMN] + list(columns.values()), read_geometry=False)
+
+    # cell ids like E1205N4875: lower-left corner in hectometers
+    ids = table[CBS_ID_COLUMN].astype(str).str.extract(r'E(\d+)N(\d+)').astype(np.float64)
+    x = ids[0].to_numpy() * 100 + grid.cell_size / 2
+    y = ids[1].to_numpy() * 100 + grid.cell_size / 2
+    row, col = grid.cell_index(x, y)
+    rows, cols = grid.shape
+    inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+
+    rasters = {}
+    for name, cbs_column in columns.items():
+        values = table[cbs_column].to_numpy(dtype=np.float64)
+        values[values < 0] = np.nan  # suppressed / secret
+        raster = np.full(grid.shape, np.nan)
+        raster[row[inside], col[inside]] = values[inside]
+        rasters[name] = raster
+    return rasters
+
+
+def add_shares(rasters: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    # household type shares per cell from the counts (NaN without households)
+    rasters = dict(rasters)
+    for share, (count, totals) in SHARES.items():
+        if count in rasters and all(total in rasters for total in totals):
+            total = sum(rasters[name].astype(np.float64) for name in totals)
+            rasters[share] = np.divide(
+                rasters[count], total, out=np.full(total.shape, np.nan), where=total > 0
+            )
+    return rasters
+
+
+def cell_errors(
+    generated: Dict[str, np.ndarray],
+    reference: Dict[str, np.ndarray],
+    variables: Sequence[str] = None
+) -> Dict[str, np.ndarray]:
+    # per-cell error rasters (generated - reference), NaN where either side is missing
+    variables = _common_variables(generated, reference, variables)
+    return {name: generated[name].astype(np.float64) - reference[name] for name in variables}
+
+
+def error_metrics(
+    generated: Dict[str, np.ndarray],
+    reference: Dict[str, np.ndarray],
+    variables: Sequence[str] = None,
+    zones: np.ndarray = None
+) -> pd.DataFrame:
+    """
+    MAE, RMSE and bias per variable, overall and per zone
+
+    Args:
+        generated: Generated rasters (grid_aggregation.aggregate_to_grid)
+        reference: Reference rasters on the same grid (load_cbs_grid)
+        variables: Variables to compare (default: all shared rasters)
+        zones: Raster of zone names per cell (zone_grid), adds one row per zone
+
+    Returns:
+        DataFrame with columns variable, zone, cells, mae, rmse, bias, generated_total,
+        reference_total (shares: mean share instead of totals)
+    """
+    errors = cell_errors(generated, reference, variables)
+    groups = [('all', None)]
+    if zones is not None:
+        groups += [(zone_name, zones == zone_name) for zone_name in pd.unique(zones.ravel())]
+
+    rows = []
+    for name, error in errors.items():
+        valid = np.isfinite(error)
+        for zone_name, in_zone in groups:
+            cells = valid if in_zone is None else valid & in_zone
+            difference = error[cells]
+            is_share = name.endswith('_share')
+            rows.append({
+                'variable': name,
+                'zone': zone_name,
+                'cells': int(cells.sum()),
+                'mae': float(np.abs(difference).mean()) if len(difference) else np.nan,
+                'rmse': float(np.sqrt((difference ** 2).mean())) if len(difference) else np.nan,
+                'bias': float(difference.mean()) if len(difference) else np.nan,
+                'generated_total': float(
+                    generated[name][cells].mean() if is_share else generated[name][cells].sum()
+                ) if len(difference) else np.nan,
+                'reference_total': float(
+                    reference[name][cells].mean() if is_share else reference[name][cells].sum()
+                ) if len(difference) else np.nan
+            })
+    return pd.DataFrame(rows)
+
+
+def zone_grid(grid: GridSpec, rules: RuleSet, city_center: Tuple[float, float]) -> np.ndarray:
+    # zone name of every cell center (straight-line distance to the city center)
+    x, y = grid.cell_centers()
+    distances = euclidean_distance(x.ravel(), y.ravel(), city_center)
+    return zone_names(rules.zones, assign_zones(rules.zones, distances)).reshape(grid.shape)
+
+
+def _common_variables(generated, reference, variables):
+    if variables is None:
+        return [name for name in reference if name in generated and np.ndim(generated[name]) == 2]
+    missing = [name for name in variables if name not in generated or name not in reference]
+    if missing:
+        raise ValueError(f"Variables missing in generated or reference rasters: {missing}")
+    return list(variables)
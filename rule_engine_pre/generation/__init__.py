@@ -0,0 +1,3 @@
+from .subdivision import subdivide_enclosures, assign_enclosure_types
+
+__all__ = ['subdivide_enclosures', 'assign_enclosure_types']
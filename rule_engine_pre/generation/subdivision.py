@@ -0,0 +1,230 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+import sys
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import RuleSet
+from postprocessing.building_processor import BuildingProcessor
+
+"""
+Enclosure subdivision into building footprints (generation steps 4-5 of
+rules/generation.md), by housing type:
+
+- apartment: one perimeter block per enclosure (the block minus an inner
+  courtyard, the whole block when it is too small for a courtyard)
+- terraced:  row-house strips of `width` along the block edge, `depth`
+  deep: the long sides are cut across, the two short ends along
+- detached:  a grid of square lots, one centered footprint per lot that
+  lies completely inside the block
+
+Every step is one batched shapely call over all enclosures of a type (or
+over all lots / strips of all enclosures): buffers, oriented envelopes,
+intersections and containment tests run in GEOS without a Python loop per
+enclosure. Lots and strips are laid out in the frame of each block's
+minimum rotated rectangle (u = long side, v = short side), generated with
+numpy repeat / arange.
+
+Coordinates must be projected (meters).
+"""
+
+HOUSING_TYPES = ('apartment', 'terraced', 'detached')
+
+# meters
+DEFAULT_PARAMETERS = {
+    # distance of every building from the street (enclosure edge)
+    'setback': 3.0,
+    'apartment': {'depth': 14.0},
+    'terraced': {'depth': 10.0, 'width': 6.0},
+    'detached': {'lot': 22.0, 'footprint': 11.0},
+    # smaller pieces are dropped (strip ends, slivers)
+    'min_area': 25.0
+}
+
+
+def subdivide_enclosures(
+    enclosures: gpd.GeoDataFrame,
+    housing_types: Sequence[str],
+    parameters: Dict = None,
+    id_column: str = 'enclosure_id'
+) -> gpd.GeoDataFrame:
+    """
+    Building footprints of all enclosures
+
+    Args:
+        enclosures: Enclosure polygons (projected CRS)
+        housing_types: Housing type per enclosure ('apartment', 'terraced', 'detached', other = no buildings)
+        parameters: Overrides of DEFAULT_PARAMETERS (per type dicts are merged)
+        id_column: Enclosure id column (default: row position when missing)
+
+    Returns:
+        GeoDataFrame with 'building_id', 'parent_block_id', 'building_type', 'area_m2' and the footprints
+    """
+    housing_types = np.asarray(housing_types, dtype=object)
+    if len(housing_types) != len(enclosures):
+        raise ValueError(f"Got {len(housing_types)} housing types for {len(enclosures)} enclosures")
+    if enclosures.crs is not None and enclosures.crs.is_geographic:
+        raise ValueError("Subdivision works in meters: reproject the enclosures to a projected CRS first")
+    params = _merge_parameters(parameters)
+
+    geometries = enclosures.geometry.to_numpy()
+    enclosure_ids = enclosures[id_column].to_numpy() if id_column in enclosures else np.arange(len(enclosures))
+
+    # building area of every block: the enclosure minus the street setback
+    blocks = shapely.buffer(geometries, -params['setback'], join_style='mitre')
+
+    subdividers = {'apartment': _apartment_blocks, 'terraced': _terraced_strips, 'detached': _detached_houses}
+    parts = []
+    for housing_type in HOUSING_TYPES:
+        selected = np.flatnonzero((housing_types == housing_type) & ~shapely.is_empty(blocks))
+        if len(selected) == 0:
+            continue
+        footprints, owner = subdividers[housing_type](blocks[selected], params)
+        # single polygons, no slivers
+        footprints, part_owner = shapely.get_parts(footprints, return_index=True)
+        owner = owner[part_owner]
+        keep = (shapely.get_type_id(footprints) == 3) & (shapely.area(footprints) >= params['min_area'])
+        parts.append((footprints[keep], selected[owner[keep]], housing_type))
+
+    footprints = np.concatenate([part[0] for part in parts]) if parts else np.array([], dtype=object)
+    parent = np.concatenate([part[1] for part in parts]) if parts else np.array([], dtype=np.int64)
+    types = np.concatenate([np.full(len(part[0]), part[2], dtype=object) for part in parts]) if parts else []
+    # buildings ordered by enclosure
+    order = np.argsort(parent, kind='stable')
+    return gpd.GeoDataFrame({
+        'building_id': np.arange(len(order)),
+        'parent_block_id': enclosure_ids[parent[order]],
+        'building_type': np.asarray(types, dtype=object)[order],
+        'area_m2': shapely.area(footprints[order]),
+    }, geometry=gpd.GeoSeries(footprints[order], crs=enclosures.crs))
+
+
+def assign_enclosure_types(
+    rules: RuleSet,
+    enclosures: gpd.GeoDataFrame,
+    city_center: Tuple[float, float],
+    random_seed: int = None
+) -> np.ndarray:
+    # housing type per enclosure from the zone rules (landuse + housing type mix at the enclosure centroid)
+    centroids = shapely.centroid(enclosures.geometry.to_numpy())
+    blocks = pd.DataFrame({
+        'x': shapely.get_x(centroids),
+        'y': shapely.get_y(centroids),
+        'area_m2': shapely.area(enclosures.geometry.to_numpy())
+    })
+    processor = BuildingProcessor(rules, random_seed=random_seed)
+    return processor.process_buildings(blocks, city_center)['building_type'].to_numpy(dtype=object)
+
+
+def _merge_parameters(parameters: Dict = None) -> Dict:
+    merged = {key: dict(value) if isinstance(value, dict) else value for key, value in DEFAULT_PARAMETERS.items()}
+    for key, value in (parameters or {}).items():
+        if key not in merged:
+            raise ValueError(f"Unknown subdivision parameter '{key}', expected one of {list(merged)}")
+        if isinstance(merged[key], dict):
+            merged[key].update(value)
+        else:
+            merged[key] = value
+    if merged['setback'] < 0 or merged['min_area'] < 0:
+        raise ValueError("Subdivision setback and min_area must not be negative")
+    for housing_type in HOUSING_TYPES:
+        for name, value in merged[housing_type].items():
+            if value <= 0:
+                raise ValueError(f"Subdivision parameter '{housing_type}.{name}' must be positive, got {value}")
+    return merged
+
+
+def _apartment_blocks(blocks: np.ndarray, params: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    # perimeter block: block minus the courtyard (whole block if there is no courtyard)
+    courtyards = shapely.buffer(blocks, -params['apartment']['depth'], join_style='mitre')
+    return shapely.difference(blocks, courtyards), np.arange(len(blocks))
+
+
+def _terraced_strips(blocks: np.ndarray, params: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    # row-house band along the block edge, cut into strips of `width`
+    depth, width = params['terraced']['depth'], params['terraced']['width']
+    bands = shapely.difference(blocks, shapely.buffer(blocks, -depth, join_style='mitre'))
+    origin, u_axis, v_axis, length, breadth = _block_frames(blocks)
+
+    # long sides: cuts across u between the two ends, each cut holds both sides of the block
+    middle = np.maximum(length - 2 * depth, 0.0)
+    side_count = np.ceil(middle / width).astype(np.int64)
+    owner, i = _enumerate(side_count)
+    u0 = depth + i * width
+    u1 = np.minimum(u0 + width, (length - depth)[owner])
+    side_cells = _frame_boxes(origin[owner], u_axis[owner], v_axis[owner], u0, u1, 0.0, breadth[owner])
+
+    # short ends: cuts along v over the first / last `depth` of u
+    end_count = np.ceil(breadth / width).astype(np.int64)
+    end_owner, j = _enumerate(np.repeat(end_count, 2))
+    block = end_owner // 2
+    at_start = end_owner % 2 == 0
+    u0 = np.where(at_start, 0.0, np.maximum(length[block] - depth, depth))
+    u1 = np.where(at_start, np.minimum(depth, length[block]), length[block])
+    v0 = j * width
+    v1 = np.minimum(v0 + width, breadth[block])
+    end_cells = _frame_boxes(origin[block], u_axis[block], v_axis[block], u0, u1, v0, v1)
+
+    owner = np.concatenate([owner, block])
+    cells = np.concatenate([side_cells, end_cells])
+    shapely.prepare(bands)
+    return shapely.intersection(bands[owner], cells), owner
+
+
+def _detached_houses(blocks: np.ndarray, params: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    # square lots in the block frame, one centered footprint per lot inside the block
+    lot, footprint = params['detached']['lot'], params['detached']['footprint']
+    origin, u_axis, v_axis, length, breadth = _block_frames(blocks)
+    nu = np.maximum(np.floor(length / lot), 1).astype(np.int64)
+    nv = np.maximum(np.floor(breadth / lot), 1).astype(np.int64)
+    owner, k = _enumerate(nu * nv)
+    # lots centered in the block frame (leftover length split over both ends)
+    cu = (length[owner] - nu[owner] * lot) / 2 + (k % nu[owner] + 0.5) * lot
+    cv = (breadth[owner] - nv[owner] * lot) / 2 + (k // nu[owner] + 0.5) * lot
+    half = footprint / 2
+    houses = _frame_boxes(origin[owner], u_axis[owner], v_axis[owner], cu - half, cu + half, cv - half, cv + half)
+    shapely.prepare(blocks)
+    inside = shapely.contains(blocks[owner], houses)
+    return houses[inside], owner[inside]
+
+
+def _block_frames(blocks: np.ndarray):
+    # minimum rotated rectangle of every block: corner, unit axes along the long (u) and short (v) side, side lengths
+    envelopes = shapely.oriented_envelope(blocks)
+    corners = shapely.get_coordinates(shapely.get_exterior_ring(envelopes)).reshape(len(blocks), 5, 2)
+    origin = corners[:, 0]
+    edge_a = corners[:, 1] - origin
+    edge_b = corners[:, 3] - origin
+    length_a = np.hypot(edge_a[:, 0], edge_a[:, 1])
+    length_b = np.hypot(edge_b[:, 0], edge_b[:, 1])
+    a_is_long = (length_a >= length_b)[:, None]
+    u_edge = np.where(a_is_long, edge_a, edge_b)
+    v_edge = np.where(a_is_long, edge_b, edge_a)
+    length = np.maximum(length_a, length_b)
+    breadth = np.minimum(length_a, length_b)
+    u_axis = u_edge / np.maximum(length, 1e-12)[:, None]
+    v_axis = v_edge / np.maximum(breadth, 1e-12)[:, None]
+    return origin, u_axis, v_axis, length, breadth
+
+
+def _enumerate(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (owner, position within owner) of sum(counts) items
+    owner = np.repeat(np.arange(len(counts)), counts)
+    position = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, position
+
+
+def _frame_boxes(origin, u_axis, v_axis, u0, u1, v0, v1) -> np.ndarray:
+    # rectangles [u0, u1] x [v0, v1] in each block frame -> world polygons
+    n = len(origin)
+    u = np.stack([np.broadcast_to(value, n) for value in (u0, u1, u1, u0, u0)], axis=1)
+    v = np.stack([np.broadcast_to(value, n) for value in (v0, v0, v1, v1, v0)], axis=1)
+    coords = origin[:, None, :] + u[..., None] * u_axis[:, None, :] + v[..., None] * v_axis[:, None, :]
+    return shapely.polygons(coords)
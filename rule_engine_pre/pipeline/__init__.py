@@ -0,0 +1,8 @@
+from .executor import StageExecutor, ExecutorResult
+from .multi_seed import run_multi_seed
+
+__all__ = [
+    'StageExecutor',
+    'ExecutorResult',
+    'run_multi_seed'
+]
@@ -0,0 +1,208 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+"""
+Small DAG stage executor.
+
+Every item (e.g. a seed) flows through a DAG of stages. A stage runs for
+an item as soon as all the stages it depends on finished for that item:
+
+    preprocess(seed 3) | generate(seed 2) | postprocess(seed 1)
+
+- every stage has its own worker threads (per-stage concurrency limit)
+- stages are connected by bounded queues: a fast stage blocks once
+  `max_pending` items wait for the next stage, so memory stays bounded
+- the first error stops feeding new items and is raised by run()
+
+Threads are enough here: the expensive stages are external processes
+(the generator) or numpy / GDAL calls that release the GIL.
+"""
+
+# marks the end of a stage queue
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    # function(item, inputs) -> result, inputs = {dependency name: its result for this item}
+    function: Callable[[Any, Dict[str, Any]], Any]
+    workers: int = 1
+    depends_on: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageRun:
+    # timing of one stage for one item
+    stage: str
+    item: Any
+    start: float
+    end: float
+
+
+@dataclass
+class ExecutorResult:
+    # results[item][stage] and the timeline of all stage runs
+    results: Dict[Any, Dict[str, Any]] = field(default_factory=dict)
+    timeline: List[StageRun] = field(default_factory=list)
+
+    def busy_time(self) -> Dict[str, float]:
+        # seconds each stage spent working (summed over its workers)
+        busy = {}
+        for run in self.timeline:
+            busy[run.stage] = busy.get(run.stage, 0.0) + run.end - run.start
+        return busy
+
+
+class StageExecutor:
+
+    def __init__(self, max_pending: int = 1):
+        """
+        Args:
+            max_pending: Max items waiting in front of every stage
+        """
+        self.max_pending = max_pending
+        self.stages: Dict[str, Stage] = {}
+
+    def add_stage(
+        self,
+        name: str,
+        function: Callable[[Any, Dict[str, Any]], Any],
+        workers: int = 1,
+        depends_on: Sequence[str] = ()
+    ) -> 'StageExecutor':
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists")
+        if workers < 1:
+            raise ValueError(f"Stage '{name}' needs at least 1 worker, got {workers}")
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                # stages are added in dependency order, so the graph can not have cycles
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = Stage(name, function, workers, tuple(depends_on))
+        return self
+
+    def run(self, items: Iterable) -> ExecutorResult:
+        """
+        Run every item through all stages
+
+        Args:
+            items: Items to process (hashable, e.g. seeds), fed in order
+
+        Returns:
+            ExecutorResult with the result of every stage for every item
+        """
+        if not self.stages:
+            raise ValueError("No stages added")
+
+        result = ExecutorResult()
+        lock = threading.Lock()
+        errors = []
+        stop = threading.Event()
+
+        queues = {name: queue.Queue(maxsize=self.max_pending) for name in self.stages}
+        downstream = {name: [s.name for s in self.stages.values() if name in s.depends_on] for name in self.stages}
+        roots = [s.name for s in self.stages.values() if not s.depends_on]
+        sinks = [name for name, children in downstream.items() if not children]
+
+        # finished dependencies per (stage, item) for stages with several parents
+        waiting: Dict[Tuple[str, Any], int] = {}
+        # open upstream streams per stage (a stage is closed when all parents are)
+        open_parents = {name: len(s.depends_on) for name, s in self.stages.items()}
+        # running workers per stage (the last one to finish closes the children)
+        running = {name: s.workers for name, s in self.stages.items()}
+
+        def put(name, item):
+            # blocking put (backpressure) that gives up once the run failed
+            while True:
+                try:
+                    queues[name].put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    if stop.is_set() and item is not _DONE:
+                        return
+
+        def finished(name, item, value):
+            with lock:
+                result.results.setdefault(item, {})[name] = value
+                ready = []
+                for child in downstream[name]:
+                    key = (child, item)
+                    waiting[key] = waiting.get(key, 0) + 1
+                    if waiting[key] == len(self.stages[child].depends_on):
+                        del waiting[key]
+                        ready.append(child)
+            for child in ready:
+                put(child, item)
+
+        def close(name):
+            # all workers of `name` are done: children lose one open parent
+            for child in downstream[name]:
+                with lock:
+                    open_parents[child] -= 1
+                    last_parent = open_parents[child] == 0
+                if last_parent:
+                    for _ in range(self.stages[child].workers):
+                        put(child, _DONE)
+
+        def worker(stage: Stage):
+            while True:
+                item = queues[stage.name].get()
+                if item is _DONE:
+                    break
+                if stop.is_set():
+                    continue
+                with lock:
+                    inputs = {dependency: result.results[item][dependency] for dependency in stage.depends_on}
+                start = time.perf_counter()
+                try:
+                    value = stage.function(item, inputs)
+                except BaseException as error:
+                    with lock:
+                        errors.append((stage.name, item, error))
+                    stop.set()
+                    continue
+                with lock:
+                    result.timeline.append(StageRun(stage.name, item, start, time.perf_counter()))
+                finished(stage.name, item, value)
+
+            with lock:
+                running[stage.name] -= 1
+                last_worker = running[stage.name] == 0
+            if last_worker:
+                close(stage.name)
+
+        threads = []
+        for stage in self.stages.values():
+            for i in range(stage.workers):
+                thread = threading.Thread(target=worker, args=(stage,), name=f"{stage.name}-{i}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        # feed items into the root stages (blocks while they are busy)
+        for item in items:
+            if stop.is_set():
+                break
+            with lock:
+                result.results[item] = {}
+            for name in roots:
+                put(name, item)
+        for name in roots:
+            for _ in range(self.stages[name].workers):
+                put(name, _DONE)
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            stage_name, item, error = errors[0]
+            raise RuntimeError(f"Stage '{stage_name}' failed for item {item!r}: {error}") from error
+
+        # only items that reached every sink are complete
+        result.results = {
+            item: values for item, values in result.results.items() if all(name in values for name in sinks)
+        }
+        return result
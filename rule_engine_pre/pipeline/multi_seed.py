@@ -0,0 +1,163 @@
+import pandas as pd
+import shlex
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence, Union
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from pipeline.executor import StageExecutor, ExecutorResult
+from preprocessing.main import modify_template_with_stats
+from postprocessing.main import postprocess_citystackgen_output
+
+"""
+Multi-seed pipeline: preprocessing -> generator -> postprocessing per seed,
+with the stages of different seeds overlapping:
+
+    preprocess:   seed 1 | seed 2 | seed 3 |
+    generate:            | seed 1 | seed 2 | seed 3 |
+    postprocess:                  | seed 1 | seed 2 | seed 3
+
+The generator (CityStackGen) is an external command. Its arguments are
+format strings with the placeholders {template}, {output_dir} and {seed},
+e.g.
+
+    ["../citystack/citystackgen/target/release/citystackgen",
+     "--template", "{template}", "--output", "{output_dir}", "--seed", "{seed}"]
+
+so a local stub script can stand in for the real generator. The generator
+has to write buildings.geojson (and city_center.geojson, unless a fixed
+city center file is given) into {output_dir}.
+
+Per seed, everything goes to <output_root>/seed_<seed>/:
+    pre/template_modified.npz, generated/, post/buildings_classified.{geojson,csv}
+
+The postprocessing stage returns the output paths and a small summary
+(building, household and resident counts per zone / type); the classified
+buildings of a seed are dropped as soon as they are written, so memory
+does not grow with the number of seeds.
+"""
+
+
+def run_multi_seed(
+    seeds: Sequence[int],
+    input_template: str,
+    rules_yaml: str,
+    generator_command: Union[str, List[str]],
+    output_root: str,
+    city_center_geojson: str = None,
+    cell_size: float = 100.0,
+    preprocess_workers: int = 1,
+    generate_workers: int = 1,
+    postprocess_workers: int = 1,
+    max_pending: int = 1,
+    preprocessing_options: Dict = None,
+    postprocessing_options: Dict = None
+) -> ExecutorResult:
+    """
+    Run preprocessing, generation and postprocessing for several seeds with overlapping stages
+
+    Args:
+        seeds: Random seeds, one full pipeline run each
+        input_template: Path to input NPZ template
+        rules_yaml: Path to rules YAML file
+        generator_command: Generator command (list or shell-style string) with
+            {template}, {output_dir} and {seed} placeholders
+        output_root: Directory for the per-seed outputs
+        city_center_geojson: Fixed city center file (None = generator's city_center.geojson)
+        cell_size: Size of grid cells in meters
+        preprocess_workers / generate_workers / postprocess_workers: Concurrency per stage
+        max_pending: Max seeds waiting in front of every stage
+        preprocessing_options: Extra keyword arguments for modify_template_with_stats
+        postprocessing_options: Extra keyword arguments for postprocess_citystackgen_output
+
+    Returns:
+        ExecutorResult: per seed the stage results (template path, generator output dir,
+        postprocessing output paths + summarize_buildings) and the stage timeline
+    """
+    output_root = Path(output_root)
+    command = shlex.split(generator_command) if isinstance(generator_command, str) else list(generator_command)
+    preprocessing_options = preprocessing_options or {}
+    postprocessing_options = postprocessing_options or {}
+
+    def seed_dir(seed) -> Path:
+        return output_root / f"seed_{seed}"
+
+    def preprocess(seed, inputs):
+        template_path = seed_dir(seed) / "pre" / "template_modified.npz"
+        modify_template_with_stats(
+            input_path=input_template,
+            output_path=str(template_path),
+            rules_yaml=rules_yaml,
+            cell_size=cell_size,
+            random_seed=seed,
+            **preprocessing_options
+        )
+        print(f"  [seed {seed}] preprocessing done")
+        return template_path
+
+    def generate(seed, inputs):
+        output_dir = seed_dir(seed) / "generated"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        run_generator(command, inputs['preprocess'], output_dir, seed)
+        print(f"  [seed {seed}] generation done")
+        return output_dir
+
+    def postprocess(seed, inputs):
+        generated = inputs['generate']
+        post_dir = seed_dir(seed) / "post"
+        outputs = {
+            'geojson': post_dir / "buildings_classified.geojson",
+            'csv': post_dir / "buildings_classified.csv"
+        }
+        buildings = postprocess_citystackgen_output(
+            buildings_geojson=str(generated / "buildings.geojson"),
+            city_center_geojson=city_center_geojson or str(generated / "city_center.geojson"),
+            rules_yaml=rules_yaml,
+            output_geojson=str(outputs['geojson']),
+            output_csv=str(outputs['csv']),
+            random_seed=seed,
+            **postprocessing_options
+        )
+        print(f"  [seed {seed}] postprocessing done")
+        # only paths + counts stay in the executor result, not the buildings
+        return {**outputs, 'summary': summarize_buildings(buildings)}
+
+    executor = StageExecutor(max_pending=max_pending)
+    executor.add_stage('preprocess', preprocess, workers=preprocess_workers)
+    executor.add_stage('generate', generate, workers=generate_workers, depends_on=['preprocess'])
+    executor.add_stage('postprocess', postprocess, workers=postprocess_workers, depends_on=['generate'])
+    return executor.run(seeds)
+
+
+def summarize_buildings(buildings: pd.DataFrame) -> Dict:
+    # building / household / resident counts of one classified run, in total and per zone / type
+    def counts(column):
+        return {str(key): int(value) for key, value in buildings[column].value_counts(sort=False).items()}
+
+    return {
+        'buildings': len(buildings),
+        'households': int(buildings['household_count'].sum()),
+        'residents': int(buildings['resident_count'].sum()),
+        'zones': counts('zone'),
+        'building_types': counts('building_type'),
+        'household_types': counts('household_type')
+    }
+
+
+def run_generator(command: List[str], template_path: Path, output_dir: Path, seed: int):
+    # run the external generator, its output goes to <output_dir>/generator.log
+    arguments = [
+        part.format(template=template_path, output_dir=output_dir, seed=seed) for part in command
+    ]
+    log_path = output_dir / "generator.log"
+    with open(log_path, 'w') as log:
+        completed = subprocess.run(arguments, stdout=log, stderr=subprocess.STDOUT)
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"Generator failed for seed {seed} (exit code {completed.returncode}), see {log_path}"
+        )
@@ -1,9 +1,10 @@
 import numpy as np
 import pandas as pd
 import geopandas as gpd
+import shapely
 import sys
 from pathlib import Path
-from typing import Tuple
+from typing import Sequence, Tuple
 
 # add parent directory to path for imports
 PARENT_DIR = Path(__file__).parent.parent # 2 levesl up
@@ -13,6 +14,16 @@ if str(PARENT_DIR) not in sys.path:
 from rules.rule_dataclass import RuleSet
 from rules.parser import RuleParser
 from preprocessing.template_modifier import BUILDING_CLASSES
+from distance.zones import euclidean_distance, assign_zones, zone_names
+from distance.network_distance import NetworkDistanceField
+from postprocessing.geometry_cache import to_projected, prepare_geometry
+from sampling.quota import quota_assign, quota_assign_by_rank
+from sampling.random_field import field_at_points
+from sampling.alias import CategoricalSampler
+from sampling.inverse_cdf import unit_size_table
+from sampling.keyed import (
+    keyed_uniform, resolve_seed, STREAM_BUILDING_TYPE, STREAM_UNIT_SIZE, STREAM_HOUSEHOLD_TYPE, STREAM_HOUSEHOLD_SIZE
+)
 
 """
 CityStackGen output run with 
@@ -29,6 +40,7 @@ is in:
 Postprocessing:
 - Classifying building geometries generated by CityStackGen
 - different data structure from preprocessing, same euclidean distance algorithm
+  (or street-network distance when a NetworkDistanceField is given)
 
 - read geojson file of CityStackGen building polygons
 - for each bldg polygon:
@@ -41,15 +53,29 @@ Postprocessing:
 
 """
 
-def load_buildings_from_geojson(geojson_path: str) -> gpd.GeoDataFrame:
+def load_buildings_from_geojson(geojson_path: str, geometry_cache: bool = False, cache_dir: str = None) -> gpd.GeoDataFrame:
     buildings_gdf = gpd.read_file(geojson_path)
-    
+    if geometry_cache:
+        # centroids / areas from the sidecar cache of this file (computed on the first run)
+        attributes = prepare_geometry(geojson_path, cache_dir)
+        for column in ('x', 'y', 'area_m2'):
+            buildings_gdf[column] = attributes[column]
+        return buildings_gdf
+    return add_building_attributes(buildings_gdf)
+
+
+# add centroid coordinates and area to a (batch of) building polygons
+# (geographic CRS: computed in EPSG:28992, the geometry column itself is unchanged)
+def add_building_attributes(buildings_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    geometries, _ = to_projected(np.asarray(buildings_gdf.geometry.values), buildings_gdf.crs)
+
     # get centroids (as x, y coordinates - not as geometry column)
-    buildings_gdf['x'] = buildings_gdf.geometry.centroid.x
-    buildings_gdf['y'] = buildings_gdf.geometry.centroid.y
+    centroids = shapely.centroid(geometries)
+    buildings_gdf['x'] = shapely.get_x(centroids)
+    buildings_gdf['y'] = shapely.get_y(centroids)
     
     # calculate area
-    buildings_gdf['area_m2'] = buildings_gdf.geometry.area
+    buildings_gdf['area_m2'] = shapely.area(geometries)
     
     return buildings_gdf
 
@@ -58,26 +84,81 @@ def get_city_center_from_geojson(geojson_path: str) -> Tuple[float, float]:
 
     city_center_gdf = gpd.read_file(geojson_path)
     
-    # Extract point coordinates
-    point = city_center_gdf.geometry.iloc[0]
-    center_x = point.x
-    center_y = point.y
+    # Extract point coordinates (geographic CRS: in EPSG:28992, like the buildings)
+    point, _ = to_projected(np.asarray(city_center_gdf.geometry.values)[:1], city_center_gdf.crs)
+    center_x = shapely.get_x(point[0])
+    center_y = shapely.get_y(point[0])
     
     return (center_x, center_y)
 
 
+# columns derived from the zone of a building (in dependency order)
+DERIVED_COLUMNS = (
+    'building_type', 'building_class', 'unit_size', 'household_type', 'household_count', 'resident_count'
+)
+
+# low-memory mode: compact dtypes of the attribute columns
+HOUSING_TYPES = ['apartment', 'detached', 'terraced', 'none']
+HOUSEHOLD_TYPES = ['single_person', 'single_parent', 'two_parent', 'none']
+LOW_MEMORY_DTYPES = {
+    'x': np.float32,
+    'y': np.float32,
+    'area_m2': np.float32,
+    'distance': np.float32,
+    'building_type': pd.CategoricalDtype(HOUSING_TYPES),
+    'building_class': np.int8,
+    'unit_size': np.float32,
+    'household_type': pd.CategoricalDtype(HOUSEHOLD_TYPES),
+    'household_count': np.int32,
+    'resident_count': np.int32
+}
+
+# unit size (m2) of zones without a unit size rule
+DEFAULT_UNIT_SIZE = 60.0
+
+# residents per household by household type ({size: probability})
+# single_person: 1, single_parent: 1 parent + 1-3 children, two_parent: 2 parents + 1-3 children
+HOUSEHOLD_SIZES = {
+    'single_person': {1: 1.0},
+    'single_parent': {2: 1 / 3, 3: 1 / 3, 4: 1 / 3},
+    'two_parent': {3: 1 / 3, 4: 1 / 3, 5: 1 / 3}
+}
+
+
 class BuildingProcessor:
 
-    def __init__(self, rules: RuleSet, random_seed: int = None):
+    def __init__(
+        self,
+        rules: RuleSet,
+        random_seed: int = None,
+        distance_field: NetworkDistanceField = None,
+        low_memory: bool = False,
+        keyed: bool = False
+    ):
         self.rules = rules
         # create independent random generator 
         self.rng = np.random.default_rng(random_seed)
+        # optional street-network distance mode (None -> straight-line distance)
+        self.distance_field = distance_field
+        # low-memory mode: attribute-only result frame with categorical / small dtypes
+        self.low_memory = low_memory
+        # keyed mode: every random draw is a hash of (seed, decision, building key) instead of the
+        # next number of self.rng, so any partition of the buildings gets the same values
+        if keyed and rules.sampling.mode == 'clustered':
+            raise ValueError("Keyed randomness does not support the 'clustered' sampling mode (one field over all buildings)")
+        self.keyed = keyed
+        # keyed draws need one fixed seed for the whole run (random if none is given)
+        self.random_seed = resolve_seed(random_seed) if keyed else random_seed
+        # alias tables / inverse-CDF tables of the rule distributions, compiled on first use
+        self._samplers = {}
+        self._unit_size_tables = {}
         
     # process buildings based on zone rules
     def process_buildings(
         self,
         buildings_df: pd.DataFrame,
-        city_center: Tuple[float, float]
+        city_center: Tuple[float, float],
+        keys: np.ndarray = None
     ) -> pd.DataFrame:
 
         """ 
@@ -86,83 +167,208 @@ class BuildingProcessor:
         Args:
             buildings_df: DataFrame with columns ['building_id', 'x', 'y'], where x, y are bldg centroid coords
             city_center: (x, y) coords of city center
+            keys: Building keys of the keyed random draws (keyed mode, default: row positions)
         Returns:
             DataFrame with columns ['distance', 'zone', 'building_class', 'building_type', 'household_type']
+            (low-memory mode: attribute columns only, join the geometry with join_geometry at write time)
         """
 
-        # make a copy
-        result_df = buildings_df.copy()
+        if self.low_memory:
+            # attribute-only frame: no copy of the geometry column
+            result_df = pd.DataFrame({
+                column: buildings_df[column].to_numpy(dtype=np.float32)
+                for column in ('x', 'y', 'area_m2') if column in buildings_df
+            }, index=buildings_df.index)
+        else:
+            # make a copy
+            result_df = buildings_df.copy()
 
-        # 1. calculate dists
-        result_df['distance'] = result_df.apply(
-            lambda row: self._calculate_distance(
-                row['x'], row['y'], city_center[0], city_center[1]
-            ),
-            axis=1
+        # 1. calculate dists (all buildings at once)
+        result_df['distance'] = self._calculate_distance(
+            result_df['x'].to_numpy(), result_df['y'].to_numpy(), city_center
         )
         # 2. assign zones
-        result_df['zone'] = result_df['distance'].apply(
-            lambda d: self._get_zone_name(d)
-        )
+        if self.low_memory:
+            result_df['distance'] = result_df['distance'].astype(np.float32)
+            result_df['zone'] = self._get_zone_categories(result_df['distance'].to_numpy())
+        else:
+            result_df['zone'] = self._get_zone_name(result_df['distance'].to_numpy())
+
+        # 3.-8. types, classes, unit sizes, households and residents
+        self.assign_attributes(result_df, keys=keys)
+
+        return result_df
+
+    # (re)assign the derived columns of buildings that already have a zone
+    def assign_attributes(
+        self,
+        result_df: pd.DataFrame,
+        columns: Sequence[str] = DERIVED_COLUMNS,
+        rows: np.ndarray = None,
+        keys: np.ndarray = None
+    ):
+        """
+        Assign derived columns in place, optionally only for some columns / rows
+
+        Args:
+            result_df: DataFrame with 'zone' (and 'x', 'y', 'area_m2') columns
+            columns: Derived columns to (re)compute, see DERIVED_COLUMNS
+            rows: Boolean mask of the rows to (re)compute (None = all rows)
+            keys: Building keys of all rows for keyed draws (keyed mode, default: row positions)
+        """
+        part = result_df if rows is None else result_df.loc[rows].copy()
+        zones = part['zone']
+        if self.keyed:
+            keys = np.arange(len(result_df)) if keys is None else np.asarray(keys)
+            keys = keys if rows is None else keys[np.asarray(rows)]
+        else:
+            keys = None
+
+        # 3. assign bldg types (per zone)
+        if 'building_type' in columns:
+            part['building_type'] = self._assign_by_zone(
+                zones, self._sample_building_type, field=self._random_field(part), keys=keys
+            )
+
+        # 4. assign bldg class
+        if 'building_class' in columns:
+            part['building_class'] = self._to_class_ids(part['building_type'].to_numpy())
+
+        residential = (part['building_type'] != 'none').to_numpy()
 
-        # 3. assign bldg types
-        result_df['building_type'] = result_df['zone'].apply(
-            lambda z: self._sample_building_type(z)
-        )
-        
-        # 4. assign bldg class 
-        result_df['building_class'] = result_df['building_type'].apply(
-            lambda t: BUILDING_CLASSES.get(t, 99)
-        )
-        
         # 5. assign unit sizes (only for residential buildings)
-        result_df['unit_size'] = result_df.apply(
-            lambda row: self._sample_unit_size(row['zone']) 
-                        if row['building_type'] != 'none' else 0.0,
-            axis=1
-        )
-        
-        # 6. assign household types (only for residential buildings)
-        result_df['household_type'] = result_df.apply(
-            lambda row: self._sample_household_type(row['zone']) 
-                        if row['building_type'] != 'none' else 'none',
-            axis=1
-        )
-        
+        if 'unit_size' in columns:
+            part['unit_size'] = self._assign_by_zone(
+                zones, self._sample_unit_size, mask=residential, fill=0.0, dtype=np.float64, keys=keys
+            )
+
+        # 6. assign household types (only for residential buildings, per zone)
+        if 'household_type' in columns:
+            part['household_type'] = self._assign_by_zone(
+                zones, self._sample_household_type, mask=residential, field=self._random_field(part), keys=keys
+            )
+
         # 7. assign household counts based on unit size and building area
-        result_df['household_count'] = result_df.apply(
-            lambda row: self._calculate_household_count(row) 
-                        if row['building_type'] != 'none' else 0,
-            axis=1
-        )
-        
+        if 'household_count' in columns:
+            part['household_count'] = np.where(residential, self._calculate_household_count(part), 0)
+
         # 8. assign resident counts based on household type
-        result_df['resident_count'] = result_df.apply(
-            lambda row: self._calculate_resident_count(row) 
-                        if row['building_type'] != 'none' else 0,
-            axis=1
-        )
+        if 'resident_count' in columns:
+            part['resident_count'] = np.where(residential, self._calculate_resident_count(part, keys), 0)
 
-        return result_df
+        if self.low_memory:
+            for column in columns:
+                part[column] = part[column].astype(LOW_MEMORY_DTYPES[column])
+
+        if rows is not None:
+            for column in columns:
+                values = part[column].to_numpy()
+                # keep the dtype of previous outputs (e.g. int32 counts read back from GeoJSON)
+                if column in result_df and result_df[column].dtype.kind in 'iuf':
+                    values = values.astype(result_df[column].dtype)
+                result_df.loc[rows, column] = values
 
-    # calc distance to city center
+    # building type names -> building class ids (one comparison per class instead of one lookup per building)
+    def _to_class_ids(self, building_types: np.ndarray) -> np.ndarray:
+        class_ids = np.full(len(building_types), BUILDING_CLASSES['none'], dtype=np.int64)
+        for building_type, class_id in BUILDING_CLASSES.items():
+            class_ids[building_types == building_type] = class_id
+        return class_ids
+
+    # calc distance to city center (straight-line or along the street network)
     def _calculate_distance(
         self, 
-        x: float,
-        y: float,
-        center_x: float, 
-        center_y: float
-    ) -> float:
-        return np.sqrt((x - center_x)**2 + (y - center_y)**2)
-
-    # find which zone a distance belons to
-    def _get_zone_name(self, distance: float) -> str:
-        zone = self.rules.get_zone(distance)
-        return zone.name if zone else "unknown"
+        x: np.ndarray,
+        y: np.ndarray,
+        city_center: Tuple[float, float]
+    ) -> np.ndarray:
+        if self.distance_field is not None:
+            return self.distance_field.distances(x, y, city_center)
+        return euclidean_distance(x, y, city_center)
+
+    # zone index of every building (position in rules.zones, -1 = unknown)
+    def compute_zone_index(self, x: np.ndarray, y: np.ndarray, city_center: Tuple[float, float]) -> np.ndarray:
+        return assign_zones(self.rules.zones, self._calculate_distance(x, y, city_center))
+
+    # find which zone each distance belongs to
+    def _get_zone_name(self, distances: np.ndarray) -> np.ndarray:
+        return zone_names(self.rules.zones, assign_zones(self.rules.zones, distances))
+
+    # zones as a categorical column (zone codes instead of one string per building)
+    def _get_zone_categories(self, distances: np.ndarray) -> pd.Categorical:
+        zone_index = assign_zones(self.rules.zones, distances)
+        names = [zone.name for zone in self.rules.zones] + ['unknown']
+        return pd.Categorical.from_codes(np.where(zone_index < 0, len(names) - 1, zone_index), categories=names)
+
+    # Gaussian random field at building centroids for clustered sampling (None in the other modes)
+    def _random_field(self, buildings_df: pd.DataFrame):
+        if self.rules.sampling.mode != 'clustered':
+            return None
+        return field_at_points(
+            buildings_df['x'].to_numpy(), buildings_df['y'].to_numpy(),
+            self.rules.sampling.correlation_length, self.rng
+        )
+
+    # draw a value for every building, zone by zone (buildings outside mask get `fill`)
+    def _assign_by_zone(
+        self,
+        zones: pd.Series,
+        sampler,
+        mask: np.ndarray = None,
+        field: np.ndarray = None,
+        fill='none',
+        dtype=object,
+        keys: np.ndarray = None
+    ) -> np.ndarray:
+        zones = zones.to_numpy()
+        result = np.full(len(zones), fill, dtype=dtype)
+        if mask is None:
+            mask = np.ones(len(zones), dtype=bool)
+
+        for zone_name in pd.unique(zones[mask]):
+            idx = np.flatnonzero(mask & (zones == zone_name))
+            result[idx] = sampler(
+                zone_name, len(idx), None if field is None else field[idx], None if keys is None else keys[idx]
+            )
+        return result
+
+    # draw `size` types from a rule's probabilities (random, exact quota or clustered)
+    def _sample_types(
+        self,
+        types: list,
+        probabilities: list,
+        size: int = None,
+        field_values: np.ndarray = None,
+        keys: np.ndarray = None,
+        stream: int = None
+    ):
+        if field_values is not None:
+            # clustered: threshold the field at the rule's percentage quantiles
+            return np.array(types, dtype=object)[quota_assign_by_rank(field_values, probabilities)]
+        if keys is not None:
+            u = keyed_uniform(self.random_seed, stream, keys)
+            if self.rules.sampling.mode == 'quota':
+                # exact quota, placed by the rank of each building's keyed number
+                return np.array(types, dtype=object)[quota_assign_by_rank(u, probabilities)]
+            return self._categorical_sampler(types, probabilities).from_uniform(u)
+        if self.rules.sampling.mode == 'quota' and size is not None:
+            return np.array(types, dtype=object)[quota_assign(size, probabilities, self.rng)]
+        sampler = self._categorical_sampler(types, probabilities)
+        if size is None:
+            return sampler.sample(1, self.rng)[0]
+        return sampler.sample(size, self.rng)
+
+    # alias table of one rule distribution, built once and reused for every zone and batch
+    def _categorical_sampler(self, categories: Sequence, probabilities: Sequence[float]) -> CategoricalSampler:
+        key = (tuple(categories), tuple(probabilities))
+        sampler = self._samplers.get(key)
+        if sampler is None:
+            sampler = self._samplers[key] = CategoricalSampler(categories, probabilities)
+        return sampler
 
     # sample bldg type based on probabilities
     # TODO: constraints?
-    def _sample_building_type(self, zone_name: str) -> str:
+    def _sample_building_type(self, zone_name: str, size: int = None, field_values: np.ndarray = None, keys: np.ndarray = None):
         rule = self.rules.get_housing_rule(zone_name)
         
         if rule is None:
@@ -171,10 +377,10 @@ class BuildingProcessor:
         types = ['apartment', 'detached', 'terraced']
         probabilities = [rule.apartment_pct, rule.detached_pct, rule.terraced_pct]
 
-        return self.rng.choice(types, p = probabilities)
+        return self._sample_types(types, probabilities, size, field_values, keys, STREAM_BUILDING_TYPE)
     
     # sample household type based on probabilities
-    def _sample_household_type(self, zone_name: str) -> str:
+    def _sample_household_type(self, zone_name: str, size: int = None, field_values: np.ndarray = None, keys: np.ndarray = None):
         rule = self.rules.get_household_rule(zone_name)
         
         if rule is None:
@@ -183,58 +389,61 @@ class BuildingProcessor:
         types = ['single_person', 'single_parent', 'two_parent']
         probabilities = [rule.single_person_pct, rule.single_parent_pct, rule.two_parent_pct]
         
-        return self.rng.choice(types, p=probabilities)
+        return self._sample_types(types, probabilities, size, field_values, keys, STREAM_HOUSEHOLD_TYPE)
     
-    # sample unit size based on probs
-    def _sample_unit_size(self, zone_name: str) -> float:
+    # sample unit sizes based on probs
+    def _sample_unit_size(self, zone_name: str, size: int = None, field_values: np.ndarray = None, keys: np.ndarray = None):
         rule = self.rules.get_unit_size_rule(zone_name)
         
         if rule is None:
-            return 60.0  # Default unit size
+            return DEFAULT_UNIT_SIZE
         
-        # sample from uniform distribution between min and max ###TODO: uniform distribution?
-        return self.rng.uniform(rule.min_size, rule.max_size)
+        # uniform / truncnormal / lognormal / empirical, served from the rule's inverse-CDF table
+        table = self._unit_size_table(rule)
+        if keys is not None:
+            return table.from_uniform(keyed_uniform(self.random_seed, STREAM_UNIT_SIZE, keys))
+        if size is None:
+            return float(table.sample(1, self.rng)[0])
+        return table.sample(size, self.rng)
+
+    # inverse-CDF table of a unit size rule, compiled once per rule
+    def _unit_size_table(self, rule):
+        key = (rule.distribution, rule.min_size, rule.max_size, rule.mean, rule.std, tuple(rule.bins), tuple(rule.counts))
+        table = self._unit_size_tables.get(key)
+        if table is None:
+            table = self._unit_size_tables[key] = unit_size_table(rule)
+        return table
     
-    # calculate household count based on bldg area and unit size
-    def _calculate_household_count(self, row) -> int:
-        building_area = row.get('area_m2', 100.0)  # default area if not available
-        unit_size = row['unit_size']
-        
-        if unit_size <= 0:
-            return 0
+    # calculate household counts based on bldg area and unit size
+    def _calculate_household_count(self, buildings_df: pd.DataFrame) -> np.ndarray:
+        if 'area_m2' in buildings_df:
+            building_area = buildings_df['area_m2'].to_numpy(dtype=np.float64)
+        else:
+            building_area = np.full(len(buildings_df), 100.0)  # default area if not available
+        unit_size = buildings_df['unit_size'].to_numpy(dtype=np.float64)
         
-        # calculate how many units fit in the bldg
-        household_count = max(1, int(building_area / unit_size))
-        return household_count
+        # calculate how many units fit in the bldg (at least 1, 0 without a unit size)
+        valid = unit_size > 0
+        household_count = np.maximum(1, (building_area / np.where(valid, unit_size, 1.0)).astype(np.int64))
+        return np.where(valid, household_count, 0)
     
-    # calculate resident count based on household type
-    def _calculate_resident_count(self, row) -> int:
-        household_type = row['household_type']
-        household_count = row['household_count']
-        
-        if household_type == 'none':
-            return 0
+    # calculate resident counts based on household type
+    def _calculate_resident_count(self, buildings_df: pd.DataFrame, keys: np.ndarray = None) -> np.ndarray:
+        household_types = buildings_df['household_type'].to_numpy()
+        household_count = buildings_df['household_count'].to_numpy(dtype=np.int64)
         
         # calculate residents per household based on type
-        residents_per_household = self._calculate_household_size(household_type)
-        return household_count * residents_per_household
+        residents_per_household = self._calculate_household_size(household_types, keys)
+        return np.where(household_types == 'none', 0, household_count * residents_per_household)
     
     # calculate number of residents in a single household based on household type
-    def _calculate_household_size(self, household_type: str) -> int:
-        if household_type == 'single_person':
-            return 1
-        
-        elif household_type == 'single_parent':
-            # 1 parent + 1-3 children
-            num_children = self.rng.integers(1, 4)  # 1, 2, or 3 children
-            return 1 + num_children
-        
-        elif household_type == 'two_parent':
-            # 2 parents + 1-3 children
-            num_children = self.rng.integers(1, 4)  # 1, 2, or 3 children
-            return 2 + num_children
-        
-        else:
-            return 1  # fallback
-
-    
\ No newline at end of file
+    def _calculate_household_size(self, household_types: np.ndarray, keys: np.ndarray = None) -> np.ndarray:
+        sizes = np.ones(len(household_types), dtype=np.int64)  # fallback
+        u = None if keys is None else keyed_uniform(self.random_seed, STREAM_HOUSEHOLD_SIZE, keys)
+        for household_type, distribution in HOUSEHOLD_SIZES.items():
+            is_type = household_types == household_type
+            n = int(is_type.sum())
+            if n:
+                sampler = self._categorical_sampler(list(distribution), list(distribution.values()))
+                sizes[is_type] = sampler.sample(n, self.rng) if u is None else sampler.from_uniform(u[is_type])
+        return sizes
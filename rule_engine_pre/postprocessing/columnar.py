@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+import pyogrio.raw
+import shapely
+from dataclasses import dataclass, field
+from pathlib import Path
+from pyproj import CRS
+from typing import Dict, Iterator, List, Tuple
+
+from postprocessing.geometry_cache import to_projected
+
+"""
+Low-memory columnar building I/O.
+
+A GeoDataFrame keeps one shapely object (plus its GEOS geometry) per
+building for the whole run, although classification only needs the
+centroid and the area. In low-memory mode:
+
+- the buildings file is read chunk by chunk as raw WKB (no shapely objects
+  for the whole file); every chunk is packed into one contiguous buffer
+- centroid and area are computed per chunk, its shapely objects are dropped
+  right after
+- classification runs on an attribute-only frame (float32 / categorical)
+- at write time the attribute columns are joined with the untouched WKB
+  and written chunk by chunk (GDAL, or the FeatureCollection text for
+  GeoJSON, where every GDAL append rewrites the whole document)
+
+With pyarrow installed every format, GeoJSON included, is streamed as
+record batches from one open layer. Without it GeoJSON is parsed in one
+pass (GDAL scans the whole document on every open) and the WKB of every
+chunk is released as soon as the chunk is packed.
+"""
+
+# buildings read / converted to shapely objects / written at once
+CHUNK_SIZE = 100_000
+
+
+@dataclass(slots=True)
+class BuildingGeometry:
+    # raw geometries of a buildings file, packed WKB chunks kept until they are written
+    crs: str
+    geometry_type: str
+    # per chunk: (all WKB bytes of the chunk, offsets of every geometry into them)
+    chunks: List[Tuple[bytes, np.ndarray]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return sum(len(offsets) - 1 for _, offsets in self.chunks)
+
+    def add_chunk(self, wkb: np.ndarray):
+        lengths = np.fromiter((len(geometry) for geometry in wkb), dtype=np.int64, count=len(wkb))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        self.chunks.append((b''.join(wkb), offsets))
+
+    def iter_wkb(self) -> Iterator[np.ndarray]:
+        # WKB object arrays, one chunk at a time
+        for data, offsets in self.chunks:
+            wkb = np.empty(len(offsets) - 1, dtype=object)
+            wkb[:] = [data[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+            yield wkb
+
+    def to_geoseries(self):
+        import geopandas as gpd
+        return gpd.GeoSeries.from_wkb(np.concatenate(list(self.iter_wkb())), crs=self.crs)
+
+
+def read_buildings_columnar(
+    path: str,
+    chunk_size: int = CHUNK_SIZE,
+    geometry_attributes: Dict[str, np.ndarray] = None
+) -> Tuple[pd.DataFrame, BuildingGeometry]:
+    """
+    Read buildings as an attribute-only frame plus packed WKB geometries
+
+    Args:
+        path: Buildings file (GeoJSON, GeoPackage, FlatGeobuf, ...)
+        chunk_size: Buildings read / converted to shapely objects at once
+        geometry_attributes: Precomputed x, y, area_m2 (geometry_cache.prepare_geometry),
+            the WKB is then never parsed
+
+    Returns:
+        (DataFrame with the file's fields and float32 'x', 'y', 'area_m2', BuildingGeometry)
+    """
+    geometry = None
+    parts = []
+    start = 0
+    for meta, wkb, field_data in _read_raw_chunks(path, chunk_size):
+        if geometry is None:
+            geometry = BuildingGeometry(crs=meta['crs'], geometry_type=meta['geometry_type'])
+
+        part = pd.DataFrame(dict(zip(meta['fields'], field_data)))
+        if geometry_attributes is not None:
+            for column in ('x', 'y', 'area_m2'):
+                part[column] = geometry_attributes[column][start:start + len(wkb)].astype(np.float32)
+        else:
+            geometries, _ = to_projected(shapely.from_wkb(wkb), meta['crs'])
+            centroids = shapely.centroid(geometries)
+            part['x'] = shapely.get_x(centroids).astype(np.float32)
+            part['y'] = shapely.get_y(centroids).astype(np.float32)
+            part['area_m2'] = shapely.area(geometries).astype(np.float32)
+            del geometries, centroids
+        parts.append(part)
+        start += len(wkb)
+
+        geometry.add_chunk(wkb)
+        del wkb
+
+    attributes = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['x', 'y', 'area_m2'])
+    return attributes, geometry
+
+
+def write_buildings_columnar(path: str, attributes: pd.DataFrame, geometry: BuildingGeometry, driver: str = 'GeoJSON'):
+    # write attribute columns + WKB geometries chunk by chunk, without building a GeoDataFrame
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    fields = [str(column) for column in attributes.columns]
+
+    if driver == 'GeoJSON':
+        _write_geojson_chunks(path, attributes, geometry)
+        return
+
+    start = 0
+    for chunk_index, wkb in enumerate(geometry.iter_wkb()):
+        rows = attributes.iloc[start:start + len(wkb)]
+        pyogrio.raw.write(
+            path,
+            geometry=wkb,
+            field_data=[_field_values(rows[column]) for column in attributes.columns],
+            fields=fields,
+            driver=driver,
+            geometry_type=geometry.geometry_type,
+            crs=geometry.crs,
+            append=chunk_index > 0
+        )
+        start += len(wkb)
+
+
+def _write_geojson_chunks(path: str, attributes: pd.DataFrame, geometry: BuildingGeometry):
+    # GDAL rewrites a GeoJSON document on every append (quadratic in the number of chunks):
+    # write the FeatureCollection text directly, one chunk of features at a time
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{\n"type": "FeatureCollection",\n')
+        authority = CRS.from_user_input(geometry.crs).to_authority() if geometry.crs else None
+        if authority is not None and authority != ('EPSG', '4326') and authority != ('OGC', 'CRS84'):
+            f.write(f'"crs": {{ "type": "name", "properties": {{ "name": "urn:ogc:def:crs:{authority[0]}::{authority[1]}" }} }},\n')
+        f.write('"features": [\n')
+
+        start = 0
+        separator = ''
+        for wkb in geometry.iter_wkb():
+            rows = attributes.iloc[start:start + len(wkb)]
+            if len(rows.columns):
+                properties = rows.to_json(orient='records', lines=True, double_precision=15).splitlines()
+            else:
+                properties = ['{}'] * len(wkb)
+            geometries = shapely.to_geojson(shapely.from_wkb(wkb))
+            for row_properties, row_geometry in zip(properties, geometries):
+                f.write(f'{separator}{{ "type": "Feature", "properties": {row_properties}, "geometry": {row_geometry} }}')
+                separator = ',\n'
+            start += len(wkb)
+
+        f.write('\n]\n}\n')
+
+
+def _read_raw_chunks(path: str, chunk_size: int):
+    # chunks of (meta, WKB, field values) from one open layer (pyarrow),
+    # otherwise GeoJSON in one pass and random-access formats slice by slice
+    try:
+        import pyarrow  # noqa: F401  (only needed for streaming record batches)
+    except ImportError:
+        pyarrow = None
+
+    if pyarrow is not None:
+        with pyogrio.raw.open_arrow(path, batch_size=chunk_size, use_pyarrow=True) as (meta, reader):
+            geometry_name = meta['geometry_name'] or 'wkb_geometry'
+            for batch in reader:
+                wkb = batch.column(geometry_name).to_numpy(zero_copy_only=False)
+                field_data = [batch.column(name).to_numpy(zero_copy_only=False) for name in meta['fields']]
+                yield meta, wkb, field_data
+        return
+
+    if Path(path).suffix.lower() in ('.geojson', '.json'):
+        # GDAL parses a whole GeoJSON document on every open: read it once and slice
+        meta, _, wkb, field_data = pyogrio.raw.read(path)
+        for start in range(0, len(wkb), chunk_size):
+            yield meta, wkb[start:start + chunk_size], [values[start:start + chunk_size] for values in field_data]
+            # the chunk is packed by now: drop its WKB objects
+            wkb[start:start + chunk_size] = None
+        return
+
+    start = 0
+    while True:
+        meta, _, wkb, field_data = pyogrio.raw.read(path, skip_features=start, max_features=chunk_size)
+        if len(wkb) == 0:
+            return
+        yield meta, wkb, field_data
+        if len(wkb) < chunk_size:
+            return
+        start += chunk_size
+
+
+def _field_values(column: pd.Series) -> np.ndarray:
+    # categorical / string columns are written as plain strings, numbers as they are
+    if isinstance(column.dtype, pd.CategoricalDtype) or column.dtype.kind not in 'biuf':
+        return column.astype(object).to_numpy()
+    return column.to_numpy()
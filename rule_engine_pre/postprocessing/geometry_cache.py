@@ -0,0 +1,133 @@
+import hashlib
+import numpy as np
+import pandas as pd
+import pyogrio
+import pyogrio.raw
+import shapely
+from collections import OrderedDict
+from pathlib import Path
+from pyproj import CRS, Transformer
+from typing import Dict, Tuple
+
+"""
+Derived geometry attributes of a buildings file, computed once.
+
+The buildings.geojson of one CityStackGen generation does not change
+across postprocessing seeds, but every run parsed all polygons again to
+get centroids and areas. prepare_geometry computes per building:
+
+    x, y                      centroid
+    area_m2                   polygon area
+    minx, miny, maxx, maxy    bounds
+
+in one pass (centroid computed once), and stores them as a sidecar NPZ
+next to the input, keyed by the SHA-1 of the file content. Later runs
+load only these arrays, without parsing any geometry.
+
+Files in a geographic CRS (lon/lat) are reprojected to EPSG:28992 (RD New)
+first, vectorized over all coordinates, so areas are in m2 and centroids
+in meters. Projected files are used as they are.
+"""
+
+TARGET_CRS = 'EPSG:28992'
+CACHE_SUFFIX = '.geometry.npz'
+GEOMETRY_COLUMNS = ('x', 'y', 'area_m2', 'minx', 'miny', 'maxx', 'maxy')
+# bytes hashed at once
+HASH_BLOCK_SIZE = 1 << 20
+# SHA-1s of files hashed in this process, by stat key (LRU): the geometry cache and the
+# incremental input fingerprint of one run hash the buildings file once
+MAX_CACHED_HASHES = 64
+_hash_cache: Dict[tuple, str] = OrderedDict()
+
+
+def file_hash(path: str) -> str:
+    # SHA-1 of the file content, reused while (path, mtime, ctime, size, inode) is unchanged
+    resolved = Path(path).resolve()
+    stat = resolved.stat()
+    key = (str(resolved), stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size, stat.st_ino)
+    if key in _hash_cache:
+        _hash_cache.move_to_end(key)
+        return _hash_cache[key]
+
+    digest = hashlib.sha1()
+    with open(resolved, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    _hash_cache[key] = digest.hexdigest()
+    while len(_hash_cache) > MAX_CACHED_HASHES:
+        _hash_cache.popitem(last=False)
+    return _hash_cache[key]
+
+
+def cache_path(path: str, digest: str, cache_dir: str = None) -> Path:
+    # <cache_dir or input dir>/<input name>.<hash>.geometry.npz
+    path = Path(path)
+    directory = Path(cache_dir) if cache_dir is not None else path.parent
+    return directory / f"{path.name}.{digest[:16]}{CACHE_SUFFIX}"
+
+
+def prepare_geometry(path: str, cache_dir: str = None) -> Dict[str, np.ndarray]:
+    """
+    Centroids, areas and bounds of every building in a file, cached by file hash
+
+    Args:
+        path: Buildings file (GeoJSON, GeoPackage, ...)
+        cache_dir: Directory of the sidecar cache (default: next to the input)
+
+    Returns:
+        Dictionary of float64 arrays (GEOMETRY_COLUMNS) in file order, plus 'crs'
+    """
+    sidecar = cache_path(path, file_hash(path), cache_dir)
+    if sidecar.exists():
+        with np.load(sidecar) as data:
+            return {name: data[name] for name in data.files}
+
+    meta, _, wkb, _ = pyogrio.raw.read(path, columns=[])
+    geometries, crs = to_projected(shapely.from_wkb(wkb), meta['crs'])
+    del wkb
+
+    centroids = shapely.centroid(geometries)
+    bounds = shapely.bounds(geometries)
+    attributes = {
+        'x': shapely.get_x(centroids),
+        'y': shapely.get_y(centroids),
+        'area_m2': shapely.area(geometries),
+        'minx': bounds[:, 0],
+        'miny': bounds[:, 1],
+        'maxx': bounds[:, 2],
+        'maxy': bounds[:, 3],
+        'crs': np.array(crs or '')
+    }
+
+    sidecar.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(sidecar, **attributes)
+    return attributes
+
+
+def load_building_attributes(path: str, cache_dir: str = None) -> pd.DataFrame:
+    """
+    The file's fields plus cached x, y and area_m2, without reading any geometry
+
+    Args:
+        path: Buildings file
+        cache_dir: Directory of the sidecar cache (default: next to the input)
+
+    Returns:
+        DataFrame in file order (no geometry column)
+    """
+    attributes = prepare_geometry(path, cache_dir)
+    buildings = pyogrio.read_dataframe(path, read_geometry=False)
+    for column in ('x', 'y', 'area_m2'):
+        buildings[column] = attributes[column]
+    return buildings
+
+
+def to_projected(geometries: np.ndarray, crs) -> Tuple[np.ndarray, str]:
+    # reproject geographic (lon/lat) geometries to TARGET_CRS, others are returned unchanged
+    if crs is None or not CRS.from_user_input(crs).is_geographic:
+        return geometries, crs
+    transformer = Transformer.from_crs(crs, TARGET_CRS, always_xy=True)
+    projected = shapely.transform(
+        geometries, lambda coordinates: np.column_stack(transformer.transform(coordinates[:, 0], coordinates[:, 1]))
+    )
+    return projected, TARGET_CRS
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Tuple
+
+"""
+Grid aggregation of classified buildings.
+
+Buildings are binned to raster cells by their centroid with integer
+arithmetic (no spatial join) and every statistic is one np.bincount over
+the flat cell index, so the whole aggregation is a single linear pass:
+
+- template grid:  aligned with the CityPy template (grid_origin = center of
+                  cell (0, 0), rows north -> south, e.g. 100 m cells)
+- CBS grid:       RD New (EPSG:28992) squares aligned to multiples of the
+                  cell size, e.g. the CBS 500 m grid (cell ids like E2330N5815)
+
+Per cell: building / residential / household / resident counts, counts
+and shares of every building and household type.
+"""
+
+HOUSING_TYPES = ['apartment', 'detached', 'terraced']
+HOUSEHOLD_TYPES = ['single_person', 'single_parent', 'two_parent']
+
+# CBS square statistics grid (RD New) cell size
+CBS_CELL_SIZE = 500.0
+
+
+@dataclass
+class GridSpec:
+    # raster layout: top-left corner of cell (0, 0), cell size, (rows, cols), rows run north -> south
+    left: float
+    top: float
+    cell_size: float
+    shape: Tuple[int, int]
+
+    @classmethod
+    def from_template(cls, template_path: str, grid_origin: Tuple[float, float], cell_size: float = 100.0) -> 'GridSpec':
+        # grid_origin: real-world (x, y) of the center of template cell (0, 0)
+        with np.load(template_path) as data:
+            shape = data['building_class'].shape
+        return cls(grid_origin[0] - cell_size / 2, grid_origin[1] + cell_size / 2, cell_size, shape)
+
+    @classmethod
+    def aligned(cls, x: np.ndarray, y: np.ndarray, cell_size: float = CBS_CELL_SIZE) -> 'GridSpec':
+        # smallest grid with edges on multiples of cell_size covering all points (CBS / RD grids)
+        # points without coordinates (NaN) are left out; no points at all -> empty (0, 0) grid
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        finite = np.isfinite(x) & np.isfinite(y)
+        if not finite.any():
+            return cls(0.0, 0.0, cell_size, (0, 0))
+        x, y = x[finite], y[finite]
+        first_col, last_col = np.floor(np.array([x.min(), x.max()]) / cell_size).astype(np.int64)
+        first_row, last_row = np.floor(np.array([y.min(), y.max()]) / cell_size).astype(np.int64)
+        shape = (int(last_row - first_row + 1), int(last_col - first_col + 1))
+        return cls(float(first_col * cell_size), float((last_row + 1) * cell_size), cell_size, shape)
+
+    def cell_index(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        col = np.floor((x - self.left) / self.cell_size).astype(np.int64)
+        row = np.floor((self.top - y) / self.cell_size).astype(np.int64)
+        return row, col
+
+    def cell_centers(self) -> Tuple[np.ndarray, np.ndarray]:
+        rows, cols = self.shape
+        x = self.left + (np.arange(cols) + 0.5) * self.cell_size
+        y = self.top - (np.arange(rows) + 0.5) * self.cell_size
+        return np.meshgrid(x, y)
+
+    def cbs_ids(self) -> np.ndarray:
+        # CBS style ids of the lower-left corners in hectometers, e.g. E2330N5815
+        rows, cols = self.shape
+        east = ((self.left + np.arange(cols) * self.cell_size) // 100).astype(np.int64)
+        north = ((self.top - (np.arange(rows) + 1) * self.cell_size) // 100).astype(np.int64)
+        return np.array([[f"E{e:04d}N{n:04d}" for e in east] for n in north], dtype=object)
+
+
+def aggregate_to_grid(buildings_df: pd.DataFrame, grid: GridSpec) -> Dict[str, np.ndarray]:
+    """
+    Aggregate classified buildings to raster cells
+
+    Args:
+        buildings_df: Classified buildings ('x', 'y', 'building_type', 'household_type',
+            'household_count', 'resident_count')
+        grid: Raster layout (GridSpec.from_template / GridSpec.aligned)
+
+    Returns:
+        Dictionary of (rows, cols) rasters: building_count, residential_count, household_count,
+        resident_count, <type>_count and <type>_share for building and household types;
+        buildings outside the grid are counted in 'outside' (0-d array)
+    """
+    rows, cols = grid.shape
+    n_cells = rows * cols
+
+    # 1. flat cell index of every building (integer binning, no spatial join)
+    row, col = grid.cell_index(
+        buildings_df['x'].to_numpy(dtype=np.float64), buildings_df['y'].to_numpy(dtype=np.float64)
+    )
+    inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+    cell = (row * cols + col)[inside]
+
+    def per_cell(weights=None) -> np.ndarray:
+        return np.bincount(cell, weights=weights, minlength=n_cells)
+
+    # 2. counts
+    rasters = {'building_count': per_cell().reshape(rows, cols)}
+    for column in ('household_count', 'resident_count'):
+        if column in buildings_df:
+            weights = buildings_df[column].to_numpy(dtype=np.float64)[inside]
+            rasters[column] = per_cell(weights).round().astype(np.int64).reshape(rows, cols)
+
+    # 3. type counts: one bincount over (cell, type) pairs per enumeration
+    if 'building_type' in buildings_df:
+        type_counts = _type_counts(buildings_df['building_type'], HOUSING_TYPES, cell, inside, n_cells)
+        residential = type_counts.sum(axis=1)
+        rasters['residential_count'] = residential.reshape(rows, cols)
+        for k, building_type in enumerate(HOUSING_TYPES):
+            rasters[f'{building_type}_count'] = type_counts[:, k].reshape(rows, cols)
+            rasters[f'{building_type}_share'] = _share(type_counts[:, k], residential).reshape(rows, cols)
+
+    if 'household_type' in buildings_df:
+        type_counts = _type_counts(buildings_df['household_type'], HOUSEHOLD_TYPES, cell, inside, n_cells)
+        with_households = type_counts.sum(axis=1)
+        for k, household_type in enumerate(HOUSEHOLD_TYPES):
+            rasters[f'{household_type}_count'] = type_counts[:, k].reshape(rows, cols)
+            rasters[f'{household_type}_share'] = _share(type_counts[:, k], with_households).reshape(rows, cols)
+
+    rasters['outside'] = np.array(int((~inside).sum()))
+    return rasters
+
+
+def save_grid_npz(rasters: Dict[str, np.ndarray], grid: GridSpec, output_path: str, crs: str = 'EPSG:28992'):
+    # rasters + grid layout in one NPZ (same row/col layout as the CityPy template)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        output_path,
+        left=grid.left,
+        top=grid.top,
+        cell_size=grid.cell_size,
+        crs=crs,
+        **rasters
+    )
+
+
+def grid_to_table(rasters: Dict[str, np.ndarray], grid: GridSpec, cbs_ids: bool = False) -> pd.DataFrame:
+    # one row per non-empty cell (columnar form for CSV / joins with CBS tables)
+    rows, cols = grid.shape
+    occupied = rasters['building_count'].ravel() > 0
+    x, y = grid.cell_centers()
+    row, col = np.divmod(np.arange(rows * cols), cols)
+
+    table = pd.DataFrame({
+        'row': row[occupied],
+        'col': col[occupied],
+        'x': x.ravel()[occupied],
+        'y': y.ravel()[occupied]
+    })
+    if cbs_ids:
+        table.insert(0, 'cbs_id', grid.cbs_ids().ravel()[occupied])
+    for name, raster in rasters.items():
+        if raster.shape == (rows, cols):
+            table[name] = raster.ravel()[occupied]
+    return table
+
+
+def _type_counts(values: pd.Series, types: list, cell: np.ndarray, inside: np.ndarray, n_cells: int) -> np.ndarray:
+    # (cells, types) counts, values outside `types` (e.g. 'none') are ignored
+    codes = pd.Index(types).get_indexer(np.asarray(values, dtype=object)[inside]).astype(np.int64)
+    known = codes >= 0
+    counts = np.bincount(cell[known] * len(types) + codes[known], minlength=n_cells * len(types))
+    return counts.reshape(n_cells, len(types))
+
+
+def _share(counts: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    # share per cell, NaN for cells without any building of the category
+    return np.divide(counts, totals, out=np.full(len(counts), np.nan), where=totals > 0).astype(np.float32)
@@ -0,0 +1,206 @@
+import dataclasses
+import json
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import RuleSet
+from postprocessing.building_processor import BuildingProcessor, DERIVED_COLUMNS
+from postprocessing.geometry_cache import file_hash
+
+"""
+Incremental re-classification.
+
+Every postprocessing output gets a small rules snapshot next to it
+(buildings_classified.geojson -> buildings_classified.geojson.rules.json)
+with the RuleSet, the distance settings, the buildings input (path, size,
+SHA-1) and the random draws (seed, keyed) it was computed with.
+
+On the next run the new RuleSet is diffed against the snapshot:
+
+- buildings input, seed or keyed randomness changed
+    -> the previous rows are not the rows of this run, full recompute
+- zones, sampling mode, city center or distance mode changed
+    -> every zone can move, full recompute
+- a per-zone rule changed -> only that zone's rows, and only the columns
+  that depend on the rule:
+
+    housing_rules     building_type, building_class, unit_size,
+                      household_type, household_count, resident_count
+    unit_size_rules   unit_size, household_count, resident_count
+    household_rules   household_type, resident_count
+
+- landuse / residents / street template rules are preprocessing-only
+
+Rows of untouched zones keep their values bit-identical. With keyed
+randomness the recomputed zones also get the values of a cold run.
+"""
+
+SNAPSHOT_SUFFIX = '.rules.json'
+
+# derived columns that depend on each postprocessing rule list
+RULE_COLUMNS = {
+    'housing_rules': DERIVED_COLUMNS,
+    'unit_size_rules': ('unit_size', 'household_count', 'resident_count'),
+    'household_rules': ('household_type', 'resident_count')
+}
+
+# changes in these sections move buildings between zones (or resample every zone)
+GLOBAL_SECTIONS = ('zones', 'sampling')
+
+
+def snapshot_path(output_path: str) -> Path:
+    # rules snapshot stored next to an output file / partition directory
+    output_path = Path(output_path)
+    if output_path.is_dir():
+        return output_path / ('rules' + SNAPSHOT_SUFFIX)
+    return output_path.with_name(output_path.name + SNAPSHOT_SUFFIX)
+
+
+def input_fingerprint(buildings_path: str) -> Dict:
+    # identity of a buildings input file (content hash, not mtime; hashed once per file state)
+    path = Path(buildings_path).resolve()
+    return {'path': str(path), 'size': path.stat().st_size, 'sha1': file_hash(str(path))}
+
+
+def save_rules_snapshot(
+    output_path: str,
+    rules: RuleSet,
+    city_center: Tuple[float, float],
+    street_network: str = None,
+    buildings: Dict = None,
+    random_seed: int = None,
+    keyed: bool = False
+):
+    # record the rules, input and random draws an output was computed with
+    snapshot = {
+        'rules': _rules_to_json(rules),
+        'city_center': [float(city_center[0]), float(city_center[1])],
+        'street_network': str(Path(street_network).resolve()) if street_network else None,
+        'buildings': buildings,
+        'random_seed': random_seed,
+        'keyed': bool(keyed)
+    }
+    with open(snapshot_path(output_path), 'w') as f:
+        json.dump(snapshot, f, indent=2)
+
+
+def load_rules_snapshot(output_path: str) -> Optional[Dict]:
+    path = snapshot_path(output_path)
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def plan_update(
+    snapshot: Dict,
+    rules: RuleSet,
+    city_center: Tuple[float, float],
+    street_network: str = None,
+    buildings: Dict = None,
+    random_seed: int = None,
+    keyed: bool = False
+) -> Optional[Dict[str, List[str]]]:
+    """
+    Work out which derived columns of which zones have to be recomputed
+
+    Args:
+        snapshot: Rules snapshot of the previous output (load_rules_snapshot)
+        rules: New RuleSet
+        city_center: (x, y) coords of city center
+        street_network: Street network of the new run (optional)
+        buildings: input_fingerprint of the buildings file of the new run
+        random_seed: Random seed of the new run
+        keyed: Keyed randomness in the new run
+
+    Returns:
+        {column: [zone names]} (empty when nothing changed),
+        None when everything has to be recomputed
+    """
+    if snapshot is None:
+        return None
+    # another input or other random draws: the previous rows cannot be reused
+    if buildings is None or _input_key(snapshot.get('buildings')) != _input_key(buildings):
+        return None
+    if snapshot.get('random_seed') != random_seed or snapshot.get('keyed', False) != bool(keyed):
+        return None
+    if snapshot['city_center'] != [float(city_center[0]), float(city_center[1])]:
+        return None
+    if snapshot['street_network'] != (str(Path(street_network).resolve()) if street_network else None):
+        return None
+
+    old_rules = snapshot['rules']
+    new_rules = _rules_to_json(rules)
+    if any(old_rules.get(section) != new_rules.get(section) for section in GLOBAL_SECTIONS):
+        return None
+
+    plan = {}
+    for section, columns in RULE_COLUMNS.items():
+        for zone_name in _diff_zones(old_rules.get(section, []), new_rules.get(section, [])):
+            for column in columns:
+                plan.setdefault(column, [])
+                if zone_name not in plan[column]:
+                    plan[column].append(zone_name)
+    return plan
+
+
+def apply_update(
+    processor: BuildingProcessor,
+    buildings_df: pd.DataFrame,
+    plan: Dict[str, List[str]]
+) -> np.ndarray:
+    """
+    Recompute the planned columns / zones of a previous output in place
+
+    Args:
+        processor: BuildingProcessor with the new rules
+        buildings_df: Previous output (needs 'zone', 'x', 'y', 'area_m2' and the derived columns)
+        plan: Result of plan_update
+
+    Returns:
+        Boolean mask of the rows that changed
+    """
+    zones = buildings_df['zone'].to_numpy()
+    changed = np.zeros(len(buildings_df), dtype=bool)
+
+    # one pass per zone, recomputing all of its affected columns in dependency order
+    for zone_name in changed_zones(plan):
+        rows = zones == zone_name
+        if not rows.any():
+            continue
+        columns = [column for column in DERIVED_COLUMNS if zone_name in plan.get(column, [])]
+        processor.assign_attributes(buildings_df, columns=columns, rows=rows)
+        changed |= rows
+    return changed
+
+
+def changed_zones(plan: Dict[str, List[str]]) -> List[str]:
+    return sorted({zone for zone_list in plan.values() for zone in zone_list})
+
+
+def _input_key(buildings: Optional[Dict]):
+    # content identity: the same file moved or copied elsewhere still matches
+    return None if buildings is None else (buildings['size'], buildings['sha1'])
+
+
+def _diff_zones(old_list: List[dict], new_list: List[dict]) -> List[str]:
+    # zones whose rule entry was added, removed or modified
+    old_by_zone = {rule['zone']: rule for rule in old_list}
+    new_by_zone = {rule['zone']: rule for rule in new_list}
+    return sorted(
+        zone for zone in set(old_by_zone) | set(new_by_zone)
+        if old_by_zone.get(zone) != new_by_zone.get(zone)
+    )
+
+
+def _rules_to_json(rules: RuleSet) -> Dict:
+    # plain JSON form (json round trip so int dict keys compare equal to a loaded snapshot)
+    return json.loads(json.dumps(dataclasses.asdict(rules)))
@@ -12,6 +12,16 @@ if str(PARENT_DIR) not in sys.path:
 
 from postprocessing.building_processor import BuildingProcessor, load_buildings_from_geojson, get_city_center_from_geojson
 from rules.parser import RuleParser
+from distance.network_distance import NetworkDistanceField
+from postprocessing.pipelined import run_pipelined_postprocessing
+from postprocessing.partitioned_output import write_partitioned, read_partitioned
+from postprocessing.columnar import read_buildings_columnar, write_buildings_columnar
+from postprocessing.geometry_cache import prepare_geometry, load_building_attributes
+from postprocessing.parallel import process_buildings_parallel
+from postprocessing.grid_aggregation import GridSpec, aggregate_to_grid, save_grid_npz, grid_to_table, CBS_CELL_SIZE
+from postprocessing.incremental import (
+    save_rules_snapshot, load_rules_snapshot, plan_update, apply_update, changed_zones, input_fingerprint
+)
 
 
 def postprocess_citystackgen_output(
@@ -20,7 +30,23 @@ def postprocess_citystackgen_output(
     rules_yaml: str,
     output_geojson: str = None,
     output_csv: str = None,
-    random_seed: int = None 
+    random_seed: int = None,
+    street_network: str = None,
+    distance_cache_dir: str = None,
+    pipelined: bool = False,
+    batch_size: int = None,
+    output_partitioned_dir: str = None,
+    partition_by: str = 'zone',
+    tile_size: float = 1000.0,
+    incremental: bool = False,
+    low_memory: bool = False,
+    output_grid_dir: str = None,
+    grid_template: str = None,
+    grid_origin: Tuple[float, float] = None,
+    grid_cell_size: float = 100.0,
+    geometry_cache: bool = False,
+    geometry_cache_dir: str = None,
+    workers: int = None
 ) -> gpd.GeoDataFrame:
     """
     Postprocess CityStackGen output with full statistics and printing
@@ -32,18 +58,228 @@ def postprocess_citystackgen_output(
         output_geojson: Path to output GeoJSON (optional)
         output_csv: Path to output CSV (optional)
         random_seed: Random seed for reproducibility (optional)
-        
+        street_network: Streets GeoJSON / OSM extract for network distance (optional)
+        distance_cache_dir: Directory for cached network distance fields (optional)
+        pipelined: Overlap reading, classification and writing in background threads
+        batch_size: Buildings per batch in pipelined mode (None = one batch; batches need sampling mode 'random')
+        output_partitioned_dir: Directory for zone/tile shards + manifest (optional)
+        partition_by: 'zone', 'tile' or 'zone_tile'
+        tile_size: Tile edge length in meters for tile partitioning
+        incremental: Only recompute the zones / columns whose rules changed since the
+            previous output (falls back to a full run when that is not possible)
+        low_memory: Keep geometries as raw WKB, classify an attribute-only frame with
+            categorical / float32 columns and join the geometry back only for writing
+            (serial path, not with workers; pipelined mode already bounds memory by batch_size)
+        output_grid_dir: Directory for per-cell aggregates (CBS 500 m grid, plus the template
+            grid when grid_template and grid_origin are given) as NPZ rasters + CSV (optional)
+        grid_template: CityPy template NPZ whose grid the aggregates align with (optional)
+        grid_origin: Real-world (x, y) of the center of template cell (0, 0)
+        grid_cell_size: Template cell size in meters
+        geometry_cache: Take centroids / areas from a sidecar cache keyed by the buildings file hash
+            (computed on the first run); without geometry outputs no geometry is read at all
+        geometry_cache_dir: Directory for the sidecar cache (default: next to the buildings file)
+        workers: Classify zone partitions on this many worker processes (shared-memory centroids,
+            keyed per-building randomness: same result as a serial keyed run, but not the same
+            draws as a serial run with the same seed; no 'clustered' sampling; None = serial)
+
+    Modes (incompatible combinations raise ValueError before anything is read):
+        pipelined: batches through reader / classifier / writer threads; not with low_memory,
+            workers or geometry_cache (batch_size only applies here)
+        low_memory: serial, attribute-only frame; not with workers
+        default: full frame, serial or on workers, optionally from the geometry cache
+        incremental: tried first with any of the above, which is the fallback for a full run
+
     Returns:
         GeoDataFrame with processed buildings (classified with zones, types, households)
+        (low-memory mode: DataFrame without the geometry column)
     """
+    _validate_options(rules_yaml, pipelined, batch_size, low_memory, geometry_cache, workers)
+
     print(f"\n{'='*60}")
     print("POSTPROCESSING: classify buildings")
     print('='*60)
+
+    if incremental:
+        final_buildings = _postprocess_incremental(
+            buildings_geojson, city_center_geojson, rules_yaml, output_geojson, output_csv, random_seed,
+            street_network, distance_cache_dir, output_partitioned_dir, partition_by, tile_size,
+            keyed=bool(workers)
+        )
+        if final_buildings is not None:
+            return final_buildings
+        print(f"  No reusable previous output, running full postprocessing")
+
+    building_geometry = None
+    if pipelined:
+        final_buildings, rules, city_center = _postprocess_pipelined(
+            buildings_geojson, city_center_geojson, rules_yaml, output_geojson, output_csv,
+            random_seed, street_network, distance_cache_dir, batch_size
+        )
+    elif low_memory:
+        final_buildings, building_geometry, rules, city_center = _postprocess_low_memory(
+            buildings_geojson, city_center_geojson, rules_yaml, output_geojson, output_csv,
+            random_seed, street_network, distance_cache_dir, geometry_cache, geometry_cache_dir
+        )
+    else:
+        final_buildings, rules, city_center = _postprocess_in_memory(
+            buildings_geojson, city_center_geojson, rules_yaml, output_geojson, output_csv, random_seed,
+            street_network, distance_cache_dir, bool(output_partitioned_dir), geometry_cache, geometry_cache_dir, workers
+        )
+
+    if output_partitioned_dir:
+        partition_input = final_buildings
+        if low_memory:
+            # shards are written from a GeoDataFrame, geometry is only built here
+            partition_input = gpd.GeoDataFrame(
+                final_buildings, geometry=building_geometry.to_geoseries()
+            )
+        _save_partitioned(partition_input, output_partitioned_dir, partition_by, tile_size)
+
+    if output_grid_dir:
+        _save_grid_aggregates(final_buildings, output_grid_dir, grid_template, grid_origin, grid_cell_size)
+
+    # record the rules, input and seed next to every output (used by incremental runs)
+    outputs = (output_geojson, output_csv, output_partitioned_dir)
+    if any(outputs):
+        _save_snapshots(
+            outputs, rules, city_center, street_network,
+            input_fingerprint(buildings_geojson), random_seed, keyed=bool(workers)
+        )
     
+    # 6. print statistics
+    print(f"\n[7] Postprocessing complete!")
+    _print_postprocessing_statistics(final_buildings)
+    
+    return final_buildings
+
+
+def _validate_options(rules_yaml, pipelined, batch_size, low_memory, geometry_cache, workers):
+    """Reject option combinations that one of the modes would otherwise ignore or fail on"""
+    if workers is not None and workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if low_memory and workers:
+        raise ValueError("low_memory and workers cannot be combined: parallel workers classify a full (not attribute-only) frame")
+    if pipelined:
+        ignored = [name for name, value in (
+            ('low_memory', low_memory), ('workers', workers), ('geometry_cache', geometry_cache)
+        ) if value]
+        if ignored:
+            raise ValueError(
+                f"pipelined mode cannot be combined with {', '.join(ignored)}: "
+                f"it reads, classifies and writes its own batches (use batch_size to bound memory)"
+            )
+    elif batch_size is not None:
+        raise ValueError("batch_size only applies to pipelined mode")
+    if workers:
+        sampling_mode = RuleParser().load_from_yaml(rules_yaml).sampling.mode
+        if sampling_mode == 'clustered':
+            raise ValueError(
+                "workers cannot be used with the 'clustered' sampling mode: parallel workers draw keyed "
+                "per-building random numbers, the clustered field is one draw over all buildings"
+            )
+
+
+def _postprocess_pipelined(
+    buildings_geojson, city_center_geojson, rules_yaml, output_geojson, output_csv,
+    random_seed, street_network, distance_cache_dir, batch_size
+):
+    """Read, classify and write in overlapping background stages"""
+    print(f"\n[1-6] Pipelined: reading, classifying and writing in overlapping stages")
+    print(f"  Buildings: {buildings_geojson}")
+    print(f"  Batch size: {batch_size if batch_size else 'all'}")
+    final_buildings, rules, city_center = run_pipelined_postprocessing(
+        buildings_geojson=buildings_geojson,
+        city_center_geojson=city_center_geojson,
+        rules_yaml=rules_yaml,
+        output_geojson=output_geojson,
+        output_csv=output_csv,
+        random_seed=random_seed,
+        street_network=street_network,
+        distance_cache_dir=distance_cache_dir,
+        batch_size=batch_size
+    )
+    for output in (output_geojson, output_csv):
+        if output:
+            print(f"  ✓ Saved {len(final_buildings)} buildings to: {output}")
+    return final_buildings, rules, city_center
+
+
+def _postprocess_low_memory(
+    buildings_geojson, city_center_geojson, rules_yaml, output_geojson, output_csv,
+    random_seed, street_network, distance_cache_dir, geometry_cache, geometry_cache_dir
+):
+    """Serial classification of an attribute-only frame, geometries stay WKB until writing"""
+    # 1. load buildings: attributes + centroids / areas only
+    print(f"\n[1] Loading buildings from: {buildings_geojson}")
+    buildings_df, building_geometry = read_buildings_columnar(
+        buildings_geojson,
+        geometry_attributes=prepare_geometry(buildings_geojson, geometry_cache_dir) if geometry_cache else None
+    )
+    print(f"  Low-memory mode: attribute-only frame, {len(buildings_df)} buildings")
+
+    city_center, rules = _load_city_center_and_rules(city_center_geojson, rules_yaml)
+
+    # 4. process buildings, classified columns join the file's own fields (no copy of the other columns)
+    print(f"\n[4] Processing buildings...")
+    processor = BuildingProcessor(
+        rules, random_seed=random_seed, distance_field=_distance_field(street_network, distance_cache_dir), low_memory=True
+    )
+    classified = processor.process_buildings(buildings_df, city_center)
+    for column in classified.columns:
+        buildings_df[column] = classified[column]
+
+    # 5. save results
+    if output_geojson:
+        Path(output_geojson).parent.mkdir(parents=True, exist_ok=True)
+        print(f"\n[5] Saving classified buildings to: {output_geojson}")
+        write_buildings_columnar(output_geojson, buildings_df, building_geometry)
+        print(f"  ✓ Saved {len(buildings_df)} buildings")
+    _save_csv(buildings_df, output_csv)
+    return buildings_df, building_geometry, rules, city_center
+
+
+def _postprocess_in_memory(
+    buildings_geojson, city_center_geojson, rules_yaml, output_geojson, output_csv, random_seed,
+    street_network, distance_cache_dir, partitioned_output, geometry_cache, geometry_cache_dir, workers
+):
+    """Classification of the full frame, serial or on worker processes"""
     # 1. load buildings
     print(f"\n[1] Loading buildings from: {buildings_geojson}")
-    buildings_gdf = load_buildings_from_geojson(buildings_geojson)
+    if geometry_cache and not (output_geojson or partitioned_output):
+        # no geometry output: fields + cached centroids / areas, polygons are never parsed
+        buildings_gdf = load_building_attributes(buildings_geojson, geometry_cache_dir)
+        print(f"  Geometry cache: attributes only, {len(buildings_gdf)} buildings")
+    else:
+        buildings_gdf = load_buildings_from_geojson(buildings_geojson, geometry_cache, geometry_cache_dir)
+
+    city_center, rules = _load_city_center_and_rules(city_center_geojson, rules_yaml)
+
+    # 4. process buildings (includes household assignment)
+    print(f"\n[4] Processing buildings...")
+    distance_field = _distance_field(street_network, distance_cache_dir)
+    if workers:
+        print(f"  Parallel: zone partitions on {workers} workers (keyed randomness)")
+        final_buildings = process_buildings_parallel(
+            rules, buildings_gdf, city_center, random_seed=random_seed,
+            partition_by='zone', workers=workers, distance_field=distance_field
+        )
+    else:
+        processor = BuildingProcessor(rules, random_seed=random_seed, distance_field=distance_field)
+        final_buildings = processor.process_buildings(buildings_gdf, city_center)
+
+    # 5. save results
+    if output_geojson:
+        # create output directory if it doesn't exist
+        Path(output_geojson).parent.mkdir(parents=True, exist_ok=True)
+        
+        print(f"\n[5] Saving classified buildings to: {output_geojson}")
+        final_buildings.to_file(output_geojson, driver='GeoJSON')
+        print(f"  ✓ Saved {len(final_buildings)} buildings")
+    _save_csv(final_buildings, output_csv)
+    return final_buildings, rules, city_center
+
 
+def _load_city_center_and_rules(city_center_geojson: str, rules_yaml: str):
     # 2. get city center
     print(f"\n[2] Getting city center from: {city_center_geojson}")
     city_center = get_city_center_from_geojson(city_center_geojson)
@@ -53,40 +289,161 @@ def postprocess_citystackgen_output(
     parser = RuleParser()
     rules = parser.load_from_yaml(rules_yaml)
     print(f"  Loaded {len(rules.zones)} zones")
+    print(f"  Sampling mode: {rules.sampling.mode}")
     print(f"  Loaded {len(rules.housing_rules)} housing rules")
     print(f"  Loaded {len(rules.household_rules)} household rules")
     print(f"  Loaded {len(rules.residents_rules)} residents rules")
     print(f"  Loaded {len(rules.unit_size_rules)} unit size rules")
-    
-    # 4. process buildings (includes household assignment)
-    print(f"\n[4] Processing buildings...")
-    processor = BuildingProcessor(rules, random_seed=random_seed)
-    final_buildings = processor.process_buildings(buildings_gdf, city_center)
-    
-    # 5. save results
+    return city_center, rules
+
+
+def _distance_field(street_network: str, distance_cache_dir: str):
+    # optional street-network distance mode (None -> straight-line distance)
+    if not street_network:
+        return None
+    print(f"  Using street-network distance: {street_network}")
+    return NetworkDistanceField(street_network, cache_dir=distance_cache_dir)
+
+
+def _save_csv(buildings_df, output_csv: str):
+    if not output_csv:
+        return
+    # create output directory if it doesn't exist
+    Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"\n[6] Saving building data to: {output_csv}")
+    # convert to regular DataFrame for CSV (drop geometry column - not needed for CSV)
+    csv_data = buildings_df.drop(columns=['geometry'], errors='ignore')
+    csv_data.to_csv(output_csv, index=False)
+    print(f"  ✓ Saved building data")
+
+
+def _postprocess_incremental(
+    buildings_geojson: str,
+    city_center_geojson: str,
+    rules_yaml: str,
+    output_geojson: str,
+    output_csv: str,
+    random_seed: int,
+    street_network: str,
+    distance_cache_dir: str,
+    output_partitioned_dir: str,
+    partition_by: str,
+    tile_size: float,
+    keyed: bool = False
+):
+    """Update the previous outputs in place, None when a full run is needed"""
+    print(f"\n[1] Incremental: diffing rules against the previous output")
+    city_center = get_city_center_from_geojson(city_center_geojson)
+    rules = RuleParser().load_from_yaml(rules_yaml)
+
+    # every output has to be in the same state, otherwise they would diverge
+    outputs = [output for output in (output_geojson, output_csv, output_partitioned_dir) if output]
+    if not outputs or not all(Path(output).exists() for output in outputs):
+        return None
+    snapshots = [load_rules_snapshot(output) for output in outputs]
+    if any(snapshot != snapshots[0] for snapshot in snapshots):
+        return None
+
+    fingerprint = input_fingerprint(buildings_geojson)
+    plan = plan_update(snapshots[0], rules, city_center, street_network, fingerprint, random_seed, keyed)
+    if plan is None:
+        print(f"  Buildings input, seed, zones, sampling or distance settings changed")
+        return None
+    zones = changed_zones(plan)
+    if not zones:
+        print(f"  Rules unchanged, nothing to recompute")
+    for zone_name in zones:
+        columns = [column for column, zone_list in plan.items() if zone_name in zone_list]
+        print(f"  {zone_name:15s}: {', '.join(columns)}")
+
+    # previous output to start from: the single-file output (keeps the building order),
+    # or only the changed zone shards when the outputs are zone partitions only
+    zone_shards = bool(output_partitioned_dir) and partition_by != 'tile'
     if output_geojson:
-        # create output directory if it doesn't exist
-        Path(output_geojson).parent.mkdir(parents=True, exist_ok=True)
-        
-        print(f"\n[5] Saving classified buildings to: {output_geojson}")
-        final_buildings.to_file(output_geojson, driver='GeoJSON')
-        print(f"  ✓ Saved {len(final_buildings)} buildings")
-    
-    if output_csv:
-        # create output directory if it doesn't exist
-        Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
-        
-        print(f"\n[6] Saving building data to: {output_csv}")
-        # convert to regular DataFrame for CSV (drop geometry column - not needed for CSV)
-        csv_data = final_buildings.drop(columns=['geometry'])
-        csv_data.to_csv(output_csv, index=False)
-        print(f"  ✓ Saved building data")
-    
-    # 6. print statistics
-    print(f"\n[7] Postprocessing complete!")
-    _print_postprocessing_statistics(final_buildings)
-    
-    return final_buildings
+        previous_output = output_geojson
+    elif output_csv and not output_partitioned_dir:
+        previous_output = output_csv
+    elif zone_shards and not output_csv and not keyed:
+        # (keyed draws need the original row positions, which shards do not keep)
+        previous_output = output_partitioned_dir
+    else:
+        # CSV has no geometry to rewrite the shards from
+        return None
+
+    print(f"\n[2] Loading previous output: {previous_output}")
+    if previous_output == output_partitioned_dir:
+        buildings = read_partitioned(output_partitioned_dir, zones=zones if zones else None)
+    elif previous_output == output_csv:
+        buildings = pd.read_csv(output_csv)
+    else:
+        buildings = gpd.read_file(output_geojson)
+    print(f"  Loaded {len(buildings)} buildings")
+
+    print(f"\n[3] Recomputing changed zones...")
+    distance_field = None
+    if street_network:
+        distance_field = NetworkDistanceField(street_network, cache_dir=distance_cache_dir)
+    processor = BuildingProcessor(rules, random_seed=random_seed, distance_field=distance_field, keyed=keyed)
+    changed = apply_update(processor, buildings, plan)
+    print(f"  Recomputed {int(changed.sum())} of {len(buildings)} buildings")
+
+    print(f"\n[4] Rewriting outputs")
+    if zones:
+        if output_geojson:
+            buildings.to_file(output_geojson, driver='GeoJSON')
+            print(f"  ✓ Saved {len(buildings)} buildings to: {output_geojson}")
+        if output_csv:
+            csv_data = buildings.drop(columns=['geometry']) if 'geometry' in buildings else buildings
+            csv_data.to_csv(output_csv, index=False)
+            print(f"  ✓ Saved building data to: {output_csv}")
+        if output_partitioned_dir:
+            if zone_shards:
+                # only the shards of the changed zones are rewritten
+                _save_partitioned(buildings[changed], output_partitioned_dir, partition_by, tile_size, zones=zones)
+            else:
+                _save_partitioned(buildings, output_partitioned_dir, partition_by, tile_size)
+    _save_snapshots(outputs, rules, city_center, street_network, fingerprint, random_seed, keyed)
+
+    print(f"\n[5] Postprocessing complete!")
+    _print_postprocessing_statistics(buildings)
+    return buildings
+
+
+def _save_snapshots(outputs, rules, city_center, street_network, buildings, random_seed, keyed=False):
+    for output in outputs:
+        if output:
+            save_rules_snapshot(output, rules, city_center, street_network, buildings, random_seed, keyed)
+
+
+def _save_partitioned(buildings_gdf: gpd.GeoDataFrame, output_dir: str, partition_by: str, tile_size: float, zones=None):
+    """Write zone/tile shards and print the manifest summary"""
+    print(f"\n[6b] Saving partitioned buildings ({partition_by}) to: {output_dir}")
+    manifest = write_partitioned(buildings_gdf, output_dir, partition_by=partition_by, tile_size=tile_size, zones=zones)
+    print(f"  ✓ Saved {manifest['count']} buildings in {len(manifest['shards'])} shards")
+
+
+def _save_grid_aggregates(
+    buildings_df,
+    output_dir: str,
+    grid_template: str = None,
+    grid_origin: Tuple[float, float] = None,
+    grid_cell_size: float = 100.0
+):
+    """Aggregate buildings to the CBS 500 m grid (and the template grid) and save NPZ + CSV"""
+    print(f"\n[6c] Aggregating buildings to grid cells: {output_dir}")
+    grids = {'cbs500': GridSpec.aligned(
+        buildings_df['x'].to_numpy(dtype=float), buildings_df['y'].to_numpy(dtype=float), CBS_CELL_SIZE
+    )}
+    if grid_template and grid_origin:
+        grids['template'] = GridSpec.from_template(grid_template, grid_origin, grid_cell_size)
+
+    for name, grid in grids.items():
+        rasters = aggregate_to_grid(buildings_df, grid)
+        save_grid_npz(rasters, grid, Path(output_dir) / f"grid_{name}.npz")
+        grid_to_table(rasters, grid, cbs_ids=name == 'cbs500').to_csv(Path(output_dir) / f"grid_{name}.csv", index=False)
+        print(f"  ✓ {name}: {grid.shape[0]}x{grid.shape[1]} cells of {grid.cell_size:.0f} m "
+              f"({int(rasters['outside'])} buildings outside)")
 
 
 def _print_postprocessing_statistics(buildings_gdf: gpd.GeoDataFrame):
@@ -140,15 +497,14 @@ def _print_postprocessing_statistics(buildings_gdf: gpd.GeoDataFrame):
         residential_buildings = buildings_gdf[buildings_gdf['building_type'] != 'none']
         if len(residential_buildings) > 0:
             print(f"\nHousehold size distribution:")
-            household_sizes = []
-            for _, row in residential_buildings.iterrows():
-                if row['household_count'] > 0:
-                    household_size = row['resident_count'] / row['household_count']
-                    household_sizes.append(household_size)
+            with_households = residential_buildings[residential_buildings['household_count'] > 0]
+            household_sizes = (
+                with_households['resident_count'].to_numpy(dtype=float) / with_households['household_count'].to_numpy(dtype=float)
+            )
             
-            if household_sizes:
-                print(f"  Average household size: {sum(household_sizes)/len(household_sizes):.1f} residents")
-                print(f"  Min household size: {min(household_sizes):.0f} residents")
-                print(f"  Max household size: {max(household_sizes):.0f} residents")
+            if len(household_sizes) > 0:
+                print(f"  Average household size: {household_sizes.mean():.1f} residents")
+                print(f"  Min household size: {household_sizes.min():.0f} residents")
+                print(f"  Max household size: {household_sizes.max():.0f} residents")
     
     print(f"{'='*60}")
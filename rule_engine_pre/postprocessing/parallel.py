@@ -0,0 +1,151 @@
+import numpy as np
+import os
+import pandas as pd
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import RuleSet
+from distance.network_distance import NetworkDistanceField
+from distance.zones import assign_zones, zone_names
+from postprocessing.building_processor import BuildingProcessor, DERIVED_COLUMNS
+
+"""
+Parallel, partitioned BuildingProcessor runs.
+
+1. distances and zones of all buildings are computed once in the parent
+   (vectorized, also with a street-network distance field)
+2. buildings are partitioned by zone or by grid tile: one stable argsort
+   of the partition key gives every partition a contiguous slice of the
+   sort order
+3. x, y, area_m2, zone index and the sort order go into one shared memory
+   block; workers attach to it and read their slice (no geometry and no
+   coordinate arrays are pickled, a task is the block name and a slice)
+4. each worker classifies its partition with a keyed BuildingProcessor
+   whose building keys are the original row positions
+5. partition results are written back at their original positions
+
+With keyed randomness every building's draws depend only on (seed,
+decision, row position), so the result is identical to a serial keyed run
+(BuildingProcessor(keyed=True)) for every partitioning and worker count.
+"""
+
+PARTITIONS = ('zone', 'tile')
+
+
+def process_buildings_parallel(
+    rules: RuleSet,
+    buildings_df: pd.DataFrame,
+    city_center: Tuple[float, float],
+    random_seed: int = None,
+    partition_by: str = 'zone',
+    tile_size: float = 1000.0,
+    workers: int = None,
+    distance_field: NetworkDistanceField = None
+) -> pd.DataFrame:
+    """
+    Classify buildings partition by partition on a process pool
+
+    Args:
+        rules: RuleSet ('random' or 'quota' sampling mode; 'quota' needs zone partitions)
+        buildings_df: Buildings with 'x', 'y' (and 'area_m2') columns
+        city_center: (x, y) coords of city center
+        random_seed: Seed of the keyed random draws
+        partition_by: 'zone' or 'tile'
+        tile_size: Tile edge length in meters (partition_by='tile')
+        workers: Worker processes (None = all cores)
+        distance_field: Street-network distance field (optional, used in the parent only)
+
+    Returns:
+        Same frame as BuildingProcessor(rules, random_seed, keyed=True).process_buildings
+    """
+    if partition_by not in PARTITIONS:
+        raise ValueError(f"partition_by must be one of {PARTITIONS}, got '{partition_by}'")
+    if rules.sampling.mode == 'quota' and partition_by != 'zone':
+        raise ValueError("Exact quotas are per zone: use partition_by='zone' in 'quota' sampling mode")
+
+    # 1. distances and zones (parent)
+    processor = BuildingProcessor(rules, random_seed=random_seed, distance_field=distance_field, keyed=True)
+    result_df = buildings_df.copy()
+    x = result_df['x'].to_numpy(dtype=np.float64)
+    y = result_df['y'].to_numpy(dtype=np.float64)
+    result_df['distance'] = processor._calculate_distance(x, y, city_center)
+    zone_index = assign_zones(rules.zones, result_df['distance'].to_numpy())
+    result_df['zone'] = zone_names(rules.zones, zone_index)
+    n = len(result_df)
+    if n == 0:
+        processor.assign_attributes(result_df)
+        return result_df
+
+    # 2. partitions: contiguous slices of one stable sort order
+    if partition_by == 'zone':
+        partition_key = zone_index
+    else:
+        column = np.floor(x / tile_size).astype(np.int64)
+        row = np.floor(y / tile_size).astype(np.int64)
+        partition_key = (column - column.min()) * (row.max() - row.min() + 1) + (row - row.min())
+    order = np.argsort(partition_key, kind='stable')
+    boundaries = np.flatnonzero(np.diff(partition_key[order])) + 1
+    slices = list(zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [n]])))
+
+    # 3. shared memory: x, y, area_m2 (float64), zone index and order (int64)
+    area = result_df['area_m2'].to_numpy(dtype=np.float64) if 'area_m2' in result_df else np.full(n, np.nan)
+    block = shared_memory.SharedMemory(create=True, size=5 * n * 8)
+    try:
+        floats = np.ndarray((3, n), dtype=np.float64, buffer=block.buf)
+        floats[0], floats[1], floats[2] = x, y, area
+        integers = np.ndarray((2, n), dtype=np.int64, buffer=block.buf, offset=3 * n * 8)
+        integers[0], integers[1] = zone_index, order
+
+        # 4. one task per partition
+        job = {'block': block.name, 'n': n, 'rules': rules, 'seed': processor.random_seed, 'has_area': 'area_m2' in result_df}
+        tasks = [(job, int(start), int(stop)) for start, stop in slices]
+        workers = workers or os.cpu_count() or 1
+        # many small partitions (tiles): several per round trip
+        chunksize = max(1, len(tasks) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_process_partition, tasks, chunksize=chunksize))
+        del floats, integers
+    finally:
+        block.close()
+        block.unlink()
+
+    # 5. back to the original row order
+    for column in DERIVED_COLUMNS:
+        values = np.concatenate([part[column] for part in parts])
+        ordered = np.empty(n, dtype=values.dtype)
+        ordered[order] = values
+        result_df[column] = ordered
+    return result_df
+
+
+def _process_partition(args) -> Dict[str, np.ndarray]:
+    job, start, stop = args
+    block = shared_memory.SharedMemory(name=job['block'])
+    try:
+        n = job['n']
+        floats = np.ndarray((3, n), dtype=np.float64, buffer=block.buf)
+        integers = np.ndarray((2, n), dtype=np.int64, buffer=block.buf, offset=3 * n * 8)
+        rows = integers[1, start:stop].copy()
+        zone_index = integers[0, rows]
+        partition = pd.DataFrame({'x': floats[0, rows], 'y': floats[1, rows]})
+        if job['has_area']:
+            partition['area_m2'] = floats[2, rows]
+        del floats, integers
+    finally:
+        block.close()
+
+    rules = job['rules']
+    partition['zone'] = zone_names(rules.zones, zone_index)
+
+    # keys = original row positions: the same draws as a serial keyed run
+    processor = BuildingProcessor(rules, random_seed=job['seed'], keyed=True)
+    processor.assign_attributes(partition, keys=rows)
+    return {column: partition[column].to_numpy() for column in DERIVED_COLUMNS}
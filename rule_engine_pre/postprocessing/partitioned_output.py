@@ -0,0 +1,220 @@
+import json
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+from pyproj import Transformer
+
+from postprocessing.geometry_cache import to_projected
+
+"""
+Spatially partitioned outputs.
+
+Instead of one monolithic buildings_classified.geojson, buildings are
+written as shards:
+
+- by zone:       zone=0_1km.geojson, ...
+- by tile:       tile=12_7.geojson (fixed square tiles on the building centroids)
+- by zone_tile:  zone=0_1km__tile=12_7.geojson
+
+plus a small manifest.json with the extent and count of every shard.
+Shards are written in parallel; read_partitioned only opens the shards
+whose extent intersects a bbox / zone filter.
+
+Tile keys come from the projected centroids ('x', 'y'), so shard bounds
+and bbox filters use the same projected CRS ('bounds_crs' in the
+manifest, EPSG:28992 for lon/lat inputs); the shards themselves keep the
+CRS of the input geometry.
+"""
+
+MANIFEST_NAME = "manifest.json"
+PARTITION_MODES = ('zone', 'tile', 'zone_tile')
+
+
+def write_partitioned(
+    buildings_gdf: gpd.GeoDataFrame,
+    output_dir: str,
+    partition_by: str = 'zone',
+    tile_size: float = 1000.0,
+    max_workers: int = 4,
+    zones: Sequence[str] = None
+) -> Dict:
+    """
+    Write classified buildings as zone / tile shards with a manifest
+
+    Args:
+        buildings_gdf: Classified buildings (needs 'x', 'y' and, for zones, 'zone')
+        output_dir: Directory for the shards and manifest.json
+        partition_by: 'zone', 'tile' or 'zone_tile'
+        tile_size: Tile edge length in meters (tile partitioning)
+        max_workers: Number of shards written in parallel
+        zones: Only rewrite the shards of these zones, keep the other shards of the
+            existing manifest (buildings_gdf then only holds these zones)
+
+    Returns:
+        Manifest dictionary (also written to output_dir/manifest.json)
+    """
+    if partition_by not in PARTITION_MODES:
+        raise ValueError(f"partition_by must be one of {PARTITION_MODES}, got '{partition_by}'")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # shard bounds use the CRS of the tile keys (projected centroids)
+    crs = buildings_gdf.crs.to_string() if buildings_gdf.crs is not None else None
+    _, bounds_crs = to_projected(np.empty(0, dtype=object), crs)
+
+    # partial rewrite: drop the old shards of the rewritten zones, keep the rest
+    kept = []
+    if zones is not None:
+        if partition_by == 'tile':
+            raise ValueError("Partial rewrites need zone shards (partition_by 'zone' or 'zone_tile')")
+        previous = read_manifest(output_dir)
+        if previous['partition_by'] != partition_by or previous['tile_size'] != (tile_size if partition_by != 'zone' else None):
+            raise ValueError(f"Existing partitions in {output_dir} use a different layout, rewrite all zones")
+        if previous.get('bounds_crs', previous['crs']) != bounds_crs:
+            raise ValueError(f"Existing partitions in {output_dir} use a different CRS, rewrite all zones")
+        for entry in previous['shards']:
+            if entry['zone'] in zones:
+                (output_dir / entry['file']).unlink(missing_ok=True)
+            else:
+                kept.append(entry)
+
+    # shard key per building
+    keys = {}
+    if partition_by in ('zone', 'zone_tile'):
+        keys['zone'] = buildings_gdf['zone'].astype(str).to_numpy()
+    if partition_by in ('tile', 'zone_tile'):
+        keys['tile_col'] = np.floor(buildings_gdf['x'].to_numpy() / tile_size).astype(np.int64)
+        keys['tile_row'] = np.floor(buildings_gdf['y'].to_numpy() / tile_size).astype(np.int64)
+    groups = pd.DataFrame(keys).groupby(list(keys), sort=True).indices
+
+    shards = []
+    for key, positions in groups.items():
+        key = key if isinstance(key, tuple) else (key,)
+        shard = dict(zip(keys, key))
+        shard['file'] = _shard_name(shard)
+        shard['positions'] = positions
+        shards.append(shard)
+
+    # per-building bounds in the CRS of the tile keys (projected centroids), not of the geometry column
+    projected, _ = to_projected(np.asarray(buildings_gdf.geometry.values), crs)
+    building_bounds = shapely.bounds(projected)
+
+    # write all shards in parallel (GDAL releases the GIL while writing)
+    def write_shard(shard):
+        part = buildings_gdf.iloc[shard['positions']]
+        part.to_file(output_dir / shard['file'], driver='GeoJSON')
+        minx, miny = building_bounds[shard['positions'], :2].min(axis=0)
+        maxx, maxy = building_bounds[shard['positions'], 2:].max(axis=0)
+        return {
+            'file': shard['file'],
+            'zone': shard.get('zone'),
+            'tile': [int(shard['tile_col']), int(shard['tile_row'])] if 'tile_col' in shard else None,
+            'count': int(len(part)),
+            'bounds': [float(minx), float(miny), float(maxx), float(maxy)]
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        entries = list(executor.map(write_shard, shards))
+
+    entries = sorted(kept + entries, key=lambda entry: entry['file'])
+    manifest = {
+        'partition_by': partition_by,
+        'tile_size': tile_size if partition_by != 'zone' else None,
+        'crs': crs,
+        'bounds_crs': bounds_crs,
+        'count': int(sum(entry['count'] for entry in entries)),
+        'shards': entries
+    }
+    with open(output_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def read_manifest(output_dir: str) -> Dict:
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"Partition manifest not found: {manifest_path}")
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def select_shards(
+    manifest: Dict,
+    bbox: Tuple[float, float, float, float] = None,
+    zones: Sequence[str] = None
+) -> List[Dict]:
+    # shards whose extent intersects bbox and whose zone is in zones
+    selected = []
+    for shard in manifest['shards']:
+        if zones is not None and manifest['partition_by'] != 'tile' and shard['zone'] not in zones:
+            continue
+        if bbox is not None:
+            minx, miny, maxx, maxy = shard['bounds']
+            if maxx < bbox[0] or minx > bbox[2] or maxy < bbox[1] or miny > bbox[3]:
+                continue
+        selected.append(shard)
+    return selected
+
+
+def read_partitioned(
+    output_dir: str,
+    bbox: Tuple[float, float, float, float] = None,
+    zones: Sequence[str] = None,
+    max_workers: int = 4
+) -> gpd.GeoDataFrame:
+    """
+    Read only the shards needed for a bbox and/or zone filter
+
+    Args:
+        output_dir: Directory written by write_partitioned
+        bbox: (minx, miny, maxx, maxy) filter in the manifest 'bounds_crs' (projected, optional)
+        zones: Zone names to keep (optional)
+        max_workers: Number of shards read in parallel
+
+    Returns:
+        GeoDataFrame with the matching buildings
+    """
+    manifest = read_manifest(output_dir)
+    shards = select_shards(manifest, bbox=bbox, zones=zones)
+
+    # bbox filter is applied by the driver (in the CRS of the shards), not after loading
+    bounds_crs = manifest.get('bounds_crs', manifest['crs'])
+    file_bbox = bbox
+    if bbox is not None and bounds_crs != manifest['crs']:
+        file_bbox = Transformer.from_crs(bounds_crs, manifest['crs'], always_xy=True).transform_bounds(*bbox)
+
+    def read_shard(shard):
+        part = gpd.read_file(Path(output_dir) / shard['file'], bbox=file_bbox)
+        if file_bbox is not bbox and len(part) > 0:
+            # the reprojected bbox is only an envelope: test the projected geometries
+            projected, _ = to_projected(np.asarray(part.geometry.values), part.crs)
+            part = part[shapely.intersects(projected, shapely.box(*bbox))]
+        return part
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        parts = list(executor.map(read_shard, shards))
+
+    parts = [part for part in parts if len(part) > 0]
+    if not parts:
+        return gpd.GeoDataFrame(geometry=[], crs=manifest['crs'])
+
+    buildings = pd.concat(parts, ignore_index=True)
+    # tile shards can still hold buildings of other zones
+    if zones is not None and 'zone' in buildings.columns:
+        buildings = buildings[buildings['zone'].isin(zones)].reset_index(drop=True)
+    return buildings
+
+
+def _shard_name(shard: Dict) -> str:
+    parts = []
+    if 'zone' in shard:
+        parts.append(f"zone={shard['zone']}")
+    if 'tile_col' in shard:
+        parts.append(f"tile={shard['tile_col']}_{shard['tile_row']}")
+    return "__".join(parts) + ".geojson"
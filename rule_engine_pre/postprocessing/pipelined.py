@@ -0,0 +1,264 @@
+import queue
+import threading
+import pandas as pd
+import geopandas as gpd
+import pyogrio
+import shapely
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from postprocessing.building_processor import BuildingProcessor, add_building_attributes, get_city_center_from_geojson
+from rules.parser import RuleParser
+from distance.network_distance import NetworkDistanceField
+
+"""
+Pipelined postprocessing: overlap I/O with classification.
+
+    reader thread:  read batch 0 | read batch 1 | read batch 2 | ...
+    main thread:    (load center + rules) | classify 0 | classify 1 | ...
+    writer threads:                        | write 0 (GeoJSON, CSV) | write 1 | ...
+
+- city center and rules are loaded in background threads while the first
+  buildings batch is being read
+- GeoJSON and CSV are written by one background thread each (in batch order),
+  so classification of batch k+1 overlaps with writing batch k
+- bounded queues keep at most `max_pending` batches in memory per stage
+
+End-to-end time approaches max(read, compute, write) instead of the sum.
+
+Batches are streamed from one open file when pyarrow is installed
+(pyogrio Arrow record batches), so reading batch k+1 overlaps with
+classifying batch k for every format. Without pyarrow:
+
+- GeoPackage / FlatGeobuf / Shapefile: slices via skip_features / max_features
+- GeoJSON: GDAL scans the whole document on every open (~1.2 s per slice of
+  a 200k-building file, growing with the offset), so the file is read in
+  one pass and only classification and writing overlap
+
+Type sampling works per batch: quota / clustered modes would only be exact
+per batch, so they need batch_size=None (the whole file is one batch; then
+only the loading and writing steps overlap).
+"""
+
+# marks the end of the batch stream
+_DONE = object()
+
+
+def run_pipelined_postprocessing(
+    buildings_geojson: str,
+    city_center_geojson: str,
+    rules_yaml: str,
+    output_geojson: str = None,
+    output_csv: str = None,
+    random_seed: int = None,
+    street_network: str = None,
+    distance_cache_dir: str = None,
+    batch_size: int = None,
+    max_pending: int = 2
+) -> Tuple[gpd.GeoDataFrame, object, Tuple[float, float]]:
+    """
+    Classify buildings with overlapping read / classify / write stages
+
+    Args:
+        buildings_geojson: Path to buildings GeoJSON
+        city_center_geojson: Path to city center GeoJSON
+        rules_yaml: Path to rules YAML file
+        output_geojson: Path to output GeoJSON (optional)
+        output_csv: Path to output CSV (optional)
+        random_seed: Random seed for reproducibility (optional)
+        street_network: Streets GeoJSON / OSM extract for network distance (optional)
+        distance_cache_dir: Directory for cached network distance fields (optional)
+        batch_size: Buildings per batch (None = one batch, needed for quota / clustered sampling)
+        max_pending: Max batches waiting between two stages
+
+    Returns:
+        (GeoDataFrame with processed buildings (all batches, in input order), rules, city center)
+    """
+    if batch_size is not None and batch_size < 1:
+        raise ValueError(f"batch_size must be >= 1, got {batch_size}")
+
+    # 1. start reading buildings, city center and rules at the same time
+    batches = _BackgroundIterator(_read_batches(buildings_geojson, batch_size), max_pending)
+    writers = []
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='postprocess-load') as loader:
+            center_future = loader.submit(get_city_center_from_geojson, city_center_geojson)
+            rules_future = loader.submit(RuleParser().load_from_yaml, rules_yaml)
+            rules = rules_future.result()
+            city_center = center_future.result()
+
+        if batch_size is not None and rules.sampling.mode != 'random':
+            raise ValueError(
+                f"Sampling mode '{rules.sampling.mode}' is exact per zone over all buildings, "
+                f"batched pipelining would make it exact per batch only: use batch_size=None"
+            )
+
+        distance_field = None
+        if street_network:
+            distance_field = NetworkDistanceField(street_network, cache_dir=distance_cache_dir)
+        processor = BuildingProcessor(rules, random_seed=random_seed, distance_field=distance_field)
+
+        if output_geojson:
+            writers.append(_BatchWriter(output_geojson, _write_geojson_batch, max_pending))
+        if output_csv:
+            writers.append(_BatchWriter(output_csv, _write_csv_batch, max_pending))
+
+        # 2. classify batch k while batch k+1 is read and batch k-1 is written
+        for batch_index, batch in enumerate(batches):
+            processed = processor.process_buildings(batch, city_center)
+            results.append(processed)
+            for writer in writers:
+                writer.put(batch_index, processed)
+    finally:
+        # stop the reader (e.g. after an error), then wait for every writer, collecting their errors
+        batches.close()
+        write_errors = [error for error in [writer.close() for writer in writers] if error is not None]
+    # reached only without an error from reading / classifying (which must not be hidden by a write error)
+    if write_errors:
+        raise write_errors[0]
+
+    final_buildings = pd.concat(results) if results else gpd.GeoDataFrame()
+    return final_buildings, rules, city_center
+
+
+def _read_batches(path: str, batch_size: int = None) -> Iterator[gpd.GeoDataFrame]:
+    # batches of batch_size features (one batch when None), index = position in the file
+    if batch_size is None:
+        yield add_building_attributes(gpd.read_file(path))
+        return
+
+    try:
+        import pyarrow  # noqa: F401  (only needed for streaming record batches)
+    except ImportError:
+        pyarrow = None
+
+    if pyarrow is not None:
+        # one open layer, GDAL hands out record batches as it parses
+        with pyogrio.raw.open_arrow(path, batch_size=batch_size, use_pyarrow=True) as (meta, reader):
+            geometry_name = meta['geometry_name'] or 'wkb_geometry'
+            start = 0
+            for record_batch in reader:
+                attributes = record_batch.drop_columns([geometry_name]).to_pandas()
+                geometry = shapely.from_wkb(record_batch.column(geometry_name).to_numpy(zero_copy_only=False))
+                batch = gpd.GeoDataFrame(attributes, geometry=geometry, crs=meta['crs'])
+                batch.index = pd.RangeIndex(start, start + len(batch))
+                start += len(batch)
+                yield add_building_attributes(batch)
+        return
+
+    if Path(path).suffix.lower() in ('.geojson', '.json'):
+        # every open of a GeoJSON document scans all of it: read once, hand out slices
+        buildings = gpd.read_file(path)
+        for start in range(0, len(buildings), batch_size):
+            yield add_building_attributes(buildings.iloc[start:start + batch_size].copy())
+        return
+
+    # random-access formats (GeoPackage, FlatGeobuf, Shapefile): read slice by slice
+    start = 0
+    while True:
+        batch = pyogrio.read_dataframe(path, skip_features=start, max_features=batch_size)
+        if len(batch) == 0:
+            return
+        batch.index = pd.RangeIndex(start, start + len(batch))
+        yield add_building_attributes(batch)
+        if len(batch) < batch_size:
+            return
+        start += batch_size
+
+
+def _write_geojson_batch(path: str, batch_index: int, batch: gpd.GeoDataFrame):
+    # first batch creates the file, later batches append features
+    batch.to_file(path, driver='GeoJSON', mode='w' if batch_index == 0 else 'a')
+
+
+def _write_csv_batch(path: str, batch_index: int, batch: gpd.GeoDataFrame):
+    # drop geometry column - not needed for CSV
+    csv_data = batch.drop(columns=['geometry'])
+    csv_data.to_csv(path, index=False, mode='w' if batch_index == 0 else 'a', header=batch_index == 0)
+
+
+class _BackgroundIterator:
+    # runs a generator in a background thread, buffering up to max_pending items
+
+    def __init__(self, generator: Iterator, max_pending: int):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(generator,), daemon=True)
+        self._thread.start()
+
+    def _run(self, generator: Iterator):
+        try:
+            for item in generator:
+                if not self._put(item):
+                    generator.close()
+                    return
+        except BaseException as error:
+            self._put(error)
+        self._put(_DONE)
+
+    def _put(self, item) -> bool:
+        # blocking put that gives up once the consumer has stopped
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        # stop reading (no-op after the last batch) and wait for the reader thread
+        self._stop.set()
+        self._thread.join()
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+class _BatchWriter:
+    # writes batches to one output file in a background thread, in submission order
+
+    def __init__(self, path: str, write_batch, max_pending: int):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._write_batch = write_batch
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if self._error is None:
+                try:
+                    self._write_batch(self.path, *item)
+                except BaseException as error:
+                    self._error = error
+
+    def put(self, batch_index: int, batch: gpd.GeoDataFrame):
+        if self._error is not None:
+            raise self._error
+        self._queue.put((batch_index, batch))
+
+    def close(self) -> BaseException:
+        # wait for all pending writes, return the write error (None if every write succeeded)
+        self._queue.put(_DONE)
+        self._thread.join()
+        return self._error
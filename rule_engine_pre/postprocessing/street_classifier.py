@@ -0,0 +1,213 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from distance.zones import euclidean_distance
+from sampling.quota import quota_counts, quota_assign_by_rank
+from postprocessing.building_processor import get_city_center_from_geojson
+from postprocessing.geometry_cache import TARGET_CRS
+
+"""
+Road types for generated streets from observed shares.
+
+CityStackGen streets have no road class. The observed shares of CityPy
+(data/citypy/layers_cleaned/road_edges_pct.csv: road_type, percentage of
+edges) are the targets, allocated with exact quotas: with N segments,
+type k gets the largest-remainder rounding of N * p_k segments, so the
+achieved shares match the targets up to one segment.
+
+Which segment gets which type is decided by one score per segment,
+
+    score = length_weight * z(log length) + distance_weight * z(distance to center) + N(0, 1)
+
+and one argsort: the highest scores go to the top of ROAD_HIERARCHY
+(motorway, trunk, ... long / peripheral segments), the lowest to the
+bottom (footway, pedestrian, steps ... short / central segments). With
+both weights 0 (default) the assignment is a random permutation of the
+quotas. Everything is vectorized over the whole network.
+"""
+
+ROAD_TARGETS_CSV = PARENT_DIR.parent / 'data' / 'citypy' / 'layers_cleaned' / 'road_edges_pct.csv'
+
+# major -> minor; road types not listed here come last, in CSV order
+ROAD_HIERARCHY = [
+    'motorway', 'motorway_link', 'trunk', 'trunk_link', 'primary', 'primary_link',
+    'secondary', 'secondary_link', 'tertiary', 'tertiary_link', 'busway', 'unclassified',
+    'residential', 'living_street', 'service', 'services', 'track', 'cycleway', 'path',
+    'footway', 'pedestrian', 'corridor', 'steps'
+]
+
+
+def load_road_targets(csv_path: str = ROAD_TARGETS_CSV) -> Dict[str, float]:
+    # road_type -> share (percentages normalized to sum 1)
+    table = pd.read_csv(csv_path)
+    if not {'road_type', 'percentage'} <= set(table.columns):
+        raise ValueError(f"{csv_path} needs 'road_type' and 'percentage' columns, got {list(table.columns)}")
+    if (table['percentage'] < 0).any() or table['percentage'].sum() <= 0:
+        raise ValueError(f"{csv_path}: percentages must be non-negative and not all zero")
+    total = table['percentage'].sum()
+    return {str(road_type): float(pct) / total for road_type, pct in zip(table['road_type'], table['percentage'])}
+
+
+def classify_streets(
+    streets: gpd.GeoDataFrame,
+    targets: Dict[str, float],
+    city_center: Tuple[float, float] = None,
+    length_weight: float = 0.0,
+    distance_weight: float = 0.0,
+    random_seed: int = None,
+    column: str = 'road_type'
+) -> gpd.GeoDataFrame:
+    """
+    Assign road types to street segments, hitting the target shares exactly
+
+    Args:
+        streets: Street segments (LineStrings, projected CRS)
+        targets: road_type -> share (e.g. load_road_targets())
+        city_center: (x, y) coords of city center (needed when distance_weight != 0)
+        length_weight: Pull of long segments towards major road types (0 = no conditioning)
+        distance_weight: Pull of peripheral segments towards major road types (0 = no conditioning)
+        random_seed: Random seed for reproducibility
+        column: Output column
+
+    Returns:
+        Copy of streets with the road type column, 'length_m' and 'distance' (if a city center is given)
+    """
+    if distance_weight and city_center is None:
+        raise ValueError("Conditioning on distance needs the city center")
+    if streets.crs is not None and streets.crs.is_geographic:
+        raise ValueError("Street lengths are in meters: reproject the streets to a projected CRS first")
+    rng = np.random.default_rng(random_seed)
+
+    result = streets.copy()
+    geometries = result.geometry.to_numpy()
+    result['length_m'] = shapely.length(geometries)
+    if city_center is not None:
+        midpoints = shapely.line_interpolate_point(geometries, 0.5, normalized=True)
+        result['distance'] = euclidean_distance(shapely.get_x(midpoints), shapely.get_y(midpoints), city_center)
+
+    # road types major -> minor
+    road_types = [t for t in ROAD_HIERARCHY if t in targets] + [t for t in targets if t not in ROAD_HIERARCHY]
+    shares = np.array([targets[t] for t in road_types], dtype=float)
+
+    # one score per segment, highest scores -> first (major) road types
+    score = rng.standard_normal(len(result))
+    if length_weight:
+        score += length_weight * _standardize(np.log(np.maximum(result['length_m'].to_numpy(), 1e-3)))
+    if distance_weight:
+        score += distance_weight * _standardize(result['distance'].to_numpy())
+    codes = quota_assign_by_rank(-score, shares)
+
+    result[column] = np.asarray(road_types, dtype=object)[codes]
+    return result
+
+
+def street_class_report(streets: gpd.GeoDataFrame, targets: Dict[str, float], column: str = 'road_type') -> pd.DataFrame:
+    """
+    Achieved vs. target shares per road type
+
+    Returns:
+        DataFrame indexed by road type: target / achieved segment counts and shares,
+        achieved share of the network length and mean segment length
+    """
+    road_types = list(targets)
+    size = len(streets)
+    if 'length_m' in streets:
+        lengths = streets['length_m']
+    else:
+        lengths = pd.Series(shapely.length(streets.geometry.to_numpy()), index=streets.index)
+    grouped = lengths.groupby(streets[column].to_numpy())
+    counts = grouped.size().reindex(road_types, fill_value=0)
+    total_length = lengths.sum()
+
+    report = pd.DataFrame({
+        'target_count': quota_counts([targets[t] for t in road_types], size) if size else 0,
+        'count': counts.to_numpy(),
+        'target_pct': [targets[t] * 100 for t in road_types],
+        'achieved_pct': counts.to_numpy() / max(size, 1) * 100,
+        'length_pct': grouped.sum().reindex(road_types, fill_value=0.0).to_numpy() / (total_length or 1.0) * 100,
+        'mean_length_m': grouped.mean().reindex(road_types).to_numpy()
+    }, index=pd.Index(road_types, name=column))
+    return report
+
+
+def classify_street_file(
+    streets_geojson: str,
+    output_geojson: str = None,
+    targets_csv: str = ROAD_TARGETS_CSV,
+    city_center_geojson: str = None,
+    length_weight: float = 0.0,
+    distance_weight: float = 0.0,
+    random_seed: int = None
+) -> Tuple[gpd.GeoDataFrame, pd.DataFrame]:
+    """
+    Classify the streets of a CityStackGen output with full statistics and printing
+
+    Args:
+        streets_geojson: Path to streets GeoJSON
+        output_geojson: Path to output GeoJSON (optional)
+        targets_csv: Road type percentages (road_type, percentage)
+        city_center_geojson: Path to city center GeoJSON (needed for distance conditioning)
+        length_weight: Pull of long segments towards major road types
+        distance_weight: Pull of peripheral segments towards major road types
+        random_seed: Random seed for reproducibility
+
+    Returns:
+        (classified streets, achieved vs. target report)
+    """
+    print(f"\n{'='*60}")
+    print("POSTPROCESSING: classify streets")
+    print('='*60)
+
+    print(f"\n[1] Loading streets from: {streets_geojson}")
+    streets = gpd.read_file(streets_geojson)
+    if streets.crs is not None and streets.crs.is_geographic:
+        streets = streets.to_crs(TARGET_CRS)
+    streets = streets[streets.geometry.geom_type.isin(['LineString', 'MultiLineString'])]
+    print(f"  Loaded {len(streets)} street segments")
+
+    print(f"\n[2] Loading road type targets from: {targets_csv}")
+    targets = load_road_targets(targets_csv)
+    print(f"  Loaded {len(targets)} road types")
+
+    city_center = get_city_center_from_geojson(city_center_geojson) if city_center_geojson else None
+    print(f"\n[3] Assigning road types (exact quotas, length weight {length_weight}, distance weight {distance_weight})...")
+    classified = classify_streets(
+        streets, targets, city_center=city_center,
+        length_weight=length_weight, distance_weight=distance_weight, random_seed=random_seed
+    )
+    report = street_class_report(classified, targets)
+
+    if output_geojson:
+        Path(output_geojson).parent.mkdir(parents=True, exist_ok=True)
+        print(f"\n[4] Saving classified streets to: {output_geojson}")
+        classified.to_file(output_geojson, driver='GeoJSON')
+        print(f"  ✓ Saved {len(classified)} street segments")
+
+    _print_street_statistics(report)
+    return classified, report
+
+
+def _standardize(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def _print_street_statistics(report: pd.DataFrame):
+    """Print achieved vs. target road type shares"""
+    print(f"\n{'='*60}")
+    print("STREETS: road type shares (target / achieved, share of length)")
+    print('='*60)
+    for road_type, row in report.iterrows():
+        print(f"  {road_type:15s}: {row['target_pct']:5.2f}% / {row['achieved_pct']:5.2f}% "
+              f"({int(row['count']):6d} segments, {row['length_pct']:5.2f}% of length)")
+    print(f"{'='*60}")
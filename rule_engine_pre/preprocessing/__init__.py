@@ -1,4 +1,5 @@
 from .template_modifier import TemplateModifier
 from .main import modify_template_with_stats
+from .tiled import modify_template_tiled
 
-__all__ = ['TemplateModifier', 'modify_template_with_stats']
+__all__ = ['TemplateModifier', 'modify_template_with_stats', 'modify_template_tiled']
@@ -2,7 +2,7 @@ import numpy as np
 import sys
 import random
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Tuple
 
 # add parent directory to path for imports
 PARENT_DIR = Path(__file__).parent.parent
@@ -10,7 +10,9 @@ if str(PARENT_DIR) not in sys.path:
     sys.path.insert(0, str(PARENT_DIR))
 
 from preprocessing.template_modifier import TemplateModifier
+from preprocessing.tiled import modify_template_tiled, DEFAULT_TILE_SIZE
 from rules.parser import RuleParser
+from distance.network_distance import NetworkDistanceField
 
 # move all printing from template_modifier to here
 
@@ -19,7 +21,13 @@ def modify_template_with_stats(
     output_path: str,
     rules_yaml: str,
     cell_size: float = 100.0,
-    random_seed: int = None
+    random_seed: int = None,
+    street_network: str = None,
+    grid_origin: Tuple[float, float] = None,
+    distance_cache_dir: str = None,
+    tiled: bool = False,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    workers: int = None
 ) -> Dict:
     """
     Modify template with full statistics and printing
@@ -30,6 +38,13 @@ def modify_template_with_stats(
         rules_yaml: Path to rules YAML file
         cell_size: Size of grid cells in meters
         random_seed: Random seed for reproducibility
+        street_network: Streets GeoJSON / OSM extract for network distance (optional)
+        grid_origin: Real-world (x, y) of cell (0, 0), needed for network distance
+        distance_cache_dir: Directory for cached network distance fields (optional)
+        tiled: Process the grid in tiles on a process pool (memory-mapped arrays, keyed random
+            numbers: the result does not depend on tile_size / workers; random mode, straight-line distance)
+        tile_size: Tile edge length in cells (tiled mode)
+        workers: Worker processes in tiled mode (None = all cores)
         
     Returns:
         Dictionary with modification statistics
@@ -44,12 +59,37 @@ def modify_template_with_stats(
     parser = RuleParser()
     rules = parser.load_from_yaml(rules_yaml)
     print(f"  Loaded {len(rules.zones)} zones")
+    print(f"  Sampling mode: {rules.sampling.mode}")
     print(f"  Loaded {len(rules.housing_rules)} housing rules")
     print(f"  Loaded {len(rules.landuse_rules)} landuse rules")
+    print(f"  Loaded {len(rules.street_template_rules)} street template rules")
     
+    if tiled:
+        if street_network:
+            raise ValueError("Tiled preprocessing uses straight-line distance, street_network is not supported")
+        print(f"\n[2-3] Modifying template in {tile_size}x{tile_size} tiles ({workers or 'all'} workers)...")
+        print(f"  Input: {input_path}")
+        print(f"  Output: {output_path}")
+        stats = modify_template_tiled(
+            rules, input_path, output_path, cell_size,
+            random_seed=random_seed, tile_size=tile_size, workers=workers
+        )
+        print(f"\n[4] Modification complete! ({stats['tiles']} tiles)")
+        _print_preprocessing_statistics(stats)
+        return stats
+
     # 2. create modifier
     print(f"\n[2] Creating template modifier...")
-    modifier = TemplateModifier(rules, random_seed=random_seed)
+    distance_field = None
+    if street_network:
+        distance_field = NetworkDistanceField(street_network, cache_dir=distance_cache_dir)
+        print(f"  Using street-network distance: {street_network}")
+    modifier = TemplateModifier(
+        rules,
+        random_seed=random_seed,
+        distance_field=distance_field,
+        grid_origin=grid_origin
+    )
     print(f"  Initialized with random seed: {random_seed}")
     
     # 3. modify template
@@ -85,5 +125,16 @@ def _print_preprocessing_statistics(stats: Dict):
     for btype, count in sorted(stats['by_type'].items()):
         pct = (count / total) * 100
         print(f"  {btype:15s}: {count:5d} cells ({pct:5.1f}%)")
+
+    if stats.get('street_templates'):
+        print(f"\nStreet clusters by zone (input -> target / achieved):")
+        for zone, zone_stats in sorted(stats['street_templates'].items()):
+            print(f"  {zone} ({zone_stats['cells']} cells):")
+            clusters = sorted(set(zone_stats['input']) | set(zone_stats['target']) | set(zone_stats['achieved']))
+            for cluster in clusters:
+                input_pct = zone_stats['input'].get(cluster, 0.0) * 100
+                target_pct = zone_stats['target'].get(cluster, 0.0) * 100
+                achieved_pct = zone_stats['achieved'].get(cluster, 0.0) * 100
+                print(f"    cluster {cluster:3d}: {input_pct:5.1f}% -> {target_pct:5.1f}% / {achieved_pct:5.1f}%")
     
     print(f"{'='*60}")
@@ -0,0 +1,175 @@
+import numpy as np
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import RuleSet, StreetTemplateRule
+
+# cluster_street value of cells without a street cluster (nodata): never counted or remapped
+NO_STREET = -1
+
+
+class StreetTemplateModifier:
+    """
+    Remap the cluster_street grid of a CityPy template per zone.
+
+    1. map cluster values to column indices of a lookup table
+    2. build one cumulative cluster -> cluster transition table per zone
+       (from the rule's transitions, or derived from its target shares)
+    3. for all cells at once:
+        a. gather the transition row of (zone, current cluster) by fancy indexing
+        b. draw one uniform number per cell (batched)
+        c. new cluster = first column where the cumulative row exceeds the draw
+    4. report achieved cluster shares against the target shares per zone
+
+    Cells in zones without a street template rule and cells without streets
+    (NO_STREET) keep their value.
+
+    Targets come from the rules only: road_edges_pct.csv holds road-type
+    shares, and there is no road type -> street cluster mapping to turn
+    them into cluster shares (road types are assigned to the generated
+    streets in postprocessing/street_classifier.py).
+    """
+
+    def __init__(self, rules: RuleSet, rng: np.random.Generator):
+        self.rules = rules
+        self.rng = rng
+
+    def modify_street_grid(
+        self,
+        street_grid: np.ndarray,
+        zone_index: np.ndarray
+    ) -> Tuple[np.ndarray, Dict]:
+        """
+        Args:
+            street_grid: cluster_street grid from the template
+            zone_index: Zone index per cell (position in rules.zones, -1 = unknown)
+
+        Returns:
+            (modified street grid, per-zone share statistics)
+        """
+        zones = self.rules.zones
+        n_zones = len(zones)
+
+        # 1. every cluster value that appears in the grid or in a rule (cells without streets stay as they are)
+        cluster_ids = self._collect_cluster_ids(street_grid)
+        has_street = street_grid != NO_STREET
+        cell_cluster = np.searchsorted(cluster_ids, street_grid)
+        n_clusters = len(cluster_ids)
+
+        # zone rows of the lookup table, last row = unknown zone (identity)
+        zone_row = np.where(zone_index < 0, n_zones, zone_index)
+
+        # 2. transition tables (identity where no rule applies)
+        transitions = np.tile(np.eye(n_clusters), (n_zones + 1, 1, 1))
+        has_rule = np.zeros(n_zones + 1, dtype=bool)
+        input_shares = {}
+
+        for i, zone in enumerate(zones):
+            rule = self.rules.get_street_template_rule(zone.name)
+            if rule is None:
+                continue
+            counts = np.bincount(cell_cluster[(zone_row == i) & has_street], minlength=n_clusters)
+            if counts.sum() == 0:
+                continue
+            input_shares[i] = counts / counts.sum()
+            transitions[i] = self._transition_table(rule, cluster_ids, input_shares[i])
+            has_rule[i] = True
+
+        # 3. remap all cells of zones with a rule in one pass
+        result = street_grid.copy()
+        mask = has_rule[zone_row] & has_street
+        if mask.any():
+            rows = zone_row[mask]
+            current = cell_cluster[mask]
+            cumulative = np.cumsum(transitions, axis=2)
+            cumulative[:, :, -1] = 1.0  # guard against rounding in the last column
+            draws = self.rng.random(rows.shape[0])
+
+            # count the cumulative columns below each draw (loop over clusters, not cells)
+            new_cluster = np.zeros(rows.shape[0], dtype=np.int64)
+            for k in range(n_clusters - 1):
+                new_cluster += draws >= cumulative[rows, current, k]
+
+            result[mask] = cluster_ids[new_cluster]
+
+        # 4. achieved vs target shares per zone
+        stats = {}
+        new_cell_cluster = np.searchsorted(cluster_ids, result)
+        for i, zone in enumerate(zones):
+            if not has_rule[i]:
+                continue
+            counts = np.bincount(new_cell_cluster[(zone_row == i) & has_street], minlength=n_clusters)
+            rule = self.rules.get_street_template_rule(zone.name)
+            # without explicit targets the expected shares follow from the transition table
+            if rule.target_shares:
+                target = np.array([rule.target_shares.get(int(c), 0.0) for c in cluster_ids])
+            else:
+                target = input_shares[i] @ transitions[i]
+
+            stats[zone.name] = {
+                'cells': int(counts.sum()),
+                'input': self._shares_dict(cluster_ids, input_shares[i]),
+                'target': self._shares_dict(cluster_ids, target),
+                'achieved': self._shares_dict(cluster_ids, counts / counts.sum())
+            }
+
+        return result, stats
+
+    def _collect_cluster_ids(self, street_grid: np.ndarray) -> np.ndarray:
+        ids = set(np.unique(street_grid).tolist())
+        for rule in self.rules.street_template_rules:
+            rule_ids = set(rule.transitions.keys()) | set(rule.target_shares.keys())
+            for row in rule.transitions.values():
+                rule_ids.update(row.keys())
+            if NO_STREET in rule_ids:
+                raise ValueError(
+                    f"Street template rule for zone '{rule.zone}' uses the no-street value {NO_STREET} as a cluster"
+                )
+            ids.update(rule_ids)
+        ids.discard(NO_STREET)
+        return np.array(sorted(ids), dtype=street_grid.dtype)
+
+    def _transition_table(
+        self,
+        rule: StreetTemplateRule,
+        cluster_ids: np.ndarray,
+        input_shares: np.ndarray
+    ) -> np.ndarray:
+        n_clusters = len(cluster_ids)
+        column = {int(c): k for k, c in enumerate(cluster_ids)}
+
+        # explicit transitions: listed rows replace the identity rows
+        if rule.transitions:
+            table = np.eye(n_clusters)
+            for from_cluster, row in rule.transitions.items():
+                k = column[from_cluster]
+                table[k] = 0.0
+                for to_cluster, p in row.items():
+                    table[k, column[to_cluster]] = p
+                table[k] /= table[k].sum()
+            return table
+
+        # target shares only: move as few cells as possible
+        # (keep min(input, target) of every cluster, spread the surplus over the deficits)
+        target = np.zeros(n_clusters)
+        for cluster, share in rule.target_shares.items():
+            target[column[cluster]] = share
+        target /= target.sum()
+
+        surplus = np.maximum(input_shares - target, 0.0)
+        deficit = np.maximum(target - input_shares, 0.0)
+        table = np.eye(n_clusters)
+        present = input_shares > 0
+        if deficit.sum() > 0:
+            table[present] = np.diag(np.minimum(input_shares, target) / np.where(present, input_shares, 1.0))[present]
+            table[present] += np.outer(surplus[present] / input_shares[present], deficit / deficit.sum())
+        return table
+
+    def _shares_dict(self, cluster_ids: np.ndarray, shares: np.ndarray) -> Dict[int, float]:
+        return {int(c): float(s) for c, s in zip(cluster_ids, shares) if s > 0}
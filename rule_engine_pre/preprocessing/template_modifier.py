@@ -10,6 +10,12 @@ if str(PARENT_DIR) not in sys.path:
 
 from rules.rule_dataclass import RuleSet
 from rules.parser import RuleParser
+from distance.zones import euclidean_distance, assign_zones
+from distance.network_distance import NetworkDistanceField
+from preprocessing.street_template_modifier import StreetTemplateModifier
+from sampling.quota import quota_assign, quota_assign_by_rank
+from sampling.random_field import gaussian_random_field
+from sampling.alias import CategoricalSampler
 
 
 BUILDING_CLASSES = {
@@ -31,23 +37,42 @@ class TemplateModifier:
     Modify CityPy templates based on rules.
     
     1. load template NPZ file from citypy
-    2. for each grid cell:
-        a. calculuate distance to city center
-        b. find which zone the cell sits in
-        c. look up housing rule for the corresponding zone
-        d. look up landuse rule for the corresponding zone
-        e. sample building class based on probabilities
-        f. assign building class to grid cell
-    3. save modified template NPZ file
+    2. calculate distance of every grid cell to the city center
+       (straight-line, or along the street network if a distance field is given)
+    3. find which zone each cell sits in
+    4. for each zone:
+        a. look up housing rule for the corresponding zone
+        b. look up landuse rule for the corresponding zone
+        c. sample building class based on probabilities
+        d. assign building class to the zone's grid cells
+    5. remap street clusters per zone (street_template_rules)
+    6. save modified template NPZ file
         
         """
     
-    def __init__(self, rules: RuleSet, random_seed: int = None):
+    def __init__(
+        self,
+        rules: RuleSet,
+        random_seed: int = None,
+        distance_field: NetworkDistanceField = None,
+        grid_origin: Tuple[float, float] = None
+    ):
         self.rules = rules
         # create independent random generator for reproducibility
         # Note: random_seed should already be handled by caller (main.py)
         self.rng = np.random.default_rng(random_seed)
 
+        # optional street-network distance mode
+        # grid_origin: real-world (x, y) of the center of cell (0, 0), rows run north -> south
+        if distance_field is not None and grid_origin is None:
+            raise ValueError("Network distance mode needs the grid origin to place cells on the street network")
+        self.distance_field = distance_field
+        self.grid_origin = grid_origin
+        # alias tables of the rule distributions, compiled on first use
+        self._samplers = {}
+
+        self.street_modifier = StreetTemplateModifier(rules, self.rng)
+
     def modify_template(
         self,
         input_path: str,
@@ -57,90 +82,14 @@ class TemplateModifier:
 
         # 1. load template
         data = np.load(input_path)
-
-        building_grid = data['building_class'].copy()
-        street_grid = data['cluster_street'].copy()
         city_center_grid = data['city_center']
-        
-        # zone grid for visualization
-        zone_grid = np.full(building_grid.shape, 99, dtype=np.int32)  # 99 = unknown
 
-        rows, cols = building_grid.shape
+        # 2.-5. modify the grids in memory
+        building_grid, street_grid, zone_grid, stats = self.modify_arrays(
+            data['building_class'], data['cluster_street'], city_center_grid, cell_size
+        )
 
-        # 2. find city center position
-        center_row, center_col = np.where(city_center_grid == 1)
-        if len(center_row) > 0:
-            center_x = center_col[0] * cell_size
-            center_y = center_row[0] * cell_size
-        else:
-            # grid center if not marked with 1
-            center_x = cols * cell_size / 2
-            center_y = rows * cell_size / 2
-        
-        # 3. modify each cell
-        stats = {
-            'total_cells': rows * cols,
-            'by_zone': {},
-            'by_type': {},
-            'by_zone_and_type': {}  # Track type distribution per zone
-        }
-
-        for row in range(rows):
-            for col in range(cols):
-                # calculate cell center position
-                ### FIXME: check for better way to do this ‼️
-                x = col * cell_size
-                y = row * cell_size
-
-                # calculate distance to city center
-                distance = np.sqrt((x - center_x)**2 + (y - center_y)**2)
-
-                # find zone
-                zone = self.rules.get_zone(distance)
-                if zone is None:
-                    building_grid[row, col] = BUILDING_CLASSES['none']
-                    zone_grid[row, col] = ZONE_IDS['unknown']
-                    continue
-                
-                # assign zone id to zone grid
-                zone_grid[row, col] = ZONE_IDS.get(zone.name, 99)
-                
-                # get housing rule for this zone
-                housing_rule = self.rules.get_housing_rule(zone.name)
-                if housing_rule is None:
-                    building_grid[row, col] = BUILDING_CLASSES['none']
-                    continue
-                
-                # get landuse rule for this zone
-                landuse_rule = self.rules.get_landuse_rule(zone.name)
-                if landuse_rule is None:
-                    building_grid[row, col] = BUILDING_CLASSES['none']
-                    continue
-                
-                # decide if this cell is residential (probabilistic)
-                is_residential = self.rng.random() < landuse_rule.residential_pct
-                
-                if not is_residential:
-                    # cell is NOT residential (commercial/industrial/etc)
-                    building_grid[row, col] = BUILDING_CLASSES['none']
-                    building_type = 'none'
-                else:
-                    # cell IS residential -> sample housing type
-                    building_type = self._sample_building_type(housing_rule)
-                    building_class_id = BUILDING_CLASSES.get(building_type, 99)
-                    building_grid[row, col] = building_class_id
-                
-                # update stats
-                stats['by_zone'][zone.name] = stats['by_zone'].get(zone.name, 0) + 1
-                stats['by_type'][building_type] = stats['by_type'].get(building_type, 0) + 1
-                
-                # Track type distribution per zone
-                if zone.name not in stats['by_zone_and_type']:
-                    stats['by_zone_and_type'][zone.name] = {}
-                stats['by_zone_and_type'][zone.name][building_type] = \
-                    stats['by_zone_and_type'][zone.name].get(building_type, 0) + 1
-        
-        # 4. save modified template (CityStackGen-compatible: only 3 arrays!)
+        # 6. save modified template (CityStackGen-compatible: only 3 arrays!)
         # create output directory if it doesn't exist
         output_path_obj = Path(output_path)
         output_path_obj.parent.mkdir(parents=True, exist_ok=True)
@@ -152,7 +101,7 @@ class TemplateModifier:
             city_center=city_center_grid)
 
 
-        # 5. save zone grid separately for visualization
+        # 7. save zone grid separately for visualization
         zone_output = output_path.replace('.npz', '_zones.npz')
         np.savez(
             zone_output,
@@ -160,10 +109,176 @@ class TemplateModifier:
             city_center=city_center_grid)
         
         return stats
+
+    # steps 2.-5. on template arrays already in memory (the inputs are not modified)
+    def modify_arrays(
+        self,
+        building_grid: np.ndarray,
+        street_grid: np.ndarray,
+        city_center_grid: np.ndarray,
+        cell_size: float = 100.0,
+        zone_index: np.ndarray = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+        """
+        Modify template arrays without reading or writing files
+
+        Args:
+            building_grid: 'building_class' grid of the template
+            street_grid: 'cluster_street' grid of the template
+            city_center_grid: 'city_center' grid of the template
+            cell_size: Size of grid cells in meters
+            zone_index: Precomputed compute_zone_index result (optional, e.g. reused across rule edits)
+
+        Returns:
+            (building_grid, street_grid, zone_grid, stats)
+        """
+        street_grid = street_grid.copy()
+        building_grid = np.full(building_grid.shape, BUILDING_CLASSES['none'], dtype=building_grid.dtype)
+
+        # zone grid for visualization
+        zone_grid = np.full(building_grid.shape, ZONE_IDS['unknown'], dtype=np.int32)
+
+        rows, cols = building_grid.shape
+
+        # 2./3. distance of every cell to the city center -> zones
+        # (cells outside every zone stay 'unknown' / 'none')
+        if zone_index is None:
+            zone_index = self.compute_zone_index(city_center_grid, cell_size)
+
+        # clustered mode: one random field per decision over the whole grid
+        residential_field, type_field = self._random_fields(building_grid.shape, cell_size)
+
+        # 4. modify cells zone by zone
+        stats = {
+            'total_cells': rows * cols,
+            'by_zone': {},
+            'by_type': {},
+            'by_zone_and_type': {},  # Track type distribution per zone
+            'street_templates': {}   # Target vs achieved street cluster shares per zone
+        }
+
+        for i, zone in enumerate(self.rules.zones):
+            zone_mask = zone_index == i
+            n_cells = int(zone_mask.sum())
+            if n_cells == 0:
+                continue
+
+            # assign zone id to zone grid
+            zone_grid[zone_mask] = ZONE_IDS.get(zone.name, 99)
+
+            # get housing and landuse rules for this zone
+            housing_rule = self.rules.get_housing_rule(zone.name)
+            landuse_rule = self.rules.get_landuse_rule(zone.name)
+            if housing_rule is None or landuse_rule is None:
+                continue
+
+            # decide which cells are residential (probabilistic)
+            # non-residential cells (commercial/industrial/etc) stay 'none'
+            building_types = np.full(n_cells, 'none', dtype='<U16')
+            is_residential = self._sample_residential(
+                landuse_rule, n_cells,
+                field_values=None if residential_field is None else residential_field[zone_mask]
+            )
+
+            # residential cells -> sample housing type
+            building_types[is_residential] = self._sample_building_type(
+                housing_rule, int(is_residential.sum()),
+                field_values=None if type_field is None else type_field[zone_mask][is_residential]
+            )
+            building_grid[zone_mask] = self._to_class_ids(building_types)
+
+            # update stats
+            types, counts = np.unique(building_types, return_counts=True)
+            stats['by_zone'][zone.name] = n_cells
+            stats['by_zone_and_type'][zone.name] = {}
+            for building_type, count in zip(types.tolist(), counts):
+                stats['by_type'][building_type] = stats['by_type'].get(building_type, 0) + int(count)
+                stats['by_zone_and_type'][zone.name][building_type] = int(count)
+        
+        # 5. remap street clusters
+        if self.rules.street_template_rules:
+            street_grid, stats['street_templates'] = self.street_modifier.modify_street_grid(street_grid, zone_index)
+
+        return building_grid, street_grid, zone_grid, stats
+
+    # zone index of every cell (position in rules.zones, -1 = unknown)
+    def compute_zone_index(self, city_center_grid: np.ndarray, cell_size: float) -> np.ndarray:
+        return assign_zones(self.rules.zones, self._calculate_distance_grid(city_center_grid, cell_size))
+
+    # distance of every cell center to the city center cell
+    def _calculate_distance_grid(self, city_center_grid: np.ndarray, cell_size: float) -> np.ndarray:
+        rows, cols = city_center_grid.shape
+        row_idx, col_idx = np.indices((rows, cols))
+
+        # find city center position
+        center_row, center_col = np.where(city_center_grid == 1)
+        if len(center_row) > 0:
+            center_row, center_col = center_row[0], center_col[0]
+        else:
+            # grid center if not marked with 1
+            center_row, center_col = rows / 2, cols / 2
+
+        if self.distance_field is None:
+            return euclidean_distance(
+                col_idx * cell_size,
+                row_idx * cell_size,
+                (center_col * cell_size, center_row * cell_size)
+            )
+
+        # network mode: place cell centers in real-world coordinates
+        origin_x, origin_y = self.grid_origin
+        x = origin_x + col_idx * cell_size
+        y = origin_y - row_idx * cell_size
+        center = (origin_x + center_col * cell_size, origin_y - center_row * cell_size)
+        return self.distance_field.distances(x, y, center)
     
-    def _sample_building_type(self, housing_rule) -> str:
-        # sample bldg type based on rule probabilities
+    # building type names -> building class ids
+    def _to_class_ids(self, building_types: np.ndarray) -> np.ndarray:
+        class_ids = np.full(building_types.shape, BUILDING_CLASSES['none'], dtype=np.int64)
+        for building_type, class_id in BUILDING_CLASSES.items():
+            class_ids[building_types == building_type] = class_id
+        return class_ids
+
+    # Gaussian random fields for clustered sampling (None in the other modes)
+    def _random_fields(self, shape: Tuple[int, int], cell_size: float):
+        if self.rules.sampling.mode != 'clustered':
+            return None, None
+        correlation_cells = self.rules.sampling.correlation_length / cell_size
+        return (
+            gaussian_random_field(shape, correlation_cells, self.rng),
+            gaussian_random_field(shape, correlation_cells, self.rng)
+        )
+
+    # decide which of a zone's cells are residential
+    def _sample_residential(self, landuse_rule, size: int, field_values: np.ndarray = None) -> np.ndarray:
+        probabilities = [landuse_rule.residential_pct, 1.0 - landuse_rule.residential_pct]
+        if field_values is not None:
+            # clustered: lowest field values become residential
+            return quota_assign_by_rank(field_values, probabilities) == 0
+        if self.rules.sampling.mode == 'quota':
+            return quota_assign(size, probabilities, self.rng) == 0
+        return self._categorical_sampler(('residential', 'other'), probabilities).codes(size, self.rng) == 0
+
+    def _sample_building_type(self, housing_rule, size: int = None, field_values: np.ndarray = None) -> np.ndarray:
+        # sample bldg type(s) based on rule probabilities
         types = ['apartment', 'detached', 'terraced']
         probabilities = [housing_rule.apartment_pct, housing_rule.detached_pct, housing_rule.terraced_pct]
-        return self.rng.choice(types, p = probabilities)
+        if field_values is not None:
+            # clustered: threshold the field at the rule's percentage quantiles
+            return np.array(types)[quota_assign_by_rank(field_values, probabilities)]
+        if self.rules.sampling.mode == 'quota' and size is not None:
+            # exact per-zone counts, one permutation per zone
+            return np.array(types)[quota_assign(size, probabilities, self.rng)]
+        sampler = self._categorical_sampler(types, probabilities)
+        if size is None:
+            return sampler.sample(1, self.rng)[0]
+        return sampler.sample(size, self.rng)
+
+    def _categorical_sampler(self, categories, probabilities) -> CategoricalSampler:
+        # alias table of one rule distribution, built once and reused for every zone
+        key = (tuple(categories), tuple(probabilities))
+        sampler = self._samplers.get(key)
+        if sampler is None:
+            sampler = self._samplers[key] = CategoricalSampler(categories, probabilities)
+        return sampler
 
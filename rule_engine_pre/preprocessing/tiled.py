@@ -0,0 +1,359 @@
+import numpy as np
+import shutil
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import RuleSet
+from distance.zones import euclidean_distance, assign_zones
+from preprocessing.template_modifier import BUILDING_CLASSES, ZONE_IDS
+from preprocessing.street_template_modifier import StreetTemplateModifier, NO_STREET
+from sampling.alias import CategoricalSampler
+from sampling.keyed import keyed_uniform, resolve_seed, STREAM_RESIDENTIAL, STREAM_BUILDING_TYPE, STREAM_STREET
+
+"""
+Tiled, multi-core template modification for national-scale grids.
+
+TemplateModifier.modify_template works on the whole grid in one array on
+one core. In tiled mode:
+
+1. the input arrays are streamed once into .npy files and memory-mapped;
+   the output arrays are memory-mapped .npy files as well
+2. the grid is split into tile_size x tile_size tiles, processed by a
+   process pool; every worker maps the arrays and writes its own tile
+3. every random decision of a cell uses a keyed random number of
+   (seed, decision, global cell index), so the result is the same for
+   every tile size and worker count
+4. per-tile statistics (cells per zone and type, street cluster counts)
+   are summed at the end
+
+Street template rules need the per-zone cluster shares of the whole grid
+(transition tables derived from target shares), so they take one extra
+counting pass over the tiles before the remapping pass.
+
+Only the 'random' sampling mode is supported: exact quotas and clustered
+fields are defined per zone over the whole grid, not per cell. Distances
+are straight-line (network distance fields are not shipped to workers).
+"""
+
+DEFAULT_TILE_SIZE = 512
+COPY_BUFFER = 16 * 1024 * 1024
+
+HOUSING_TYPES = ['apartment', 'detached', 'terraced']
+HOUSING_CLASS_IDS = np.array([BUILDING_CLASSES[name] for name in HOUSING_TYPES])
+
+
+def modify_template_tiled(
+    rules: RuleSet,
+    input_path: str,
+    output_path: str,
+    cell_size: float = 100.0,
+    random_seed: int = None,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    workers: int = None,
+    work_dir: str = None
+) -> Dict:
+    """
+    Modify a template tile by tile on a process pool
+
+    Args:
+        rules: RuleSet (sampling mode 'random')
+        input_path: Input NPZ template
+        output_path: Output NPZ template (zones saved next to it, as in modify_template)
+        cell_size: Size of grid cells in meters
+        random_seed: Seed of the keyed random numbers (None = random, one seed for all tiles)
+        tile_size: Tile edge length in cells
+        workers: Worker processes (None = all cores)
+        work_dir: Directory for the memory-mapped .npy arrays (None = temporary directory)
+
+    Returns:
+        Statistics dictionary as returned by TemplateModifier.modify_template (plus 'tiles')
+    """
+    if rules.sampling.mode != 'random':
+        raise ValueError(
+            f"Tiled preprocessing supports sampling mode 'random' only, got '{rules.sampling.mode}' "
+            f"(quota / clustered assignments need whole zones)"
+        )
+    if tile_size < 1:
+        raise ValueError(f"tile_size must be >= 1, got {tile_size}")
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as directory:
+        arrays = _prepare_arrays(input_path, Path(directory))
+        rows, cols = arrays['shape']
+        tiles = [
+            (row, min(row + tile_size, rows), col, min(col + tile_size, cols))
+            for row in range(0, rows, tile_size)
+            for col in range(0, cols, tile_size)
+        ]
+        job = {
+            'arrays': arrays,
+            'rules': rules,
+            'cell_size': cell_size,
+            'seed': resolve_seed(random_seed),
+            'center': _city_center_cell(arrays)
+        }
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # street template rules: cluster counts per zone over the whole grid first
+            if rules.street_template_rules:
+                counts = _merge_counts(pool.map(_count_street_clusters, [(job, tile) for tile in tiles]))
+                job['street'] = _street_tables(rules, counts)
+            tile_stats = list(pool.map(_process_tile, [(job, tile) for tile in tiles]))
+
+        stats = _merge_stats(rules, tile_stats, rows * cols, job.get('street'))
+        stats['tiles'] = len(tiles)
+        _save_outputs(arrays, output_path)
+    return stats
+
+
+### ----- ARRAYS
+
+def _prepare_arrays(input_path: str, directory: Path) -> Dict:
+    # input arrays -> .npy (NPZ members cannot be memory-mapped), outputs -> empty .npy maps;
+    # every NPZ member is a complete .npy file, so its bytes are streamed to disk without
+    # loading the array, and all later reads go through np.load(..., mmap_mode='r')
+    paths = {}
+    with zipfile.ZipFile(input_path) as archive:
+        for name in ('building_class', 'cluster_street', 'city_center'):
+            paths[name] = str(directory / f"{name}.npy")
+            with archive.open(f"{name}.npy") as source, open(paths[name], 'wb') as target:
+                shutil.copyfileobj(source, target, COPY_BUFFER)
+    shape = _open(paths, 'building_class').shape
+    dtypes = {name: _open(paths, name).dtype for name in ('building_class', 'cluster_street')}
+
+    outputs = {
+        'out_building_class': dtypes['building_class'],
+        'out_cluster_street': dtypes['cluster_street'],
+        'out_zone_grid': np.int32
+    }
+    for name, dtype in outputs.items():
+        paths[name] = str(directory / f"{name}.npy")
+        np.lib.format.open_memmap(paths[name], mode='w+', dtype=dtype, shape=shape).flush()
+    paths['shape'] = shape
+    return paths
+
+
+def _open(arrays: Dict, name: str, mode: str = 'r') -> np.ndarray:
+    return np.load(arrays[name], mmap_mode=mode)
+
+
+def _city_center_cell(arrays: Dict) -> Tuple[float, float]:
+    # (row, col) of the first city center cell, grid center if none is marked
+    center = np.flatnonzero(_open(arrays, 'city_center').ravel() == 1)
+    rows, cols = arrays['shape']
+    if len(center) == 0:
+        return rows / 2, cols / 2
+    return divmod(int(center[0]), cols)
+
+
+def _save_outputs(arrays: Dict, output_path: str):
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    city_center = _open(arrays, 'city_center')
+    np.savez(
+        output_path,
+        building_class=_open(arrays, 'out_building_class'),
+        cluster_street=_open(arrays, 'out_cluster_street'),
+        city_center=city_center
+    )
+    np.savez(
+        output_path.replace('.npz', '_zones.npz'),
+        zone_grid=_open(arrays, 'out_zone_grid'),
+        city_center=city_center
+    )
+
+
+### ----- TILE WORKERS
+
+def _tile_zones(job: Dict, tile: Tuple[int, int, int, int]):
+    # zone index and global cell index of every cell of a tile
+    row_start, row_stop, col_start, col_stop = tile
+    row_idx, col_idx = np.mgrid[row_start:row_stop, col_start:col_stop]
+    center_row, center_col = job['center']
+    cell_size = job['cell_size']
+    distances = euclidean_distance(
+        col_idx * cell_size, row_idx * cell_size, (center_col * cell_size, center_row * cell_size)
+    )
+    cell_index = row_idx.astype(np.int64) * job['arrays']['shape'][1] + col_idx
+    return assign_zones(job['rules'].zones, distances), cell_index
+
+
+def _count_street_clusters(args) -> Dict[Tuple[int, int], int]:
+    # {(zone index, cluster): cells} of one tile
+    job, tile = args
+    row_start, row_stop, col_start, col_stop = tile
+    zone_index, _ = _tile_zones(job, tile)
+    streets = np.asarray(_open(job['arrays'], 'cluster_street')[row_start:row_stop, col_start:col_stop])
+    values, cluster = np.unique(streets, return_inverse=True)
+    counts = np.bincount((zone_index.ravel() + 1) * len(values) + cluster.ravel(), minlength=(len(job['rules'].zones) + 1) * len(values))
+    return {
+        (int(key // len(values)) - 1, int(values[key % len(values)])): int(counts[key])
+        for key in np.flatnonzero(counts)
+    }
+
+
+def _process_tile(args) -> Dict:
+    job, tile = args
+    row_start, row_stop, col_start, col_stop = tile
+    rules, arrays, seed = job['rules'], job['arrays'], job['seed']
+    zone_index, cell_index = _tile_zones(job, tile)
+
+    building_grid = np.full(zone_index.shape, BUILDING_CLASSES['none'])
+    zone_grid = np.full(zone_index.shape, ZONE_IDS['unknown'], dtype=np.int32)
+    stats = {'by_zone': {}, 'by_zone_and_type': {}}
+
+    for i, zone in enumerate(rules.zones):
+        zone_mask = zone_index == i
+        if not zone_mask.any():
+            continue
+        zone_grid[zone_mask] = ZONE_IDS.get(zone.name, 99)
+
+        housing_rule = rules.get_housing_rule(zone.name)
+        landuse_rule = rules.get_landuse_rule(zone.name)
+        if housing_rule is None or landuse_rule is None:
+            continue
+
+        # keyed draws: the same cell gets the same numbers in every tiling
+        cells = cell_index[zone_mask]
+        is_residential = keyed_uniform(seed, STREAM_RESIDENTIAL, cells) < landuse_rule.residential_pct
+        codes = CategoricalSampler(
+            HOUSING_TYPES, [housing_rule.apartment_pct, housing_rule.detached_pct, housing_rule.terraced_pct]
+        ).table.codes_from_uniform(keyed_uniform(seed, STREAM_BUILDING_TYPE, cells[is_residential]))
+
+        class_ids = np.full(len(cells), BUILDING_CLASSES['none'])
+        class_ids[is_residential] = HOUSING_CLASS_IDS[codes]
+        building_grid[zone_mask] = class_ids
+
+        type_counts = dict(zip(HOUSING_TYPES, np.bincount(codes, minlength=len(HOUSING_TYPES)).tolist()))
+        type_counts['none'] = len(cells) - len(codes)
+        stats['by_zone'][zone.name] = len(cells)
+        stats['by_zone_and_type'][zone.name] = {name: count for name, count in type_counts.items() if count > 0}
+
+    streets = np.asarray(_open(arrays, 'cluster_street')[row_start:row_stop, col_start:col_stop])
+    if job.get('street') is not None:
+        streets, stats['street_counts'] = _remap_streets(job, streets, zone_index, cell_index)
+
+    for name, values in (('out_building_class', building_grid), ('out_zone_grid', zone_grid), ('out_cluster_street', streets)):
+        output = _open(arrays, name, 'r+')
+        output[row_start:row_stop, col_start:col_stop] = values
+        output.flush()
+        del output
+    return stats
+
+
+### ----- STREET TEMPLATES
+
+def _street_tables(rules: RuleSet, counts: Dict[Tuple[int, int], int]) -> Dict:
+    # global cluster ids, input shares and cumulative transition tables per zone
+    # (same tables as StreetTemplateModifier builds for the whole grid)
+    modifier = StreetTemplateModifier(rules, rng=None)
+    cluster_ids = modifier._collect_cluster_ids(np.array(sorted({cluster for _, cluster in counts}), dtype=np.int64))
+    n_zones, n_clusters = len(rules.zones), len(cluster_ids)
+    column = {int(c): k for k, c in enumerate(cluster_ids)}
+
+    transitions = np.tile(np.eye(n_clusters), (n_zones + 1, 1, 1))
+    has_rule = np.zeros(n_zones + 1, dtype=bool)
+    input_shares = {}
+    for i, zone in enumerate(rules.zones):
+        rule = rules.get_street_template_rule(zone.name)
+        zone_counts = np.zeros(n_clusters)
+        for (zone_position, cluster), count in counts.items():
+            if zone_position == i and cluster != NO_STREET:
+                zone_counts[column[cluster]] += count
+        if rule is None or zone_counts.sum() == 0:
+            continue
+        input_shares[i] = zone_counts / zone_counts.sum()
+        transitions[i] = modifier._transition_table(rule, cluster_ids, input_shares[i])
+        has_rule[i] = True
+
+    cumulative = np.cumsum(transitions, axis=2)
+    cumulative[:, :, -1] = 1.0  # guard against rounding in the last column
+    return {
+        'cluster_ids': cluster_ids,
+        'transitions': transitions,
+        'cumulative': cumulative,
+        'has_rule': has_rule,
+        'input_shares': input_shares
+    }
+
+
+def _remap_streets(job: Dict, streets: np.ndarray, zone_index: np.ndarray, cell_index: np.ndarray):
+    street = job['street']
+    cluster_ids = street['cluster_ids']
+    n_zones = len(job['rules'].zones)
+    zone_row = np.where(zone_index < 0, n_zones, zone_index)
+
+    result = streets.copy()
+    has_street = streets != NO_STREET
+    mask = street['has_rule'][zone_row] & has_street
+    if mask.any():
+        rows = zone_row[mask]
+        current = np.searchsorted(cluster_ids, streets[mask])
+        draws = keyed_uniform(job['seed'], STREAM_STREET, cell_index[mask])
+        new_cluster = np.zeros(len(rows), dtype=np.int64)
+        for k in range(len(cluster_ids) - 1):
+            new_cluster += draws >= street['cumulative'][rows, current, k]
+        result[mask] = cluster_ids[new_cluster]
+
+    # achieved cluster counts per zone with a rule
+    new_cell_cluster = np.searchsorted(cluster_ids, result)
+    counts = {}
+    for i in np.flatnonzero(street['has_rule'][:n_zones]):
+        counts[int(i)] = np.bincount(new_cell_cluster[(zone_row == i) & has_street], minlength=len(cluster_ids))
+    return result, counts
+
+
+### ----- STATISTICS
+
+def _merge_counts(parts) -> Dict:
+    merged = {}
+    for part in parts:
+        for key, count in part.items():
+            merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+def _merge_stats(rules: RuleSet, tile_stats: List[Dict], total_cells: int, street: Dict = None) -> Dict:
+    stats = {
+        'total_cells': total_cells,
+        'by_zone': {},
+        'by_type': {},
+        'by_zone_and_type': {},
+        'street_templates': {}
+    }
+    street_counts = {}
+    for part in tile_stats:
+        for zone_name, cells in part['by_zone'].items():
+            stats['by_zone'][zone_name] = stats['by_zone'].get(zone_name, 0) + cells
+        for zone_name, types in part['by_zone_and_type'].items():
+            zone_types = stats['by_zone_and_type'].setdefault(zone_name, {})
+            for building_type, count in types.items():
+                zone_types[building_type] = zone_types.get(building_type, 0) + count
+                stats['by_type'][building_type] = stats['by_type'].get(building_type, 0) + count
+        for zone_position, counts in part.get('street_counts', {}).items():
+            street_counts[zone_position] = street_counts.get(zone_position, 0) + counts
+
+    if street is not None:
+        cluster_ids = street['cluster_ids']
+        shares = StreetTemplateModifier(rules, rng=None)._shares_dict
+        for i, counts in sorted(street_counts.items()):
+            zone = rules.zones[i]
+            rule = rules.get_street_template_rule(zone.name)
+            if rule.target_shares:
+                target = np.array([rule.target_shares.get(int(c), 0.0) for c in cluster_ids])
+            else:
+                target = street['input_shares'][i] @ street['transitions'][i]
+            stats['street_templates'][zone.name] = {
+                'cells': int(counts.sum()),
+                'input': shares(cluster_ids, street['input_shares'][i]),
+                'target': shares(cluster_ids, target),
+                'achieved': shares(cluster_ids, counts / counts.sum())
+            }
+    return stats
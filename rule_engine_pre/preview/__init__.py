@@ -0,0 +1,4 @@
+from .png import write_png
+from .render import preview_buildings, preview_grid
+
+__all__ = ['write_png', 'preview_buildings', 'preview_grid']
@@ -0,0 +1,61 @@
+import numpy as np
+import struct
+import zlib
+from typing import Sequence, Tuple
+
+"""
+Minimal PNG writer (no imaging library needed).
+
+Writes 8-bit palette images (one byte per pixel, color type 3) or RGB
+images (color type 2). Rows are stored without filtering (filter type 0),
+which compresses well enough for flat categorical maps, and the whole
+image is compressed in one zlib call.
+"""
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# fast zlib level: categorical previews are mostly runs of the same byte
+COMPRESSION_LEVEL = 3
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    # length, type, data, CRC of type + data
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def write_png(path: str, image: np.ndarray, palette: Sequence[Tuple[int, int, int]] = None):
+    """
+    Write a PNG file
+
+    Args:
+        path: Output file
+        image: (height, width) uint8 palette indices, or (height, width, 3) uint8 RGB
+        palette: RGB colors of the palette indices (required for 2D images, at most 256)
+    """
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    if image.ndim == 2:
+        if palette is None or not 0 < len(palette) <= 256:
+            raise ValueError("Palette images need a palette of 1 to 256 colors")
+        if image.size and int(image.max()) >= len(palette):
+            raise ValueError(f"Pixel index {int(image.max())} is outside the palette of {len(palette)} colors")
+        color_type = 3
+    elif image.ndim == 3 and image.shape[2] == 3:
+        color_type = 2
+    else:
+        raise ValueError(f"Expected a (height, width) or (height, width, 3) image, got shape {image.shape}")
+
+    height, width = image.shape[:2]
+    # every row starts with its filter type byte (0 = none)
+    rows = image.reshape(height, -1)
+    raw = np.zeros((height, rows.shape[1] + 1), dtype=np.uint8)
+    raw[:, 1:] = rows
+
+    chunks = [_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))]
+    if color_type == 3:
+        chunks.append(_chunk(b'PLTE', np.asarray(palette, dtype=np.uint8).reshape(-1).tobytes()))
+    chunks.append(_chunk(b'IDAT', zlib.compress(raw.tobytes(), COMPRESSION_LEVEL)))
+    chunks.append(_chunk(b'IEND', b''))
+
+    with open(path, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        for chunk in chunks:
+            f.write(chunk)
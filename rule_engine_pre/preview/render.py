@@ -0,0 +1,344 @@
+import argparse
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from preprocessing.template_modifier import BUILDING_CLASSES, ZONE_IDS
+from preview.png import write_png
+
+"""
+Raster previews of classified outputs, written as PNG without a browser.
+
+Buildings are drawn as centroids (one pixel, or a point_size square, per
+building) or as footprints (every pixel whose center lies inside the
+polygon, tested with one vectorized shapely.contains_xy call per batch),
+coloured by building_type, household_type or zone. Template grids
+(building_class, zone_grid of *_zones.npz, cluster_street) are drawn one
+cell = scale x scale pixels.
+
+Colors come from fixed palettes, so previews of different runs can be
+compared side by side. Pixel index 0 is the background; values outside a
+palette get OTHER_COLOR.
+
+    python preview/render.py buildings outputs/post/buildings_classified.csv buildings.png --color-by zone
+    python preview/render.py grid outputs/pre/Groningen_NL_modified_zones.npz zones.png --scale 4
+"""
+
+BACKGROUND_COLOR = (255, 255, 255)
+OTHER_COLOR = (99, 99, 99)
+CENTER_COLOR = (0, 0, 0)
+
+PALETTES = {
+    'building_type': {
+        'apartment': (228, 26, 28),
+        'terraced': (255, 127, 0),
+        'detached': (55, 126, 184),
+        'none': (204, 204, 204)
+    },
+    'household_type': {
+        'single_person': (102, 194, 165),
+        'single_parent': (252, 141, 98),
+        'two_parent': (141, 160, 203),
+        'none': (204, 204, 204)
+    }
+}
+# zones from the city center outwards (ZONE_IDS order, other zone names after them)
+ZONE_COLORS = [
+    (215, 48, 39), (252, 141, 89), (254, 224, 144), (171, 217, 233),
+    (116, 173, 209), (69, 117, 180), (49, 54, 149), (120, 120, 200)
+]
+# street cluster ids (cycled)
+CLUSTER_COLORS = [
+    (27, 158, 119), (217, 95, 2), (117, 112, 179), (231, 41, 138),
+    (102, 166, 30), (230, 171, 2), (166, 118, 29), (102, 102, 102)
+]
+COLOR_FIELDS = ('building_type', 'household_type', 'zone')
+# largest preview in pixels
+MAX_PIXELS = 200_000_000
+# candidate pixels tested at once in footprint mode
+FOOTPRINT_BATCH = 5_000_000
+
+
+def zone_palette(zone_names: Sequence[str]) -> Dict[str, Tuple[int, int, int]]:
+    # known zones keep their ZONE_IDS color, other names follow in sorted order
+    names = [name for name in ZONE_IDS if name in zone_names and name != 'unknown']
+    names += sorted(name for name in set(zone_names) - set(ZONE_IDS) if name != 'unknown')
+    return {name: ZONE_COLORS[i % len(ZONE_COLORS)] for i, name in enumerate(names)}
+
+
+def palette_codes(values: np.ndarray, colors: Dict[str, Tuple[int, int, int]]) -> Tuple[np.ndarray, List]:
+    """
+    Palette indices of categorical values
+
+    Returns:
+        (uint8 index per value, palette: background, the colors in order, OTHER_COLOR)
+    """
+    values = np.asarray(values, dtype=object)
+    palette = [BACKGROUND_COLOR] + list(colors.values()) + [OTHER_COLOR]
+    codes = np.full(len(values), len(palette) - 1, dtype=np.uint8)
+    for i, name in enumerate(colors, start=1):
+        codes[values == name] = i
+    return codes, palette
+
+
+def raster_shape(bounds: Tuple[float, float, float, float], resolution: float) -> Tuple[int, int]:
+    minx, miny, maxx, maxy = bounds
+    height, width = int(np.ceil((maxy - miny) / resolution)) + 1, int(np.ceil((maxx - minx) / resolution)) + 1
+    if height * width > MAX_PIXELS:
+        raise ValueError(
+            f"Preview of {width} x {height} pixels is too large at {resolution} m/pixel, use a coarser resolution"
+        )
+    return height, width
+
+
+def render_points(
+    x: np.ndarray,
+    y: np.ndarray,
+    codes: np.ndarray,
+    bounds: Tuple[float, float, float, float],
+    resolution: float,
+    point_size: int = 1
+) -> np.ndarray:
+    # one point_size x point_size square per point, rows run north -> south
+    minx, miny, maxx, maxy = bounds
+    image = np.zeros(raster_shape(bounds, resolution), dtype=np.uint8)
+    height, width = image.shape
+    col = np.floor((np.asarray(x) - minx) / resolution).astype(np.int64)
+    row = np.floor((maxy - np.asarray(y)) / resolution).astype(np.int64)
+    inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    col, row, codes = col[inside], row[inside], codes[inside]
+    offset = point_size // 2
+    for dr in range(point_size):
+        for dc in range(point_size):
+            image[np.clip(row + dr - offset, 0, height - 1), np.clip(col + dc - offset, 0, width - 1)] = codes
+    return image
+
+
+def render_footprints(
+    geometries: np.ndarray,
+    codes: np.ndarray,
+    bounds: Tuple[float, float, float, float],
+    resolution: float
+) -> np.ndarray:
+    """
+    Rasterize polygons: a pixel gets a polygon's code when its center is inside it
+
+    Buildings smaller than a pixel still get the pixel of a point on their surface
+    (not the centroid, which lies outside e.g. perimeter blocks).
+    """
+    import shapely
+
+    minx, miny, maxx, maxy = bounds
+    anchors = shapely.point_on_surface(geometries)
+    image = render_points(shapely.get_x(anchors), shapely.get_y(anchors), codes, bounds, resolution)
+    height, width = image.shape
+
+    # candidate pixels: the bounding box of every polygon (clipped to the image)
+    box = shapely.bounds(geometries)
+    col0 = np.clip(np.floor((box[:, 0] - minx) / resolution), 0, width - 1).astype(np.int64)
+    col1 = np.clip(np.floor((box[:, 2] - minx) / resolution), 0, width - 1).astype(np.int64)
+    row0 = np.clip(np.floor((maxy - box[:, 3]) / resolution), 0, height - 1).astype(np.int64)
+    row1 = np.clip(np.floor((maxy - box[:, 1]) / resolution), 0, height - 1).astype(np.int64)
+    box_width = col1 - col0 + 1
+    pixels = box_width * (row1 - row0 + 1)
+
+    shapely.prepare(geometries)
+    # batches of whole buildings with about FOOTPRINT_BATCH candidate pixels each
+    ends = np.cumsum(pixels)
+    starts = np.searchsorted(ends, np.arange(0, ends[-1] if len(ends) else 0, FOOTPRINT_BATCH), side='right')
+    for first, last in zip(starts, np.append(starts[1:], len(geometries))):
+        if first == last:
+            continue
+        counts = pixels[first:last]
+        building = np.repeat(np.arange(first, last), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        col = col0[building] + k % box_width[building]
+        row = row0[building] + k // box_width[building]
+        inside = shapely.contains_xy(
+            geometries[building], minx + (col + 0.5) * resolution, maxy - (row + 0.5) * resolution
+        )
+        image[row[inside], col[inside]] = codes[building[inside]]
+    shapely.destroy_prepared(geometries)
+    return image
+
+
+def render_grid(grid: np.ndarray, codes_by_value: Dict[int, int], scale: int = 1, other: int = 0) -> np.ndarray:
+    # template grid -> palette indices, one cell = scale x scale pixels
+    values, inverse = np.unique(grid, return_inverse=True)
+    lookup = np.array([codes_by_value.get(int(value), other) for value in values], dtype=np.uint8)
+    image = lookup[inverse.reshape(grid.shape)]
+    if scale > 1:
+        image = np.repeat(np.repeat(image, scale, axis=0), scale, axis=1)
+    return image
+
+
+def load_classified(path: str, color_by: str, footprints: bool = False) -> Dict:
+    """
+    Coordinates (or polygons) and one attribute of a classified buildings file
+
+    Args:
+        path: Postprocessing output (CSV, GeoJSON, GeoPackage, ...)
+        color_by: Attribute column
+        footprints: Read the polygons (not possible from CSV)
+
+    Returns:
+        Dictionary with 'values' and 'x', 'y' (centroids) or 'geometry' (projected polygons)
+    """
+    if Path(path).suffix.lower() == '.csv':
+        if footprints:
+            raise ValueError("CSV outputs have no footprints, use the GeoJSON output or centroid mode")
+        frame = pd.read_csv(path, usecols=['x', 'y', color_by])
+        return {'x': frame['x'].to_numpy(), 'y': frame['y'].to_numpy(), 'values': frame[color_by].to_numpy(dtype=object)}
+
+    import pyogrio
+    import pyogrio.raw
+    import shapely
+    from postprocessing.geometry_cache import prepare_geometry, to_projected
+
+    if footprints:
+        meta, _, wkb, fields = pyogrio.raw.read(path, columns=[color_by])
+        geometries, _ = to_projected(shapely.from_wkb(wkb), meta['crs'])
+        return {'geometry': geometries, 'values': np.asarray(fields[0], dtype=object)}
+
+    # classified outputs carry their centroids as x / y fields, otherwise use the geometry cache
+    columns = pyogrio.read_info(path)['fields'].tolist()
+    if 'x' in columns and 'y' in columns:
+        frame = pyogrio.read_dataframe(path, columns=['x', 'y', color_by], read_geometry=False)
+        return {'x': frame['x'].to_numpy(), 'y': frame['y'].to_numpy(), 'values': frame[color_by].to_numpy(dtype=object)}
+    attributes = prepare_geometry(path)
+    frame = pyogrio.read_dataframe(path, columns=[color_by], read_geometry=False)
+    return {'x': attributes['x'], 'y': attributes['y'], 'values': frame[color_by].to_numpy(dtype=object)}
+
+
+def preview_buildings(
+    input_path: str,
+    output_png: str,
+    color_by: str = 'building_type',
+    resolution: float = 5.0,
+    footprints: bool = False,
+    point_size: int = 1,
+    bbox: Tuple[float, float, float, float] = None
+) -> Dict[str, Tuple[int, int, int]]:
+    """
+    PNG preview of classified buildings
+
+    Args:
+        input_path: Postprocessing output (CSV or GeoJSON / GeoPackage)
+        output_png: Output PNG path
+        color_by: 'building_type', 'household_type' or 'zone'
+        resolution: Meters per pixel
+        footprints: Rasterize polygons instead of drawing centroids (slower, needs geometry)
+        point_size: Square size in pixels of a centroid (centroid mode)
+        bbox: (minx, miny, maxx, maxy) extent to draw (default: all buildings)
+
+    Returns:
+        Legend: value -> RGB color
+    """
+    if color_by not in COLOR_FIELDS:
+        raise ValueError(f"color_by must be one of {COLOR_FIELDS}, got '{color_by}'")
+    data = load_classified(input_path, color_by, footprints)
+    values = data['values']
+    colors = zone_palette(pd.unique(values).tolist()) if color_by == 'zone' else PALETTES[color_by]
+    codes, palette = palette_codes(values, colors)
+
+    if footprints:
+        import shapely
+        if bbox is None:
+            bbox = tuple(shapely.total_bounds(data['geometry']))
+        image = render_footprints(data['geometry'], codes, bbox, resolution)
+    else:
+        if bbox is None:
+            bbox = (data['x'].min(), data['y'].min(), data['x'].max(), data['y'].max())
+        image = render_points(data['x'], data['y'], codes, bbox, resolution, point_size)
+
+    Path(output_png).parent.mkdir(parents=True, exist_ok=True)
+    write_png(output_png, image, palette)
+    return colors
+
+
+def preview_grid(input_npz: str, output_png: str, layer: str = None, scale: int = 4) -> Dict:
+    """
+    PNG preview of a template grid
+
+    Args:
+        input_npz: Modified template NPZ or *_zones.npz
+        output_png: Output PNG path
+        layer: 'building_class', 'zone_grid' or 'cluster_street' (default: zone_grid if present, else building_class)
+        scale: Pixels per cell edge
+
+    Returns:
+        Legend: value -> RGB color
+    """
+    with np.load(input_npz) as data:
+        if layer is None:
+            layer = 'zone_grid' if 'zone_grid' in data.files else 'building_class'
+        if layer not in data.files:
+            raise ValueError(f"{input_npz} has no '{layer}' array (arrays: {data.files})")
+        grid = data[layer]
+        center = data['city_center'] if 'city_center' in data.files else None
+
+    if layer == 'zone_grid':
+        names = [name for name in ZONE_IDS if name != 'unknown']
+        colors = {ZONE_IDS[name]: ZONE_COLORS[i % len(ZONE_COLORS)] for i, name in enumerate(names)}
+        legend = {name: colors[ZONE_IDS[name]] for name in names}
+    elif layer == 'building_class':
+        colors = {class_id: PALETTES['building_type'][name] for name, class_id in BUILDING_CLASSES.items()}
+        legend = {name: colors[class_id] for name, class_id in BUILDING_CLASSES.items()}
+    else:
+        # cluster ids; -1 (no street) stays background
+        colors = {int(value): CLUSTER_COLORS[int(value) % len(CLUSTER_COLORS)] for value in np.unique(grid) if value >= 0}
+        legend = {f"cluster {value}": color for value, color in colors.items()}
+
+    palette = [BACKGROUND_COLOR] + list(colors.values()) + [OTHER_COLOR, CENTER_COLOR]
+    codes_by_value = {value: i for i, value in enumerate(colors, start=1)}
+    other = len(palette) - 2 if layer != 'cluster_street' else 0
+    image = render_grid(grid, codes_by_value, scale, other)
+    if center is not None:
+        # city center cell in black
+        image[render_grid(center == 1, {1: 1}, scale) == 1] = len(palette) - 1
+
+    Path(output_png).parent.mkdir(parents=True, exist_ok=True)
+    write_png(output_png, image, palette)
+    return legend
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render PNG previews of classified buildings and template grids")
+    commands = parser.add_subparsers(dest='command', required=True)
+    buildings = commands.add_parser('buildings', help="classified buildings (CSV / GeoJSON)")
+    buildings.add_argument('input')
+    buildings.add_argument('output')
+    buildings.add_argument('--color-by', default='building_type', choices=COLOR_FIELDS)
+    buildings.add_argument('--resolution', type=float, default=5.0, help="meters per pixel")
+    buildings.add_argument('--footprints', action='store_true', help="rasterize polygons instead of centroids")
+    buildings.add_argument('--point-size', type=int, default=1)
+    buildings.add_argument('--bbox', type=float, nargs=4, default=None, metavar=('MINX', 'MINY', 'MAXX', 'MAXY'))
+    grid = commands.add_parser('grid', help="template NPZ / *_zones.npz")
+    grid.add_argument('input')
+    grid.add_argument('output')
+    grid.add_argument('--layer', default=None, choices=('building_class', 'zone_grid', 'cluster_street'))
+    grid.add_argument('--scale', type=int, default=4, help="pixels per cell edge")
+    args = parser.parse_args(argv)
+
+    if args.command == 'buildings':
+        legend = preview_buildings(
+            args.input, args.output, color_by=args.color_by, resolution=args.resolution,
+            footprints=args.footprints, point_size=args.point_size, bbox=tuple(args.bbox) if args.bbox else None
+        )
+    else:
+        legend = preview_grid(args.input, args.output, layer=args.layer, scale=args.scale)
+
+    print(f"Saved preview: {args.output}")
+    for name, color in legend.items():
+        print(f"  {name:15s}: #{color[0]:02x}{color[1]:02x}{color[2]:02x}")
+
+
+if __name__ == "__main__":
+    main()
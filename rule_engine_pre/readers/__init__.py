@@ -0,0 +1,3 @@
+from .citypy import list_layers, read_layer, read_buildings, read_grid_building_class, zone_mask
+
+__all__ = ['list_layers', 'read_layer', 'read_buildings', 'read_grid_building_class', 'zone_mask']
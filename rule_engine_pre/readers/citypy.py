@@ -0,0 +1,166 @@
+import geopandas as gpd
+import pandas as pd
+import pyogrio
+import shapely
+import sys
+from pathlib import Path
+from typing import Dict, Sequence, Tuple, Union
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import Zone
+
+"""
+Reader for CityPy GeoPackages (e.g. data/citypy/groningen_NL.gpkg).
+
+The CityPy output holds wide layers (the `grid` layer has one column per
+aggregated attribute), but we only use a handful of columns. Instead of
+gpd.read_file on the whole file / layer and dropping columns afterwards,
+everything is pushed down to GDAL (pyogrio):
+
+- columns:  only the requested fields are decoded
+- bbox / zone (mask polygon) / where:  features are filtered by the driver
+  (GeoPackage spatial index), the others are never decoded
+- read_geometry=False for attribute-only reads
+
+Values are normalized after reading: 'UNKNOWN' becomes missing (NaN), and
+the building class '99' becomes 'other', as in notebooks/citypy.ipynb.
+
+    layers = list_layers('groningen_NL.gpkg')
+    grid = read_grid_building_class('groningen_NL.gpkg', bbox=(230000, 578000, 236000, 586000))
+    buildings = read_buildings('groningen_NL.gpkg', zone=zone_mask((233000, 582000), rules.zones[0]))
+"""
+
+# columns kept from the buildings layer
+BUILDING_COLUMNS = ('subtype', 'class', 'enclosure_id', 'land_use_category', 'building_class')
+# building class of the grid layer (mode of the most intersecting buildings, 3x3 kernel)
+GRID_BUILDING_CLASS_COLUMN = 'buildings::building_class::most_intersecting::mode_kernel3'
+
+# value normalization: missing markers -> NaN, building class codes -> names
+MISSING_VALUES = ('UNKNOWN',)
+BUILDING_CLASS_VALUES = {'99': 'other'}
+
+
+def list_layers(path: str) -> pd.DataFrame:
+    """
+    Layers of a GeoPackage
+
+    Returns:
+        DataFrame with one row per layer: 'layer', 'geometry_type', 'features', 'fields', 'crs'
+    """
+    rows = []
+    for name, geometry_type in pyogrio.list_layers(path):
+        info = pyogrio.read_info(path, layer=name)
+        rows.append({
+            'layer': name,
+            'geometry_type': geometry_type,
+            'features': int(info['features']),
+            'fields': len(info['fields']),
+            'crs': info['crs']
+        })
+    return pd.DataFrame(rows, columns=['layer', 'geometry_type', 'features', 'fields', 'crs'])
+
+
+def layer_columns(path: str, layer: str) -> list:
+    # field names of a layer (no data read)
+    return pyogrio.read_info(path, layer=layer)['fields'].tolist()
+
+
+def zone_mask(city_center: Tuple[float, float], zone: Union[Zone, Tuple[float, float]], resolution: int = 64):
+    # ring polygon of a zone around the city center (Zone or (min_distance, max_distance) in meters)
+    min_distance, max_distance = (zone.min_distance, zone.max_distance) if isinstance(zone, Zone) else zone
+    center = shapely.Point(city_center)
+    outer = shapely.buffer(center, max_distance, quad_segs=resolution)
+    return shapely.difference(outer, shapely.buffer(center, min_distance, quad_segs=resolution)) if min_distance > 0 else outer
+
+
+def read_layer(
+    path: str,
+    layer: str,
+    columns: Sequence[str] = None,
+    bbox: Tuple[float, float, float, float] = None,
+    zone=None,
+    where: str = None,
+    read_geometry: bool = True,
+    rename: Dict[str, str] = None,
+    normalize: bool = True,
+    drop_empty: bool = False
+) -> Union[gpd.GeoDataFrame, pd.DataFrame]:
+    """
+    Read one layer with column projection and driver-level filters
+
+    Args:
+        path: CityPy GeoPackage
+        layer: Layer name
+        columns: Fields to read (None = all)
+        bbox: (minx, miny, maxx, maxy) in the layer CRS
+        zone: Polygon (e.g. zone_mask(...)) in the layer CRS: only intersecting features are read
+        where: SQL WHERE clause on the layer's fields (e.g. "class = 'house'")
+        read_geometry: Read geometries (False: attribute DataFrame only)
+        rename: Column renames applied after reading
+        normalize: 'UNKNOWN' -> NaN, building class '99' -> 'other'
+        drop_empty: Drop columns that are missing in every feature read
+
+    Returns:
+        GeoDataFrame (DataFrame when read_geometry is False)
+    """
+    if bbox is not None and zone is not None:
+        raise ValueError("Give either bbox or zone, not both")
+    if columns is not None:
+        columns = list(columns)
+        available = layer_columns(path, layer)
+        missing = [column for column in columns if column not in available]
+        if missing:
+            raise ValueError(f"Layer '{layer}' has no columns {missing} (available: {len(available)} columns)")
+
+    frame = pyogrio.read_dataframe(
+        path, layer=layer, columns=columns, bbox=bbox, mask=zone, where=where, read_geometry=read_geometry
+    )
+    if normalize:
+        normalize_values(frame)
+    if drop_empty:
+        empty = [column for column in frame.columns if column != 'geometry' and frame[column].isna().all()]
+        frame = frame.drop(columns=empty)
+    if rename:
+        frame = frame.rename(columns=rename)
+    return frame
+
+
+def normalize_values(frame: pd.DataFrame) -> pd.DataFrame:
+    # in place: missing markers -> NaN in text columns, '99' -> 'other' in building class columns
+    for column in frame.columns:
+        if column == 'geometry' or not pd.api.types.is_string_dtype(frame[column]):
+            continue
+        values = frame[column].mask(frame[column].isin(MISSING_VALUES))
+        if 'building_class' in column.split('::'):
+            values = values.replace(BUILDING_CLASS_VALUES)
+        frame[column] = values
+    return frame
+
+
+def read_buildings(
+    path: str,
+    columns: Sequence[str] = BUILDING_COLUMNS,
+    bbox: Tuple[float, float, float, float] = None,
+    zone=None,
+    where: str = None,
+    read_geometry: bool = True
+) -> gpd.GeoDataFrame:
+    # buildings layer with the columns used by the rule engine
+    return read_layer(path, 'buildings', columns=columns, bbox=bbox, zone=zone, where=where, read_geometry=read_geometry)
+
+
+def read_grid_building_class(
+    path: str,
+    bbox: Tuple[float, float, float, float] = None,
+    zone=None,
+    read_geometry: bool = True
+) -> gpd.GeoDataFrame:
+    # grid cells with their building class only (column renamed to 'building_class')
+    return read_layer(
+        path, 'grid', columns=[GRID_BUILDING_CLASS_COLUMN], bbox=bbox, zone=zone,
+        read_geometry=read_geometry, rename={GRID_BUILDING_CLASS_COLUMN: 'building_class'}
+    )
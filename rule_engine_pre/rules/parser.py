@@ -1,6 +1,9 @@
+import copy
+import hashlib
 import yaml
+from collections import OrderedDict
 from pathlib import Path
-from typing import Union
+from typing import Dict, List, Union
 
 from .rule_dataclass import (
     RuleSet,
@@ -9,95 +12,340 @@ from .rule_dataclass import (
     LanduseRule,
     HouseholdRule,
     ResidentsRule,
-    UnitSizeRule
+    UnitSizeRule,
+    StreetTemplateRule,
+    SamplingConfig
 )
 
+# libyaml C loader when available (much faster), pure-Python loader otherwise
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# rule files kept in each cache (least recently used entries are dropped first)
+MAX_CACHED_FILES = 64
+
+# rule lists whose entries are merged by key when a scenario `extends:` a base file
+MERGE_KEYS = {
+    'zones': 'name',
+    'housing_rules': 'zone',
+    'landuse_rules': 'zone',
+    'household_rules': 'zone',
+    'residents_rules': 'zone',
+    'unit_size_rules': 'zone',
+    'street_template_rules': 'zone'
+}
+
+
+class RuleValidationError(ValueError):
+    # invalid rule file content, message starts with the file and YAML path
+    def __init__(self, source: str, yaml_path: str, message: str):
+        self.source = source
+        self.yaml_path = yaml_path
+        super().__init__(f"{source}: {yaml_path}: {message}")
+
 
 # parse for YAML files into RuleSet objects
 class RuleParser:
+    # compiled RuleSets and parsed YAML documents, shared by all parsers (LRU, MAX_CACHED_FILES each)
+    # path -> (files, sha1s, RuleSet) / (stat key, sha1, parsed YAML)
+    _ruleset_cache: Dict[Path, tuple] = OrderedDict()
+    _document_cache: Dict[Path, tuple] = OrderedDict()
+
     # load rules from YAML file
+    # scenario files can `extends: base.yaml` and override single keys
     def load_from_yaml(self, filepath: Union[str, Path]) -> RuleSet:
-        filepath = Path(filepath)
+        filepath = Path(filepath).resolve()
         if not filepath.exists():
             raise FileNotFoundError(f"Rule file not found: {filepath}")
-        
-        with open(filepath, 'r') as f:
-            data = yaml.safe_load(f)
-        
+
+        # compiled cache: valid while the file and every file it extends are unchanged
+        cached = self._cache_get(self._ruleset_cache, filepath)
+        if cached is not None:
+            files, fingerprint, rules = cached
+            if all(path.exists() for path in files) and \
+                    tuple(self._fingerprint(path)[1] for path in files) == fingerprint:
+                return copy.deepcopy(rules)
+
+        data, files = self._load_document(filepath, chain=())
+        rules = self.parse_dict(data, source=str(filepath))
+
+        fingerprint = tuple(self._fingerprint(path)[1] for path in files)
+        self._cache_put(self._ruleset_cache, filepath, (files, fingerprint, rules))
+        return copy.deepcopy(rules)
+
+    # build a RuleSet from an already loaded YAML mapping
+    def parse_dict(self, data: dict, source: str = '<dict>') -> RuleSet:
         if data is None:
             data = {}
-        
+        if not isinstance(data, dict):
+            raise RuleValidationError(source, '$', f"expected a mapping at the top level, got {type(data).__name__}")
+
+        self._source = source
         return RuleSet(
-            zones=self._parse_zones(data.get('zones', [])),
-            housing_rules=self._parse_housing_rules(data.get('housing_rules', [])),
-            landuse_rules=self._parse_landuse_rules(data.get('landuse_rules', [])),
-            household_rules=self._parse_household_rules(data.get('household_rules', [])),
-            residents_rules=self._parse_residents_rules(data.get('residents_rules', [])),
-            unit_size_rules=self._parse_unit_size_rules(data.get('unit_size_rules', []))
+            zones=self._parse_list(data, 'zones', self._parse_zone),
+            housing_rules=self._parse_list(data, 'housing_rules', self._parse_housing_rule),
+            landuse_rules=self._parse_list(data, 'landuse_rules', self._parse_landuse_rule),
+            household_rules=self._parse_list(data, 'household_rules', self._parse_household_rule),
+            residents_rules=self._parse_list(data, 'residents_rules', self._parse_residents_rule),
+            unit_size_rules=self._parse_list(data, 'unit_size_rules', self._parse_unit_size_rule),
+            street_template_rules=self._parse_list(data, 'street_template_rules', self._parse_street_template_rule),
+            sampling=self._parse_sampling(data.get('sampling', {}))
         )
-    
-    def _parse_zones(self, zones_data: list) -> list:
-        # parse zone definitions
-        return [
-            Zone(
-                name=zone.get('name', ''),
-                min_distance=float(zone.get('min_distance', 0)),
-                max_distance=float(zone.get('max_distance', 0))
-            )
-            for zone in zones_data
-        ]
-    
-    def _parse_housing_rules(self, rules_data: list) -> list:
-        # parse housing rules
-        return [
-            HousingRule(
-                zone=rule.get('zone', ''),
-                apartment_pct=float(rule.get('apartment_pct', 0.0)),
-                detached_pct=float(rule.get('detached_pct', 0.0)),
-                terraced_pct=float(rule.get('terraced_pct', 0.0))
-            )
-            for rule in rules_data
-        ]
-    
-    def _parse_landuse_rules(self, rules_data: list) -> list:
-        # parse landuse rules
-        return [
-            LanduseRule(
-                zone=rule.get('zone', ''),
-                residential_pct=float(rule.get('residential_pct', 0.0))
-            )
-            for rule in rules_data
-        ]
-    
-    def _parse_household_rules(self, rules_data: list) -> list:
-        # parse household rules
-        return [
-            HouseholdRule(
-                zone=rule.get('zone', ''),
-                single_person_pct=float(rule.get('single_person_pct', 0.0)),
-                single_parent_pct=float(rule.get('single_parent_pct', 0.0)),
-                two_parent_pct=float(rule.get('two_parent_pct', 0.0))
-            )
-            for rule in rules_data
-        ]
-
-    def _parse_residents_rules(self, rules_data: list) -> list:
-        # parse residents rules
-        return [
-            ResidentsRule(
-                zone=rule.get('zone', ''),
-                residents_per_grid=float(rule.get('residents_per_grid', 0.0))
-            )
-            for rule in rules_data
-        ]           
-    
-    def _parse_unit_size_rules(self, rules_data: list) -> list:
-        # parse unit size rules
-        return [
-            UnitSizeRule(
-                zone=rule.get('zone', ''),
-                min_size=float(rule.get('min_size', 0.0)),
-                max_size=float(rule.get('max_size', 0.0))
+
+    # merged YAML mapping of a rule file (extends resolved), e.g. as the base of rule diffs
+    def load_document(self, filepath: Union[str, Path]) -> dict:
+        filepath = Path(filepath).resolve()
+        if not filepath.exists():
+            raise FileNotFoundError(f"Rule file not found: {filepath}")
+        data, _ = self._load_document(filepath, chain=())
+        return copy.deepcopy(data)
+
+    # apply a partial rule mapping to a full one, merged like an `extends:` scenario
+    def merge_documents(self, base: dict, override: dict) -> dict:
+        if not isinstance(override, dict):
+            raise RuleValidationError('<diff>', '$', f"expected a mapping at the top level, got {type(override).__name__}")
+        return self._merge(base, override)
+
+    # clear the compiled RuleSet / document caches
+    @classmethod
+    def clear_cache(cls):
+        cls._ruleset_cache.clear()
+        cls._document_cache.clear()
+
+    ### ----- FILE LOADING
+
+    def _load_document(self, filepath: Path, chain: tuple):
+        # returns (merged data, files it depends on)
+        if filepath in chain:
+            cycle = " -> ".join(str(p) for p in chain + (filepath,))
+            raise RuleValidationError(str(filepath), 'extends', f"circular extends: {cycle}")
+        if not filepath.exists():
+            raise FileNotFoundError(f"Rule file not found: {filepath} (extended by {chain[-1]})")
+
+        data = self._read_yaml(filepath)
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            raise RuleValidationError(str(filepath), '$', f"expected a mapping at the top level, got {type(data).__name__}")
+
+        base = data.get('extends')
+        if base is None:
+            return data, [filepath]
+
+        base_path = (filepath.parent / str(base)).resolve()
+        base_data, base_files = self._load_document(base_path, chain + (filepath,))
+
+        overrides = {key: value for key, value in data.items() if key != 'extends'}
+        return self._merge(base_data, overrides), base_files + [filepath]
+
+    def _read_yaml(self, filepath: Path):
+        # parsed documents are cached by stat key, then by content hash
+        # (documents are never modified after loading: merging builds new containers)
+        stat_key, digest = self._fingerprint(filepath)
+        cached = self._cache_get(self._document_cache, filepath)
+        if cached is not None and cached[1] == digest:
+            return cached[2]
+
+        try:
+            data = yaml.load(self._file_bytes(filepath), Loader=YamlLoader)
+        except yaml.YAMLError as error:
+            raise RuleValidationError(str(filepath), '$', f"invalid YAML: {error}") from error
+
+        self._cache_put(self._document_cache, filepath, (stat_key, digest, data))
+        return data
+
+    def _fingerprint(self, filepath: Path):
+        # (stat key, sha1) - the hash is only recomputed when the stat key changed
+        # mtime alone misses same-timestamp rewrites (coarse clocks, editors restoring
+        # the mtime): size, inode (atomic replace) and ctime (set on every write) catch those
+        stat = filepath.stat()
+        stat_key = (stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size, stat.st_ino)
+        cached = self._document_cache.get(filepath)
+        if cached is not None and cached[0] == stat_key:
+            return stat_key, cached[1]
+        return stat_key, hashlib.sha1(self._file_bytes(filepath)).hexdigest()
+
+    @staticmethod
+    def _cache_get(cache: OrderedDict, key: Path):
+        if key not in cache:
+            return None
+        cache.move_to_end(key)
+        return cache[key]
+
+    @staticmethod
+    def _cache_put(cache: OrderedDict, key: Path, value: tuple):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > MAX_CACHED_FILES:
+            cache.popitem(last=False)
+
+    def _file_bytes(self, filepath: Path) -> bytes:
+        with open(filepath, 'rb') as f:
+            return f.read()
+
+    def _merge(self, base, override):
+        # dicts merge recursively, rule lists merge entry by entry on their zone/name key
+        if isinstance(base, dict) and isinstance(override, dict):
+            merged = dict(base)
+            for key, value in override.items():
+                if key in merged and key in MERGE_KEYS and isinstance(value, list) and isinstance(merged[key], list):
+                    merged[key] = self._merge_list(merged[key], value, MERGE_KEYS[key])
+                elif key in merged:
+                    merged[key] = self._merge(merged[key], value)
+                else:
+                    merged[key] = value
+            return merged
+        return override
+
+    def _merge_list(self, base: list, override: list, key: str) -> list:
+        merged = list(base)
+        index = {entry.get(key): i for i, entry in enumerate(merged) if isinstance(entry, dict)}
+        for entry in override:
+            if isinstance(entry, dict) and entry.get(key) in index:
+                i = index[entry.get(key)]
+                merged[i] = self._merge(merged[i], entry)
+            else:
+                merged.append(entry)
+        return merged
+
+    ### ----- VALIDATION HELPERS
+
+    def _parse_list(self, data: dict, key: str, parse_item) -> List:
+        # parse every entry of a rule list, errors report the exact YAML path
+        items = data.get(key, [])
+        if items is None:
+            return []
+        if not isinstance(items, list):
+            raise RuleValidationError(self._source, key, f"expected a list, got {type(items).__name__}")
+
+        parsed = []
+        for i, item in enumerate(items):
+            path = f"{key}[{i}]"
+            if not isinstance(item, dict):
+                raise RuleValidationError(self._source, path, f"expected a mapping, got {type(item).__name__}")
+            try:
+                parsed.append(parse_item(item, path))
+            except RuleValidationError:
+                raise
+            except (ValueError, TypeError) as error:
+                label = item.get('zone', item.get('name'))
+                where = f"{path} (zone '{label}')" if label is not None else path
+                raise RuleValidationError(self._source, where, str(error)) from error
+        return parsed
+
+    def _float(self, item: dict, key: str, default: float, path: str) -> float:
+        value = item.get(key, default)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise RuleValidationError(self._source, f"{path}.{key}", f"expected a number, got {value!r}")
+
+    def _float_list(self, item: dict, key: str, path: str) -> List[float]:
+        values = item.get(key) or []
+        if not isinstance(values, list):
+            raise RuleValidationError(self._source, f"{path}.{key}", f"expected a list of numbers, got {values!r}")
+        parsed = []
+        for i, value in enumerate(values):
+            try:
+                parsed.append(float(value))
+            except (TypeError, ValueError):
+                raise RuleValidationError(self._source, f"{path}.{key}[{i}]", f"expected a number, got {value!r}")
+        return parsed
+
+    def _int(self, value, path: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise RuleValidationError(self._source, path, f"expected a cluster id (integer), got {value!r}")
+
+    ### ----- RULES
+
+    def _parse_zone(self, zone: dict, path: str) -> Zone:
+        # parse zone definition
+        return Zone(
+            name=zone.get('name', ''),
+            min_distance=self._float(zone, 'min_distance', 0, path),
+            max_distance=self._float(zone, 'max_distance', 0, path)
+        )
+
+    def _parse_housing_rule(self, rule: dict, path: str) -> HousingRule:
+        # parse housing rule
+        return HousingRule(
+            zone=rule.get('zone', ''),
+            apartment_pct=self._float(rule, 'apartment_pct', 0.0, path),
+            detached_pct=self._float(rule, 'detached_pct', 0.0, path),
+            terraced_pct=self._float(rule, 'terraced_pct', 0.0, path)
+        )
+
+    def _parse_landuse_rule(self, rule: dict, path: str) -> LanduseRule:
+        # parse landuse rule
+        return LanduseRule(
+            zone=rule.get('zone', ''),
+            residential_pct=self._float(rule, 'residential_pct', 0.0, path)
+        )
+
+    def _parse_household_rule(self, rule: dict, path: str) -> HouseholdRule:
+        # parse household rule
+        return HouseholdRule(
+            zone=rule.get('zone', ''),
+            single_person_pct=self._float(rule, 'single_person_pct', 0.0, path),
+            single_parent_pct=self._float(rule, 'single_parent_pct', 0.0, path),
+            two_parent_pct=self._float(rule, 'two_parent_pct', 0.0, path)
+        )
+
+    def _parse_residents_rule(self, rule: dict, path: str) -> ResidentsRule:
+        # parse residents rule
+        return ResidentsRule(
+            zone=rule.get('zone', ''),
+            residents_per_grid=self._float(rule, 'residents_per_grid', 0.0, path)
+        )
+
+    def _parse_unit_size_rule(self, rule: dict, path: str) -> UnitSizeRule:
+        # parse unit size rule (empirical histograms default to the range of their bins)
+        distribution = str(rule.get('distribution', 'uniform'))
+        bins = self._float_list(rule, 'bins', path)
+        counts = self._float_list(rule, 'counts', path)
+        default_min, default_max = (bins[0], bins[-1]) if distribution == 'empirical' and bins else (0.0, 0.0)
+        return UnitSizeRule(
+            zone=rule.get('zone', ''),
+            min_size=self._float(rule, 'min_size', default_min, path),
+            max_size=self._float(rule, 'max_size', default_max, path),
+            distribution=distribution,
+            mean=self._float(rule, 'mean', None, path) if rule.get('mean') is not None else None,
+            std=self._float(rule, 'std', None, path) if rule.get('std') is not None else None,
+            bins=bins,
+            counts=counts
+        )
+
+    def _parse_street_template_rule(self, rule: dict, path: str) -> StreetTemplateRule:
+        # parse street template rule (cluster ids as ints)
+        transitions = {}
+        for from_cluster, row in (rule.get('transitions') or {}).items():
+            row_path = f"{path}.transitions.{from_cluster}"
+            transitions[self._int(from_cluster, row_path)] = {
+                self._int(to, f"{row_path}.{to}"): self._float(row, to, 0.0, row_path)
+                for to in (row or {})
+            }
+        target_shares = rule.get('target_shares') or {}
+        return StreetTemplateRule(
+            zone=rule.get('zone', ''),
+            transitions=transitions,
+            target_shares={
+                self._int(cluster, f"{path}.target_shares.{cluster}"): self._float(target_shares, cluster, 0.0, f"{path}.target_shares")
+                for cluster in target_shares
+            }
+        )
+
+    def _parse_sampling(self, sampling_data: dict) -> SamplingConfig:
+        # parse sampling settings (defaults when the section is missing)
+        sampling_data = sampling_data or {}
+        if not isinstance(sampling_data, dict):
+            raise RuleValidationError(self._source, 'sampling', f"expected a mapping, got {type(sampling_data).__name__}")
+        try:
+            return SamplingConfig(
+                mode=str(sampling_data.get('mode', 'random')),
+                correlation_length=self._float(sampling_data, 'correlation_length', 300.0, 'sampling')
             )
-            for rule in rules_data
-        ]
\ No newline at end of file
+        except RuleValidationError:
+            raise
+        except ValueError as error:
+            raise RuleValidationError(self._source, 'sampling', str(error)) from error
@@ -1,10 +1,10 @@
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 ### ZONE RULES
 
-@dataclass
+@dataclass(slots=True)
 class Zone:
     # distance range from the city center. min and max in meters
     name: str
@@ -18,9 +18,34 @@ class Zone:
     def __str__(self):
         return f"Zone('{self.name}': {self.min_distance}-{self.max_distance}m)"
 
+### SAMPLING SETTINGS
+
+# how type decisions are drawn from the rule percentages (pre- and postprocessing)
+# random: independent draw per cell/building
+# quota: exact per-zone counts (largest remainder), shuffled once per zone
+# clustered: exact per-zone counts, placed by thresholding a spatially correlated random field
+SAMPLING_MODES = ('random', 'quota', 'clustered')
+UNIT_SIZE_DISTRIBUTIONS = ('uniform', 'truncnormal', 'lognormal', 'empirical')
+
+@dataclass(slots=True)
+class SamplingConfig:
+    mode: str = 'random'
+    correlation_length: float = 300.0  # meters, clustered mode only
+
+    def __post_init__(self):
+        if self.mode not in SAMPLING_MODES:
+            raise ValueError(f"Sampling mode must be one of {SAMPLING_MODES}, got '{self.mode}'")
+        if self.correlation_length < 0:
+            raise ValueError(f"Correlation length must be >= 0, got {self.correlation_length}")
+
+    def __str__(self):
+        if self.mode == 'clustered':
+            return f"SamplingConfig(mode = '{self.mode}', correlation_length = {self.correlation_length:.0f}m)"
+        return f"SamplingConfig(mode = '{self.mode}')"
+
 ### ----- PREPROCESSING ONLY
 
-@ dataclass
+@dataclass(slots=True)
 class HousingRule:
     # housing mix rule for each zone, in percentages
     zone: str
@@ -49,7 +74,7 @@ class HousingRule:
 
 
 # landuse rule
-@ dataclass
+@dataclass(slots=True)
 class LanduseRule:
     zone: str
     residential_pct: float
@@ -61,9 +86,43 @@ class LanduseRule:
     def __str__(self):
         return f"LanduseRule(zone = '{self.zone}': {self.residential_pct:.0%})"
 
+# street template rule: remap street clusters (cluster_street grid) per zone
+# transitions: from cluster -> {to cluster: probability}
+# target_shares: desired cluster shares in the zone (transitions are derived if none are given)
+@dataclass(slots=True)
+class StreetTemplateRule:
+    zone: str
+    transitions: Dict[int, Dict[int, float]] = field(default_factory=dict)
+    target_shares: Dict[int, float] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.transitions and not self.target_shares:
+            raise ValueError(f"Street template rule for zone '{self.zone}' needs transitions or target_shares")
+
+        for from_cluster, row in self.transitions.items():
+            total = sum(row.values())
+            if not (0.99 <= total <= 1.01):
+                raise ValueError(
+                    f"Street transition probabilities must sum to 1.0, got {total:.3f}\n"
+                    f"  zone: {self.zone}, from cluster: {from_cluster}"
+                )
+
+        if self.target_shares:
+            total = sum(self.target_shares.values())
+            if not (0.99 <= total <= 1.01):
+                raise ValueError(
+                    f"Street target shares must sum to 1.0, got {total:.3f}\n"
+                    f"  zone: {self.zone}"
+                )
+
+    def __str__(self):
+        return (f"StreetTemplateRule(zone = '{self.zone}': "
+                f"{len(self.transitions)} transitions, "
+                f"{len(self.target_shares)} target shares)")
+
 ### ----- POSTPROCESSING ONLY
 
-@ dataclass
+@dataclass(slots=True)
 # add a household rule
 class HouseholdRule:
     zone: str
@@ -89,22 +148,60 @@ class HouseholdRule:
                 f"{self.two_parent_pct:.0%} two_parent)")
 
 # residentsrule (per grid - density indicator) -> household assignment (per building)
-@ dataclass
+@dataclass(slots=True)
 class ResidentsRule:
     zone: str
     residents_per_grid: float
 
-# unit size rule
-@ dataclass
+# unit size rule: distribution of unit sizes (m2), truncated to [min_size, max_size]
+@dataclass(slots=True)
 class UnitSizeRule:
     zone: str
     min_size: float
     max_size: float
+    distribution: str = 'uniform'
+    # truncnormal / lognormal: mean and standard deviation in m2 (before truncation)
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    # empirical: histogram bin edges (m2) and counts per bin, e.g. fitted from CBS dwelling data
+    bins: List[float] = field(default_factory=list)
+    counts: List[float] = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.distribution not in UNIT_SIZE_DISTRIBUTIONS:
+            raise ValueError(f"Unit size distribution must be one of {UNIT_SIZE_DISTRIBUTIONS}, got '{self.distribution}'")
+        if self.max_size < self.min_size:
+            raise ValueError(f"Unit size max_size ({self.max_size}) is smaller than min_size ({self.min_size})")
+
+        if self.distribution in ('truncnormal', 'lognormal'):
+            if self.mean is None or self.std is None:
+                raise ValueError(f"Unit size distribution '{self.distribution}' needs mean and std")
+            if self.std <= 0:
+                raise ValueError(f"Unit size std must be > 0, got {self.std}")
+        if self.distribution == 'lognormal' and (self.mean <= 0 or self.min_size < 0):
+            raise ValueError(f"Lognormal unit sizes need mean > 0 and min_size >= 0, got mean {self.mean}, min_size {self.min_size}")
+
+        if self.distribution == 'empirical':
+            if len(self.bins) < 2 or len(self.counts) != len(self.bins) - 1:
+                raise ValueError(
+                    f"Empirical unit sizes need bin edges and one count per bin, "
+                    f"got {len(self.bins)} edges and {len(self.counts)} counts"
+                )
+            if any(high <= low for low, high in zip(self.bins, self.bins[1:])):
+                raise ValueError(f"Unit size bin edges must be increasing, got {self.bins}")
+            if any(count < 0 for count in self.counts) or sum(self.counts) <= 0:
+                raise ValueError(f"Unit size bin counts must be >= 0 and not all zero, got {self.counts}")
+
+    def __str__(self):
+        if self.distribution == 'uniform':
+            return f"UnitSizeRule(zone = '{self.zone}': {self.min_size:.0f}-{self.max_size:.0f}m2)"
+        return (f"UnitSizeRule(zone = '{self.zone}': {self.distribution} "
+                f"{self.min_size:.0f}-{self.max_size:.0f}m2)")
     
 ### ----- FINAL RULE SET
 
 # RuleSet: container for all rules
-@ dataclass
+@dataclass(slots=True)
 class RuleSet:
     zones: List[Zone]
     housing_rules: List[HousingRule]
@@ -112,6 +209,8 @@ class RuleSet:
     household_rules: List[HouseholdRule]
     residents_rules: List[ResidentsRule]
     unit_size_rules: List[UnitSizeRule]
+    street_template_rules: List[StreetTemplateRule] = field(default_factory=list)
+    sampling: SamplingConfig = field(default_factory=SamplingConfig)
 
     # find which zone a distance belongs to
     # e.g. ruleset.get_zone(500) -> Zone('0_1km': 0-1000m)
@@ -157,8 +256,16 @@ class RuleSet:
                 return rule
         return None
     
+    # get street template rule for a specific zone
+    def get_street_template_rule(self, zone_name: str) -> StreetTemplateRule:
+        for rule in self.street_template_rules:
+            if rule.zone == zone_name:
+                return rule
+        return None
+    
     def __str__(self):
         s = "RuleSet:\n"
+        s += f"  Sampling: {self.sampling}\n"
         s += f"  Zones: {len(self.zones)}\n"
         for zone in self.zones:
             s += f"    - {zone}\n"
@@ -177,6 +284,9 @@ class RuleSet:
         s += f"  Unit Size Rules: {len(self.unit_size_rules)}\n"
         for rule in self.unit_size_rules:
             s += f"    - {rule}\n"
+        s += f"  Street Template Rules: {len(self.street_template_rules)}\n"
+        for rule in self.street_template_rules:
+            s += f"    - {rule}\n"
         return s
 
 
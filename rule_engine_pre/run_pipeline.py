@@ -1,8 +1,8 @@
 import sys
 import random
 from pathlib import Path
-from preprocessing.main import modify_template_with_stats
-from postprocessing.main import postprocess_citystackgen_output
+
+# stage imports are deferred to where a stage runs (see run_preprocessing.py / run_postprocessing.py)
 
 
 def main():
@@ -15,8 +15,83 @@ def main():
     city_center_geojson = "../citystack/citystackgen/outputs/Groningen_modified_2.1/city_center.geojson"
     postprocessing_output_geojson = "outputs/post/buildings_classified.geojson"
     postprocessing_output_csv = "outputs/post/buildings_classified.csv"
+    # optional zone/tile shards + manifest.json (e.g. "outputs/post/partitioned")
+    postprocessing_output_partitioned = None
+    # optional per-cell aggregates (CBS 500 m grid + template grid) as NPZ rasters + CSV (e.g. "outputs/post/grid")
+    postprocessing_output_grid = None
     
     random_seed = None  
+
+    # optional: street-network distance instead of straight-line distance for zones
+    # (CityStackGen streets output or a local OSM extract; grid_origin = RD x, y of template cell (0, 0))
+    street_network = None  # e.g. "../citystack/citystackgen/outputs/Groningen_modified_2.1/streets.geojson"
+    grid_origin = None
+    distance_cache_dir = "outputs/cache/distance"
+
+    # preprocessing: tiles on all cores (national-scale templates, random sampling mode only)
+    tiled_preprocessing = False
+
+    # postprocessing: overlap reading / classification / writing (batch_size=None -> one batch)
+    pipelined = False
+    batch_size = None
+    # postprocessing: only recompute zones / columns whose rules changed since the last output
+    incremental = False
+    # postprocessing: attribute-only frame + raw WKB geometries (large inputs)
+    low_memory = False
+    # postprocessing: classify zone partitions on several processes (None = serial; keyed random
+    # draws, not with low_memory, pipelined or the 'clustered' sampling mode)
+    postprocessing_workers = None
+
+    # postprocessing: centroids / areas of the buildings file computed once, reused by later runs
+    # (sidecar cache keyed by the file hash; the pipelined mode reads its own batches without it)
+    geometry_cache = True
+    geometry_cache_dir = "outputs/cache/geometry"
+
+    # optional: road types for the generated streets from the observed CityPy shares
+    # (exact quotas of data/citypy/layers_cleaned/road_edges_pct.csv; weights > 0 give long /
+    # peripheral segments the major road types)
+    streets_geojson = None  # e.g. "../citystack/citystackgen/outputs/Groningen_modified_2.1/streets.geojson"
+    streets_output_geojson = "outputs/post/streets_classified.geojson"
+    street_length_weight = 0.0
+    street_distance_weight = 0.0
+
+    # multi-seed: preprocessing, generation and postprocessing of different seeds overlap
+    # (generator is run as an external command, placeholders {template}, {output_dir}, {seed})
+    seeds = None  # e.g. [1, 2, 3, 4]
+    generator_command = [
+        "../citystack/citystackgen/target/release/citystackgen",
+        "--template", "{template}", "--output", "{output_dir}", "--seed", "{seed}"
+    ]
+    multi_seed_output = "outputs/seeds"
+
+    if seeds:
+        from pipeline.multi_seed import run_multi_seed
+
+        print(f"\nMULTI-SEED PIPELINE: {len(seeds)} seeds")
+        print("-" * 40)
+        result = run_multi_seed(
+            seeds=seeds,
+            input_template=input_template,
+            rules_yaml=rules_yaml,
+            generator_command=generator_command,
+            output_root=multi_seed_output,
+            cell_size=100.0,
+            preprocessing_options={
+                'street_network': street_network,
+                'grid_origin': grid_origin,
+                'distance_cache_dir': distance_cache_dir
+            },
+            postprocessing_options={
+                'street_network': street_network,
+                'distance_cache_dir': distance_cache_dir,
+                'low_memory': low_memory
+            }
+        )
+        print(f"\nStage busy time:")
+        for stage, seconds in result.busy_time().items():
+            print(f"  {stage:12s}: {seconds:.1f} s")
+        print(f"\nOutputs: {multi_seed_output}/seed_<seed>/")
+        return
     
     # if random_seed is None, generate one seed for both preprocessing and postprocessing
     if random_seed is None:
@@ -26,6 +101,8 @@ def main():
         print(f"Random seed is provided: {random_seed}") 
     
     # preprocessing
+    from preprocessing.main import modify_template_with_stats
+
     print("\n1. PREPROCESSING")
     print("-" * 40)
     modify_template_with_stats(
@@ -33,10 +110,16 @@ def main():
         output_path=preprocessing_output,
         rules_yaml=rules_yaml,
         cell_size=100.0,
-        random_seed=random_seed
+        random_seed=random_seed,
+        street_network=street_network,
+        grid_origin=grid_origin,
+        distance_cache_dir=distance_cache_dir,
+        tiled=tiled_preprocessing
     )
     
     # postprocessing
+    from postprocessing.main import postprocess_citystackgen_output
+
     print("\n2. POSTPROCESSING")
     print("-" * 40)
     postprocess_citystackgen_output(
@@ -45,14 +128,45 @@ def main():
         rules_yaml=rules_yaml,
         output_geojson=postprocessing_output_geojson,
         output_csv=postprocessing_output_csv,
-        random_seed=random_seed
+        random_seed=random_seed,
+        street_network=street_network,
+        distance_cache_dir=distance_cache_dir,
+        pipelined=pipelined,
+        batch_size=batch_size,
+        output_partitioned_dir=postprocessing_output_partitioned,
+        partition_by="zone",
+        incremental=incremental,
+        low_memory=low_memory,
+        output_grid_dir=postprocessing_output_grid,
+        grid_template=input_template,
+        grid_origin=grid_origin,
+        geometry_cache=geometry_cache and not pipelined,
+        geometry_cache_dir=geometry_cache_dir,
+        workers=postprocessing_workers
     )
     
+    # streets
+    if streets_geojson:
+        from postprocessing.street_classifier import classify_street_file
+
+        print("\n3. STREETS")
+        print("-" * 40)
+        classify_street_file(
+            streets_geojson=streets_geojson,
+            output_geojson=streets_output_geojson,
+            city_center_geojson=city_center_geojson,
+            length_weight=street_length_weight,
+            distance_weight=street_distance_weight,
+            random_seed=random_seed
+        )
+
     # directory
     print(f"\nOutputs:")
     print(f"  Preprocessing:  {preprocessing_output}")
     print(f"  Postprocessing GeoJSON: {postprocessing_output_geojson}")
     print(f"  Postprocessing CSV: {postprocessing_output_csv}")
+    if streets_geojson:
+        print(f"  Streets: {streets_output_geojson}")
 
 
 if __name__ == "__main__":
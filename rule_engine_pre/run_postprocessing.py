@@ -0,0 +1,53 @@
+import argparse
+
+"""
+Postprocessing-only entry point.
+
+The postprocessing stage (pandas, geopandas, shapely, pyproj, pyogrio) is
+imported inside main() once the arguments are parsed, so --help and
+argument errors return immediately and nothing of the preprocessing side
+is loaded.
+
+    python run_postprocessing.py buildings.geojson city_center.geojson --rules rule.yaml \\
+        --output-geojson outputs/post/buildings_classified.geojson --seed 1
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify CityStackGen buildings with the postprocessing rules")
+    parser.add_argument('buildings', help="buildings GeoJSON / GeoPackage")
+    parser.add_argument('city_center', help="city center GeoJSON")
+    parser.add_argument('--rules', default='rule.yaml', help="rules YAML (default: rule.yaml)")
+    parser.add_argument('--output-geojson', default=None)
+    parser.add_argument('--output-csv', default=None)
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    parser.add_argument('--street-network', default=None, help="streets GeoJSON / OSM extract for network distance")
+    parser.add_argument('--distance-cache-dir', default='outputs/cache/distance')
+    parser.add_argument('--low-memory', action='store_true', help="attribute-only frame + raw WKB geometries (not with --workers)")
+    parser.add_argument('--no-geometry-cache', action='store_true', help="do not reuse cached centroids / areas")
+    parser.add_argument('--geometry-cache-dir', default='outputs/cache/geometry')
+    parser.add_argument('--workers', type=int, default=None, help="classify zone partitions on several processes (implies keyed per-building random draws: "
+             "reproducible for any worker count, but not the draws of a serial run; no 'clustered' sampling)")
+    args = parser.parse_args(argv)
+
+    # stage imports are deferred until here
+    from postprocessing.main import postprocess_citystackgen_output
+
+    postprocess_citystackgen_output(
+        buildings_geojson=args.buildings,
+        city_center_geojson=args.city_center,
+        rules_yaml=args.rules,
+        output_geojson=args.output_geojson,
+        output_csv=args.output_csv,
+        random_seed=args.seed,
+        street_network=args.street_network,
+        distance_cache_dir=args.distance_cache_dir,
+        low_memory=args.low_memory,
+        geometry_cache=not args.no_geometry_cache,
+        geometry_cache_dir=args.geometry_cache_dir,
+        workers=args.workers
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+# the stage packages live next to this script (first on sys.path when it is run)
+ENGINE_DIR = Path(__file__).parent
+
+"""
+Preprocessing-only entry point.
+
+Only argparse is imported at module load; the preprocessing stage (numpy,
+yaml, the rule engine) is imported inside main() once the arguments are
+parsed. Nothing of the postprocessing stack (pandas, geopandas, shapely,
+pyproj, pyogrio) or scipy is loaded for a preprocessing run.
+
+    python run_preprocessing.py template.npz outputs/pre/template_modified.npz --rules rule.yaml --seed 1
+    python run_preprocessing.py --check-startup
+
+--check-startup imports the stage in a fresh interpreter and fails when
+the import takes longer than STARTUP_BUDGET seconds or pulls in one of the
+FORBIDDEN_MODULES.
+"""
+
+# seconds for importing the preprocessing stage in a fresh interpreter
+STARTUP_BUDGET = 0.35
+STAGE_MODULE = 'preprocessing.main'
+FORBIDDEN_MODULES = ('pandas', 'geopandas', 'shapely', 'pyproj', 'pyogrio', 'scipy')
+
+# run in a fresh interpreter: prints the import time and the forbidden modules that were loaded
+_STARTUP_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+loaded = [name for name in {forbidden!r} if name in sys.modules]
+print(seconds, ','.join(loaded))
+"""
+
+
+def check_startup(
+    module: str = STAGE_MODULE,
+    budget: float = STARTUP_BUDGET,
+    forbidden=FORBIDDEN_MODULES
+) -> float:
+    """
+    Import a stage module in a fresh interpreter and check its startup cost
+
+    Args:
+        module: Module to import
+        budget: Maximum import time in seconds
+        forbidden: Modules the import must not load
+
+    Returns:
+        Import time in seconds (raises ValueError when over budget or a forbidden module was loaded)
+    """
+    # python -c puts the working directory on sys.path: the stage packages resolve from ENGINE_DIR
+    probe = _STARTUP_PROBE.format(module=module, forbidden=tuple(forbidden))
+    output = subprocess.run(
+        [sys.executable, '-c', probe], cwd=str(ENGINE_DIR), capture_output=True, text=True, check=True
+    ).stdout
+    fields = output.split()
+    seconds = float(fields[0])
+    loaded = fields[1].split(',') if len(fields) > 1 else []
+    if loaded:
+        raise ValueError(f"Importing {module} loads {', '.join(loaded)}")
+    if seconds > budget:
+        raise ValueError(f"Importing {module} took {seconds:.3f} s, budget is {budget:.3f} s")
+    return seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modify a CityPy NPZ template with the preprocessing rules")
+    parser.add_argument('input', nargs='?', help="input NPZ template")
+    parser.add_argument('output', nargs='?', help="output NPZ template")
+    parser.add_argument('--rules', default='rule.yaml', help="rules YAML (default: rule.yaml)")
+    parser.add_argument('--cell-size', type=float, default=100.0, help="grid cell size in meters")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    parser.add_argument('--street-network', default=None, help="streets GeoJSON / OSM extract for network distance")
+    parser.add_argument('--grid-origin', type=float, nargs=2, default=None, metavar=('X', 'Y'),
+                        help="real-world x, y of cell (0, 0), needed for network distance")
+    parser.add_argument('--distance-cache-dir', default='outputs/cache/distance')
+    parser.add_argument('--tiled', action='store_true', help="process the grid in tiles on all cores")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes in tiled mode")
+    parser.add_argument('--check-startup', action='store_true',
+                        help=f"check that importing the stage stays under {STARTUP_BUDGET} s")
+    args = parser.parse_args(argv)
+
+    if args.check_startup:
+        seconds = check_startup()
+        print(f"{STAGE_MODULE}: imported in {seconds:.3f} s (budget {STARTUP_BUDGET:.3f} s)")
+        return
+    if not args.input or not args.output:
+        parser.error("input and output templates are required")
+
+    # stage imports are deferred until here
+    from preprocessing.main import modify_template_with_stats
+
+    modify_template_with_stats(
+        input_path=args.input,
+        output_path=args.output,
+        rules_yaml=args.rules,
+        cell_size=args.cell_size,
+        random_seed=args.seed,
+        street_network=args.street_network,
+        grid_origin=tuple(args.grid_origin) if args.grid_origin else None,
+        distance_cache_dir=args.distance_cache_dir,
+        tiled=args.tiled,
+        workers=args.workers
+    )
+
+
+if __name__ == "__main__":
+    main()
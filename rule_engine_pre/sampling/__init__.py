@@ -0,0 +1,21 @@
+from .quota import quota_counts, quota_assign, quota_assign_by_rank
+from .random_field import gaussian_random_field, field_at_points
+from .alias import AliasTable, CategoricalSampler, sample_batch_codes
+from .inverse_cdf import InverseCDF, unit_size_table
+from .keyed import keyed_uniform, splitmix64, resolve_seed
+
+__all__ = [
+    'quota_counts',
+    'quota_assign',
+    'quota_assign_by_rank',
+    'gaussian_random_field',
+    'field_at_points',
+    'AliasTable',
+    'CategoricalSampler',
+    'sample_batch_codes',
+    'InverseCDF',
+    'unit_size_table',
+    'keyed_uniform',
+    'splitmix64',
+    'resolve_seed'
+]
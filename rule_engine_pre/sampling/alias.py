@@ -0,0 +1,112 @@
+import numpy as np
+from typing import Dict, Sequence
+
+"""
+Categorical samplers compiled once per rule and zone.
+
+rng.choice(types, p=...) validates and normalizes p on every call and
+returns numpy string scalars. Here a distribution is compiled once into a
+Walker alias table (Vose's method); a draw is then one uniform integer and
+one uniform float:
+
+    i = random column, code = i if u < prob[i] else alias[i]
+
+so N draws are O(N) with no validation and produce integer category codes.
+Strings are only looked up at the end (categories[codes]).
+
+sample_batch_codes is the batched variant for many distributions at once
+(one row of probabilities per scenario), based on cumulative arrays.
+"""
+
+
+class AliasTable:
+    # Walker alias table of one categorical distribution
+    __slots__ = ('prob', 'alias')
+
+    def __init__(self, probabilities: Sequence[float]):
+        p = np.asarray(probabilities, dtype=np.float64)
+        if p.ndim != 1 or len(p) == 0:
+            raise ValueError(f"Expected a non-empty 1-d list of probabilities, got shape {p.shape}")
+        if (p < 0).any() or not np.isfinite(p).all() or p.sum() <= 0:
+            raise ValueError(f"Probabilities must be finite, non-negative and not all zero, got {p.tolist()}")
+
+        n = len(p)
+        scaled = p / p.sum() * n
+        prob = np.ones(n)
+        alias = np.arange(n)
+
+        # Vose: pair every under-full column with an over-full one
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # leftovers are full columns (up to rounding)
+        for i in small + large:
+            prob[i] = 1.0
+
+        self.prob = prob
+        self.alias = alias
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def sample(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        # `size` integer category codes
+        column = rng.integers(0, len(self.prob), size=size)
+        return np.where(rng.random(size) < self.prob[column], column, self.alias[column])
+
+    def codes_from_uniform(self, u: np.ndarray) -> np.ndarray:
+        # codes from one given uniform number per draw (keyed randomness):
+        # integer part -> column, fractional part -> column or its alias
+        scaled = np.asarray(u, dtype=np.float64) * len(self.prob)
+        column = np.minimum(scaled.astype(np.int64), len(self.prob) - 1)
+        return np.where(scaled - column < self.prob[column], column, self.alias[column])
+
+
+class CategoricalSampler:
+    # categories + their compiled alias table
+
+    def __init__(self, categories: Sequence, probabilities: Sequence[float]):
+        if len(categories) != len(probabilities):
+            raise ValueError(f"Got {len(categories)} categories but {len(probabilities)} probabilities")
+        self.categories = np.array(categories, dtype=object)
+        self.table = AliasTable(probabilities)
+
+    @classmethod
+    def from_dict(cls, distribution: Dict) -> 'CategoricalSampler':
+        # {category: probability}
+        return cls(list(distribution.keys()), list(distribution.values()))
+
+    def codes(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        return self.table.sample(size, rng)
+
+    def sample(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        return self.categories[self.table.sample(size, rng)]
+
+    def from_uniform(self, u: np.ndarray) -> np.ndarray:
+        return self.categories[self.table.codes_from_uniform(u)]
+
+
+def sample_batch_codes(probabilities: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw codes from many categorical distributions at once
+
+    Args:
+        probabilities: (batch, categories) probabilities, one distribution per row
+        size: Draws per distribution
+        rng: Random generator
+
+    Returns:
+        (batch, size) integer category codes
+    """
+    cumulative = np.cumsum(np.asarray(probabilities, dtype=np.float64), axis=1)
+    cumulative /= cumulative[:, -1:]
+    draws = rng.random((cumulative.shape[0], size))
+    codes = np.zeros(draws.shape, dtype=np.int64)
+    for k in range(cumulative.shape[1] - 1):
+        codes += draws >= cumulative[:, k:k + 1]
+    return codes
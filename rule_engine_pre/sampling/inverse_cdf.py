@@ -0,0 +1,109 @@
+import numpy as np
+from typing import Sequence
+
+"""
+Continuous distributions compiled into inverse-CDF lookup tables.
+
+A distribution is evaluated once at TABLE_SIZE evenly spaced probabilities
+u_k = k / (TABLE_SIZE - 1); a draw is then one uniform number u and a
+linear interpolation between the two neighbouring table entries (no
+search, the table is evenly spaced in u). N draws cost the same for every
+distribution, uniform included.
+
+All distributions are truncated to [low, high]:
+- uniform: exact (two-entry table)
+- truncnormal / lognormal: exact quantiles at the table points
+- empirical: piecewise-linear CDF of a histogram (uniform within bins)
+"""
+
+TABLE_SIZE = 1025
+
+
+class InverseCDF:
+    # values of the quantile function at evenly spaced probabilities 0..1
+    __slots__ = ('quantiles', 'steps')
+
+    def __init__(self, quantiles: Sequence[float]):
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        if quantiles.ndim != 1 or len(quantiles) < 2:
+            raise ValueError(f"An inverse CDF table needs at least 2 quantiles, got shape {quantiles.shape}")
+        if np.any(np.diff(quantiles) < 0):
+            raise ValueError("Inverse CDF quantiles must be non-decreasing")
+        self.quantiles = quantiles
+        self.steps = np.diff(quantiles)
+
+    @classmethod
+    def uniform(cls, low: float, high: float) -> 'InverseCDF':
+        return cls([low, high])
+
+    @classmethod
+    def truncated_normal(cls, mean: float, std: float, low: float, high: float) -> 'InverseCDF':
+        # quantiles of N(mean, std) restricted to [low, high]
+        # (scipy is imported here: it is only needed to build tables, not to load the rules)
+        from scipy.special import ndtr, ndtri
+        cdf_low, cdf_high = ndtr((low - mean) / std), ndtr((high - mean) / std)
+        if cdf_high - cdf_low < 1e-12:
+            raise ValueError(
+                f"Normal distribution (mean {mean}, std {std}) has no probability mass between {low} and {high}"
+            )
+        u = np.linspace(0.0, 1.0, TABLE_SIZE)
+        quantiles = mean + std * ndtri(cdf_low + u * (cdf_high - cdf_low))
+        return cls(np.clip(quantiles, low, high))
+
+    @classmethod
+    def truncated_lognormal(cls, mean: float, std: float, low: float, high: float) -> 'InverseCDF':
+        # mean / std of the sizes themselves (not of their logarithm)
+        sigma = np.sqrt(np.log1p((std / mean) ** 2))
+        mu = np.log(mean) - sigma ** 2 / 2
+        log_low = np.log(low) if low > 0 else -np.inf
+        table = cls.truncated_normal(mu, sigma, log_low, np.log(high))
+        return cls(np.clip(np.exp(table.quantiles), low, high))
+
+    @classmethod
+    def empirical(cls, bins: Sequence[float], counts: Sequence[float], low: float, high: float) -> 'InverseCDF':
+        # histogram CDF at the bin edges, cut to [low, high] and renormalized
+        bins = np.asarray(bins, dtype=np.float64)
+        cdf = np.concatenate([[0.0], np.cumsum(counts, dtype=np.float64)])
+        edges = np.unique(np.concatenate([bins[(bins > low) & (bins < high)], [low, high]]))
+        edge_cdf = np.interp(edges, bins, cdf)
+        if edge_cdf[-1] - edge_cdf[0] <= 0:
+            raise ValueError(f"Unit size histogram has no counts between {low} and {high}")
+        edge_cdf = (edge_cdf - edge_cdf[0]) / (edge_cdf[-1] - edge_cdf[0])
+
+        # invert (empty bins are flat steps of the CDF: np.interp jumps over them)
+        u = np.linspace(0.0, 1.0, TABLE_SIZE)
+        return cls(np.interp(u, edge_cdf, edges))
+
+    def __len__(self) -> int:
+        return len(self.quantiles)
+
+    def sample(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        # `size` draws
+        return self.from_uniform(rng.random(size))
+
+    def from_uniform(self, u: np.ndarray) -> np.ndarray:
+        # quantiles of given uniform numbers: linear interpolation in the evenly spaced table
+        # (in place on a float64 copy, one pass per step)
+        position = np.array(u, dtype=np.float64)
+        if len(self.steps) == 1:
+            # uniform
+            position *= self.steps[0]
+            position += self.quantiles[0]
+            return position
+        position *= len(self.steps)
+        index = position.astype(np.intp)
+        np.minimum(index, len(self.steps) - 1, out=index)
+        position -= index
+        position *= self.steps.take(index)
+        position += self.quantiles.take(index)
+        return position
+
+def unit_size_table(rule) -> InverseCDF:
+    # compile a UnitSizeRule into its inverse-CDF table
+    if rule.distribution == 'truncnormal':
+        return InverseCDF.truncated_normal(rule.mean, rule.std, rule.min_size, rule.max_size)
+    if rule.distribution == 'lognormal':
+        return InverseCDF.truncated_lognormal(rule.mean, rule.std, rule.min_size, rule.max_size)
+    if rule.distribution == 'empirical':
+        return InverseCDF.empirical(rule.bins, rule.counts, rule.min_size, rule.max_size)
+    return InverseCDF.uniform(rule.min_size, rule.max_size)
@@ -0,0 +1,77 @@
+import numpy as np
+
+"""
+Keyed (counter-based) random numbers.
+
+A Generator hands out numbers in call order, so the value a cell or
+building gets depends on how the work was split (tile size, batch size,
+worker count). Here the random number of an item is a hash of
+(seed, stream, item index) instead:
+
+    u = splitmix64(index ^ key(seed, stream)) / 2**64
+
+Any subset of items can be drawn in any order, in any process, and gets
+the same numbers as a single serial pass. Streams separate the decisions
+made for the same item (e.g. residential vs. building type).
+"""
+
+MASK64 = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+
+# random streams of the rule decisions
+STREAM_RESIDENTIAL = 1
+STREAM_BUILDING_TYPE = 2
+STREAM_STREET = 3
+STREAM_UNIT_SIZE = 4
+STREAM_HOUSEHOLD_TYPE = 5
+STREAM_HOUSEHOLD_SIZE = 6
+
+
+def splitmix64(values: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer on uint64 arrays (wrapping arithmetic)
+    z = np.asarray(values, dtype=np.uint64) + np.uint64(GOLDEN)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def resolve_seed(seed: int = None) -> int:
+    """
+    Seed of a keyed run, drawn from OS entropy if none is given
+
+    Resolve once per run and pass the result to every worker: keyed numbers
+    are only consistent across tiles and partitions for one fixed seed.
+
+    Args:
+        seed: Run seed (None = random)
+
+    Returns:
+        64-bit integer seed
+    """
+    if seed is None:
+        return int(np.random.SeedSequence().entropy) & MASK64
+    return int(seed)
+
+
+def stream_key(seed: int, stream: int) -> np.uint64:
+    # one 64-bit key per (seed, stream)
+    if seed is None:
+        raise ValueError("Keyed random numbers need a fixed seed: resolve it once per run with resolve_seed()")
+    mixed = splitmix64(np.array([seed & MASK64], dtype=np.uint64))
+    return splitmix64(mixed ^ np.uint64((stream * GOLDEN) & MASK64))[0]
+
+
+def keyed_uniform(seed: int, stream: int, index: np.ndarray) -> np.ndarray:
+    """
+    Uniform [0, 1) numbers keyed by item index
+
+    Args:
+        seed: Run seed
+        stream: Decision stream (STREAM_* constant)
+        index: Global item indices (cell index row * cols + col, building position, ...)
+
+    Returns:
+        float64 array of the shape of index
+    """
+    bits = splitmix64(np.asarray(index, dtype=np.uint64) ^ stream_key(seed, stream))
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
@@ -0,0 +1,44 @@
+import numpy as np
+from typing import Sequence
+
+"""
+Exact-quota (stratified) sampling.
+
+Instead of one independent draw per item, a zone of n items gets exactly
+round(n * p) items of every category:
+
+- target counts from the rule percentages with largest-remainder rounding
+  (the counts always add up to n)
+- one random permutation per zone decides WHICH items get which category
+  (or, for clustered sampling, the ranks of a random field)
+"""
+
+
+def quota_counts(probabilities: Sequence[float], size: int) -> np.ndarray:
+    # largest-remainder rounding of size * p (Hamilton method)
+    p = np.asarray(probabilities, dtype=float)
+    p = p / p.sum()
+
+    exact = p * size
+    counts = np.floor(exact).astype(np.int64)
+    remaining = size - counts.sum()
+    if remaining > 0:
+        # ties go to the earlier category (stable sort)
+        order = np.argsort(-(exact - counts), kind='stable')
+        counts[order[:remaining]] += 1
+    return counts
+
+
+def quota_assign(size: int, probabilities: Sequence[float], rng: np.random.Generator) -> np.ndarray:
+    # category codes (0..k-1) hitting the quota exactly, in random order
+    counts = quota_counts(probabilities, size)
+    return rng.permutation(np.repeat(np.arange(len(counts)), counts))
+
+
+def quota_assign_by_rank(values: np.ndarray, probabilities: Sequence[float]) -> np.ndarray:
+    # category codes hitting the quota exactly, thresholding values at the percentage quantiles
+    # (lowest values -> category 0, next -> category 1, ...)
+    counts = quota_counts(probabilities, len(values))
+    codes = np.empty(len(values), dtype=np.int64)
+    codes[np.argsort(values, kind='stable')] = np.repeat(np.arange(len(counts)), counts)
+    return codes
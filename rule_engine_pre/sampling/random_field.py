@@ -0,0 +1,85 @@
+import numpy as np
+from typing import Tuple
+
+"""
+Spatially correlated random fields for clustered type assignment.
+
+Independent draws per cell give salt-and-pepper patterns; real
+neighbourhoods cluster. A Gaussian random field (white noise smoothed by a
+Gaussian kernel) is generated with FFT convolution in O(n log n) and then
+thresholded per zone at the rule's percentage quantiles (see
+quota.quota_assign_by_rank), so zone shares stay exact.
+"""
+
+# the kernel is negligible beyond this many correlation lengths (used for padding)
+KERNEL_REACH = 3.0
+# largest helper grid of field_at_points (float64 cells before padding: 128 MB)
+MAX_FIELD_CELLS = 16_000_000
+
+
+def gaussian_random_field(
+    shape: Tuple[int, int],
+    correlation_length: float,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Standardized Gaussian random field via FFT convolution
+
+    Args:
+        shape: (rows, cols) of the grid
+        correlation_length: Kernel standard deviation in cells (<= 0 gives white noise)
+        rng: Random generator
+
+    Returns:
+        float32 array of the given shape, mean 0 / std 1
+    """
+    rows, cols = shape
+    if correlation_length <= 0:
+        return rng.standard_normal(shape).astype(np.float32)
+
+    # pad so the periodic FFT convolution does not wrap opposite edges together
+    pad = int(np.ceil(KERNEL_REACH * correlation_length))
+    padded_shape = (rows + 2 * pad, cols + 2 * pad)
+    noise = rng.standard_normal(padded_shape)
+
+    # Gaussian kernel in the frequency domain: exp(-2 pi^2 sigma^2 |k|^2)
+    ky = np.fft.fftfreq(padded_shape[0])[:, None]
+    kx = np.fft.rfftfreq(padded_shape[1])[None, :]
+    transfer = np.exp(-2.0 * np.pi**2 * correlation_length**2 * (kx**2 + ky**2))
+
+    field = np.fft.irfft2(np.fft.rfft2(noise) * transfer, s=padded_shape)
+    field = field[pad:pad + rows, pad:pad + cols]
+
+    std = field.std()
+    return ((field - field.mean()) / (std if std > 0 else 1.0)).astype(np.float32)
+
+
+def field_at_points(
+    x: np.ndarray,
+    y: np.ndarray,
+    correlation_length: float,
+    rng: np.random.Generator,
+    cells_per_length: int = 4
+) -> np.ndarray:
+    # sample a random field at point locations (e.g. building centroids);
+    # the field is generated on a helper grid covering the points' extent
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    # white noise needs no grid: one independent value per point
+    if correlation_length <= 0:
+        return rng.standard_normal(len(x)).astype(np.float32)
+
+    # helper cells of correlation_length / cells_per_length, coarser when the grid would be
+    # larger than MAX_FIELD_CELLS (tiny lengths over a city-sized extent)
+    extent_x, extent_y = np.ptp(x), np.ptp(y)
+    cell_size = correlation_length / cells_per_length
+    while (np.floor(extent_x / cell_size) + 1) * (np.floor(extent_y / cell_size) + 1) > MAX_FIELD_CELLS:
+        cell_size *= 2.0
+    col = np.floor((x - x.min()) / cell_size).astype(np.int64)
+    row = np.floor((y - y.min()) / cell_size).astype(np.int64)
+
+    field = gaussian_random_field((row.max() + 1, col.max() + 1), correlation_length / cell_size, rng)
+    return field[row, col]
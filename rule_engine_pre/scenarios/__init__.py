@@ -0,0 +1,5 @@
+from .sweep import ScenarioSweep
+
+__all__ = [
+    'ScenarioSweep'
+]
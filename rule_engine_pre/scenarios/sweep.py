@@ -0,0 +1,313 @@
+import copy
+import dataclasses
+import itertools
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import RuleSet
+from preprocessing.template_modifier import TemplateModifier
+from postprocessing.building_processor import BuildingProcessor, HOUSEHOLD_SIZES, DEFAULT_UNIT_SIZE
+from sampling.quota import quota_counts
+from sampling.alias import CategoricalSampler, sample_batch_codes
+from sampling.inverse_cdf import unit_size_table
+
+"""
+In-memory scenario sweeps over rule parameters.
+
+Instead of writing one YAML per parameter combination and rerunning the
+pipeline, a sweep evaluates all scenarios against ONE loaded template or
+building set:
+
+- distance and zone fields are computed once (from the base rules) and shared
+- per zone, scenarios are a batch dimension: one (scenarios x cells) array
+  of draws is compared with the per-scenario probabilities
+- quota / clustered modes hit the rule shares exactly, so their per-zone
+  counts are computed directly from the quotas
+
+Parameters are addressed as '<rule list>.<zone>.<field>', e.g.
+
+    sweep = ScenarioSweep(rules)
+    sweep.add_parameter('landuse_rules.2_5km.residential_pct', np.linspace(0.1, 0.9, 9))
+    table = sweep.run_on_template('Groningen_NL.npz', random_seed=1)
+
+The result is a tidy DataFrame with one row per (scenario, zone).
+"""
+
+HOUSING_TYPES = ['apartment', 'detached', 'terraced']
+HOUSEHOLD_TYPES = ['single_person', 'single_parent', 'two_parent']
+
+# max draws held in memory at once (scenarios x cells per chunk)
+MAX_DRAWS_PER_CHUNK = 5_000_000
+
+
+class ScenarioSweep:
+
+    def __init__(self, base_rules: RuleSet, combine: str = 'product'):
+        """
+        Args:
+            base_rules: RuleSet every scenario starts from (also defines the zones)
+            combine: 'product' (all combinations) or 'zip' (parameters change together)
+        """
+        if combine not in ('product', 'zip'):
+            raise ValueError(f"combine must be 'product' or 'zip', got '{combine}'")
+        self.base_rules = base_rules
+        self.combine = combine
+        self.parameters: Dict[str, np.ndarray] = {}
+        # household sizes do not depend on the scenario: one alias table per household type
+        self._size_samplers = {
+            household_type: CategoricalSampler.from_dict(distribution)
+            for household_type, distribution in HOUSEHOLD_SIZES.items()
+        }
+
+    def add_parameter(self, path: str, values: Sequence[float]) -> 'ScenarioSweep':
+        # path: '<rule list>.<zone>.<field>' e.g. 'housing_rules.0_1km.apartment_pct'
+        self._resolve(self.base_rules, path)
+        if path.split('.')[0] == 'zones':
+            raise ValueError("Zones are shared by all scenarios and cannot be swept")
+        self.parameters[path] = np.asarray(values, dtype=float)
+        return self
+
+    # parameter values of every scenario, one row per scenario
+    def scenario_table(self) -> pd.DataFrame:
+        if not self.parameters:
+            return pd.DataFrame(index=pd.RangeIndex(1, name='scenario'))
+
+        names = list(self.parameters)
+        if self.combine == 'zip':
+            lengths = {len(values) for values in self.parameters.values()}
+            if len(lengths) != 1:
+                raise ValueError(f"zip sweep needs parameter ranges of equal length, got {sorted(lengths)}")
+            rows = list(zip(*self.parameters.values()))
+        else:
+            rows = list(itertools.product(*self.parameters.values()))
+
+        table = pd.DataFrame(rows, columns=names)
+        table.index.name = 'scenario'
+        return table
+
+    # RuleSet of every scenario (validated like rules loaded from YAML)
+    def scenario_rules(self) -> List[RuleSet]:
+        scenarios = []
+        for i, row in self.scenario_table().iterrows():
+            rules = copy.deepcopy(self.base_rules)
+            # all fields of one rule are replaced together (e.g. housing shares that must sum to 1)
+            changes = {}
+            for path, value in row.items():
+                rule_list, index, field_name = self._resolve(rules, path)
+                changes.setdefault((id(rule_list), index), (rule_list, index, {}))[2][field_name] = float(value)
+            for rule_list, index, fields in changes.values():
+                try:
+                    rule_list[index] = dataclasses.replace(rule_list[index], **fields)
+                except ValueError as error:
+                    raise ValueError(f"Scenario {i} ({fields}): {error}") from error
+            scenarios.append(rules)
+        return scenarios
+
+    def run_on_template(
+        self,
+        template_path: str,
+        cell_size: float = 100.0,
+        random_seed: int = None,
+        distance_field=None,
+        grid_origin: Tuple[float, float] = None
+    ) -> pd.DataFrame:
+        """
+        Preprocessing statistics of all scenarios on one template
+
+        Returns:
+            DataFrame with one row per (scenario, zone): parameter values, cell counts,
+            residential cells and housing type counts / shares
+        """
+        rng = np.random.default_rng(random_seed)
+        scenarios = self.scenario_rules()
+        mode = self.base_rules.sampling.mode
+
+        # zone field computed once for all scenarios
+        data = np.load(template_path)
+        modifier = TemplateModifier(self.base_rules, distance_field=distance_field, grid_origin=grid_origin)
+        zone_index = modifier.compute_zone_index(data['city_center'], cell_size)
+
+        rows = []
+        for i, zone in enumerate(self.base_rules.zones):
+            n_cells = int((zone_index == i).sum())
+            landuse = [rules.get_landuse_rule(zone.name) for rules in scenarios]
+            housing = [rules.get_housing_rule(zone.name) for rules in scenarios]
+            if n_cells == 0 or any(r is None for r in landuse) or any(r is None for r in housing):
+                continue
+
+            residential_pct = np.array([rule.residential_pct for rule in landuse])
+            type_probabilities = np.array([[r.apartment_pct, r.detached_pct, r.terraced_pct] for r in housing])
+
+            if mode == 'random':
+                residential, type_counts = self._random_template_counts(n_cells, residential_pct, type_probabilities, rng)
+            else:
+                residential = np.array([quota_counts([p, 1.0 - p], n_cells)[0] for p in residential_pct])
+                type_counts = np.array([quota_counts(p, n) for p, n in zip(type_probabilities, residential)])
+
+            for s in range(len(scenarios)):
+                row = {'scenario': s, 'zone': zone.name, 'n_cells': n_cells, 'residential_cells': int(residential[s])}
+                for k, building_type in enumerate(HOUSING_TYPES):
+                    row[building_type] = int(type_counts[s, k])
+                    row[f'{building_type}_share'] = type_counts[s, k] / residential[s] if residential[s] else 0.0
+                row['residential_share'] = residential[s] / n_cells
+                rows.append(row)
+
+        return self._tidy(rows)
+
+    def run_on_buildings(
+        self,
+        buildings_df: pd.DataFrame,
+        city_center: Tuple[float, float],
+        random_seed: int = None,
+        distance_field=None
+    ) -> pd.DataFrame:
+        """
+        Postprocessing statistics of all scenarios on one building set
+
+        Args:
+            buildings_df: Buildings with 'x', 'y' and 'area_m2' columns
+            city_center: (x, y) coords of city center
+
+        Returns:
+            DataFrame with one row per (scenario, zone): parameter values, housing and
+            household type counts, mean unit size, households and residents
+        """
+        rng = np.random.default_rng(random_seed)
+        scenarios = self.scenario_rules()
+        mode = self.base_rules.sampling.mode
+
+        # zone field computed once for all scenarios
+        processor = BuildingProcessor(self.base_rules, distance_field=distance_field)
+        zone_index = processor.compute_zone_index(
+            buildings_df['x'].to_numpy(), buildings_df['y'].to_numpy(), city_center
+        )
+        areas = buildings_df['area_m2'].to_numpy(dtype=float) if 'area_m2' in buildings_df else None
+
+        rows = []
+        for i, zone in enumerate(self.base_rules.zones):
+            in_zone = zone_index == i
+            n_buildings = int(in_zone.sum())
+            housing = [rules.get_housing_rule(zone.name) for rules in scenarios]
+            if n_buildings == 0 or any(r is None for r in housing):
+                continue
+            zone_areas = areas[in_zone] if areas is not None else np.full(n_buildings, 100.0)
+
+            household = [rules.get_household_rule(zone.name) for rules in scenarios]
+            unit_size = [rules.get_unit_size_rule(zone.name) for rules in scenarios]
+
+            type_probabilities = np.array([[r.apartment_pct, r.detached_pct, r.terraced_pct] for r in housing])
+            type_codes = self._draw_codes(type_probabilities, n_buildings, rng, mode)
+
+            unit_sizes = self._unit_sizes(unit_size, n_buildings, rng)
+            household_counts = np.where(
+                unit_sizes > 0, np.maximum(1, (zone_areas[None, :] / np.where(unit_sizes > 0, unit_sizes, 1.0)).astype(np.int64)), 0
+            )
+
+            # household types and sizes (scenarios without a household rule get 'none' -> 0 residents)
+            has_household_rule = np.array([r is not None for r in household])
+            household_probabilities = np.array([
+                [r.single_person_pct, r.single_parent_pct, r.two_parent_pct] if r else [1.0, 0.0, 0.0]
+                for r in household
+            ])
+            household_codes = self._draw_codes(household_probabilities, n_buildings, rng, mode)
+            household_sizes = self._household_sizes(household_codes, rng)
+            residents = (household_counts * household_sizes).sum(axis=1) * has_household_rule
+
+            for s in range(len(scenarios)):
+                row = {'scenario': s, 'zone': zone.name, 'n_buildings': n_buildings}
+                type_counts = np.bincount(type_codes[s], minlength=3)
+                for k, building_type in enumerate(HOUSING_TYPES):
+                    row[building_type] = int(type_counts[k])
+                    row[f'{building_type}_share'] = type_counts[k] / n_buildings
+                household_type_counts = np.bincount(household_codes[s], minlength=3) * has_household_rule[s]
+                for k, household_type in enumerate(HOUSEHOLD_TYPES):
+                    row[household_type] = int(household_type_counts[k])
+                row['mean_unit_size'] = float(unit_sizes[s].mean())
+                row['households'] = int(household_counts[s].sum())
+                row['residents'] = int(residents[s])
+                rows.append(row)
+
+        return self._tidy(rows)
+
+    ### ----- BATCHED SAMPLING
+
+    def _random_template_counts(self, n_cells, residential_pct, type_probabilities, rng):
+        # residential cells and housing type counts per scenario, scenarios chunked to bound memory
+        n_scenarios = len(residential_pct)
+        chunk = max(1, MAX_DRAWS_PER_CHUNK // max(n_cells, 1))
+        residential = np.zeros(n_scenarios, dtype=np.int64)
+        type_counts = np.zeros((n_scenarios, 3), dtype=np.int64)
+
+        for start in range(0, n_scenarios, chunk):
+            stop = min(start + chunk, n_scenarios)
+            is_residential = rng.random((stop - start, n_cells)) < residential_pct[start:stop, None]
+            codes = self._draw_codes(type_probabilities[start:stop], n_cells, rng, 'random')
+            residential[start:stop] = is_residential.sum(axis=1)
+            for k in range(3):
+                type_counts[start:stop, k] = ((codes == k) & is_residential).sum(axis=1)
+        return residential, type_counts
+
+    def _draw_codes(self, probabilities: np.ndarray, size: int, rng, mode: str) -> np.ndarray:
+        # (scenarios x size) category codes
+        if mode == 'random':
+            return sample_batch_codes(probabilities, size, rng)
+
+        # quota / clustered: exact counts (placement does not change zone statistics)
+        return np.stack([np.repeat(np.arange(len(p)), quota_counts(p, size)) for p in probabilities])
+
+    def _household_sizes(self, household_codes: np.ndarray, rng) -> np.ndarray:
+        # residents per household from the household size distributions (codes follow HOUSEHOLD_TYPES)
+        sizes = np.ones(household_codes.shape, dtype=np.int64)
+        for k, household_type in enumerate(HOUSEHOLD_TYPES):
+            is_type = household_codes == k
+            n = int(is_type.sum())
+            if n:
+                sizes[is_type] = self._size_samplers[household_type].sample(n, rng)
+        return sizes
+
+    def _unit_sizes(self, unit_size_rules: List, size: int, rng) -> np.ndarray:
+        # (scenarios x size) unit sizes from each scenario's rule distribution (DEFAULT_UNIT_SIZE without a rule)
+        if all(r is not None and r.distribution == 'uniform' for r in unit_size_rules):
+            low = np.array([r.min_size for r in unit_size_rules])[:, None]
+            high = np.array([r.max_size for r in unit_size_rules])[:, None]
+            return low + (high - low) * rng.random((len(unit_size_rules), size))
+        return np.stack([
+            unit_size_table(r).sample(size, rng) if r is not None else np.full(size, DEFAULT_UNIT_SIZE)
+            for r in unit_size_rules
+        ])
+
+    ### ----- HELPERS
+
+    def _resolve(self, rules: RuleSet, path: str):
+        # 'landuse_rules.2_5km.residential_pct' -> (rules.landuse_rules, index, 'residential_pct')
+        parts = path.split('.')
+        if len(parts) != 3:
+            raise ValueError(f"Parameter path must be '<rule list>.<zone>.<field>', got '{path}'")
+        list_name, zone_name, field_name = parts
+
+        rule_list = getattr(rules, list_name, None)
+        if not isinstance(rule_list, list):
+            raise ValueError(f"Unknown rule list '{list_name}' in parameter '{path}'")
+        for index, rule in enumerate(rule_list):
+            if getattr(rule, 'zone', getattr(rule, 'name', None)) == zone_name:
+                if field_name not in {f.name for f in dataclasses.fields(rule)}:
+                    raise ValueError(f"Unknown field '{field_name}' in parameter '{path}'")
+                return rule_list, index, field_name
+        raise ValueError(f"No {list_name} entry for zone '{zone_name}' (parameter '{path}')")
+
+    def _tidy(self, rows: List[dict]) -> pd.DataFrame:
+        # join the parameter values of every scenario to its per-zone statistics
+        stats = pd.DataFrame(rows)
+        if stats.empty:
+            return stats
+        parameters = self.scenario_table().reset_index()
+        table = parameters.merge(stats, on='scenario', how='right')
+        return table.sort_values('scenario', kind='stable').reset_index(drop=True)
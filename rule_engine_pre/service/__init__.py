@@ -0,0 +1,4 @@
+from .session import RuleSession
+from .daemon import serve
+
+__all__ = ['RuleSession', 'serve']
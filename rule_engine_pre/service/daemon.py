@@ -0,0 +1,154 @@
+import argparse
+import json
+import numpy as np
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from service.session import RuleSession
+
+"""
+Warm rule-evaluation daemon on localhost.
+
+Loads one city into a RuleSession and answers evaluations over HTTP, so a
+rule tweak costs one sampling pass instead of a cold pipeline run:
+
+    python service/daemon.py --rules rule.yaml --template template.npz \\
+        --buildings buildings.geojson --city-center city_center.geojson --port 8765
+
+    GET  /status      loaded inputs
+    POST /evaluate    body: rule YAML (any content type but JSON), or JSON
+                      {"rules": "<yaml>" | "diff": {...}, "seed": 1,
+                       "output_template": "...", "output_csv": "...", "update_base": false}
+    POST /shutdown    stop the daemon
+
+    curl -s localhost:8765/evaluate -H 'Content-Type: application/json' \\
+        -d '{"diff": {"landuse_rules": [{"zone": "2_5km", "residential_pct": 0.6}]}, "seed": 1}'
+
+Requests are handled one at a time (the session is shared). The server
+binds to 127.0.0.1 only: it writes files to the paths it is given.
+"""
+
+DEFAULT_PORT = 8765
+REQUEST_FIELDS = ('rules', 'diff', 'seed', 'output_template', 'output_csv', 'update_base')
+
+
+def make_handler(session: RuleSession):
+
+    class RuleRequestHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path != '/status':
+                return self._reply(404, {'error': f"unknown path {self.path}"})
+            self._reply(200, session.describe())
+
+        def do_POST(self):
+            if self.path == '/shutdown':
+                self._reply(200, {'status': 'stopping'})
+                # shutdown() waits for serve_forever, which runs this handler: stop from another thread
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            if self.path != '/evaluate':
+                return self._reply(404, {'error': f"unknown path {self.path}"})
+
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+            try:
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    request = json.loads(body or '{}')
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                    unknown = set(request) - set(REQUEST_FIELDS)
+                    if unknown:
+                        raise ValueError(f"unknown request fields: {sorted(unknown)}")
+                else:
+                    request = {'rules': body}
+                result = session.evaluate(
+                    rules_text=request.get('rules'),
+                    diff=request.get('diff'),
+                    seed=request.get('seed'),
+                    output_template=request.get('output_template'),
+                    output_csv=request.get('output_csv'),
+                    update_base=bool(request.get('update_base', False))
+                )
+            except (ValueError, TypeError, FileNotFoundError) as error:
+                # invalid JSON / YAML / rules (RuleValidationError is a ValueError)
+                return self._reply(400, {'error': str(error)})
+            self._reply(200, result)
+
+        def _reply(self, status: int, payload):
+            data = json.dumps(payload, default=_json_default).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            # one line per request on stdout instead of stderr
+            print(f"  {self.command} {self.path} -> {args[1] if len(args) > 1 else ''}")
+
+    return RuleRequestHandler
+
+
+def serve(session: RuleSession, port: int = DEFAULT_PORT) -> HTTPServer:
+    # bound server (port=0 picks a free port), call serve_forever() on it
+    return HTTPServer(('127.0.0.1', port), make_handler(session))
+
+
+def _json_default(value):
+    # numpy scalars / arrays in the statistics
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep a city loaded and evaluate rule edits over HTTP")
+    parser.add_argument('--rules', required=True, help="base rules YAML")
+    parser.add_argument('--template', default=None, help="CityPy template NPZ")
+    parser.add_argument('--buildings', default=None, help="CityStackGen buildings GeoJSON")
+    parser.add_argument('--city-center', default=None, help="city center GeoJSON")
+    parser.add_argument('--cell-size', type=float, default=100.0)
+    parser.add_argument('--street-network', default=None)
+    parser.add_argument('--grid-origin', type=float, nargs=2, default=None, metavar=('X', 'Y'))
+    parser.add_argument('--distance-cache-dir', default='outputs/cache/distance')
+    parser.add_argument('--geometry-cache-dir', default='outputs/cache/geometry')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    print(f"\n[1] Loading city...")
+    session = RuleSession(
+        args.rules,
+        template_path=args.template,
+        buildings_path=args.buildings,
+        city_center_path=args.city_center,
+        cell_size=args.cell_size,
+        street_network=args.street_network,
+        grid_origin=tuple(args.grid_origin) if args.grid_origin else None,
+        distance_cache_dir=args.distance_cache_dir,
+        geometry_cache_dir=args.geometry_cache_dir
+    )
+    for key, value in session.describe().items():
+        print(f"  {key}: {value}")
+
+    server = serve(session, args.port)
+    host, port = server.server_address[:2]
+    print(f"\n[2] Listening on http://{host}:{port} (POST /evaluate, GET /status, POST /shutdown)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
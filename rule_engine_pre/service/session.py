@@ -0,0 +1,256 @@
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+import sys
+import time
+import yaml
+from pathlib import Path
+from typing import Dict, Tuple
+
+# add parent directory to path for imports
+PARENT_DIR = Path(__file__).parent.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.insert(0, str(PARENT_DIR))
+
+from rules.rule_dataclass import RuleSet
+from rules.parser import RuleParser, YamlLoader
+from distance.network_distance import NetworkDistanceField
+from distance.zones import assign_zones, zone_names
+from preprocessing.template_modifier import TemplateModifier, BUILDING_CLASSES
+from postprocessing.building_processor import BuildingProcessor, get_city_center_from_geojson
+from postprocessing.geometry_cache import load_building_attributes
+
+"""
+A loaded city for repeated rule evaluations.
+
+Everything that does not depend on the rules is loaded once:
+
+- template grids (building_class, cluster_street, city_center)
+- building fields + centroids / areas (geometry cache, polygons are not parsed)
+- city center, street-network distance field
+- distance of every cell and every building to the city center
+
+An evaluation then only parses the rules (compiled RuleSets are cached by
+content), assigns zones from the kept distances (cached per zone set) and
+samples the attributes. Rules are given as full YAML text or as a diff
+that is merged into the session's base rules like an `extends:` scenario:
+
+    session = RuleSession('rule.yaml', template_path='template.npz',
+                          buildings_path='buildings.geojson', city_center_path='city_center.geojson')
+    result = session.evaluate(diff={'landuse_rules': [{'zone': '2_5km', 'residential_pct': 0.6}]}, seed=1)
+
+For a given seed the results equal a cold run of preprocessing /
+postprocessing (straight-line or network distance, non-tiled, serial).
+"""
+
+# compiled RuleSets kept per session
+MAX_CACHED_RULES = 64
+
+
+class RuleSession:
+
+    def __init__(
+        self,
+        rules_yaml: str,
+        template_path: str = None,
+        buildings_path: str = None,
+        city_center_path: str = None,
+        cell_size: float = 100.0,
+        street_network: str = None,
+        grid_origin: Tuple[float, float] = None,
+        distance_cache_dir: str = None,
+        geometry_cache_dir: str = None
+    ):
+        """
+        Args:
+            rules_yaml: Base rule file (diffs are applied to it)
+            template_path: CityPy template NPZ (optional, enables preprocessing statistics)
+            buildings_path: CityStackGen buildings file (optional, enables postprocessing statistics)
+            city_center_path: City center GeoJSON (needed with buildings_path)
+            cell_size: Size of grid cells in meters
+            street_network: Streets GeoJSON / OSM extract for network distance (optional)
+            grid_origin: Real-world (x, y) of cell (0, 0), needed for network distance on the template
+            distance_cache_dir: Directory for cached network distance fields (optional)
+            geometry_cache_dir: Directory of the building geometry cache (default: next to the input)
+        """
+        if template_path is None and buildings_path is None:
+            raise ValueError("A session needs a template, a buildings file or both")
+        if buildings_path is not None and city_center_path is None:
+            raise ValueError("buildings_path needs city_center_path")
+
+        self.parser = RuleParser()
+        self.rules_yaml = Path(rules_yaml).resolve()
+        self.base_document = self.parser.load_document(self.rules_yaml)
+        self.cell_size = cell_size
+        self.grid_origin = grid_origin
+        self.distance_field = None
+        if street_network:
+            self.distance_field = NetworkDistanceField(street_network, cache_dir=distance_cache_dir)
+        # rules hash -> RuleSet, zone key -> (cell zone index, building zone index)
+        self._rules_cache: Dict[str, RuleSet] = {}
+        self._zone_cache: Dict[tuple, tuple] = {}
+
+        base_rules = self.parser.parse_dict(self.base_document, source=str(self.rules_yaml))
+        self.template = None
+        self.cell_distances = None
+        if template_path is not None:
+            with np.load(template_path) as data:
+                self.template = {key: data[key] for key in ('building_class', 'cluster_street', 'city_center')}
+            modifier = TemplateModifier(base_rules, distance_field=self.distance_field, grid_origin=grid_origin)
+            self.cell_distances = modifier._calculate_distance_grid(self.template['city_center'], cell_size)
+
+        self.buildings = None
+        self.building_distances = None
+        if buildings_path is not None:
+            self.buildings = load_building_attributes(buildings_path, geometry_cache_dir)
+            self.city_center = get_city_center_from_geojson(city_center_path)
+            processor = BuildingProcessor(base_rules, distance_field=self.distance_field)
+            self.building_distances = processor._calculate_distance(
+                self.buildings['x'].to_numpy(), self.buildings['y'].to_numpy(), self.city_center
+            )
+
+    # what is loaded (GET /status)
+    def describe(self) -> Dict:
+        return {
+            'rules': str(self.rules_yaml),
+            'template_shape': list(self.template['building_class'].shape) if self.template is not None else None,
+            'buildings': len(self.buildings) if self.buildings is not None else None,
+            'network_distance': self.distance_field is not None,
+            'cached_rules': len(self._rules_cache)
+        }
+
+    # rule document of a request: full YAML text or a diff of the base rules
+    def resolve_document(self, rules_text: str = None, diff: Dict = None) -> Dict:
+        if rules_text is not None and diff is not None:
+            raise ValueError("Give either rule YAML or a diff, not both")
+        if rules_text is None:
+            return self.parser.merge_documents(self.base_document, diff or {})
+
+        try:
+            data = yaml.load(rules_text, Loader=YamlLoader)
+        except yaml.YAMLError as error:
+            raise ValueError(f"invalid YAML: {error}") from error
+        if isinstance(data, dict) and 'extends' in data:
+            # relative to the directory of the base rule file
+            base = self.parser.load_document(self.rules_yaml.parent / str(data['extends']))
+            data = self.parser.merge_documents(base, {key: value for key, value in data.items() if key != 'extends'})
+        return data
+
+    def compile(self, document: Dict) -> RuleSet:
+        # compiled RuleSets are cached by document content
+        key = hashlib.sha1(json.dumps(document, sort_keys=True, default=str).encode()).hexdigest()
+        rules = self._rules_cache.get(key)
+        if rules is None:
+            rules = self.parser.parse_dict(document, source='<request>')
+            if len(self._rules_cache) >= MAX_CACHED_RULES:
+                self._rules_cache.pop(next(iter(self._rules_cache)))
+            self._rules_cache[key] = rules
+        return rules
+
+    def evaluate(
+        self,
+        rules_text: str = None,
+        diff: Dict = None,
+        seed: int = None,
+        output_template: str = None,
+        output_csv: str = None,
+        update_base: bool = False
+    ) -> Dict:
+        """
+        Preprocessing and postprocessing statistics of one rule set
+
+        Args:
+            rules_text: Full rule YAML (may `extends:` a file next to the base rules)
+            diff: Partial rule mapping merged into the base rules (used when rules_text is None)
+            seed: Random seed (same results as a cold run with this seed)
+            output_template: Write the modified template NPZ here (optional)
+            output_csv: Write the classified buildings CSV here (optional)
+            update_base: Later diffs are applied to these rules instead of the current base
+
+        Returns:
+            Dictionary with 'preprocessing' / 'postprocessing' statistics and 'seconds'
+        """
+        start = time.perf_counter()
+        document = self.resolve_document(rules_text, diff)
+        rules = self.compile(document)
+        if update_base:
+            self.base_document = document
+        cell_zones, building_zones = self._zone_index(rules)
+        result = {'seed': seed}
+
+        if self.template is not None:
+            modifier = TemplateModifier(
+                rules, random_seed=seed, distance_field=self.distance_field, grid_origin=self.grid_origin
+            )
+            building_grid, street_grid, zone_grid, stats = modifier.modify_arrays(
+                self.template['building_class'], self.template['cluster_street'], self.template['city_center'],
+                self.cell_size, zone_index=cell_zones
+            )
+            result['preprocessing'] = stats
+            if output_template:
+                Path(output_template).parent.mkdir(parents=True, exist_ok=True)
+                np.savez(
+                    output_template,
+                    building_class=building_grid,
+                    cluster_street=street_grid,
+                    city_center=self.template['city_center'])
+                np.savez(
+                    output_template.replace('.npz', '_zones.npz'),
+                    zone_grid=zone_grid,
+                    city_center=self.template['city_center'])
+
+        if self.buildings is not None:
+            buildings = self.buildings.copy()
+            buildings['distance'] = self.building_distances
+            buildings['zone'] = zone_names(rules.zones, building_zones)
+            processor = BuildingProcessor(rules, random_seed=seed, distance_field=self.distance_field)
+            processor.assign_attributes(buildings)
+            result['postprocessing'] = building_statistics(buildings)
+            if output_csv:
+                Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
+                buildings.to_csv(output_csv, index=False)
+
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    def _zone_index(self, rules: RuleSet):
+        # zones only depend on the zone definitions: reused across rule edits
+        key = tuple((zone.name, zone.min_distance, zone.max_distance) for zone in rules.zones)
+        cached = self._zone_cache.get(key)
+        if cached is None:
+            cached = (
+                assign_zones(rules.zones, self.cell_distances) if self.cell_distances is not None else None,
+                assign_zones(rules.zones, self.building_distances) if self.building_distances is not None else None
+            )
+            self._zone_cache[key] = cached
+        return cached
+
+
+def building_statistics(buildings: pd.DataFrame) -> Dict:
+    # JSON-ready counterpart of the printed postprocessing statistics
+    # (one grouping pass over zone x type, the other counts are sums of it)
+    by_zone_and_type = buildings.groupby(['zone', 'building_type'], observed=True).size()
+    residential = buildings['building_class'].to_numpy() != BUILDING_CLASSES['none']
+    unit_sizes = buildings['unit_size'].to_numpy(dtype=float)
+    unit_sizes = unit_sizes[unit_sizes > 0]
+
+    nested = {}
+    for (zone, building_type), count in by_zone_and_type.items():
+        nested.setdefault(str(zone), {})[str(building_type)] = int(count)
+    return {
+        'total_buildings': len(buildings),
+        'by_zone': {zone: sum(counts.values()) for zone, counts in nested.items()},
+        'by_type': {
+            str(building_type): int(count)
+            for building_type, count in by_zone_and_type.groupby(level=1, observed=True).sum().items()
+        },
+        'by_zone_and_type': nested,
+        'by_household_type': {
+            str(household_type): int(count)
+            for household_type, count in buildings.loc[residential, 'household_type'].value_counts().items()
+        },
+        'households': int(buildings['household_count'].sum()),
+        'residents': int(buildings['resident_count'].sum()),
+        'mean_unit_size': float(unit_sizes.mean()) if len(unit_sizes) else None
+    }
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# the rule engine modules import each other as top-level packages (rules, postprocessing, ...)
+ENGINE_DIR = Path(__file__).parent.parent
+if str(ENGINE_DIR) not in sys.path:
+    sys.path.insert(0, str(ENGINE_DIR))
+
+from rules.parser import RuleParser
+
+RULES_YAML = ENGINE_DIR / 'rule.yaml'
+CITY_CENTER = (233000.0, 582000.0)
+
+
+@pytest.fixture
+def rules_yaml():
+    return RULES_YAML
+
+
+@pytest.fixture
+def rules():
+    return RuleParser().load_from_yaml(str(RULES_YAML))
+
+
+@pytest.fixture
+def city_center():
+    return CITY_CENTER
+
+
+@pytest.fixture
+def buildings():
+    # 3000 buildings up to 6 km around CITY_CENTER (some outside every zone)
+    rng = np.random.default_rng(7)
+    n = 3000
+    radius = rng.uniform(0, 6000, n)
+    angle = rng.uniform(0, 2 * np.pi, n)
+    return pd.DataFrame({
+        'building_id': np.arange(n),
+        'x': CITY_CENTER[0] + radius * np.cos(angle),
+        'y': CITY_CENTER[1] + radius * np.sin(angle),
+        'area_m2': rng.uniform(40, 900, n)
+    })
+
+
+@pytest.fixture
+def buildings_gpkg(tmp_path, buildings):
+    # the buildings fixture as 10 x 10 m squares (EPSG:28992) in a GeoPackage
+    import geopandas as gpd
+    import shapely
+
+    half = 5.0
+    squares = shapely.box(buildings['x'] - half, buildings['y'] - half, buildings['x'] + half, buildings['y'] + half)
+    path = tmp_path / 'buildings.gpkg'
+    gpd.GeoDataFrame({'building_id': buildings['building_id']}, geometry=squares, crs='EPSG:28992').to_file(path)
+    return path
+
+
+@pytest.fixture
+def city_center_geojson(tmp_path):
+    import geopandas as gpd
+    import shapely
+
+    path = tmp_path / 'city_center.geojson'
+    gpd.GeoDataFrame(geometry=[shapely.Point(CITY_CENTER)], crs='EPSG:28992').to_file(path, driver='GeoJSON')
+    return path
+
+
+@pytest.fixture
+def template_npz(tmp_path):
+    # 60 x 70 template of 100 m cells, city center in the middle, street clusters 0-3 and no-street cells
+    rng = np.random.default_rng(5)
+    city_center = np.zeros((60, 70), dtype=np.int8)
+    city_center[30, 35] = 1
+    path = tmp_path / 'template.npz'
+    np.savez_compressed(
+        path,
+        building_class=rng.integers(0, 4, (60, 70)).astype(np.int16),
+        cluster_street=rng.integers(-1, 4, (60, 70)),
+        city_center=city_center
+    )
+    return path
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from sampling.alias import AliasTable, CategoricalSampler, sample_batch_codes
+
+
+def _implied_distribution(table):
+    # P(code) of an alias table: own column share + aliased remainders, each column 1/n
+    n = len(table)
+    p = table.prob.copy()
+    np.add.at(p, table.alias, 1.0 - table.prob)
+    return p / n
+
+
+@pytest.mark.parametrize('probabilities', [
+    [1.0], [0.5, 0.5], [0.1, 0.6, 0.3], [0.0, 0.25, 0.0, 0.75], [3, 1, 1, 1, 2], list(np.linspace(0.01, 1, 17))
+])
+def test_table_reproduces_the_distribution(probabilities):
+    p = np.asarray(probabilities, dtype=float)
+    np.testing.assert_allclose(_implied_distribution(AliasTable(p)), p / p.sum(), atol=1e-12)
+
+
+def test_uniform_grid_gives_exact_shares():
+    table = AliasTable([0.1, 0.6, 0.3])
+    u = (np.arange(100_000) + 0.5) / 100_000
+    np.testing.assert_allclose(np.bincount(table.codes_from_uniform(u)) / len(u), [0.1, 0.6, 0.3], atol=1e-4)
+
+
+def test_sampling_follows_the_probabilities():
+    codes = AliasTable([0.2, 0.0, 0.8]).sample(200_000, np.random.default_rng(0))
+    shares = np.bincount(codes, minlength=3) / len(codes)
+    assert shares[1] == 0
+    np.testing.assert_allclose(shares, [0.2, 0.0, 0.8], atol=0.005)
+
+
+@pytest.mark.parametrize('probabilities', [[], [[0.5, 0.5]], [-0.1, 1.1], [0.0, 0.0], [np.nan, 1.0]])
+def test_invalid_probabilities_are_rejected(probabilities):
+    with pytest.raises(ValueError):
+        AliasTable(probabilities)
+
+
+def test_categorical_sampler_maps_codes_to_categories():
+    sampler = CategoricalSampler.from_dict({'apartment': 0.0, 'detached': 1.0})
+    assert set(sampler.sample(50, np.random.default_rng(0))) == {'detached'}
+    assert list(sampler.from_uniform(np.array([0.0, 0.99]))) == ['detached', 'detached']
+    with pytest.raises(ValueError, match="categories"):
+        CategoricalSampler(['a', 'b'], [1.0])
+
+
+def test_batch_codes_follow_each_row():
+    probabilities = np.array([[1.0, 0.0, 0.0], [0.2, 0.3, 0.5], [0.0, 0.0, 2.0]])
+    codes = sample_batch_codes(probabilities, 100_000, np.random.default_rng(0))
+    assert codes.shape == (3, 100_000)
+    assert (codes[0] == 0).all() and (codes[2] == 2).all()
+    np.testing.assert_allclose(np.bincount(codes[1]) / 100_000, [0.2, 0.3, 0.5], atol=0.01)
@@ -0,0 +1,90 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from readers.citypy import (
+    list_layers, read_layer, read_buildings, read_grid_building_class, zone_mask,
+    BUILDING_COLUMNS, GRID_BUILDING_CLASS_COLUMN
+)
+from rules.rule_dataclass import Zone
+
+CENTER = (1000.0, 1000.0)
+
+
+@pytest.fixture
+def citypy_gpkg(tmp_path):
+    # buildings on a 10 x 10 grid of 200 m, grid layer of 100 m cells with a few wide columns
+    path = tmp_path / 'citypy.gpkg'
+    xs, ys = np.meshgrid(np.arange(10) * 200.0 + 100, np.arange(10) * 200.0 + 100)
+    n = xs.size
+    classes = np.array(['house', 'apartments', 'UNKNOWN', 'shed'], dtype=object)[np.arange(n) % 4]
+    gpd.GeoDataFrame({
+        'subtype': np.where(np.arange(n) % 2, 'residential', 'UNKNOWN'),
+        'class': classes,
+        'enclosure_id': np.arange(n) // 10,
+        'land_use_category': 'urban',
+        'building_class': np.array(['1', '2', '99'], dtype=object)[np.arange(n) % 3],
+        'height': np.full(n, 9.0),
+        'note': ['UNKNOWN'] * n
+    }, geometry=shapely.box(xs.ravel() - 5, ys.ravel() - 5, xs.ravel() + 5, ys.ravel() + 5), crs='EPSG:28992').to_file(
+        path, layer='buildings'
+    )
+    gx, gy = np.meshgrid(np.arange(20) * 100.0, np.arange(20) * 100.0)
+    grid = {f"layer::attribute_{i}::mean": np.zeros(gx.size) for i in range(30)}
+    grid[GRID_BUILDING_CLASS_COLUMN] = np.array(['1', '99', 'UNKNOWN'], dtype=object)[np.arange(gx.size) % 3]
+    gpd.GeoDataFrame(grid, geometry=shapely.box(gx.ravel(), gy.ravel(), gx.ravel() + 100, gy.ravel() + 100), crs='EPSG:28992').to_file(
+        path, layer='grid'
+    )
+    return path
+
+
+def test_layers_are_listed_without_reading_data(citypy_gpkg):
+    layers = list_layers(citypy_gpkg).set_index('layer')
+    assert layers.loc['buildings', 'features'] == 100
+    assert layers.loc['grid', 'features'] == 400
+    assert layers.loc['grid', 'fields'] == 31
+    assert layers.loc['buildings', 'crs'] == 'EPSG:28992'
+
+
+def test_only_requested_columns_are_read(citypy_gpkg):
+    buildings = read_buildings(citypy_gpkg)
+    assert list(buildings.columns) == list(BUILDING_COLUMNS) + ['geometry']
+    attributes = read_buildings(citypy_gpkg, columns=['class'], read_geometry=False)
+    assert list(attributes.columns) == ['class'] and not isinstance(attributes, gpd.GeoDataFrame)
+    with pytest.raises(ValueError, match=r"no columns \['roof'\]"):
+        read_buildings(citypy_gpkg, columns=['class', 'roof'])
+
+
+def test_values_are_normalized(citypy_gpkg):
+    buildings = read_buildings(citypy_gpkg)
+    assert buildings['class'].isna().sum() == 25
+    assert set(buildings['building_class']) == {'1', '2', 'other'}
+    grid = read_grid_building_class(citypy_gpkg, read_geometry=False)
+    assert list(grid.columns) == ['building_class']
+    assert set(grid['building_class'].dropna()) == {'1', 'other'}
+    raw = read_layer(citypy_gpkg, 'buildings', columns=['class'], normalize=False, read_geometry=False)
+    assert (raw['class'] == 'UNKNOWN').sum() == 25
+    dropped = read_layer(citypy_gpkg, 'buildings', columns=['class', 'note'], drop_empty=True)
+    assert 'note' not in dropped.columns
+
+
+def test_features_are_filtered_by_the_driver(citypy_gpkg):
+    in_bbox = read_buildings(citypy_gpkg, bbox=(0, 0, 450, 450))
+    assert len(in_bbox) == 4
+    houses = read_buildings(citypy_gpkg, where="class = 'house'")
+    assert len(houses) == 25 and (houses['class'] == 'house').all()
+    with pytest.raises(ValueError, match='not both'):
+        read_buildings(citypy_gpkg, bbox=(0, 0, 1, 1), zone=zone_mask(CENTER, (0, 100)))
+
+
+def test_zone_masks_select_rings(citypy_gpkg):
+    ring = zone_mask(CENTER, Zone(name='ring', min_distance=300, max_distance=600))
+    assert ring.area == pytest.approx(np.pi * (600 ** 2 - 300 ** 2), rel=1e-3)
+    buildings = read_buildings(citypy_gpkg, zone=ring)
+    distance = shapely.distance(shapely.centroid(buildings.geometry.to_numpy()), shapely.Point(CENTER))
+    assert len(buildings) > 0
+    assert ((distance > 290) & (distance < 610)).all()
+    everything = read_buildings(citypy_gpkg)
+    all_distance = shapely.distance(shapely.centroid(everything.geometry.to_numpy()), shapely.Point(CENTER))
+    assert len(buildings) == int(((all_distance > 305) & (all_distance < 595)).sum())
@@ -0,0 +1,79 @@
+import json
+import numpy as np
+import geopandas as gpd
+import pytest
+import shapely
+
+from postprocessing.building_processor import load_buildings_from_geojson
+from postprocessing.columnar import read_buildings_columnar, write_buildings_columnar
+from postprocessing.main import postprocess_citystackgen_output
+
+
+@pytest.fixture
+def buildings_geojson(tmp_path, buildings_gpkg):
+    path = tmp_path / 'buildings.geojson'
+    gpd.read_file(buildings_gpkg).to_file(path, driver='GeoJSON')
+    return path
+
+
+@pytest.mark.parametrize('chunk_size', [299, 700, 10_000])
+def test_read_matches_a_geodataframe(buildings_gpkg, buildings_geojson, chunk_size):
+    expected = load_buildings_from_geojson(str(buildings_gpkg))
+    for path in (buildings_gpkg, buildings_geojson):
+        attributes, geometry = read_buildings_columnar(str(path), chunk_size=chunk_size)
+        assert len(geometry) == len(attributes) == len(expected)
+        assert len(geometry.chunks) == -(-len(expected) // chunk_size)
+        np.testing.assert_array_equal(attributes['building_id'], expected['building_id'])
+        np.testing.assert_allclose(attributes[['x', 'y', 'area_m2']], expected[['x', 'y', 'area_m2']], rtol=1e-6)
+        assert geometry.to_geoseries().geom_equals_exact(expected.geometry, 1e-9).all()
+
+
+@pytest.mark.parametrize('driver, suffix', [('GeoJSON', '.geojson'), ('GPKG', '.gpkg')])
+def test_write_round_trips(buildings_gpkg, tmp_path, driver, suffix):
+    attributes, geometry = read_buildings_columnar(str(buildings_gpkg), chunk_size=700)
+    attributes['zone'] = np.where(attributes['x'] > attributes['x'].mean(), 'east', 'west')
+    attributes['zone'] = attributes['zone'].astype('category')
+    attributes.loc[3, 'area_m2'] = np.nan
+
+    path = tmp_path / f'out{suffix}'
+    write_buildings_columnar(str(path), attributes, geometry, driver=driver)
+    written = gpd.read_file(path)
+    assert written.crs == 'EPSG:28992'
+    np.testing.assert_array_equal(written['zone'], attributes['zone'].astype(str))
+    np.testing.assert_allclose(written['area_m2'], attributes['area_m2'], rtol=1e-6)
+    assert np.isnan(written.loc[3, 'area_m2'])
+    assert written.geometry.geom_equals_exact(geometry.to_geoseries(), 1e-9).all()
+
+
+def test_geojson_output_is_a_plain_feature_collection(tmp_path):
+    squares = shapely.box([4.5, 4.6], [52.0, 52.1], [4.51, 4.61], [52.01, 52.11])
+    source = tmp_path / 'wgs84.geojson'
+    gpd.GeoDataFrame({'name': ['a', 'b']}, geometry=squares, crs='EPSG:4326').to_file(source, driver='GeoJSON')
+    attributes, geometry = read_buildings_columnar(str(source))
+
+    path = tmp_path / 'out.geojson'
+    write_buildings_columnar(str(path), attributes[['name']], geometry)
+    document = json.loads(path.read_text())
+    assert 'crs' not in document
+    assert [feature['properties']['name'] for feature in document['features']] == ['a', 'b']
+
+    write_buildings_columnar(str(path), attributes[[]], geometry)
+    assert [feature['properties'] for feature in json.loads(path.read_text())['features']] == [{}, {}]
+
+
+def test_low_memory_run_writes_every_building(buildings_gpkg, city_center_geojson, rules_yaml, tmp_path):
+    output = tmp_path / 'out.geojson'
+    result = postprocess_citystackgen_output(
+        str(buildings_gpkg), str(city_center_geojson), str(rules_yaml),
+        output_geojson=str(output), random_seed=1, low_memory=True
+    )
+    written = gpd.read_file(output)
+    assert len(written) == len(result) == 3000
+    np.testing.assert_array_equal(written['building_type'], result['building_type'].astype(str))
+
+
+def test_low_memory_rejects_workers(buildings_gpkg, city_center_geojson, rules_yaml):
+    with pytest.raises(ValueError, match="low_memory and workers"):
+        postprocess_citystackgen_output(
+            str(buildings_gpkg), str(city_center_geojson), str(rules_yaml), low_memory=True, workers=2
+        )
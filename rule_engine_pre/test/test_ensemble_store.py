@@ -0,0 +1,117 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from ensemble.store import EnsembleStore, VARIABLES
+from postprocessing.building_processor import BuildingProcessor
+
+SEEDS = [11, 12, 13, 14, 15, 16, 17]
+
+
+@pytest.fixture
+def runs(rules, buildings, city_center):
+    return [BuildingProcessor(rules, random_seed=seed).process_buildings(buildings, city_center) for seed in SEEDS]
+
+
+@pytest.fixture
+def store(tmp_path, runs):
+    # small tiles: 3 runs x 700 buildings, the last run chunk is partial
+    store = EnsembleStore.create(tmp_path / 'ensemble', runs[0], chunk_runs=3, chunk_buildings=700)
+    for seed, result in zip(SEEDS, runs):
+        store.append(result, seed=seed)
+    store.flush()
+    return store
+
+
+def expected_codes(runs, variable):
+    categories = VARIABLES[variable]
+    if categories is None:
+        return np.stack([run[variable].to_numpy() for run in runs])
+    return np.stack([pd.Categorical(run[variable].to_numpy(dtype=object), categories=categories).codes for run in runs])
+
+
+@pytest.mark.parametrize('variable', list(VARIABLES))
+def test_runs_round_trip(store, runs, variable):
+    np.testing.assert_array_equal(store.read(variable), expected_codes(runs, variable))
+    assert store.seeds == SEEDS
+
+
+@pytest.mark.parametrize('selection', [[0, 2, 1, 3], [2999, 0, 700, 699], [5, 5, 4], slice(690, 710)])
+def test_selections_keep_the_requested_order(store, runs, selection):
+    full = expected_codes(runs, 'building_type')
+    np.testing.assert_array_equal(store.read('building_type', runs=[4, 0, 6], buildings=selection), full[[4, 0, 6]][:, selection])
+
+
+def test_reopened_store_continues_the_partial_chunk(store, runs, tmp_path):
+    reopened = EnsembleStore(tmp_path / 'ensemble')
+    assert reopened.seeds == SEEDS
+    reopened.append(runs[0], seed=99)
+    reopened.flush()
+    again = EnsembleStore(tmp_path / 'ensemble')
+    assert again.seeds == SEEDS + [99]
+    np.testing.assert_array_equal(again.read('resident_count'), expected_codes(runs + [runs[0]], 'resident_count'))
+    assert len(list((tmp_path / 'ensemble').glob('runs_*.bin'))) == 3
+
+
+def test_frequency_and_statistics(store, runs):
+    frequency = store.frequency('building_type', buildings=[3, 1])
+    for position, building_id in zip([3, 1], frequency.index):
+        observed = pd.Series([run['building_type'].iloc[position] for run in runs]).value_counts() / len(runs)
+        for building_type, share in observed.items():
+            assert frequency.loc[building_id, building_type] == pytest.approx(share)
+    statistics = store.statistics('resident_count')
+    values = expected_codes(runs, 'resident_count')
+    np.testing.assert_allclose(statistics['mean'], values.mean(axis=0))
+    np.testing.assert_allclose(statistics['std'], values.std(axis=0), atol=1e-9)
+    with pytest.raises(ValueError, match='count variable'):
+        store.frequency('resident_count')
+
+
+def test_zone_distribution_matches_pandas(store, runs):
+    shares = store.zone_distribution('building_type', per_run=True)
+    for run_position, run in enumerate(runs):
+        observed = pd.crosstab(run['zone'], run['building_type'], normalize='index')
+        for zone in observed.index:
+            for building_type in observed.columns:
+                assert shares.loc[(run_position, zone), building_type] == pytest.approx(observed.loc[zone, building_type])
+    totals = store.zone_distribution('household_count', per_run=True)
+    for run_position, run in enumerate(runs):
+        for zone, total in run.groupby('zone')['household_count'].sum().items():
+            assert totals.loc[(run_position, zone), 'total'] == total
+
+
+def test_single_run_and_geometry(tmp_path, runs):
+    frame = gpd.GeoDataFrame(runs[0], geometry=shapely.points(runs[0]['x'], runs[0]['y']), crs='EPSG:28992')
+    store = EnsembleStore.create(tmp_path / 'geo', frame, chunk_runs=2, chunk_buildings=1000)
+    store.append(runs[1], seed=5)
+    run = store.run(-1)
+    assert run.attrs['seed'] == 5
+    assert (run['building_type'].astype(object) == runs[1]['building_type'].astype(object)).all()
+    geometry = store.geometry([10, 3])
+    assert shapely.equals(geometry.to_numpy(), frame.geometry.to_numpy()[[10, 3]]).all()
+    with pytest.raises(ValueError, match='exists'):
+        EnsembleStore.create(tmp_path / 'geo', frame)
+    with pytest.raises(ValueError, match='3000 buildings|buildings, the store'):
+        store.append(runs[1].iloc[:10])
+
+
+@pytest.mark.parametrize('selection', [[6, 0, 3], [4, 0], [2, 5, 2]])
+def test_per_run_zone_distribution_follows_the_requested_runs(store, runs, selection):
+    # runs of several chunks in non-chunk order (and repeated): every row block stays with its run
+    totals = store.zone_distribution('household_count', runs=selection, per_run=True)
+    shares = store.zone_distribution('building_type', runs=selection, per_run=True)
+    n_zones = len(store.zones)
+    for position, run_position in enumerate(selection):
+        run = runs[run_position]
+        run_totals = totals.iloc[position * n_zones:(position + 1) * n_zones].droplevel('run')
+        run_shares = shares.iloc[position * n_zones:(position + 1) * n_zones].droplevel('run')
+        assert set(totals.iloc[position * n_zones:(position + 1) * n_zones].index.get_level_values('run')) == {run_position}
+        assert (run_totals['seed'] == SEEDS[run_position]).all()
+        for zone, total in run.groupby('zone')['household_count'].sum().items():
+            assert run_totals.loc[zone, 'total'] == total
+        observed = pd.crosstab(run['zone'], run['building_type'], normalize='index')
+        for zone in observed.index:
+            for building_type in observed.columns:
+                assert run_shares.loc[zone, building_type] == pytest.approx(observed.loc[zone, building_type])
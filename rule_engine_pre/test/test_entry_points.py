@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+
+from run_preprocessing import check_startup, ENGINE_DIR, FORBIDDEN_MODULES
+
+# import time is only checked against a generous bound: shared CI machines are slow and noisy
+GENEROUS_BUDGET = 10.0
+
+
+def loaded_modules(code: str):
+    # modules of FORBIDDEN_MODULES loaded by running code in a fresh interpreter
+    probe = f"import sys\n{code}\nprint(','.join(name for name in {FORBIDDEN_MODULES!r} if name in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', probe], cwd=str(ENGINE_DIR), capture_output=True, text=True, check=True)
+    return [name for name in output.stdout.strip().split(',') if name]
+
+
+def test_preprocessing_stage_loads_no_postprocessing_stack():
+    assert check_startup(budget=GENEROUS_BUDGET) < GENEROUS_BUDGET
+    assert loaded_modules("import preprocessing.main") == []
+
+
+def test_entry_points_import_their_stage_lazily():
+    assert loaded_modules("import run_preprocessing, run_postprocessing") == []
+
+
+def test_scipy_is_loaded_only_for_parametric_unit_sizes():
+    assert loaded_modules("import sampling") == []
+    assert loaded_modules(
+        "from sampling.inverse_cdf import InverseCDF\nInverseCDF.truncated_normal(70.0, 20.0, 30.0, 150.0)"
+    ) == ['scipy']
+
+
+def test_forbidden_modules_fail_the_check():
+    with pytest.raises(ValueError, match='loads .*geopandas'):
+        check_startup('postprocessing.main', budget=GENEROUS_BUDGET)
+
+
+def test_entry_points_run_from_another_directory(tmp_path):
+    for script in ('run_preprocessing.py', 'run_postprocessing.py'):
+        result = subprocess.run(
+            [sys.executable, str(ENGINE_DIR / script), '--help'], cwd=str(tmp_path), capture_output=True, text=True
+        )
+        assert result.returncode == 0 and 'usage' in result.stdout
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from evaluation.metrics import load_cbs_grid, add_shares, cell_errors, error_metrics
+from postprocessing.grid_aggregation import GridSpec
+
+
+def test_cbs_grid_cells_land_on_the_generated_grid(tmp_path):
+    grid = GridSpec(left=233000.0, top=582000.0, cell_size=500.0, shape=(2, 3))
+    path = tmp_path / 'cbs.csv'
+    pd.DataFrame({
+        'crs28992res500m': ['E2330N5815', 'E2340N5810', 'E2400N5815'],
+        'aantal_inwoners': [120, -99997, 50]
+    }).to_csv(path, index=False)
+    rasters = load_cbs_grid(str(path), grid, columns={'resident_count': 'aantal_inwoners'})
+    expected = np.full((2, 3), np.nan)
+    expected[0, 0] = 120
+    np.testing.assert_array_equal(rasters['resident_count'], expected)
+
+
+def test_shares_from_household_counts():
+    rasters = add_shares({
+        'single_person_count': np.array([[1.0, 0.0]]),
+        'single_parent_count': np.array([[1.0, 0.0]]),
+        'two_parent_count': np.array([[2.0, 0.0]])
+    })
+    np.testing.assert_array_equal(rasters['two_parent_share'], [[0.5, np.nan]])
+
+
+def test_error_metrics_skip_missing_cells_and_split_by_zone():
+    generated = {'resident_count': np.array([[10, 20], [30, 40]])}
+    reference = {'resident_count': np.array([[12.0, 20.0], [np.nan, 36.0]])}
+    np.testing.assert_array_equal(cell_errors(generated, reference)['resident_count'], [[-2, 0], [np.nan, 4]])
+
+    zones = np.array([['inner', 'inner'], ['outer', 'outer']], dtype=object)
+    table = error_metrics(generated, reference, zones=zones).set_index('zone')
+    assert table.loc['all', 'cells'] == 3
+    assert table.loc['all', 'mae'] == pytest.approx(2.0)
+    assert table.loc['all', 'rmse'] == pytest.approx(np.sqrt(20 / 3))
+    assert table.loc['all', 'bias'] == pytest.approx(2 / 3)
+    assert table.loc['outer', 'generated_total'] == 40
+    assert table.loc['inner', 'reference_total'] == 32
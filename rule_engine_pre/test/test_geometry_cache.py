@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import geopandas as gpd
+import shapely
+
+from postprocessing.building_processor import load_buildings_from_geojson
+from postprocessing.main import postprocess_citystackgen_output
+from postprocessing.geometry_cache import prepare_geometry, load_building_attributes, cache_path, file_hash
+
+
+def test_cache_matches_the_geometries(buildings_gpkg, tmp_path):
+    attributes = prepare_geometry(str(buildings_gpkg), tmp_path / 'cache')
+    buildings = gpd.read_file(buildings_gpkg)
+    centroids = shapely.centroid(buildings.geometry.values)
+    np.testing.assert_allclose(attributes['x'], shapely.get_x(centroids))
+    np.testing.assert_allclose(attributes['area_m2'], 100.0)
+    np.testing.assert_allclose(attributes['minx'], buildings.bounds['minx'])
+    assert str(attributes['crs']) == 'EPSG:28992'
+
+
+def test_second_run_reads_the_sidecar(buildings_gpkg, tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    first = prepare_geometry(str(buildings_gpkg), cache_dir)
+    assert cache_path(str(buildings_gpkg), file_hash(str(buildings_gpkg)), cache_dir).exists()
+
+    import postprocessing.geometry_cache as geometry_cache
+    monkeypatch.setattr(geometry_cache.pyogrio.raw, 'read', None)
+    second = prepare_geometry(str(buildings_gpkg), cache_dir)
+    np.testing.assert_array_equal(second['x'], first['x'])
+
+
+def test_changed_file_gets_a_new_cache(buildings_gpkg, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    prepare_geometry(str(buildings_gpkg), cache_dir)
+    moved = gpd.read_file(buildings_gpkg)
+    moved['geometry'] = moved.geometry.translate(xoff=10.0)
+    moved.to_file(buildings_gpkg)
+    attributes = prepare_geometry(str(buildings_gpkg), cache_dir)
+    np.testing.assert_allclose(attributes['x'], shapely.get_x(shapely.centroid(moved.geometry.values)))
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_geographic_input_is_reprojected(buildings_gpkg, tmp_path):
+    wgs84 = tmp_path / 'wgs84.gpkg'
+    gpd.read_file(buildings_gpkg).to_crs('EPSG:4326').to_file(wgs84)
+    attributes = prepare_geometry(str(wgs84))
+    expected = prepare_geometry(str(buildings_gpkg))
+    np.testing.assert_allclose(attributes['x'], expected['x'], atol=0.01)
+    np.testing.assert_allclose(attributes['area_m2'], expected['area_m2'], rtol=1e-3)
+
+
+def test_cached_attributes_match_a_full_load(buildings_gpkg, tmp_path):
+    cached = load_building_attributes(str(buildings_gpkg), tmp_path)
+    full = load_buildings_from_geojson(str(buildings_gpkg))
+    assert 'geometry' not in cached
+    np.testing.assert_array_equal(cached['building_id'], full['building_id'])
+    np.testing.assert_allclose(cached[['x', 'y', 'area_m2']], full[['x', 'y', 'area_m2']])
+    with_cache = load_buildings_from_geojson(str(buildings_gpkg), geometry_cache=True, cache_dir=str(tmp_path))
+    np.testing.assert_allclose(with_cache[['x', 'y']], full[['x', 'y']])
+
+
+@pytest.fixture
+def hash_reads(monkeypatch):
+    # paths file_hash reads (the module's open), with an empty hash cache
+    import postprocessing.geometry_cache as geometry_cache
+    reads = []
+
+    def counting_open(path, *args, **kwargs):
+        reads.append(str(path))
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(geometry_cache, '_hash_cache', geometry_cache.OrderedDict())
+    monkeypatch.setattr(geometry_cache, 'open', counting_open, raising=False)
+    return reads
+
+
+def test_file_hash_is_reused_until_the_file_changes(buildings_gpkg, hash_reads):
+    first = file_hash(str(buildings_gpkg))
+    assert file_hash(str(buildings_gpkg)) == first
+    assert len(hash_reads) == 1
+    with open(buildings_gpkg, 'ab') as f:
+        f.write(b'\0')
+    assert file_hash(str(buildings_gpkg)) != first
+    assert len(hash_reads) == 2
+
+
+@pytest.mark.parametrize('geometry_cache, output, reads', [(False, False, 0), (True, True, 1)])
+def test_postprocessing_hashes_the_input_at_most_once(
+    buildings_gpkg, city_center_geojson, rules_yaml, tmp_path, hash_reads, geometry_cache, output, reads
+):
+    postprocess_citystackgen_output(
+        str(buildings_gpkg), str(city_center_geojson), str(rules_yaml),
+        output_csv=str(tmp_path / 'out.csv') if output else None, random_seed=1,
+        geometry_cache=geometry_cache, geometry_cache_dir=str(tmp_path / 'cache')
+    )
+    assert hash_reads.count(str(buildings_gpkg.resolve())) == reads
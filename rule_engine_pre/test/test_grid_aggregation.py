@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from postprocessing.building_processor import BuildingProcessor
+from postprocessing.grid_aggregation import GridSpec, aggregate_to_grid, grid_to_table, save_grid_npz
+
+
+def test_aligned_grid_covers_all_points_on_cell_multiples():
+    grid = GridSpec.aligned(np.array([1200.0, 2600.0, np.nan]), np.array([3100.0, 3999.0, 5.0]), cell_size=500.0)
+    assert (grid.left, grid.top, grid.shape) == (1000.0, 4000.0, (2, 4))
+    row, col = grid.cell_index(np.array([1200.0, 2600.0]), np.array([3100.0, 3999.0]))
+    np.testing.assert_array_equal(row, [1, 0])
+    np.testing.assert_array_equal(col, [0, 3])
+    assert grid.cbs_ids()[1, 0] == 'E0010N0030'
+
+
+def test_aligned_grid_of_no_points_is_empty():
+    grid = GridSpec.aligned(np.array([]), np.array([]))
+    assert grid.shape == (0, 0)
+    rasters = aggregate_to_grid(pd.DataFrame({'x': [], 'y': [], 'building_type': []}), grid)
+    assert rasters['building_count'].shape == (0, 0)
+    assert len(grid_to_table(rasters, grid, cbs_ids=True)) == 0
+
+
+def test_aggregates_match_a_groupby(rules, buildings, city_center):
+    result = BuildingProcessor(rules, random_seed=1).process_buildings(buildings, city_center)
+    grid = GridSpec(left=230000.0, top=585000.0, cell_size=1000.0, shape=(5, 6))
+    rasters = aggregate_to_grid(result, grid)
+
+    row, col = grid.cell_index(result['x'].to_numpy(), result['y'].to_numpy())
+    inside = (row >= 0) & (row < 5) & (col >= 0) & (col < 6)
+    cells = result[inside].assign(row=row[inside], col=col[inside])
+    expected = cells.groupby(['row', 'col'])
+    assert rasters['outside'] == (~inside).sum()
+    for (r, c), group in expected:
+        assert rasters['building_count'][r, c] == len(group)
+        assert rasters['resident_count'][r, c] == group['resident_count'].sum()
+        residential = (group['building_type'] != 'none').sum()
+        assert rasters['residential_count'][r, c] == residential
+        if residential:
+            assert rasters['apartment_share'][r, c] == pytest.approx((group['building_type'] == 'apartment').sum() / residential)
+    assert rasters['building_count'].sum() == inside.sum()
+
+
+def test_template_grid_and_npz(tmp_path):
+    template = tmp_path / 'template.npz'
+    np.savez(template, building_class=np.zeros((3, 4)))
+    grid = GridSpec.from_template(str(template), grid_origin=(50.0, 250.0), cell_size=100.0)
+    assert (grid.left, grid.top, grid.shape) == (0.0, 300.0, (3, 4))
+
+    rasters = aggregate_to_grid(pd.DataFrame({'x': [10.0, 390.0, 500.0], 'y': [290.0, 10.0, 10.0]}), grid)
+    np.testing.assert_array_equal(np.argwhere(rasters['building_count']), [[0, 0], [2, 3]])
+    save_grid_npz(rasters, grid, tmp_path / 'grid.npz')
+    with np.load(tmp_path / 'grid.npz') as saved:
+        assert int(saved['outside']) == 1
+        assert float(saved['cell_size']) == 100.0
@@ -0,0 +1,104 @@
+import dataclasses
+import pandas as pd
+import pytest
+
+from postprocessing.building_processor import BuildingProcessor
+from postprocessing.incremental import (
+    save_rules_snapshot, load_rules_snapshot, plan_update, apply_update, input_fingerprint, snapshot_path
+)
+from postprocessing.main import postprocess_citystackgen_output
+
+NEW_HOUSING = '    apartment_pct: 0.10\n    detached_pct: 0.10\n    terraced_pct: 0.80'
+
+
+def _with_housing(rules, zone, **shares):
+    rules.housing_rules = [
+        dataclasses.replace(rule, **shares) if rule.zone == zone else rule for rule in rules.housing_rules
+    ]
+    return rules
+
+
+@pytest.fixture
+def snapshot(tmp_path, rules, city_center, buildings_gpkg):
+    output = tmp_path / 'out.csv'
+    output.write_text('')
+    save_rules_snapshot(str(output), rules, city_center, buildings=input_fingerprint(buildings_gpkg), random_seed=1)
+    return load_rules_snapshot(str(output))
+
+
+def test_snapshot_is_stored_next_to_the_output(tmp_path):
+    assert snapshot_path(str(tmp_path / 'out.csv')) == tmp_path / 'out.csv.rules.json'
+    assert snapshot_path(str(tmp_path)) == tmp_path / 'rules.rules.json'
+
+
+def test_plan_recomputes_only_changed_zones(snapshot, rules, city_center, buildings_gpkg):
+    fingerprint = input_fingerprint(buildings_gpkg)
+    assert plan_update(snapshot, rules, city_center, buildings=fingerprint, random_seed=1) == {}
+
+    rules = _with_housing(rules, '1_2km', apartment_pct=0.2, terraced_pct=0.7)
+    plan = plan_update(snapshot, rules, city_center, buildings=fingerprint, random_seed=1)
+    assert set(plan) == {'building_type', 'building_class', 'unit_size', 'household_type', 'household_count', 'resident_count'}
+    assert all(zones == ['1_2km'] for zones in plan.values())
+
+
+def test_plan_forces_a_full_run(snapshot, rules, city_center, buildings_gpkg, tmp_path):
+    fingerprint = input_fingerprint(buildings_gpkg)
+    assert plan_update(snapshot, rules, city_center, buildings=fingerprint, random_seed=2) is None
+    assert plan_update(snapshot, rules, city_center, buildings=fingerprint, random_seed=1, keyed=True) is None
+    assert plan_update(snapshot, rules, (0.0, 0.0), buildings=fingerprint, random_seed=1) is None
+
+    changed = tmp_path / 'other.gpkg'
+    changed.write_bytes(buildings_gpkg.read_bytes() + b'\0')
+    assert plan_update(snapshot, rules, city_center, buildings=input_fingerprint(changed), random_seed=1) is None
+
+    legacy = {key: value for key, value in snapshot.items() if key != 'buildings'}
+    assert plan_update(legacy, rules, city_center, buildings=fingerprint, random_seed=1) is None
+
+
+def test_keyed_update_matches_a_cold_run(rules, buildings, city_center):
+    previous = BuildingProcessor(rules, random_seed=5, keyed=True).process_buildings(buildings, city_center)
+    new_rules = _with_housing(dataclasses.replace(rules), '0_1km', apartment_pct=0.8, detached_pct=0.1, terraced_pct=0.1)
+    cold = BuildingProcessor(new_rules, random_seed=5, keyed=True).process_buildings(buildings, city_center)
+
+    plan = {column: ['0_1km'] for column in ('building_type', 'building_class', 'unit_size', 'household_type',
+                                             'household_count', 'resident_count')}
+    changed = apply_update(BuildingProcessor(new_rules, random_seed=5, keyed=True), previous, plan)
+    assert changed.sum() == (previous['zone'] == '0_1km').sum()
+    pd.testing.assert_frame_equal(previous, cold, check_dtype=False)
+
+
+def _run(buildings_path, center_path, rules_path, output_csv, **kwargs):
+    postprocess_citystackgen_output(
+        str(buildings_path), str(center_path), str(rules_path), output_csv=str(output_csv), random_seed=3, **kwargs
+    )
+    return pd.read_csv(output_csv)
+
+
+def test_incremental_run_matches_a_cold_run(buildings_gpkg, city_center_geojson, rules_yaml, tmp_path):
+    rules_path = tmp_path / 'rules.yaml'
+    rules_path.write_text(rules_yaml.read_text())
+    output_csv = tmp_path / 'incremental.csv'
+    previous = _run(buildings_gpkg, city_center_geojson, rules_path, output_csv, workers=2)
+
+    text = rules_yaml.read_text()
+    start = text.index('apartment_pct', text.index('zone: "0_1km"'))
+    rules_path.write_text(text[:start - 4] + NEW_HOUSING + text[text.index('\n', text.index('terraced_pct', start)):])
+
+    updated = _run(buildings_gpkg, city_center_geojson, rules_path, output_csv, workers=2, incremental=True)
+    cold = _run(buildings_gpkg, city_center_geojson, rules_path, tmp_path / 'cold.csv', workers=2)
+    pd.testing.assert_frame_equal(updated, cold)
+    outside = previous['zone'] != '0_1km'
+    pd.testing.assert_frame_equal(updated[outside], previous[outside])
+    assert (updated.loc[~outside, 'building_type'] != previous.loc[~outside, 'building_type']).any()
+
+
+def test_changed_input_forces_a_full_run(buildings_gpkg, city_center_geojson, rules_yaml, tmp_path, capsys):
+    import geopandas as gpd
+
+    output_csv = tmp_path / 'out.csv'
+    _run(buildings_gpkg, city_center_geojson, rules_yaml, output_csv)
+    gpd.read_file(buildings_gpkg).iloc[:1000].to_file(buildings_gpkg)
+
+    updated = _run(buildings_gpkg, city_center_geojson, rules_yaml, output_csv, incremental=True)
+    assert len(updated) == 1000
+    assert 'No reusable previous output' in capsys.readouterr().out
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from rules.rule_dataclass import UnitSizeRule
+from sampling.inverse_cdf import InverseCDF, unit_size_table, TABLE_SIZE
+
+# evenly spaced probabilities away from the table points
+U = (np.arange(10_000) + 0.5) / 10_000
+
+
+def test_uniform_is_exact():
+    np.testing.assert_allclose(InverseCDF.uniform(40, 120).from_uniform(U), 40 + 80 * U)
+
+
+def _truncated_cdf(distribution, low, high):
+    cdf_low, cdf_high = distribution.cdf(low), distribution.cdf(high)
+    return lambda x: (distribution.cdf(x) - cdf_low) / (cdf_high - cdf_low)
+
+
+@pytest.mark.parametrize('make, distribution, low, high', [
+    (lambda: InverseCDF.truncated_normal(mean=80, std=25, low=30, high=150), stats.norm(80, 25), 30, 150),
+    (
+        lambda: InverseCDF.truncated_lognormal(mean=90, std=40, low=20, high=400),
+        stats.lognorm(s=np.sqrt(np.log1p((40 / 90) ** 2)), scale=90 / np.sqrt(1 + (40 / 90) ** 2)),
+        20, 400
+    ),
+])
+def test_parametric_tables_match_scipy(make, distribution, low, high):
+    table = make()
+    cdf = _truncated_cdf(distribution, low, high)
+    # exact quantiles at the table points ...
+    np.testing.assert_allclose(cdf(table.quantiles), np.linspace(0, 1, TABLE_SIZE), atol=1e-9)
+    # ... and every interval keeps its probability: CDF error below one table step
+    assert np.abs(cdf(table.from_uniform(U)) - U).max() <= 1 / (TABLE_SIZE - 1)
+
+
+def test_empirical_puts_the_bin_shares_into_each_bin():
+    table = InverseCDF.empirical(bins=[0, 50, 75, 100, 200], counts=[1, 0, 2, 1], low=25, high=150)
+    values = table.from_uniform(U)
+    # [25, 50): half a bin of count 1, [75, 100): 2, [100, 150): half of 1 -> 0.5 : 0 : 2 : 0.5
+    shares = np.histogram(values, bins=[25, 50, 75, 100, 150])[0] / len(values)
+    np.testing.assert_allclose(shares, [0.5 / 3, 0.0, 2 / 3, 0.5 / 3], atol=1e-3)
+
+
+def test_sampled_values_stay_in_bounds():
+    rng = np.random.default_rng(0)
+    for table in (InverseCDF.truncated_normal(50, 100, 40, 60), InverseCDF.truncated_lognormal(60, 5, 55, 70)):
+        values = table.sample(50_000, rng)
+        assert values.min() >= table.quantiles[0] and values.max() <= table.quantiles[-1]
+
+
+@pytest.mark.parametrize('make', [
+    lambda: InverseCDF([1.0]),
+    lambda: InverseCDF([2.0, 1.0]),
+    lambda: InverseCDF.truncated_normal(0, 1, 50, 60),
+    lambda: InverseCDF.empirical([0, 10, 20], [1, 0], 15, 20),
+])
+def test_invalid_tables_are_rejected(make):
+    with pytest.raises(ValueError):
+        make()
+
+
+@pytest.mark.parametrize('fields', [
+    {'distribution': 'gamma'},
+    {'distribution': 'truncnormal'},
+    {'distribution': 'truncnormal', 'mean': 80, 'std': 0},
+    {'distribution': 'lognormal', 'mean': -1, 'std': 5},
+    {'distribution': 'empirical', 'bins': [0, 10], 'counts': [1, 2]},
+    {'distribution': 'empirical', 'bins': [0, 10, 5], 'counts': [1, 2]},
+])
+def test_invalid_unit_size_rules_are_rejected(fields):
+    with pytest.raises(ValueError):
+        UnitSizeRule(zone='0_1km', min_size=30, max_size=150, **fields)
+
+
+def test_rules_compile_to_their_distribution():
+    rule = UnitSizeRule(zone='0_1km', min_size=30, max_size=150, distribution='truncnormal', mean=80, std=25)
+    assert len(unit_size_table(rule)) > 2
+    assert len(unit_size_table(UnitSizeRule(zone='0_1km', min_size=30, max_size=150))) == 2
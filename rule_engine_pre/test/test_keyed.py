@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from sampling.keyed import keyed_uniform, resolve_seed, STREAM_RESIDENTIAL, STREAM_BUILDING_TYPE
+
+
+def test_numbers_depend_only_on_the_index():
+    index = np.arange(10_000)
+    full = keyed_uniform(42, STREAM_RESIDENTIAL, index)
+    subset = np.random.default_rng(0).permutation(index)[:500]
+    np.testing.assert_array_equal(keyed_uniform(42, STREAM_RESIDENTIAL, subset), full[subset])
+
+
+def test_numbers_are_uniform_and_streams_differ():
+    index = np.arange(200_000)
+    u = keyed_uniform(7, STREAM_RESIDENTIAL, index)
+    assert u.min() >= 0.0 and u.max() < 1.0
+    assert u.mean() == pytest.approx(0.5, abs=0.005)
+    np.testing.assert_allclose(np.histogram(u, bins=10, range=(0, 1))[0] / len(u), 0.1, atol=0.005)
+    other = keyed_uniform(7, STREAM_BUILDING_TYPE, index)
+    assert abs(np.corrcoef(u, other)[0, 1]) < 0.01
+    assert not np.array_equal(u, keyed_uniform(8, STREAM_RESIDENTIAL, index))
+
+
+def test_missing_seed_is_drawn_once():
+    seeds = {resolve_seed(None) for _ in range(5)}
+    assert len(seeds) == 5
+    assert resolve_seed(3) == 3
+    with pytest.raises(ValueError, match='seed'):
+        keyed_uniform(None, STREAM_RESIDENTIAL, np.arange(3))
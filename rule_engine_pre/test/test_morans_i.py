@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from evaluation import morans_i as morans_module
+from evaluation.morans_i import global_morans_i, local_morans_i
+from evaluation.spatial_weights import grid_weights
+
+
+def _dense_morans_i(values, weights):
+    # textbook formula on a dense weights matrix
+    x = values[weights.mask]
+    z = x - x.mean()
+    w = weights.matrix.toarray()
+    return len(x) / w.sum() * (z @ w @ z) / (z @ z)
+
+
+def test_checkerboard_is_perfectly_dispersed():
+    checkerboard = np.indices((10, 10)).sum(axis=0) % 2
+    result = global_morans_i(checkerboard, grid_weights((10, 10), contiguity='rook'))
+    assert result['I'] == pytest.approx(-1.0)
+    assert result['z'] < -5
+
+
+def test_matches_the_dense_formula():
+    rng = np.random.default_rng(0)
+    values = rng.random((12, 15)).cumsum(axis=1)
+    mask = rng.random((12, 15)) > 0.2
+    weights = grid_weights((12, 15), mask=mask)
+    result = global_morans_i(values, weights)
+    assert result['I'] == pytest.approx(_dense_morans_i(values, weights))
+    assert result['expected'] == pytest.approx(-1 / (mask.sum() - 1))
+
+
+def test_constant_values_have_no_statistic():
+    assert np.isnan(global_morans_i(np.ones((5, 5)), grid_weights((5, 5)))['I'])
+
+
+def test_nan_inside_the_mask_is_rejected():
+    values = np.ones((5, 5))
+    values[2, 2] = np.nan
+    with pytest.raises(ValueError, match="NaN"):
+        global_morans_i(values, grid_weights((5, 5)))
+
+
+def test_permutation_batches_do_not_change_the_test(monkeypatch):
+    values = np.random.default_rng(0).random((30, 30))
+    values[:, :15] += 0.3
+    weights = grid_weights((30, 30))
+    single = global_morans_i(values, weights, permutations=99, rng=np.random.default_rng(1))
+    monkeypatch.setattr(morans_module, 'MAX_PERMUTED_VALUES', 900 * 7)
+    batched = global_morans_i(values, weights, permutations=99, rng=np.random.default_rng(1))
+    assert batched == single
+    # clustered values: no permutation reaches the observed I
+    assert single['p_sim'] == pytest.approx(1 / 100)
+
+
+def test_local_statistics_add_up_to_the_global_one():
+    values = np.random.default_rng(2).random((8, 9))
+    weights = grid_weights((8, 9))
+    local = local_morans_i(values, weights)
+    assert local['I'].sum() == pytest.approx(weights.s0 * global_morans_i(values, weights)['I'])
+
+    z = values - values.mean()
+    lag = weights.lag(z.ravel()).reshape(z.shape)
+    high_high = (z > 0) & (lag > 0)
+    np.testing.assert_array_equal(local['quadrant'] == 1, high_high)
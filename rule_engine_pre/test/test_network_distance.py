@@ -0,0 +1,46 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from distance.network_distance import NetworkDistanceField
+
+
+@pytest.fixture
+def streets(tmp_path):
+    # an L-shaped street (0,0) -> (100,0) -> (100,100) and a separate street far away
+    path = tmp_path / 'streets.geojson'
+    gpd.GeoDataFrame(geometry=[
+        shapely.LineString([(0, 0), (100, 0)]),
+        shapely.LineString([(100, 0), (100, 100)]),
+        shapely.LineString([(500, 500), (600, 500)])
+    ], crs='EPSG:28992').to_file(path, driver='GeoJSON')
+    return path
+
+
+def test_distance_follows_the_streets(streets, tmp_path):
+    field = NetworkDistanceField(streets, cache_dir=tmp_path / 'cache')
+    distances = field.distances(np.array([100.0, 100.0, 0.0]), np.array([100.0, 0.0, 5.0]), (0.0, 0.0))
+    # around the corner (200 m), not straight-line (141 m); points off the street add their snap distance
+    np.testing.assert_allclose(distances, [200.0, 100.0, 5.0])
+
+
+def test_unreachable_streets_are_infinite(streets, tmp_path):
+    field = NetworkDistanceField(streets, cache_dir=tmp_path / 'cache')
+    assert np.isinf(field.distances(np.array([550.0]), np.array([500.0]), (0.0, 0.0))).all()
+
+
+def test_field_is_cached_on_disk(streets, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    first = NetworkDistanceField(streets, cache_dir=cache_dir).distances(np.array([100.0]), np.array([100.0]), (0.0, 0.0))
+    assert len(list(cache_dir.glob('network_*.npz'))) == 1
+
+    cached = NetworkDistanceField(streets, cache_dir=cache_dir)
+    cached._build_graph = None   # a cache hit must not rebuild the graph
+    np.testing.assert_array_equal(cached.distances(np.array([100.0]), np.array([100.0]), (0.0, 0.0)), first)
+
+
+def test_multiple_centers_take_the_nearest(streets, tmp_path):
+    field = NetworkDistanceField(streets, cache_dir=tmp_path / 'cache')
+    distances = field.distances(np.array([100.0]), np.array([100.0]), [(0.0, 0.0), (100.0, 100.0)])
+    np.testing.assert_allclose(distances, [0.0], atol=1e-6)
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from postprocessing.building_processor import BuildingProcessor, load_buildings_from_geojson, get_city_center_from_geojson
+from postprocessing.main import postprocess_citystackgen_output
+from postprocessing.parallel import process_buildings_parallel
+from rules.parser import RuleParser
+
+
+def serial_keyed(rules, buildings, city_center, seed=3):
+    return BuildingProcessor(rules, random_seed=seed, keyed=True).process_buildings(buildings, city_center)
+
+
+@pytest.mark.parametrize('workers', [1, 2, 3])
+def test_zone_partitions_match_a_serial_keyed_run(rules, buildings, city_center, workers):
+    result = process_buildings_parallel(rules, buildings, city_center, random_seed=3, workers=workers)
+    pd.testing.assert_frame_equal(result, serial_keyed(rules, buildings, city_center))
+
+
+def test_tile_partitions_match_a_serial_keyed_run(rules, buildings, city_center):
+    result = process_buildings_parallel(rules, buildings, city_center, random_seed=3, partition_by='tile', tile_size=700.0, workers=2)
+    pd.testing.assert_frame_equal(result, serial_keyed(rules, buildings, city_center))
+
+
+def test_quota_mode_is_exact_per_zone(rules, buildings, city_center):
+    rules.sampling.mode = 'quota'
+    result = process_buildings_parallel(rules, buildings, city_center, random_seed=3, workers=2)
+    pd.testing.assert_frame_equal(result, serial_keyed(rules, buildings, city_center))
+    with pytest.raises(ValueError, match="partition_by='zone'"):
+        process_buildings_parallel(rules, buildings, city_center, partition_by='tile')
+
+
+def test_unseeded_run_uses_one_seed_for_all_workers(rules, buildings, city_center, monkeypatch):
+    # the seed is resolved once in the parent and shipped to every partition
+    import postprocessing.building_processor as building_processor
+    monkeypatch.setattr(building_processor, 'resolve_seed', lambda seed: 99 if seed is None else seed)
+    result = process_buildings_parallel(rules, buildings, city_center, workers=2)
+    pd.testing.assert_frame_equal(result, serial_keyed(rules, buildings, city_center, seed=99))
+
+
+@pytest.fixture
+def clustered_rules_yaml(tmp_path, rules_yaml):
+    path = tmp_path / 'rule.yaml'
+    path.write_text(rules_yaml.read_text().replace('mode: "random"', 'mode: "clustered"'))
+    return path
+
+
+@pytest.mark.parametrize('options, message', [
+    ({'pipelined': True, 'workers': 2}, 'pipelined mode cannot be combined with workers'),
+    ({'pipelined': True, 'low_memory': True, 'geometry_cache': True}, 'low_memory, geometry_cache'),
+    ({'batch_size': 100}, 'batch_size only applies to pipelined mode'),
+    ({'low_memory': True, 'workers': 2}, 'low_memory and workers'),
+    ({'workers': 0}, 'workers must be >= 1'),
+])
+def test_incompatible_options_are_rejected(tmp_path, rules_yaml, options, message):
+    # validation runs before any input is read
+    with pytest.raises(ValueError, match=message):
+        postprocess_citystackgen_output(
+            str(tmp_path / 'missing.gpkg'), str(tmp_path / 'missing.geojson'), str(rules_yaml), **options
+        )
+
+
+def test_workers_reject_clustered_sampling_up_front(tmp_path, clustered_rules_yaml):
+    with pytest.raises(ValueError, match="workers cannot be used with the 'clustered' sampling mode"):
+        postprocess_citystackgen_output(
+            str(tmp_path / 'missing.gpkg'), str(tmp_path / 'missing.geojson'), str(clustered_rules_yaml), workers=2
+        )
+
+
+def test_workers_output_matches_a_serial_keyed_run(buildings_gpkg, city_center_geojson, rules_yaml, tmp_path):
+    result = postprocess_citystackgen_output(
+        str(buildings_gpkg), str(city_center_geojson), str(rules_yaml),
+        output_csv=str(tmp_path / 'out.csv'), random_seed=3, workers=2
+    )
+    expected = serial_keyed(
+        RuleParser().load_from_yaml(str(rules_yaml)),
+        load_buildings_from_geojson(str(buildings_gpkg)),
+        get_city_center_from_geojson(str(city_center_geojson))
+    )
+    pd.testing.assert_frame_equal(pd.DataFrame(result), pd.DataFrame(expected))
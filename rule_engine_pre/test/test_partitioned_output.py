@@ -0,0 +1,69 @@
+import numpy as np
+import geopandas as gpd
+import pytest
+import shapely
+
+from postprocessing.building_processor import add_building_attributes
+from postprocessing.partitioned_output import write_partitioned, read_partitioned, read_manifest, select_shards
+
+
+def _classified(buildings, crs='EPSG:28992'):
+    squares = shapely.box(buildings['x'] - 5, buildings['y'] - 5, buildings['x'] + 5, buildings['y'] + 5)
+    gdf = gpd.GeoDataFrame({'building_id': buildings['building_id']}, geometry=squares, crs='EPSG:28992').to_crs(crs)
+    gdf = add_building_attributes(gdf)
+    gdf['zone'] = np.where(np.hypot(buildings['x'] - 233000.0, buildings['y'] - 582000.0) < 3000, 'inner', 'outer')
+    return gdf
+
+
+@pytest.mark.parametrize('partition_by', ['zone', 'tile', 'zone_tile'])
+def test_shards_hold_every_building_once(buildings, tmp_path, partition_by):
+    gdf = _classified(buildings)
+    manifest = write_partitioned(gdf, tmp_path, partition_by=partition_by, tile_size=2000.0)
+    assert manifest['count'] == len(gdf)
+    restored = read_partitioned(tmp_path)
+    assert sorted(restored['building_id']) == list(range(len(gdf)))
+
+
+@pytest.mark.parametrize('crs', ['EPSG:28992', 'EPSG:4326'])
+def test_bounds_are_in_the_tile_key_crs(buildings, tmp_path, crs):
+    tile_size = 2000.0
+    manifest = write_partitioned(_classified(buildings, crs), tmp_path, partition_by='tile', tile_size=tile_size)
+    assert manifest['crs'] == crs
+    assert manifest['bounds_crs'] == 'EPSG:28992'
+    for shard in manifest['shards']:
+        col, row = shard['tile']
+        minx, miny, maxx, maxy = shard['bounds']
+        # centroid in the tile, polygon at most half a building over its edge
+        assert col * tile_size - 5.01 <= minx and maxx <= (col + 1) * tile_size + 5.01
+        assert row * tile_size - 5.01 <= miny and maxy <= (row + 1) * tile_size + 5.01
+
+
+@pytest.mark.parametrize('crs', ['EPSG:28992', 'EPSG:4326'])
+def test_bbox_read_matches_a_full_filter(buildings, tmp_path, crs):
+    gdf = _classified(buildings, crs)
+    write_partitioned(gdf, tmp_path, partition_by='tile', tile_size=1000.0)
+    bbox = (232000.0, 580000.0, 234500.0, 582000.0)
+    expected = (
+        (gdf['x'] + 5 >= bbox[0]) & (gdf['x'] - 5 <= bbox[2]) & (gdf['y'] + 5 >= bbox[1]) & (gdf['y'] - 5 <= bbox[3])
+    )
+    restored = read_partitioned(tmp_path, bbox=bbox)
+    assert sorted(restored['building_id']) == sorted(gdf.loc[expected, 'building_id'])
+    assert len(select_shards(read_manifest(tmp_path), bbox=bbox)) < len(read_manifest(tmp_path)['shards'])
+
+
+def test_partial_rewrite_keeps_other_zones(buildings, tmp_path):
+    gdf = _classified(buildings)
+    write_partitioned(gdf, tmp_path, partition_by='zone')
+    inner = gdf[gdf['zone'] == 'inner'].copy()
+    inner['marker'] = 1
+    manifest = write_partitioned(inner, tmp_path, partition_by='zone', zones=['inner'])
+    assert manifest['count'] == len(gdf)
+    assert (read_partitioned(tmp_path, zones=['inner'])['marker'] == 1).all()
+    assert len(read_partitioned(tmp_path, zones=['outer'])) == (gdf['zone'] == 'outer').sum()
+
+
+def test_partial_rewrite_rejects_another_layout(buildings, tmp_path):
+    gdf = _classified(buildings)
+    write_partitioned(gdf, tmp_path, partition_by='zone_tile', tile_size=1000.0)
+    with pytest.raises(ValueError, match="different layout"):
+        write_partitioned(gdf, tmp_path, partition_by='zone_tile', tile_size=500.0, zones=['inner'])
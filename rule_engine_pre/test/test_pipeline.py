@@ -0,0 +1,131 @@
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.executor import StageExecutor
+from pipeline.multi_seed import run_multi_seed
+
+# stand-in for CityStackGen: seeded random squares around the center of the template grid
+GENERATOR_STUB = '''
+import sys
+import numpy as np
+import geopandas as gpd
+import shapely
+
+template, output_dir, seed = sys.argv[1], sys.argv[2], int(sys.argv[3])
+np.load(template)
+rng = np.random.default_rng(seed)
+n = 200 + seed
+x = 233000.0 + rng.uniform(-4000, 4000, n)
+y = 582000.0 + rng.uniform(-4000, 4000, n)
+gpd.GeoDataFrame({'building_id': np.arange(n)}, geometry=shapely.box(x - 5, y - 5, x + 5, y + 5), crs='EPSG:28992').to_file(
+    output_dir + '/buildings.geojson', driver='GeoJSON')
+gpd.GeoDataFrame(geometry=[shapely.Point(233000.0, 582000.0)], crs='EPSG:28992').to_file(
+    output_dir + '/city_center.geojson', driver='GeoJSON')
+'''
+
+
+def test_stages_get_the_results_of_their_dependencies():
+    executor = StageExecutor(max_pending=2)
+    executor.add_stage('a', lambda item, inputs: item * 10)
+    executor.add_stage('b', lambda item, inputs: inputs['a'] + 1, depends_on=['a'])
+    executor.add_stage('c', lambda item, inputs: inputs['a'] + 2, workers=2, depends_on=['a'])
+    executor.add_stage('d', lambda item, inputs: (inputs['b'], inputs['c']), depends_on=['b', 'c'])
+    result = executor.run(range(5))
+    assert {item: values['d'] for item, values in result.results.items()} == {i: (10 * i + 1, 10 * i + 2) for i in range(5)}
+    assert len(result.timeline) == 20
+    assert set(result.busy_time()) == {'a', 'b', 'c', 'd'}
+
+
+def test_stages_of_different_items_overlap():
+    active = set()
+    overlaps = []
+    lock = threading.Lock()
+
+    def stage(name):
+        def run(item, inputs):
+            with lock:
+                active.add(name)
+                overlaps.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.discard(name)
+            return item
+        return run
+
+    executor = StageExecutor()
+    executor.add_stage('first', stage('first'))
+    executor.add_stage('second', stage('second'), depends_on=['first'])
+    executor.run(range(4))
+    assert max(overlaps) == 2
+
+
+def test_errors_stop_the_run():
+    def fail(item, inputs):
+        if item == 2:
+            raise ValueError("broken")
+        return item
+
+    executor = StageExecutor()
+    executor.add_stage('first', lambda item, inputs: item)
+    executor.add_stage('second', fail, depends_on=['first'])
+    with pytest.raises(RuntimeError, match="Stage 'second' failed for item 2: broken"):
+        executor.run(range(100))
+
+
+@pytest.mark.parametrize('stage, message', [
+    (('a', None, 1, ()), "already exists"),
+    (('b', None, 0, ()), "at least 1 worker"),
+    (('b', None, 1, ('x',)), "unknown stage 'x'"),
+])
+def test_invalid_stages_are_rejected(stage, message):
+    executor = StageExecutor().add_stage('a', lambda item, inputs: item)
+    with pytest.raises(ValueError, match=message):
+        executor.add_stage(*stage)
+
+
+@pytest.fixture
+def template(tmp_path):
+    shape = (80, 80)
+    city_center = np.zeros(shape, dtype=np.int64)
+    city_center[40, 40] = 1
+    path = tmp_path / 'template.npz'
+    np.savez(path, building_class=np.full(shape, 99), cluster_street=np.zeros(shape, dtype=np.int64), city_center=city_center)
+    return path
+
+
+def test_multi_seed_returns_paths_and_summaries(tmp_path, template, rules_yaml):
+    stub = tmp_path / 'generator.py'
+    stub.write_text(GENERATOR_STUB)
+    result = run_multi_seed(
+        seeds=[1, 2, 3],
+        input_template=str(template),
+        rules_yaml=str(rules_yaml),
+        generator_command=[sys.executable, str(stub), '{template}', '{output_dir}', '{seed}'],
+        output_root=str(tmp_path / 'seeds'),
+        generate_workers=2
+    )
+    assert sorted(result.results) == [1, 2, 3]
+    for seed, stages in result.results.items():
+        assert stages['preprocess'].exists()
+        post = stages['postprocess']
+        written = pd.read_csv(post['csv'])
+        assert post['geojson'].exists()
+        assert post['summary']['buildings'] == len(written) == 200 + seed
+        assert post['summary']['residents'] == written['resident_count'].sum()
+        assert post['summary']['zones'] == written['zone'].value_counts().to_dict()
+        assert not any(isinstance(value, pd.DataFrame) for value in post.values())
+
+
+def test_multi_seed_reports_generator_failures(tmp_path, template, rules_yaml):
+    with pytest.raises(RuntimeError, match="Generator failed for seed 1"):
+        run_multi_seed(
+            seeds=[1],
+            input_template=str(template),
+            rules_yaml=str(rules_yaml),
+            generator_command=[sys.executable, '-c', 'raise SystemExit(3)'],
+            output_root=str(tmp_path / 'seeds')
+        )
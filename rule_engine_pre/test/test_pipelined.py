@@ -0,0 +1,101 @@
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+
+from postprocessing.building_processor import BuildingProcessor, load_buildings_from_geojson
+from postprocessing.pipelined import run_pipelined_postprocessing, _read_batches, _BackgroundIterator
+
+
+def test_read_batches_streams_the_file_in_order(buildings_gpkg):
+    batches = list(_read_batches(str(buildings_gpkg), batch_size=1300))
+    assert [len(batch) for batch in batches] == [1300, 1300, 400]
+    assert [batch.index[0] for batch in batches] == [0, 1300, 2600]
+    np.testing.assert_array_equal(pd.concat(batches)['building_id'], np.arange(3000))
+
+
+def test_unbatched_run_matches_a_serial_run(buildings_gpkg, city_center_geojson, rules_yaml, rules, city_center, tmp_path):
+    output_csv = tmp_path / 'out.csv'
+    result, _, center = run_pipelined_postprocessing(
+        str(buildings_gpkg), str(city_center_geojson), str(rules_yaml), output_csv=str(output_csv), random_seed=3
+    )
+    expected = BuildingProcessor(rules, random_seed=3).process_buildings(
+        load_buildings_from_geojson(str(buildings_gpkg)), city_center
+    )
+    assert center == pytest.approx(city_center)
+    pd.testing.assert_frame_equal(result.drop(columns='geometry'), expected.drop(columns='geometry'))
+    assert len(pd.read_csv(output_csv)) == 3000
+
+
+def test_batched_run_writes_every_batch(buildings_gpkg, city_center_geojson, rules_yaml, tmp_path):
+    output_csv = tmp_path / 'out.csv'
+    result, _, _ = run_pipelined_postprocessing(
+        str(buildings_gpkg), str(city_center_geojson), str(rules_yaml),
+        output_csv=str(output_csv), random_seed=3, batch_size=700
+    )
+    written = pd.read_csv(output_csv)
+    np.testing.assert_array_equal(written['building_id'], np.arange(3000))
+    np.testing.assert_array_equal(written['zone'], result['zone'])
+
+
+def test_batched_run_rejects_quota_sampling(buildings_gpkg, city_center_geojson, tmp_path, rules_yaml):
+    quota_yaml = tmp_path / 'quota.yaml'
+    quota_yaml.write_text(rules_yaml.read_text().replace('mode: "random"', 'mode: "quota"'))
+    with pytest.raises(ValueError, match="batch_size=None"):
+        run_pipelined_postprocessing(str(buildings_gpkg), str(city_center_geojson), str(quota_yaml), batch_size=500)
+
+
+def test_reader_thread_stops_on_error():
+    def endless():
+        while True:
+            yield 0
+
+    before = threading.active_count()
+    batches = _BackgroundIterator(endless(), max_pending=2)
+    for _ in zip(range(3), batches):
+        pass
+    batches.close()
+    assert threading.active_count() == before
+
+
+@pytest.fixture
+def failing_geojson_writer(monkeypatch):
+    import postprocessing.pipelined as pipelined
+
+    def fail(path, batch_index, batch):
+        raise OSError(f"disk full writing batch {batch_index}")
+
+    monkeypatch.setattr(pipelined, '_write_geojson_batch', fail)
+
+
+def test_write_error_is_raised_after_every_writer_finished(
+    buildings_gpkg, city_center_geojson, rules_yaml, tmp_path, failing_geojson_writer
+):
+    output_csv = tmp_path / 'out.csv'
+    with pytest.raises(OSError, match='disk full writing batch 0'):
+        run_pipelined_postprocessing(
+            str(buildings_gpkg), str(city_center_geojson), str(rules_yaml),
+            output_geojson=str(tmp_path / 'out.geojson'), output_csv=str(output_csv), random_seed=3, batch_size=3000
+        )
+    # the CSV writer after the failing one was still drained and joined
+    np.testing.assert_array_equal(pd.read_csv(output_csv)['building_id'], np.arange(3000))
+
+
+def test_classification_error_is_not_hidden_by_a_write_error(
+    buildings_gpkg, city_center_geojson, rules_yaml, tmp_path, failing_geojson_writer, monkeypatch
+):
+    calls = []
+
+    def process_buildings(self, batch, city_center, keys=None):
+        calls.append(len(batch))
+        if len(calls) == 2:
+            raise RuntimeError("classification failed")
+        return original(self, batch, city_center)
+
+    original = BuildingProcessor.process_buildings
+    monkeypatch.setattr(BuildingProcessor, 'process_buildings', process_buildings)
+    with pytest.raises(RuntimeError, match='classification failed'):
+        run_pipelined_postprocessing(
+            str(buildings_gpkg), str(city_center_geojson), str(rules_yaml),
+            output_geojson=str(tmp_path / 'out.geojson'), random_seed=3, batch_size=1000
+        )
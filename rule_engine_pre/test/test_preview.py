@@ -0,0 +1,108 @@
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from preprocessing.template_modifier import ZONE_IDS
+from preview.png import write_png, PNG_SIGNATURE
+from preview.render import (
+    render_points, render_footprints, preview_buildings, preview_grid, PALETTES, BACKGROUND_COLOR, CENTER_COLOR
+)
+
+
+def read_png(path):
+    # decoder for the subset write_png produces: 8-bit palette / RGB, filter type 0, CRCs checked
+    data = path.read_bytes()
+    assert data[:8] == PNG_SIGNATURE
+    chunks, position = {}, 8
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        (crc,) = struct.unpack('>I', data[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(kind + body) & 0xFFFFFFFF
+        chunks[kind] = chunks.get(kind, b'') + body
+        position += 12 + length
+    width, height, depth, color_type = struct.unpack('>IIBB', chunks[b'IHDR'][:10])
+    assert depth == 8
+    channels = 3 if color_type == 2 else 1
+    raw = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8).reshape(height, width * channels + 1)
+    assert (raw[:, 0] == 0).all()
+    image = raw[:, 1:].reshape(height, width, channels).squeeze(axis=2) if channels == 1 else raw[:, 1:].reshape(height, width, 3)
+    palette = None
+    if b'PLTE' in chunks:
+        palette = [tuple(color) for color in np.frombuffer(chunks[b'PLTE'], dtype=np.uint8).reshape(-1, 3).tolist()]
+    return image, palette
+
+
+def test_palette_and_rgb_images_round_trip(tmp_path):
+    image = np.random.default_rng(0).integers(0, 3, (17, 23)).astype(np.uint8)
+    palette = [(255, 255, 255), (10, 20, 30), (200, 100, 0)]
+    write_png(tmp_path / 'palette.png', image, palette)
+    decoded, decoded_palette = read_png(tmp_path / 'palette.png')
+    np.testing.assert_array_equal(decoded, image)
+    assert decoded_palette == palette
+
+    rgb = np.random.default_rng(1).integers(0, 256, (5, 4, 3)).astype(np.uint8)
+    write_png(tmp_path / 'rgb.png', rgb)
+    decoded, decoded_palette = read_png(tmp_path / 'rgb.png')
+    np.testing.assert_array_equal(decoded, rgb)
+    assert decoded_palette is None
+
+
+@pytest.mark.parametrize('image, palette, message', [
+    (np.zeros((2, 2)), None, 'need a palette'),
+    (np.full((2, 2), 3), [(0, 0, 0)] * 3, 'outside the palette'),
+    (np.zeros((2, 2, 4)), None, 'Expected a'),
+])
+def test_invalid_images_are_rejected(tmp_path, image, palette, message):
+    with pytest.raises(ValueError, match=message):
+        write_png(tmp_path / 'bad.png', image, palette)
+
+
+def test_points_are_drawn_north_up():
+    # bounds 0..10 m at 1 m/pixel: 11 x 11 pixels, y = 10 is the top row
+    image = render_points(np.array([0.5, 9.5]), np.array([9.5, 0.5]), np.array([1, 2], dtype=np.uint8), (0, 0, 10, 10), 1.0)
+    assert image.shape == (11, 11)
+    assert image[0, 0] == 1 and image[9, 9] == 2
+    assert np.count_nonzero(image) == 2
+
+
+def test_footprints_fill_their_pixels():
+    polygons = np.array([shapely.box(0, 0, 10, 10), shapely.box(20.2, 20.2, 20.4, 20.4)])
+    image = render_footprints(polygons, np.array([1, 2], dtype=np.uint8), (0, 0, 30, 30), 1.0)
+    # 10 x 10 pixel centers inside the large square, one pixel for the small one
+    assert np.count_nonzero(image == 1) == 100
+    assert np.count_nonzero(image == 2) == 1
+
+
+def test_building_preview_from_csv(tmp_path):
+    frame = pd.DataFrame({
+        'x': [0.0, 50.0, 100.0], 'y': [0.0, 50.0, 100.0], 'building_type': ['apartment', 'detached', 'castle']
+    })
+    frame.to_csv(tmp_path / 'buildings.csv', index=False)
+    legend = preview_buildings(str(tmp_path / 'buildings.csv'), str(tmp_path / 'buildings.png'), resolution=10.0)
+    image, palette = read_png(tmp_path / 'buildings.png')
+
+    assert legend == PALETTES['building_type']
+    drawn = [palette[code] for code in image[image > 0]]
+    assert sorted(drawn) == sorted([legend['apartment'], legend['detached'], palette[-1]])
+    with pytest.raises(ValueError, match='no footprints'):
+        preview_buildings(str(tmp_path / 'buildings.csv'), str(tmp_path / 'x.png'), footprints=True)
+
+
+def test_zone_grid_preview(tmp_path):
+    zone_grid = np.array([[ZONE_IDS['0_1km'], ZONE_IDS['2_5km']], [ZONE_IDS['unknown'], ZONE_IDS['1_2km']]])
+    center = np.array([[1, 0], [0, 0]])
+    np.savez(tmp_path / 'zones.npz', zone_grid=zone_grid, city_center=center)
+    legend = preview_grid(str(tmp_path / 'zones.npz'), str(tmp_path / 'zones.png'), scale=3)
+    image, palette = read_png(tmp_path / 'zones.png')
+
+    assert image.shape == (6, 6)
+    colors = np.array(palette)[image]
+    assert tuple(colors[0, 0]) == CENTER_COLOR
+    assert tuple(colors[0, 5]) == legend['2_5km']
+    assert tuple(colors[5, 5]) == legend['1_2km']
+    assert tuple(colors[5, 0]) not in set(legend.values()) | {BACKGROUND_COLOR}
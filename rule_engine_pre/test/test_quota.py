@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from postprocessing.building_processor import BuildingProcessor
+from preprocessing.template_modifier import TemplateModifier
+from rules.rule_dataclass import SamplingConfig
+from sampling.quota import quota_counts, quota_assign, quota_assign_by_rank
+
+
+@pytest.mark.parametrize('size', [0, 1, 7, 10, 999, 1000])
+def test_quota_counts_add_up(size):
+    counts = quota_counts([0.5, 0.2, 0.3], size)
+    assert counts.sum() == size
+    # largest remainder: every count is floor or ceil of size * p
+    assert (np.abs(counts - np.array([0.5, 0.2, 0.3]) * size) < 1).all()
+
+
+def test_quota_counts_largest_remainder():
+    # 10 * (1/3, 1/3, 1/3) = 3.33 each -> the first category gets the extra item
+    np.testing.assert_array_equal(quota_counts([1, 1, 1], 10), [4, 3, 3])
+    np.testing.assert_array_equal(quota_counts([0.15, 0.85], 10), [2, 8])
+    np.testing.assert_array_equal(quota_counts([0.14, 0.86], 10), [1, 9])
+
+
+def test_quota_assign_hits_the_counts_in_random_order():
+    codes = quota_assign(1000, [0.1, 0.6, 0.3], np.random.default_rng(0))
+    np.testing.assert_array_equal(np.bincount(codes), [100, 600, 300])
+    assert not (np.diff(codes) >= 0).all()
+
+
+def test_quota_assign_by_rank_thresholds_values():
+    values = np.random.default_rng(0).random(100)
+    codes = quota_assign_by_rank(values, [0.2, 0.8])
+    np.testing.assert_array_equal(np.bincount(codes), [20, 80])
+    assert values[codes == 0].max() < values[codes == 1].min()
+
+
+def test_processor_quota_mode_is_exact_per_zone(rules, buildings, city_center):
+    rules.sampling = SamplingConfig(mode='quota')
+    result = BuildingProcessor(rules, random_seed=1).process_buildings(buildings, city_center)
+    for zone in rules.zones:
+        housing = rules.get_housing_rule(zone.name)
+        types = result.loc[result['zone'] == zone.name, 'building_type']
+        expected = quota_counts([housing.apartment_pct, housing.detached_pct, housing.terraced_pct], len(types))
+        np.testing.assert_array_equal(
+            [(types == name).sum() for name in ('apartment', 'detached', 'terraced')], expected
+        )
+
+
+def test_template_quota_mode_is_exact_per_zone(rules):
+    rules.sampling = SamplingConfig(mode='quota')
+    shape = (80, 80)
+    city_center = np.zeros(shape, dtype=np.int64)
+    city_center[40, 40] = 1
+    _, _, _, stats = TemplateModifier(rules, random_seed=1).modify_arrays(
+        np.full(shape, 99), np.zeros(shape, dtype=np.int64), city_center, cell_size=50.0
+    )
+    for zone in rules.zones:
+        cells = stats['by_zone'][zone.name]
+        residential_pct = rules.get_landuse_rule(zone.name).residential_pct
+        residential = quota_counts([residential_pct, 1 - residential_pct], cells)[0]
+        housing = rules.get_housing_rule(zone.name)
+        expected = quota_counts([housing.apartment_pct, housing.detached_pct, housing.terraced_pct], residential)
+        by_type = stats['by_zone_and_type'][zone.name]
+        assert [by_type.get(name, 0) for name in ('apartment', 'detached', 'terraced')] == expected.tolist()
@@ -0,0 +1,103 @@
+import numpy as np
+
+from postprocessing.building_processor import BuildingProcessor
+from preprocessing.template_modifier import TemplateModifier
+from rules.rule_dataclass import SamplingConfig
+from sampling.quota import quota_counts
+from sampling.random_field import gaussian_random_field, field_at_points
+
+
+def neighbour_correlation(field):
+    return np.corrcoef(field[:, :-1].ravel(), field[:, 1:].ravel())[0, 1]
+
+
+def test_field_is_standardized():
+    field = gaussian_random_field((120, 90), 5.0, np.random.default_rng(0))
+    assert field.shape == (120, 90) and field.dtype == np.float32
+    assert abs(float(field.mean())) < 1e-5 and abs(float(field.std()) - 1) < 1e-5
+
+
+def test_correlation_grows_with_length():
+    rng = np.random.default_rng(0)
+    white = gaussian_random_field((200, 200), 0.0, rng)
+    smooth = gaussian_random_field((200, 200), 8.0, rng)
+    assert abs(neighbour_correlation(white)) < 0.05
+    assert neighbour_correlation(smooth) > 0.9
+
+
+def test_field_at_points():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 2000, 500), rng.uniform(0, 2000, 500)
+    values = field_at_points(x, y, 300.0, rng)
+    assert values.shape == (500,)
+    assert len(field_at_points(np.array([]), np.array([]), 300.0, rng)) == 0
+
+
+def same_type_share(grid):
+    # share of horizontally adjacent cell pairs with the same class
+    return float((grid[:, :-1] == grid[:, 1:]).mean())
+
+
+def run_template(rules, mode):
+    rules.sampling = SamplingConfig(mode=mode, correlation_length=400.0)
+    shape = (100, 100)
+    city_center = np.zeros(shape, dtype=np.int64)
+    city_center[50, 50] = 1
+    building_grid, _, _, stats = TemplateModifier(rules, random_seed=2).modify_arrays(
+        np.full(shape, 99), np.zeros(shape, dtype=np.int64), city_center, cell_size=50.0
+    )
+    return building_grid, stats
+
+
+def test_clustered_template_is_exact_and_clustered(rules):
+    clustered, stats = run_template(rules, 'clustered')
+    random, _ = run_template(rules, 'random')
+    assert same_type_share(clustered) > same_type_share(random) + 0.1
+
+    for zone in rules.zones:
+        housing = rules.get_housing_rule(zone.name)
+        by_type = stats['by_zone_and_type'][zone.name]
+        residential = sum(count for name, count in by_type.items() if name != 'none')
+        expected = quota_counts([housing.apartment_pct, housing.detached_pct, housing.terraced_pct], residential)
+        assert [by_type.get(name, 0) for name in ('apartment', 'detached', 'terraced')] == expected.tolist()
+
+
+def test_clustered_buildings_are_exact_per_zone(rules, buildings, city_center):
+    rules.sampling = SamplingConfig(mode='clustered', correlation_length=300.0)
+    result = BuildingProcessor(rules, random_seed=1).process_buildings(buildings, city_center)
+    for zone in rules.zones:
+        housing = rules.get_housing_rule(zone.name)
+        types = result.loc[result['zone'] == zone.name, 'building_type']
+        expected = quota_counts([housing.apartment_pct, housing.detached_pct, housing.terraced_pct], len(types))
+        assert [(types == name).sum() for name in ('apartment', 'detached', 'terraced')] == expected.tolist()
+
+
+def test_white_noise_points_need_no_grid(monkeypatch):
+    import sampling.random_field as random_field
+
+    def no_grid(*args):
+        raise AssertionError("white noise must not build a helper grid")
+
+    monkeypatch.setattr(random_field, 'gaussian_random_field', no_grid)
+    rng = np.random.default_rng(0)
+    values = field_at_points(rng.uniform(0, 20000, 1000), rng.uniform(0, 20000, 1000), 0.0, rng)
+    assert values.shape == (1000,) and values.dtype == np.float32
+    assert abs(float(values.mean())) < 0.15 and abs(float(values.std()) - 1) < 0.15
+
+
+def test_tiny_correlation_length_keeps_the_grid_bounded(monkeypatch):
+    import sampling.random_field as random_field
+    shapes = []
+    original = random_field.gaussian_random_field
+
+    def recording(shape, correlation_length, rng):
+        shapes.append(shape)
+        return original(shape, correlation_length, rng)
+
+    monkeypatch.setattr(random_field, 'gaussian_random_field', recording)
+    monkeypatch.setattr(random_field, 'MAX_FIELD_CELLS', 1_000_000)
+    rng = np.random.default_rng(0)
+    # 1 m correlation over 20 km would be 80000 x 80000 cells of 0.25 m
+    values = field_at_points(np.array([0.0, 20000.0, 5.0]), np.array([0.0, 20000.0, 5.0]), 1.0, rng)
+    assert values.shape == (3,)
+    assert shapes[0][0] * shapes[0][1] <= 1_000_000
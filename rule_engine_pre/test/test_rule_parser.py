@@ -0,0 +1,86 @@
+import os
+import pytest
+
+from rules import parser as parser_module
+from rules.parser import RuleParser, RuleValidationError
+
+
+@pytest.fixture(autouse=True)
+def clear_rule_cache():
+    RuleParser.clear_cache()
+    yield
+    RuleParser.clear_cache()
+
+
+def _write(path, text):
+    path.write_text(text)
+    return path
+
+
+def test_extends_merges_rules_by_zone(tmp_path, rules_yaml):
+    base = _write(tmp_path / 'base.yaml', rules_yaml.read_text())
+    scenario = _write(tmp_path / 'scenario.yaml', (
+        "extends: base.yaml\n"
+        "housing_rules:\n"
+        "  - zone: \"1_2km\"\n"
+        "    apartment_pct: 0.9\n"
+        "    detached_pct: 0.05\n"
+        "    terraced_pct: 0.05\n"
+    ))
+    base_rules = RuleParser().load_from_yaml(base)
+    rules = RuleParser().load_from_yaml(scenario)
+    assert rules.get_housing_rule('1_2km').apartment_pct == 0.9
+    assert rules.get_housing_rule('0_1km') == base_rules.get_housing_rule('0_1km')
+    assert [zone.name for zone in rules.zones] == [zone.name for zone in base_rules.zones]
+
+
+def test_cached_rules_are_copies(rules_yaml):
+    first = RuleParser().load_from_yaml(rules_yaml)
+    first.zones.clear()
+    assert RuleParser().load_from_yaml(rules_yaml).zones
+
+
+def test_same_mtime_rewrite_is_reloaded(tmp_path, rules_yaml):
+    path = _write(tmp_path / 'rules.yaml', rules_yaml.read_text())
+    assert RuleParser().load_from_yaml(path).sampling.mode == 'random'
+
+    stat = path.stat()
+    path.write_text(rules_yaml.read_text().replace('mode: "random"', 'mode: "quota"'))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert path.stat().st_mtime_ns == stat.st_mtime_ns
+    assert RuleParser().load_from_yaml(path).sampling.mode == 'quota'
+
+
+def test_edited_base_file_invalidates_the_scenario(tmp_path, rules_yaml):
+    base = _write(tmp_path / 'base.yaml', rules_yaml.read_text())
+    scenario = _write(tmp_path / 'scenario.yaml', "extends: base.yaml\n")
+    assert RuleParser().load_from_yaml(scenario).sampling.mode == 'random'
+    base.write_text(rules_yaml.read_text().replace('mode: "random"', 'mode: "quota"'))
+    assert RuleParser().load_from_yaml(scenario).sampling.mode == 'quota'
+
+
+def test_caches_are_bounded(tmp_path, rules_yaml, monkeypatch):
+    monkeypatch.setattr(parser_module, 'MAX_CACHED_FILES', 3)
+    paths = [_write(tmp_path / f'rules_{i}.yaml', rules_yaml.read_text()) for i in range(5)]
+    for path in paths:
+        RuleParser().load_from_yaml(path)
+    assert list(RuleParser._ruleset_cache) == [path.resolve() for path in paths[2:]]
+    assert len(RuleParser._document_cache) == 3
+
+
+def test_circular_extends_is_rejected(tmp_path):
+    _write(tmp_path / 'a.yaml', "extends: b.yaml\n")
+    _write(tmp_path / 'b.yaml', "extends: a.yaml\n")
+    with pytest.raises(RuleValidationError, match="circular extends"):
+        RuleParser().load_from_yaml(tmp_path / 'a.yaml')
+
+
+def test_validation_error_names_the_yaml_path(tmp_path):
+    path = _write(tmp_path / 'bad.yaml', (
+        "zones:\n"
+        "  - name: \"0_1km\"\n"
+        "    min_distance: 0\n"
+        "    max_distance: far\n"
+    ))
+    with pytest.raises(RuleValidationError, match=r"zones\[0\]\.max_distance"):
+        RuleParser().load_from_yaml(path)
@@ -0,0 +1,116 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from postprocessing.building_processor import BuildingProcessor, get_city_center_from_geojson
+from postprocessing.geometry_cache import load_building_attributes
+from preprocessing.template_modifier import TemplateModifier
+from rules.parser import RuleParser
+from service.daemon import serve
+from service.session import RuleSession, building_statistics
+
+DIFF = {'landuse_rules': [{'zone': '2_5km', 'residential_pct': 0.6}]}
+
+
+@pytest.fixture
+def session(rules_yaml, template_npz, buildings_gpkg, city_center_geojson, tmp_path):
+    return RuleSession(
+        str(rules_yaml), template_path=str(template_npz), buildings_path=str(buildings_gpkg),
+        city_center_path=str(city_center_geojson), geometry_cache_dir=str(tmp_path / 'cache')
+    )
+
+
+@pytest.fixture
+def diff_rules_yaml(tmp_path, rules_yaml):
+    # the DIFF written out as a full rule file, for the cold runs
+    document = RuleParser().merge_documents(RuleParser().load_document(rules_yaml), DIFF)
+    path = tmp_path / 'diff_rule.yaml'
+    path.write_text(yaml.safe_dump(document))
+    return path
+
+
+def cold_run(rules_yaml, template_npz, buildings_gpkg, city_center_geojson, tmp_path, seed):
+    rules = RuleParser().load_from_yaml(str(rules_yaml))
+    output = str(tmp_path / 'cold.npz')
+    stats = TemplateModifier(rules, random_seed=seed).modify_template(str(template_npz), output)
+    buildings = load_building_attributes(str(buildings_gpkg), str(tmp_path / 'cache'))
+    classified = BuildingProcessor(rules, random_seed=seed).process_buildings(
+        buildings, get_city_center_from_geojson(str(city_center_geojson))
+    )
+    with np.load(output) as data:
+        return stats, {key: data[key] for key in data.files}, classified
+
+
+@pytest.mark.parametrize('use_diff', [False, True])
+def test_evaluation_equals_a_cold_run(session, rules_yaml, diff_rules_yaml, template_npz, buildings_gpkg, city_center_geojson, tmp_path, use_diff):
+    output_template, output_csv = str(tmp_path / 'warm.npz'), str(tmp_path / 'warm.csv')
+    result = session.evaluate(diff=DIFF if use_diff else None, seed=4, output_template=output_template, output_csv=output_csv)
+    stats, arrays, classified = cold_run(
+        diff_rules_yaml if use_diff else rules_yaml, template_npz, buildings_gpkg, city_center_geojson, tmp_path, 4
+    )
+
+    with np.load(output_template) as warm:
+        for key, values in arrays.items():
+            np.testing.assert_array_equal(warm[key], values)
+    assert result['preprocessing']['by_zone_and_type'] == stats['by_zone_and_type']
+    classified.to_csv(tmp_path / 'cold.csv', index=False)
+    pd.testing.assert_frame_equal(pd.read_csv(output_csv), pd.read_csv(tmp_path / 'cold.csv'))
+    assert result['postprocessing'] == building_statistics(classified)
+
+
+def test_rules_are_compiled_once_and_diffs_can_become_the_base(session):
+    document = session.resolve_document(diff=DIFF)
+    assert session.compile(document) is session.compile(session.resolve_document(diff=DIFF))
+    session.evaluate(diff=DIFF, seed=1, update_base=True)
+    assert session.resolve_document(diff={}) == document
+    with pytest.raises(ValueError, match='not both'):
+        session.resolve_document(rules_text='zones: []', diff=DIFF)
+
+
+@pytest.fixture
+def daemon(session):
+    server = serve(session, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def request(url, body=None, content_type='application/json'):
+    data = None if body is None else (json.dumps(body) if content_type == 'application/json' else body).encode()
+    http_request = urllib.request.Request(url, data=data, headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(http_request, timeout=60) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_daemon_answers_evaluations(daemon, session, rules_yaml):
+    status, described = request(f"{daemon}/status")
+    assert status == 200 and described['buildings'] == 3000
+
+    status, result = request(f"{daemon}/evaluate", {'diff': DIFF, 'seed': 2})
+    assert status == 200
+    assert result['postprocessing'] == session.evaluate(diff=DIFF, seed=2)['postprocessing']
+
+    status, result = request(f"{daemon}/evaluate", rules_yaml.read_text(), content_type='text/yaml')
+    assert status == 200 and result['preprocessing']['total_cells'] == 60 * 70
+
+
+@pytest.mark.parametrize('body, content_type, message', [
+    ({'seed': 1, 'colour': 'red'}, 'application/json', 'unknown request fields'),
+    ('zones: [', 'text/yaml', 'invalid YAML'),
+    ([1, 2], 'application/json', 'JSON object'),
+])
+def test_daemon_rejects_bad_requests(daemon, body, content_type, message):
+    status, result = request(f"{daemon}/evaluate", body, content_type)
+    assert status == 400 and message in result['error']
+    assert request(f"{daemon}/missing")[0] == 404
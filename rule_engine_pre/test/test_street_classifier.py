@@ -0,0 +1,84 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from postprocessing.street_classifier import (
+    classify_streets, classify_street_file, load_road_targets, street_class_report, ROAD_TARGETS_CSV
+)
+from sampling.quota import quota_counts
+
+TARGETS = {'residential': 0.5, 'primary': 0.2, 'footway': 0.3}
+
+
+@pytest.fixture
+def streets(city_center):
+    # 997 segments, 10 - 300 m long, up to 5 km from the center
+    rng = np.random.default_rng(4)
+    n = 997
+    x = city_center[0] + rng.uniform(-5000, 5000, n)
+    y = city_center[1] + rng.uniform(-5000, 5000, n)
+    length = rng.uniform(10, 300, n)
+    lines = shapely.linestrings(np.stack([np.stack([x, y], 1), np.stack([x + length, y], 1)], axis=1))
+    return gpd.GeoDataFrame({'segment': np.arange(n)}, geometry=lines, crs='EPSG:28992')
+
+
+def test_counts_are_exact_quotas(streets):
+    result = classify_streets(streets, TARGETS, random_seed=1)
+    counts = result['road_type'].value_counts()
+    for road_type, expected in zip(TARGETS, quota_counts(list(TARGETS.values()), len(streets))):
+        assert counts[road_type] == expected
+    np.testing.assert_allclose(result['length_m'], shapely.length(streets.geometry.to_numpy()))
+    pd.testing.assert_frame_equal(result, classify_streets(streets, TARGETS, random_seed=1))
+
+
+def test_weights_pull_long_and_peripheral_segments_to_major_types(streets, city_center):
+    by_length = classify_streets(streets, TARGETS, length_weight=5.0, random_seed=1)
+    mean_length = by_length.groupby('road_type')['length_m'].mean()
+    assert mean_length['primary'] > mean_length['residential'] > mean_length['footway']
+
+    by_distance = classify_streets(streets, TARGETS, city_center=city_center, distance_weight=5.0, random_seed=1)
+    mean_distance = by_distance.groupby('road_type')['distance'].mean()
+    assert mean_distance['primary'] > mean_distance['residential'] > mean_distance['footway']
+
+
+def test_report_matches_the_assignment(streets):
+    result = classify_streets(streets, TARGETS, random_seed=1)
+    report = street_class_report(result, TARGETS)
+    assert (report['count'] == report['target_count']).all()
+    assert report['achieved_pct'].sum() == pytest.approx(100.0)
+    assert report['length_pct'].sum() == pytest.approx(100.0)
+    assert abs(report.loc['primary', 'achieved_pct'] - 20.0) < 100.0 / len(streets)
+
+
+def test_invalid_inputs_are_rejected(streets, tmp_path):
+    with pytest.raises(ValueError, match='city center'):
+        classify_streets(streets, TARGETS, distance_weight=1.0)
+    with pytest.raises(ValueError, match='projected CRS'):
+        classify_streets(streets.to_crs('EPSG:4326'), TARGETS)
+    pd.DataFrame({'type': ['a'], 'pct': [1.0]}).to_csv(tmp_path / 'bad.csv', index=False)
+    with pytest.raises(ValueError, match="'road_type' and 'percentage'"):
+        load_road_targets(tmp_path / 'bad.csv')
+
+
+def test_shipped_targets_are_normalized():
+    targets = load_road_targets(ROAD_TARGETS_CSV)
+    assert sum(targets.values()) == pytest.approx(1.0)
+    assert 'footway' in targets
+
+
+def test_street_file_round_trip(streets, tmp_path, city_center_geojson):
+    streets.to_crs('EPSG:4326').to_file(tmp_path / 'streets.geojson', driver='GeoJSON')
+    pd.DataFrame({'road_type': list(TARGETS), 'percentage': [v * 100 for v in TARGETS.values()]}).to_csv(
+        tmp_path / 'targets.csv', index=False
+    )
+    classified, report = classify_street_file(
+        str(tmp_path / 'streets.geojson'), str(tmp_path / 'out.geojson'), str(tmp_path / 'targets.csv'),
+        city_center_geojson=str(city_center_geojson), distance_weight=1.0, random_seed=3
+    )
+    # lon/lat input is classified in meters
+    assert classified.crs.to_epsg() == 28992
+    np.testing.assert_allclose(classified['length_m'], shapely.length(streets.geometry.to_numpy()), rtol=1e-3)
+    assert (report['count'] == report['target_count']).all()
+    assert gpd.read_file(tmp_path / 'out.geojson')['road_type'].value_counts().to_dict() == report['count'].to_dict()
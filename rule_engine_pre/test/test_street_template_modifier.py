@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from preprocessing.street_template_modifier import StreetTemplateModifier, NO_STREET
+from rules.rule_dataclass import StreetTemplateRule
+
+
+@pytest.fixture
+def street_grid():
+    # clusters 0-3 and no-street cells, 200 x 200
+    return np.random.default_rng(3).integers(NO_STREET, 4, (200, 200))
+
+
+def zone_index_of(grid, zone=0):
+    return np.full(grid.shape, zone)
+
+
+def test_target_shares_are_reached(rules, street_grid):
+    rules.street_template_rules = [StreetTemplateRule(zone='0_1km', target_shares={0: 0.7, 1: 0.1, 2: 0.1, 3: 0.1})]
+    _, stats = StreetTemplateModifier(rules, np.random.default_rng(1)).modify_street_grid(street_grid, zone_index_of(street_grid))
+    achieved = stats['0_1km']['achieved']
+    for cluster, share in {0: 0.7, 1: 0.1, 2: 0.1, 3: 0.1}.items():
+        assert achieved[cluster] == pytest.approx(share, abs=0.02)
+
+
+def test_no_street_cells_are_kept(rules, street_grid):
+    rules.street_template_rules = [StreetTemplateRule(zone='0_1km', target_shares={0: 0.25, 1: 0.25, 2: 0.25, 3: 0.25})]
+    result, stats = StreetTemplateModifier(rules, np.random.default_rng(1)).modify_street_grid(street_grid, zone_index_of(street_grid))
+    np.testing.assert_array_equal(result == NO_STREET, street_grid == NO_STREET)
+    assert NO_STREET not in stats['0_1km']['input']
+    assert stats['0_1km']['cells'] == int((street_grid != NO_STREET).sum())
+
+
+def test_transitions_only_touch_listed_clusters_and_zones(rules, street_grid):
+    rules.street_template_rules = [StreetTemplateRule(zone='1_2km', transitions={0: {1: 0.5, 2: 0.5}})]
+    zone_index = np.where(np.arange(200)[:, None] < 100, 0, 1) * np.ones((1, 200), dtype=int)
+    result, _ = StreetTemplateModifier(rules, np.random.default_rng(1)).modify_street_grid(street_grid, zone_index)
+
+    changed = result != street_grid
+    # zone 0 has no rule, only cluster 0 cells of zone 1 change, and all of them
+    assert not changed[zone_index == 0].any()
+    assert (street_grid[changed] == 0).all()
+    assert not (result[(zone_index == 1)] == 0).any()
+
+
+def test_no_street_value_is_not_a_cluster(rules, street_grid):
+    rules.street_template_rules = [StreetTemplateRule(zone='0_1km', transitions={NO_STREET: {0: 1.0}})]
+    with pytest.raises(ValueError, match='no-street'):
+        StreetTemplateModifier(rules, np.random.default_rng(1)).modify_street_grid(street_grid, zone_index_of(street_grid))
@@ -0,0 +1,78 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from shapely import affinity
+
+from generation.subdivision import subdivide_enclosures, assign_enclosure_types, DEFAULT_PARAMETERS
+
+
+def enclosures(*polygons, ids=None):
+    frame = gpd.GeoDataFrame(geometry=list(polygons), crs='EPSG:28992')
+    if ids is not None:
+        frame['enclosure_id'] = ids
+    return frame
+
+
+BLOCK = shapely.box(0, 0, 100, 60)
+
+
+def test_apartment_block_is_a_perimeter_block():
+    # setback 3 m: 94 x 54 block, courtyard 14 m further in: 66 x 26
+    result = subdivide_enclosures(enclosures(BLOCK, shapely.box(200, 0, 230, 30)), ['apartment', 'apartment'])
+    assert len(result) == 2
+    assert result['area_m2'].iloc[0] == pytest.approx(94 * 54 - 66 * 26)
+    # too small for a courtyard: the whole block
+    assert result['area_m2'].iloc[1] == pytest.approx(24 * 24)
+
+
+@pytest.mark.parametrize('angle', [0.0, 30.0, 90.0])
+def test_detached_houses_fill_a_lot_grid(angle):
+    # 94 x 54 block, 22 m lots: 4 x 2 lots with one 11 x 11 house each
+    block = affinity.rotate(BLOCK, angle, origin=(0, 0))
+    result = subdivide_enclosures(enclosures(block), ['detached'])
+    assert len(result) == 8
+    np.testing.assert_allclose(result['area_m2'], 121.0)
+    assert shapely.contains(shapely.buffer(block, -3.0, join_style='mitre'), result.geometry.to_numpy()).all()
+    assert not shapely.intersects(result.geometry.iloc[0], result.geometry.iloc[1:].to_numpy()).any()
+
+
+def test_terraced_strips_tile_the_band():
+    result = subdivide_enclosures(enclosures(BLOCK), ['terraced'])
+    band_area = 94 * 54 - 74 * 34
+    footprints = result.geometry.to_numpy()
+    # strips do not overlap and cover the band up to the dropped small pieces
+    assert shapely.union_all(footprints).area == pytest.approx(result['area_m2'].sum())
+    assert 0.9 * band_area <= result['area_m2'].sum() <= band_area + 1e-6
+    params = DEFAULT_PARAMETERS['terraced']
+    assert result['area_m2'].max() <= params['width'] * params['depth'] + 1e-6
+    assert (result['area_m2'] >= DEFAULT_PARAMETERS['min_area']).all()
+
+
+def test_buildings_keep_their_enclosure_and_type():
+    frame = enclosures(BLOCK, shapely.box(200, 0, 300, 60), shapely.box(400, 0, 500, 60), ids=[10, 11, 12])
+    result = subdivide_enclosures(frame, ['detached', 'none', 'apartment'])
+    assert result['building_id'].tolist() == list(range(len(result)))
+    assert result['parent_block_id'].tolist() == [10] * 8 + [12]
+    assert result['building_type'].tolist() == ['detached'] * 8 + ['apartment']
+    assert result.crs == frame.crs
+
+
+@pytest.mark.parametrize('frame, types, parameters, message', [
+    (enclosures(BLOCK), ['apartment', 'detached'], None, '2 housing types for 1'),
+    (enclosures(BLOCK).set_crs('EPSG:4326', allow_override=True), ['apartment'], None, 'projected CRS'),
+    (enclosures(BLOCK), ['apartment'], {'garden': 5.0}, "Unknown subdivision parameter 'garden'"),
+    (enclosures(BLOCK), ['apartment'], {'terraced': {'width': 0.0}}, "'terraced.width' must be positive"),
+])
+def test_invalid_input_is_rejected(frame, types, parameters, message):
+    with pytest.raises(ValueError, match=message):
+        subdivide_enclosures(frame, types, parameters)
+
+
+def test_enclosure_types_follow_the_zone_rules(rules, city_center):
+    x, y = city_center
+    frame = enclosures(*[shapely.box(x + dx, y, x + dx + 80, y + 60) for dx in range(0, 4000, 100)])
+    types = assign_enclosure_types(rules, frame, city_center, random_seed=2)
+    assert len(types) == 40
+    assert set(types) <= {'apartment', 'terraced', 'detached', 'none'}
+    np.testing.assert_array_equal(types, assign_enclosure_types(rules, frame, city_center, random_seed=2))
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from postprocessing.building_processor import BuildingProcessor
+from rules.rule_dataclass import SamplingConfig
+from sampling.quota import quota_counts
+from scenarios.sweep import ScenarioSweep
+
+
+def _template(tmp_path, shape=(80, 80)):
+    city_center = np.zeros(shape, dtype=np.int64)
+    city_center[40, 40] = 1
+    path = tmp_path / 'template.npz'
+    np.savez(path, building_class=np.full(shape, 99), cluster_street=np.zeros(shape, dtype=np.int64), city_center=city_center)
+    return path
+
+
+def test_product_and_zip_scenarios(rules):
+    sweep = ScenarioSweep(rules)
+    sweep.add_parameter('landuse_rules.0_1km.residential_pct', [0.1, 0.5, 0.9])
+    sweep.add_parameter('landuse_rules.2_5km.residential_pct', [0.2, 0.4])
+    assert len(sweep.scenario_table()) == 6
+
+    zipped = ScenarioSweep(rules, combine='zip')
+    zipped.add_parameter('housing_rules.0_1km.apartment_pct', [0.6, 0.7])
+    zipped.add_parameter('housing_rules.0_1km.detached_pct', [0.1, 0.0])
+    scenarios = zipped.scenario_rules()
+    assert [s.get_housing_rule('0_1km').apartment_pct for s in scenarios] == [0.6, 0.7]
+    assert rules.get_housing_rule('0_1km').apartment_pct == 0.5
+
+
+@pytest.mark.parametrize('path', ['landuse_rules.9km.residential_pct', 'landuse_rules.0_1km.color', 'zones.0_1km.max_distance', 'x.y'])
+def test_invalid_parameter_paths_are_rejected(rules, path):
+    with pytest.raises(ValueError):
+        ScenarioSweep(rules).add_parameter(path, [1.0])
+
+
+def test_invalid_scenario_names_the_scenario(rules):
+    sweep = ScenarioSweep(rules).add_parameter('housing_rules.0_1km.apartment_pct', [0.5, 0.9])
+    with pytest.raises(ValueError, match="Scenario 1"):
+        sweep.scenario_rules()
+
+
+def test_quota_sweep_on_buildings_is_exact(rules, buildings, city_center):
+    rules.sampling = SamplingConfig(mode='quota')
+    sweep = ScenarioSweep(rules, combine='zip')
+    sweep.add_parameter('housing_rules.1_2km.apartment_pct', [0.1, 0.5])
+    sweep.add_parameter('housing_rules.1_2km.terraced_pct', [0.8, 0.4])
+    table = sweep.run_on_buildings(buildings, city_center, random_seed=1)
+
+    zones = BuildingProcessor(rules).process_buildings(buildings, city_center)['zone']
+    for _, row in table.iterrows():
+        n = (zones == row['zone']).sum()
+        assert row['n_buildings'] == n
+        housing = sweep.scenario_rules()[row['scenario']].get_housing_rule(row['zone'])
+        expected = quota_counts([housing.apartment_pct, housing.detached_pct, housing.terraced_pct], n)
+        np.testing.assert_array_equal(row[['apartment', 'detached', 'terraced']].to_numpy(dtype=int), expected)
+
+
+def test_random_sweep_on_template_follows_the_shares(rules, tmp_path):
+    sweep = ScenarioSweep(rules).add_parameter('landuse_rules.2_5km.residential_pct', [0.1, 0.9])
+    table = sweep.run_on_template(str(_template(tmp_path)), cell_size=50.0, random_seed=1)
+    outer = table[table['zone'] == '2_5km'].set_index('scenario')
+    assert outer.loc[0, 'n_cells'] == outer.loc[1, 'n_cells'] > 1000
+    np.testing.assert_allclose(outer['residential_share'], [0.1, 0.9], atol=0.03)
+    # zones without a swept parameter keep their base share in every scenario
+    inner = table[table['zone'] == '1_2km']
+    np.testing.assert_allclose(inner['residential_share'], 0.7, atol=0.05)
+
+
+def test_quota_sweep_on_template_is_exact(rules, tmp_path):
+    rules.sampling = SamplingConfig(mode='quota')
+    sweep = ScenarioSweep(rules).add_parameter('landuse_rules.0_1km.residential_pct', [0.25, 0.75])
+    table = sweep.run_on_template(str(_template(tmp_path)), cell_size=50.0)
+    for _, row in table[table['zone'] == '0_1km'].iterrows():
+        p = [0.25, 0.75][row['scenario']]
+        assert row['residential_cells'] == quota_counts([p, 1 - p], row['n_cells'])[0]
+        assert row[['apartment', 'detached', 'terraced']].sum() == row['residential_cells']
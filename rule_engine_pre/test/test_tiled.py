@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from preprocessing.template_modifier import ZONE_IDS
+from preprocessing.tiled import modify_template_tiled
+from rules.rule_dataclass import StreetTemplateRule
+
+
+@pytest.fixture
+def template(template_npz):
+    return str(template_npz)
+
+
+def run(rules, template, tmp_path, name, **kwargs):
+    output = str(tmp_path / f"{name}.npz")
+    stats = modify_template_tiled(rules, template, output, random_seed=11, **kwargs)
+    with np.load(output) as data:
+        return stats, {key: data[key] for key in data.files}
+
+
+def test_result_is_independent_of_tiling_and_workers(rules, template, tmp_path):
+    rules.street_template_rules = [StreetTemplateRule(zone='0_1km', target_shares={0: 0.4, 1: 0.2, 2: 0.2, 3: 0.2})]
+    reference_stats, reference = run(rules, template, tmp_path, 'reference', tile_size=512, workers=1)
+    assert reference_stats['tiles'] == 1
+    for tile_size, workers in ((7, 1), (16, 2)):
+        stats, result = run(rules, template, tmp_path, f"tiles_{tile_size}", tile_size=tile_size, workers=workers)
+        for key in reference:
+            np.testing.assert_array_equal(result[key], reference[key])
+        assert stats['by_zone_and_type'] == reference_stats['by_zone_and_type']
+        assert stats['street_templates'] == reference_stats['street_templates']
+
+
+def test_outputs_keep_shape_dtype_and_zones(rules, template, tmp_path):
+    stats, result = run(rules, template, tmp_path, 'out', tile_size=16, workers=1)
+    with np.load(template) as data:
+        assert result['building_class'].dtype == data['building_class'].dtype
+        np.testing.assert_array_equal(result['city_center'], data['city_center'])
+    # every cell lies within 5 km of the center
+    assert stats['total_cells'] == sum(stats['by_zone'].values()) == 60 * 70
+    with np.load(str(tmp_path / 'out_zones.npz')) as zones:
+        assert not (zones['zone_grid'] == ZONE_IDS['unknown']).any()
+
+
+def test_only_random_mode_is_tiled(rules, template, tmp_path):
+    rules.sampling.mode = 'quota'
+    with pytest.raises(ValueError, match="'random'"):
+        modify_template_tiled(rules, template, str(tmp_path / 'out.npz'))